@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark du stockage d'inventaire d'inventory-service
+Compare le parcours linéaire historique (dict indexé par numéro de ligne) à
+InventoryStore (clé (product_id, location_id), index par emplacement, totaux tenus)
+sur 100k produits x 7 emplacements
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'microservices', 'inventory-service'
+)))
+
+from inventory_store import InventoryStore
+
+
+def generer_inventaire(nb_produits, nb_emplacements):
+    return [
+        {
+            'product_id': product_id,
+            'location_id': location_id,
+            'available_quantity': (product_id * location_id) % 500,
+            'reserved_quantity': 0,
+        }
+        for location_id in range(1, nb_emplacements + 1)
+        for product_id in range(1, nb_produits + 1)
+    ]
+
+
+def mesurer(operation, iterations):
+    durees = []
+    for _ in range(iterations):
+        debut = time.perf_counter()
+        operation()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), max(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--locations', type=int, default=7)
+    parser.add_argument('--lookups', type=int, default=20, help="recherches par itération (un panier)")
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    lignes = generer_inventaire(args.products, args.locations)
+    inventory_db = {index: dict(ligne) for index, ligne in enumerate(lignes, start=1)}
+    debut = time.perf_counter()
+    store = InventoryStore(dict(ligne) for ligne in lignes)
+    chargement = time.perf_counter() - debut
+
+    rng = random.Random(42)
+    cles = [(rng.randint(1, args.products), rng.randint(1, args.locations)) for _ in range(args.lookups)]
+
+    def lineaire_recherche():
+        for product_id, location_id in cles:
+            next(item for item in inventory_db.values()
+                 if item['product_id'] == product_id and item['location_id'] == location_id)
+
+    def store_recherche():
+        for product_id, location_id in cles:
+            store.get(product_id, location_id)
+
+    def lineaire_emplacement():
+        [item for item in inventory_db.values() if item['location_id'] == 3]
+
+    def store_emplacement():
+        store.by_location(3)
+
+    def lineaire_totaux():
+        sum(item['available_quantity'] for item in inventory_db.values())
+        sum(item['reserved_quantity'] for item in inventory_db.values())
+
+    def store_totaux():
+        store.total_available, store.total_reserved
+
+    print(f"Inventaire: {args.products} produits x {args.locations} emplacements = {len(store)} lignes "
+          f"(chargement InventoryStore {chargement * 1000:.0f} ms), {args.iterations} itérations (médiane / max)")
+    for label, lineaire, indexe in (
+        (f"{args.lookups} recherches", lineaire_recherche, store_recherche),
+        ("Liste emplacement", lineaire_emplacement, store_emplacement),
+        ("Totaux métriques", lineaire_totaux, store_totaux),
+    ):
+        med_l, max_l = mesurer(lineaire, args.iterations)
+        med_s, max_s = mesurer(indexe, args.iterations)
+        print(f"{label:18s} parcours {med_l * 1000:10.3f} ms (max {max_l * 1000:10.3f}) | "
+              f"store {med_s * 1000:8.3f} ms (max {max_s * 1000:8.3f}) | x{med_l / max(med_s, 1e-9):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark du chemin de lecture du catalogue produits
+Compare l'hydratation de l'agrégat Product (ProductApplicationService)
+au read model CQRS (ProductQueryService) sur un catalogue de 50k produits
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.persistence.models import Base, CategorieModel, ProduitModel
+from src.api.bounded_contexts.product_catalog.infrastructure.product_repository_adapter import (
+    ProductRepositoryAdapter
+)
+from src.api.bounded_contexts.product_catalog.infrastructure.product_read_model import ProductReadModel
+from src.api.bounded_contexts.product_catalog.application.product_application_service import (
+    ProductApplicationService
+)
+from src.api.bounded_contexts.product_catalog.application.product_query_service import ProductQueryService
+
+
+def creer_catalogue(database_url, nb_produits):
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(CategorieModel), [
+            {'id': i, 'nom': f"Catégorie {i}", 'description': None} for i in range(1, 9)
+        ])
+        conn.execute(insert(ProduitModel), [
+            {
+                'id': i,
+                'nom': f"Produit {i:06d}",
+                'prix': Decimal(100 + i % 9900) / 100,
+                'stock': i % 500,
+                'seuil_alerte': 5,
+                'id_categorie': 1 + i % 8,
+                'description': f"Description du produit {i}",
+            }
+            for i in range(1, nb_produits + 1)
+        ])
+    return engine
+
+
+def mesurer(operation, iterations):
+    durees = []
+    for _ in range(iterations):
+        debut = time.perf_counter()
+        operation()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), max(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--database-url', default='sqlite:////tmp/product_read_path_benchmark.db')
+    args = parser.parse_args()
+
+    engine = creer_catalogue(args.database_url, args.products)
+    Session = sessionmaker(bind=engine)
+
+    def agregat_liste_complete():
+        session = Session()
+        ProductApplicationService(ProductRepositoryAdapter(session)).list_products()
+        session.close()
+
+    def read_model_liste_complete():
+        session = Session()
+        ProductQueryService(ProductReadModel(session)).list_products()
+        session.close()
+
+    def agregat_page():
+        # Chemin historique de l'endpoint : liste complète puis découpage
+        session = Session()
+        ProductApplicationService(ProductRepositoryAdapter(session)).list_products()[:20]
+        session.close()
+
+    def read_model_page():
+        session = Session()
+        ProductQueryService(ProductReadModel(session)).list_products(page=100, per_page=20)
+        session.close()
+
+    def agregat_detail():
+        session = Session()
+        ProductApplicationService(ProductRepositoryAdapter(session)).get_product_by_id(args.products // 2)
+        session.close()
+
+    def read_model_detail():
+        session = Session()
+        ProductQueryService(ProductReadModel(session)).get_product_by_id(args.products // 2)
+        session.close()
+
+    print(f"Catalogue: {args.products} produits, {args.iterations} itérations (médiane / max)")
+    for label, agregat, read_model in (
+        ("Liste complète", agregat_liste_complete, read_model_liste_complete),
+        ("Page de 20", agregat_page, read_model_page),
+        ("Détail", agregat_detail, read_model_detail),
+    ):
+        med_a, max_a = mesurer(agregat, args.iterations)
+        med_r, max_r = mesurer(read_model, args.iterations)
+        print(f"{label:15s} agrégat {med_a * 1000:9.2f} ms (max {max_a * 1000:9.2f}) | "
+              f"read model {med_r * 1000:9.2f} ms (max {max_r * 1000:9.2f}) | x{med_a / med_r:.1f}")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
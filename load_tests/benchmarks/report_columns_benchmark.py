@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark du calcul des rapports de reporting-service
+Compare les boucles de ReportGenerator (un parcours des dictionnaires par statistique)
+au calcul colonnaire de report_columns (un chargement, puis np.bincount par regroupement)
+sur 1M de lignes de vente
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'microservices', 'reporting-service'
+)))
+
+import report_columns
+from app import ReportGenerator
+
+
+def generer_ventes(nb_lignes, lignes_par_vente, nb_produits, nb_magasins, seed=42):
+    rng = random.Random(seed)
+    ventes = []
+    for numero in range(nb_lignes // lignes_par_vente):
+        items = [
+            {'product_id': rng.randint(1, nb_produits), 'quantity': rng.randint(1, 5),
+             'unit_price': round(rng.uniform(0.5, 50), 2)}
+            for _ in range(lignes_par_vente)
+        ]
+        ventes.append({
+            'transaction_id': f"t{numero}",
+            'store_id': rng.randint(1, nb_magasins),
+            'cashier_id': f"caissier_{rng.randint(1, 40)}",
+            'payment_method': rng.choice(('card', 'cash', 'mobile')),
+            'timestamp': f"2025-01-{rng.randint(1, 28):02d}T{rng.randint(8, 21):02d}:{rng.randint(0, 59):02d}:00",
+            'final_amount': round(sum(i['quantity'] * i['unit_price'] for i in items), 2),
+            'items': items
+        })
+    return ventes
+
+
+def mesurer(operation, iterations):
+    durees = []
+    for _ in range(iterations):
+        debut = time.perf_counter()
+        resultat = operation()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=1_000_000)
+    parser.add_argument('--lines-per-sale', type=int, default=4)
+    parser.add_argument('--products', type=int, default=5_000)
+    parser.add_argument('--stores', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    ventes = generer_ventes(args.lines, args.lines_per_sale, args.products, args.stores)
+    produits = [{'id': pid, 'nom': f"Produit {pid}", 'categorie': 'Test'} for pid in range(1, args.products + 1)]
+
+    def boucles():
+        report_columns.REPORT_COLUMNAR_MIN_ROWS = len(ventes) + 1
+        return (ReportGenerator.generate_sales_summary(ventes),
+                ReportGenerator.generate_product_performance(ventes, produits))
+
+    def colonnes():
+        colonnes = report_columns.SalesColumns(ventes)
+        return (colonnes.sales_summary(),
+                ReportGenerator.summarize_product_performance(colonnes.product_sales(), produits),
+                colonnes.group_by('cashier'), colonnes.group_by('hour'))
+
+    med_boucles, (resume_b, perf_b) = mesurer(boucles, args.iterations)
+    med_colonnes, (resume_c, perf_c, _, _) = mesurer(colonnes, args.iterations)
+    chargement, _ = mesurer(lambda: report_columns.SalesColumns(ventes), args.iterations)
+
+    assert resume_b['total_revenue'] == resume_c['total_revenue']
+    assert resume_b['by_store'].keys() == resume_c['by_store'].keys()
+    assert [p['product_id'] for p in perf_b['top_products']] == [p['product_id'] for p in perf_c['top_products']]
+
+    print(f"{len(ventes)} ventes, {args.lines} lignes, {args.iterations} itérations (médiane)")
+    print(f"Boucles (résumé + performance produits)          {med_boucles * 1000:9.0f} ms")
+    print(f"Colonnes (résumé + produits + caissier + heure)  {med_colonnes * 1000:9.0f} ms "
+          f"dont chargement {chargement * 1000:.0f} ms | x{med_boucles / max(med_colonnes, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
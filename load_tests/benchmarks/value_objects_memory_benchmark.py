@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire (tracemalloc) des Value Objects du catalogue
+Mesure le surcoût par produit du chemin list-products :
+mapping entité -> agrégat Product (+ Value Objects) puis to_dict()
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.api.bounded_contexts.product_catalog.infrastructure.product_repository_adapter import (
+    ProductRepositoryAdapter
+)
+
+
+def construire_entites(nb_produits):
+    """Entités de persistance telles que renvoyées par RepositoryProduit"""
+    return [
+        SimpleNamespace(
+            id=i,
+            nom=f"Produit {i:06d}",
+            prix=Decimal(100 + i % 9900) / 100,
+            stock=i % 500,
+            id_categorie=1 + i % 8,
+            seuil_alerte=5 + i % 20,
+            description=f"Description du produit {i}" if i % 2 else None,
+        )
+        for i in range(1, nb_produits + 1)
+    ]
+
+
+def mesurer(nb_produits):
+    entites = construire_entites(nb_produits)
+    adapter = ProductRepositoryAdapter(session=SimpleNamespace())
+
+    gc.collect()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    produits = [adapter._map_to_domain(entite) for entite in entites]
+    duree_mapping = time.perf_counter() - debut
+    memoire_agregats, _ = tracemalloc.get_traced_memory()
+
+    debut = time.perf_counter()
+    resultat = [produit.to_dict() for produit in produits]
+    duree_to_dict = time.perf_counter() - debut
+    memoire_totale, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(resultat) == nb_produits
+    return {
+        'octets_par_produit_agregat': memoire_agregats / nb_produits,
+        'octets_par_produit_total': memoire_totale / nb_produits,
+        'pic_mo': pic / (1024 * 1024),
+        'mapping_us_par_produit': duree_mapping / nb_produits * 1e6,
+        'to_dict_us_par_produit': duree_to_dict / nb_produits * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"Catalogue: {args.products} produits")
+    # Le second passage bénéficie des IDs internés par le premier (requêtes suivantes)
+    for passage in ("Premier passage", "Passage suivant"):
+        resultats = mesurer(args.products)
+        print(f"--- {passage}")
+        print(f"Agrégats + Value Objects : {resultats['octets_par_produit_agregat']:.0f} octets/produit")
+        print(f"Avec to_dict()           : {resultats['octets_par_produit_total']:.0f} octets/produit")
+        print(f"Pic tracemalloc          : {resultats['pic_mo']:.1f} Mo")
+        print(f"Mapping                  : {resultats['mapping_us_par_produit']:.2f} µs/produit")
+        print(f"to_dict()                : {resultats['to_dict_us_par_produit']:.2f} µs/produit")
+
+if __name__ == "__main__":
+    main()
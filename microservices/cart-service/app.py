@@ -81,11 +81,30 @@ update_item_model = api.model('UpdateItem', {
 
 # Import des services métier
 from services import CartService, TaxService
-from redis_client import get_redis_client
+from redis_client import get_redis_client, RedisCartClient
 
 # Initialisation de Redis
 redis_client = get_redis_client()
 
+# Cache local du catalogue (prix, noms, stock), invalidé par le flux de changements de product-service
+PRODUCT_EVENTS_REDIS_URL = os.getenv('PRODUCT_EVENTS_REDIS_URL')
+
+try:
+    from product_cache import ProductCache
+except ImportError:  # module partagé copié dans l'image (microservices/shared)
+    ProductCache = None
+
+product_cache = None
+if ProductCache and PRODUCT_EVENTS_REDIS_URL:
+    import redis
+    product_cache = ProductCache(
+        redis.from_url(PRODUCT_EVENTS_REDIS_URL),
+        ttl=float(os.getenv('PRODUCT_CACHE_TTL', '3600')),
+        max_entries=int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', '50000')),
+        negative_ttl=float(os.getenv('PRODUCT_CACHE_NEGATIVE_TTL', '60'))
+    )
+    product_cache.start()
+
 def init_app():
     """Initialiser l'application avec Redis"""
     global redis_client
@@ -99,6 +118,15 @@ def init_app():
     app.logger.info(f"[CART] Service démarré sur le port 8006 - Instance: {INSTANCE_ID}")
     app.logger.info(f"[CART] Connexion Redis initialisée - URL: {REDIS_URL}")
     app.logger.info(f"[CART] Service name: {SERVICE_NAME}")
+    
+    # Index d'expiration des paniers : reconstruit par SCAN s'il n'existe pas encore
+    redis_cart = RedisCartClient(redis_client)
+    try:
+        if not redis_client.exists(redis_cart.index_key):
+            indexed = redis_cart.rebuild_cart_index()
+            app.logger.info(f"[CART] Index des paniers reconstruit - {indexed} paniers")
+    except Exception as e:
+        app.logger.warning(f"[CART] Index des paniers non reconstruit: {e}")
 
 # Endpoints Panier
 @api.route('/carts/<string:session_id>')
@@ -108,7 +136,7 @@ class Cart(Resource):
     def get(self, session_id):
         """Récupérer le contenu du panier"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             cart = cart_service.get_cart(session_id)
             
             if not cart:
@@ -133,7 +161,7 @@ class Cart(Resource):
     def delete(self, session_id):
         """Vider complètement le panier"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             success = cart_service.clear_cart(session_id)
             
             if success:
@@ -155,7 +183,7 @@ class CartItems(Resource):
         """Ajouter un article au panier"""
         try:
             data = request.get_json()
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             
             # Validation des données
             if not data.get('product_id') or not data.get('quantity'):
@@ -200,7 +228,7 @@ class CartItem(Resource):
         """Mettre à jour la quantité d'un article dans le panier"""
         try:
             data = request.get_json()
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             
             if not data.get('quantity') or data['quantity'] < 0:
                 api.abort(400, "La quantité doit être >= 0")
@@ -238,7 +266,7 @@ class CartItem(Resource):
     def delete(self, session_id, product_id):
         """Retirer un article du panier"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             cart = cart_service.remove_item_from_cart(session_id, product_id)
             
             if not cart:
@@ -269,7 +297,7 @@ class CartCalculation(Resource):
     def post(self, session_id):
         """Recalculer tous les totaux du panier (avec taxes)"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             tax_service = TaxService()
             
             cart = cart_service.get_cart(session_id)
@@ -304,7 +332,7 @@ class CartCustomerAssociation(Resource):
     def put(self, session_id, customer_id):
         """Associer un panier à un client connecté"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             cart = cart_service.associate_cart_to_customer(session_id, customer_id)
             
             if not cart:
@@ -335,7 +363,7 @@ class CartExtension(Resource):
         """Prolonger la durée de vie du panier"""
         try:
             hours = int(request.args.get('hours', 24))
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             cart = cart_service.extend_cart_expiry(session_id, hours)
             
             if not cart:
@@ -365,7 +393,7 @@ class ExpiredCarts(Resource):
     def delete(self):
         """Nettoyer les paniers expirés (endpoint admin)"""
         try:
-            cart_service = CartService(redis_client)
+            cart_service = CartService(redis_client, product_cache)
             cleaned_count = cart_service.cleanup_expired_carts()
             
             app.logger.info(f"Nettoyage effectué: {cleaned_count} paniers expirés supprimés")
@@ -421,9 +449,9 @@ class InstanceMetrics(Resource):
             # Statistiques Redis pour cette instance
             redis_info = redis_client.info()
             
-            # Métriques de charge locale
-            cart_keys = redis_client.keys(f"cart:*")
-            active_sessions = len(cart_keys)
+            # Métriques de charge locale (index d'expiration, sans parcourir les paniers)
+            cart_stats = RedisCartClient(redis_client).get_cart_stats()
+            active_sessions = cart_stats.get('active_carts', 0)
             
             return {
                 'instance_id': INSTANCE_ID,
@@ -437,6 +465,7 @@ class InstanceMetrics(Resource):
                     'redis_keyspace_hits': redis_info.get('keyspace_hits', 0),
                     'redis_keyspace_misses': redis_info.get('keyspace_misses', 0)
                 },
+                'product_cache': product_cache.stats() if product_cache else {'enabled': False},
                 'load_balancing': {
                     'ready_for_traffic': True,
                     'weight': 100,
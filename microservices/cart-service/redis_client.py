@@ -7,6 +7,8 @@ Base de données: Redis (cart_cache)
 import os
 import redis
 import json
+import time
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any
 
 # Configuration Redis
@@ -21,6 +23,270 @@ REDIS_SOCKET_CONNECT_TIMEOUT = 5
 REDIS_SOCKET_TIMEOUT = 5
 REDIS_CONNECTION_POOL_MAX_CONNECTIONS = 20
 
+# Taille des lots SCAN / pipeline pour les parcours de paniers
+CART_SCAN_BATCH_SIZE = int(os.getenv('CART_SCAN_BATCH_SIZE', '500'))
+
+# Panier = HASH cart:<session_id> : champs d'en-tête (session_id, customer_id, currency, dates),
+# totaux en centimes (total_items, total_amount_cents, tax_amount_cents, final_amount_cents)
+# et un champ item:<product_id> par article (JSON). Les scripts Lua modifient un article et
+# les totaux dans le même aller-retour, sans perte de mise à jour entre instances.
+# KEYS[2] = index d'expiration (ZSET clé -> échéance epoch), KEYS[3] = compteurs (HASH) :
+# les statistiques se lisent sans parcourir les paniers
+_CART_LUA_HELPERS = """
+local function index_cart(key)
+    local ttl = redis.call('PTTL', key)
+    if ttl > 0 then
+        local now = redis.call('TIME')
+        redis.call('ZADD', KEYS[2], tonumber(now[1]) + tonumber(now[2]) / 1000000 + ttl / 1000, key)
+    end
+end
+
+local function migrate(key)
+    -- Ancien format : panier complet en JSON dans une chaîne
+    if redis.call('TYPE', key).ok ~= 'string' then
+        return
+    end
+    local cart = cjson.decode(redis.call('GET', key))
+    local ttl = redis.call('PTTL', key)
+    redis.call('DEL', key)
+    local total, position = 0, 0
+    for _, item in ipairs(cart['items'] or {}) do
+        position = position + 1
+        local price_cents = math.floor(item['price'] * 100 + 0.5)
+        local stored = {product_id = item['product_id'], product_name = item['product_name'],
+                        product_sku = item['product_sku'], price = item['price'], price_cents = price_cents,
+                        quantity = item['quantity'], subtotal_cents = price_cents * item['quantity'],
+                        position = position}
+        total = total + stored['subtotal_cents']
+        redis.call('HSET', key, 'item:' .. item['product_id'], cjson.encode(stored))
+    end
+    local tax = math.floor((tonumber(cart['tax_amount']) or 0) * 100 + 0.5)
+    local customer_id = cart['customer_id']
+    if customer_id == cjson.null or customer_id == nil then
+        customer_id = ''
+    end
+    redis.call('HSET', key, 'session_id', cart['session_id'] or '', 'customer_id', customer_id,
+        'currency', cart['currency'] or 'CAD', 'created_at', cart['created_at'] or '',
+        'updated_at', cart['updated_at'] or '', 'expires_at', cart['expires_at'] or '',
+        'total_items', cart['total_items'] or 0, 'total_amount_cents', total,
+        'tax_amount_cents', tax, 'final_amount_cents', total + tax, 'next_position', position)
+    if ttl > 0 then
+        redis.call('PEXPIRE', key, ttl)
+        index_cart(key)
+    end
+end
+
+local function refresh_ttl(key, ttl)
+    -- Au moins ttl secondes, sans raccourcir une prolongation
+    if redis.call('TTL', key) < tonumber(ttl) then
+        redis.call('EXPIRE', key, ttl)
+        index_cart(key)
+    end
+end
+"""
+
+# KEYS[1] panier, KEYS[2] index, KEYS[3] compteurs ; ARGV : ttl, updated_at
+_TOUCH_CART_SCRIPT = _CART_LUA_HELPERS + """
+migrate(KEYS[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[2])
+refresh_ttl(KEYS[1], ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS[1..3] ; ARGV : ttl, champs du panier (JSON) ; sans effet si le panier existe déjà
+_CREATE_CART_SCRIPT = _CART_LUA_HELPERS + """
+migrate(KEYS[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    for field, value in pairs(cjson.decode(ARGV[2])) do
+        redis.call('HSET', KEYS[1], field, value)
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    index_cart(KEYS[1])
+    redis.call('HINCRBY', KEYS[3], 'created', 1)
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS[1..3] ; ARGV : ttl, updated_at, champs d'un nouveau panier (JSON),
+# product_id, quantité ajoutée, article (JSON : nom, sku, prix, prix en centimes)
+_ADD_ITEM_SCRIPT = _CART_LUA_HELPERS + """
+local key = KEYS[1]
+migrate(key)
+if redis.call('EXISTS', key) == 0 then
+    for field, value in pairs(cjson.decode(ARGV[3])) do
+        redis.call('HSET', key, field, value)
+    end
+    redis.call('HINCRBY', KEYS[3], 'created', 1)
+end
+local field = 'item:' .. ARGV[4]
+local quantity = tonumber(ARGV[5])
+local raw = redis.call('HGET', key, field)
+local item
+if raw then
+    item = cjson.decode(raw)
+    item['quantity'] = item['quantity'] + quantity
+else
+    item = cjson.decode(ARGV[6])
+    item['quantity'] = quantity
+    item['position'] = redis.call('HINCRBY', key, 'next_position', 1)
+end
+item['subtotal_cents'] = item['price_cents'] * item['quantity']
+redis.call('HSET', key, field, cjson.encode(item))
+redis.call('HINCRBY', key, 'total_items', quantity)
+local total = redis.call('HINCRBY', key, 'total_amount_cents', item['price_cents'] * quantity)
+redis.call('HSET', key, 'tax_amount_cents', 0, 'final_amount_cents', total, 'updated_at', ARGV[2])
+refresh_ttl(key, ARGV[1])
+return redis.call('HGETALL', key)
+"""
+
+# KEYS[1..3] ; ARGV : ttl, updated_at, product_id, nouvelle quantité (0 = retirer)
+_SET_QUANTITY_SCRIPT = _CART_LUA_HELPERS + """
+local key = KEYS[1]
+migrate(key)
+local field = 'item:' .. ARGV[3]
+local raw = redis.call('HGET', key, field)
+if not raw then
+    return nil
+end
+local item = cjson.decode(raw)
+local quantity = tonumber(ARGV[4])
+local delta = quantity - item['quantity']
+if quantity == 0 then
+    redis.call('HDEL', key, field)
+else
+    item['quantity'] = quantity
+    item['subtotal_cents'] = item['price_cents'] * quantity
+    redis.call('HSET', key, field, cjson.encode(item))
+end
+redis.call('HINCRBY', key, 'total_items', delta)
+local total = redis.call('HINCRBY', key, 'total_amount_cents', item['price_cents'] * delta)
+redis.call('HSET', key, 'tax_amount_cents', 0, 'final_amount_cents', total, 'updated_at', ARGV[2])
+refresh_ttl(key, ARGV[1])
+return redis.call('HGETALL', key)
+"""
+
+# KEYS[1..3] ; ARGV : updated_at, total attendu (centimes), taxes (centimes).
+# Les taxes ne sont appliquées que si le total n'a pas changé depuis leur calcul
+_SET_TAXES_SCRIPT = _CART_LUA_HELPERS + """
+local key = KEYS[1]
+migrate(key)
+if redis.call('EXISTS', key) == 0 then
+    return nil
+end
+local total = tonumber(redis.call('HGET', key, 'total_amount_cents') or '0')
+if total ~= tonumber(ARGV[2]) then
+    return {}
+end
+redis.call('HSET', key, 'tax_amount_cents', ARGV[3], 'final_amount_cents', total + tonumber(ARGV[3]),
+    'updated_at', ARGV[1])
+return redis.call('HGETALL', key)
+"""
+
+# KEYS[1..3] ; ARGV : champs d'en-tête à modifier (JSON)
+_SET_FIELDS_SCRIPT = _CART_LUA_HELPERS + """
+migrate(KEYS[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+for field, value in pairs(cjson.decode(ARGV[1])) do
+    redis.call('HSET', KEYS[1], field, value)
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# Retrait de l'index des paniers arrivés à échéance. KEYS[1] index, KEYS[2] compteurs ;
+# ARGV : maintenant (epoch), taille du lot. Une clé prolongée entre-temps est réindexée,
+# une clé sans expiration sort de l'index
+_SWEEP_EXPIRED_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local expired = 0
+for _, key in ipairs(due) do
+    local ttl = redis.call('PTTL', key)
+    if ttl > 0 then
+        redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + ttl / 1000, key)
+    else
+        redis.call('ZREM', KEYS[1], key)
+        if ttl == -2 then
+            expired = expired + 1
+        end
+    end
+end
+if expired > 0 then
+    redis.call('HINCRBY', KEYS[2], 'expired', expired)
+end
+return {#due, expired}
+"""
+
+HEADER_FIELDS = ('session_id', 'currency', 'created_at', 'updated_at', 'expires_at')
+
+
+def to_cents(amount) -> int:
+    """Montant en centimes entiers (arrondi au centime le plus proche)"""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _text(value) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def encode_cart_fields(cart: Dict) -> Dict[str, Any]:
+    """Champs du HASH pour un panier au format API"""
+    fields = {name: cart.get(name) or '' for name in HEADER_FIELDS}
+    fields['customer_id'] = '' if cart.get('customer_id') is None else cart['customer_id']
+    total_cents = 0
+    for position, item in enumerate(cart.get('items', []), start=1):
+        price_cents = to_cents(item['price'])
+        subtotal_cents = price_cents * item['quantity']
+        total_cents += subtotal_cents
+        fields[f"item:{item['product_id']}"] = json.dumps({
+            'product_id': item['product_id'], 'product_name': item.get('product_name'),
+            'product_sku': item.get('product_sku'), 'price': item['price'], 'price_cents': price_cents,
+            'quantity': item['quantity'], 'subtotal_cents': subtotal_cents, 'position': position
+        })
+    tax_cents = to_cents(cart.get('tax_amount') or 0)
+    fields.update({
+        'total_items': sum(item['quantity'] for item in cart.get('items', [])),
+        'total_amount_cents': total_cents,
+        'tax_amount_cents': tax_cents,
+        'final_amount_cents': total_cents + tax_cents,
+        'next_position': len(cart.get('items', []))
+    })
+    return fields
+
+
+def decode_cart(raw) -> Optional[Dict]:
+    """Panier au format API depuis HGETALL (dict ou liste à plat retournée par un script)"""
+    if not raw:
+        return None
+    if isinstance(raw, list):
+        raw = dict(zip(raw[::2], raw[1::2]))
+    fields = {_text(name): _text(value) for name, value in raw.items()}
+    items = sorted((json.loads(value) for name, value in fields.items() if name.startswith('item:')),
+                   key=lambda item: item['position'])
+    cart = {name: fields.get(name) or None for name in HEADER_FIELDS}
+    cart.update({
+        'customer_id': int(fields['customer_id']) if fields.get('customer_id') else None,
+        'items': [
+            {
+                'product_id': item['product_id'],
+                'product_name': item['product_name'],
+                'product_sku': item['product_sku'],
+                'price': item['price'],
+                'quantity': item['quantity'],
+                'subtotal': item['subtotal_cents'] / 100
+            }
+            for item in items
+        ],
+        'total_items': int(fields.get('total_items', 0)),
+        'total_amount': int(fields.get('total_amount_cents', 0)) / 100,
+        'tax_amount': int(fields.get('tax_amount_cents', 0)) / 100,
+        'final_amount': int(fields.get('final_amount_cents', 0)) / 100
+    })
+    return cart
+
 
 def init_redis_client():
     """Initialiser le client Redis avec pool de connexions"""
@@ -67,44 +333,136 @@ class RedisCartClient:
         self.client = redis_client
         self.cart_prefix = "cart:"
         self.cart_expiry = 86400  # 24 heures en secondes
+        self.index_key = "carts:expiry"
+        self.counters_key = "carts:counters"
+        self._touch_script = redis_client.register_script(_TOUCH_CART_SCRIPT)
+        self._create_script = redis_client.register_script(_CREATE_CART_SCRIPT)
+        self._add_item_script = redis_client.register_script(_ADD_ITEM_SCRIPT)
+        self._set_quantity_script = redis_client.register_script(_SET_QUANTITY_SCRIPT)
+        self._set_taxes_script = redis_client.register_script(_SET_TAXES_SCRIPT)
+        self._set_fields_script = redis_client.register_script(_SET_FIELDS_SCRIPT)
+        self._sweep_script = redis_client.register_script(_SWEEP_EXPIRED_SCRIPT)
     
     def _get_cart_key(self, session_id: str) -> str:
         """Générer la clé Redis pour un panier"""
         return f"{self.cart_prefix}{session_id}"
     
-    def get_cart(self, session_id: str) -> Optional[Dict]:
-        """Récupérer un panier depuis Redis"""
+    def _script_keys(self, session_id: str) -> list:
+        return [self._get_cart_key(session_id), self.index_key, self.counters_key]
+    
+    def get_cart(self, session_id: str, updated_at: Optional[str] = None) -> Optional[Dict]:
+        """Récupérer un panier depuis Redis (date d'accès et TTL mis à jour dans le même appel)"""
         try:
-            cart_key = self._get_cart_key(session_id)
-            cart_data = self.client.get(cart_key)
+            return decode_cart(self._touch_script(
+                keys=self._script_keys(session_id),
+                args=[self.cart_expiry, updated_at or '']
+            ))
             
-            if cart_data:
-                return json.loads(cart_data)
-            return None
-            
-        except (redis.RedisError, json.JSONDecodeError) as e:
+        except (redis.RedisError, ValueError) as e:
             print(f"Erreur lors de la récupération du panier {session_id}: {e}")
             return None
     
     def set_cart(self, session_id: str, cart_data: Dict, expiry: Optional[int] = None) -> bool:
-        """Sauvegarder un panier dans Redis"""
+        """Remplacer un panier complet dans Redis"""
         try:
             cart_key = self._get_cart_key(session_id)
-            cart_json = json.dumps(cart_data, default=str)
-            
             expiry_seconds = expiry or self.cart_expiry
             
-            return self.client.setex(cart_key, expiry_seconds, cart_json)
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.delete(cart_key)
+            pipeline.hset(cart_key, mapping=encode_cart_fields(cart_data))
+            pipeline.expire(cart_key, expiry_seconds)
+            pipeline.zadd(self.index_key, {cart_key: time.time() + expiry_seconds})
+            return all(pipeline.execute()[1:3])
             
-        except (redis.RedisError, json.JSONEncodeError) as e:
+        except (redis.RedisError, TypeError, ValueError) as e:
             print(f"Erreur lors de la sauvegarde du panier {session_id}: {e}")
             return False
     
+    def create_cart(self, session_id: str, cart_data: Dict) -> Optional[Dict]:
+        """Créer un panier s'il n'existe pas ; retourne le panier stocké (existant ou créé)"""
+        try:
+            return decode_cart(self._create_script(
+                keys=self._script_keys(session_id),
+                args=[self.cart_expiry, json.dumps(encode_cart_fields(cart_data))]
+            ))
+            
+        except redis.RedisError as e:
+            print(f"Erreur lors de la création du panier {session_id}: {e}")
+            return None
+    
+    def add_item(self, session_id: str, item: Dict, new_cart: Dict, updated_at: str) -> Optional[Dict]:
+        """
+        Ajouter une quantité d'un article (créé si absent, panier créé depuis new_cart si absent).
+        Le prix d'un article déjà présent est conservé
+        """
+        try:
+            price_cents = to_cents(item['price'])
+            return decode_cart(self._add_item_script(
+                keys=self._script_keys(session_id),
+                args=[self.cart_expiry, updated_at, json.dumps(encode_cart_fields(new_cart)),
+                      item['product_id'], item['quantity'],
+                      json.dumps({'product_id': item['product_id'], 'product_name': item.get('product_name'),
+                                  'product_sku': item.get('product_sku'), 'price': item['price'],
+                                  'price_cents': price_cents})]
+            ))
+            
+        except redis.RedisError as e:
+            print(f"Erreur lors de l'ajout au panier {session_id}: {e}")
+            return None
+    
+    def set_item_quantity(self, session_id: str, product_id: int, quantity: int, updated_at: str) -> Optional[Dict]:
+        """Fixer la quantité d'un article (0 = retirer) ; None si le panier ou l'article n'existe pas"""
+        try:
+            return decode_cart(self._set_quantity_script(
+                keys=self._script_keys(session_id),
+                args=[self.cart_expiry, updated_at, product_id, quantity]
+            ))
+            
+        except redis.RedisError as e:
+            print(f"Erreur lors de la mise à jour du panier {session_id}: {e}")
+            return None
+    
+    def set_taxes(self, session_id: str, expected_total: float, tax_amount: float, updated_at: str):
+        """
+        Appliquer des taxes calculées sur expected_total. Retourne le panier, None s'il n'existe pas,
+        ou False si le total a changé entre-temps (taxes à recalculer)
+        """
+        try:
+            raw = self._set_taxes_script(
+                keys=self._script_keys(session_id),
+                args=[updated_at, to_cents(expected_total), to_cents(tax_amount)]
+            )
+        except redis.RedisError as e:
+            print(f"Erreur lors du calcul des taxes du panier {session_id}: {e}")
+            return None
+        if raw is None:
+            return None
+        return decode_cart(raw) if raw else False
+    
+    def update_cart_fields(self, session_id: str, fields: Dict[str, Any]) -> Optional[Dict]:
+        """Modifier des champs d'en-tête (customer_id, expires_at, ...) d'un panier existant"""
+        try:
+            encoded = {name: '' if value is None else value for name, value in fields.items()}
+            return decode_cart(self._set_fields_script(
+                keys=self._script_keys(session_id), args=[json.dumps(encoded)]
+            ))
+            
+        except redis.RedisError as e:
+            print(f"Erreur lors de la mise à jour du panier {session_id}: {e}")
+            return None
+    
     def delete_cart(self, session_id: str) -> bool:
         """Supprimer un panier de Redis"""
         try:
             cart_key = self._get_cart_key(session_id)
-            return bool(self.client.delete(cart_key))
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.delete(cart_key)
+            pipeline.zrem(self.index_key, cart_key)
+            deleted = bool(pipeline.execute()[0])
+            if deleted:
+                self.client.hincrby(self.counters_key, 'deleted', 1)
+            return deleted
             
         except redis.RedisError as e:
             print(f"Erreur lors de la suppression du panier {session_id}: {e}")
@@ -128,10 +486,14 @@ class RedisCartClient:
             
             if current_ttl > 0:
                 new_ttl = current_ttl + additional_seconds
-                return bool(self.client.expire(cart_key, new_ttl))
             else:
                 # Le panier n'existe pas ou n'a pas d'expiration
-                return bool(self.client.expire(cart_key, additional_seconds))
+                new_ttl = additional_seconds
+            
+            if not self.client.expire(cart_key, new_ttl):
+                return False
+            self.client.zadd(self.index_key, {cart_key: time.time() + new_ttl})
+            return True
                 
         except redis.RedisError as e:
             print(f"Erreur lors de l'extension du panier {session_id}: {e}")
@@ -147,55 +509,83 @@ class RedisCartClient:
             print(f"Erreur lors de la récupération du TTL du panier {session_id}: {e}")
             return -1
     
+    def iter_cart_keys(self, batch_size: int = CART_SCAN_BATCH_SIZE):
+        """Parcourir les clés de paniers par SCAN (par lots, sans bloquer Redis comme KEYS)"""
+        yield from self.client.scan_iter(match=f"{self.cart_prefix}*", count=batch_size)
+    
     def get_all_cart_keys(self) -> list:
         """Récupérer toutes les clés de paniers (pour nettoyage administratif)"""
         try:
-            pattern = f"{self.cart_prefix}*"
-            return self.client.keys(pattern)
+            return list(self.iter_cart_keys())
             
         except redis.RedisError as e:
             print(f"Erreur lors de la récupération des clés de paniers: {e}")
             return []
     
-    def cleanup_expired_carts(self) -> int:
-        """Nettoyer les paniers expirés (retourne le nombre supprimé)"""
+    def rebuild_cart_index(self, batch_size: int = CART_SCAN_BATCH_SIZE) -> int:
+        """
+        Reconstruire l'index d'expiration (paniers antérieurs à l'index) : SCAN puis
+        PTTL et ZADD en pipeline par lots. Retourne le nombre de paniers indexés
+        """
+        indexed = 0
+        batch = []
         try:
-            all_keys = self.get_all_cart_keys()
-            expired_count = 0
+            for key in self.iter_cart_keys(batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    indexed += self._index_batch(batch)
+                    batch = []
+            if batch:
+                indexed += self._index_batch(batch)
+            return indexed
             
-            for key in all_keys:
-                ttl = self.client.ttl(key)
-                # TTL -2 signifie que la clé n'existe pas (expirée)
-                # TTL -1 signifie que la clé n'a pas d'expiration
-                if ttl == -2:
-                    expired_count += 1
-            
-            return expired_count
+        except redis.RedisError as e:
+            print(f"Erreur lors de la reconstruction de l'index des paniers: {e}")
+            return indexed
+    
+    def _index_batch(self, keys: list) -> int:
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.pttl(key)
+        now = time.time()
+        deadlines = {key: now + ttl / 1000 for key, ttl in zip(keys, pipeline.execute()) if ttl > 0}
+        if deadlines:
+            self.client.zadd(self.index_key, deadlines)
+        return len(deadlines)
+    
+    def cleanup_expired_carts(self, batch_size: int = CART_SCAN_BATCH_SIZE) -> int:
+        """Retirer de l'index les paniers expirés, par lots (retourne le nombre retiré)"""
+        try:
+            expired_count = 0
+            while True:
+                due, expired = self._sweep_script(
+                    keys=[self.index_key, self.counters_key], args=[time.time(), batch_size]
+                )
+                expired_count += expired
+                if due < batch_size:
+                    return expired_count
             
         except redis.RedisError as e:
             print(f"Erreur lors du nettoyage des paniers expirés: {e}")
             return 0
     
     def get_cart_stats(self) -> Dict:
-        """Obtenir des statistiques sur les paniers"""
+        """Statistiques des paniers lues dans l'index et les compteurs (sans parcourir les paniers)"""
         try:
-            all_keys = self.get_all_cart_keys()
-            total_carts = len(all_keys)
-            
-            expired_carts = 0
-            active_carts = 0
-            
-            for key in all_keys:
-                ttl = self.client.ttl(key)
-                if ttl == -2:
-                    expired_carts += 1
-                elif ttl > 0:
-                    active_carts += 1
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.zcard(self.index_key)
+            pipeline.zcount(self.index_key, '-inf', time.time())
+            pipeline.hgetall(self.counters_key)
+            total_carts, expired_carts, counters = pipeline.execute()
+            counters = {_text(name): int(value) for name, value in counters.items()}
             
             return {
                 'total_carts': total_carts,
-                'active_carts': active_carts,
+                'active_carts': total_carts - expired_carts,
                 'expired_carts': expired_carts,
+                'created_carts': counters.get('created', 0),
+                'deleted_carts': counters.get('deleted', 0),
+                'expired_carts_cleaned': counters.get('expired', 0),
                 'redis_memory_usage': self.get_redis_memory_info()
             }
             
@@ -13,33 +13,69 @@ import uuid
 
 from redis_client import RedisCartClient
 
+# Taille maximale acceptée par POST /api/v1/products/batch
+PRODUCT_BATCH_SIZE = int(os.getenv('PRODUCT_BATCH_SIZE', '200'))
+
+
+def fetch_products_batch(product_service_url: str, product_ids: List[int]) -> Optional[Dict[int, Dict]]:
+    """
+    Résoudre plusieurs produits en un aller-retour par lot de PRODUCT_BATCH_SIZE.
+    Retourne {product_id: produit} (les IDs absents sont inexistants), ou None si le service est injoignable
+    """
+    products = {}
+    unique_ids = list(dict.fromkeys(product_ids))
+    for start in range(0, len(unique_ids), PRODUCT_BATCH_SIZE):
+        chunk = unique_ids[start:start + PRODUCT_BATCH_SIZE]
+        try:
+            response = requests.post(
+                f"{product_service_url}/api/v1/products/batch",
+                json={'ids': chunk},
+                timeout=5
+            )
+        except requests.RequestException as e:
+            print(f"Erreur de connexion au Product Service pour les produits {chunk}: {e}")
+            return None
+        
+        if response.status_code != 200:
+            print(f"Erreur lors de la récupération des produits {chunk}: {response.status_code}")
+            return None
+        
+        for product in response.json().get('products', []):
+            products[product['id']] = product
+    return products
+
+
+def get_products(product_service_url: str, product_ids: List[int], product_cache=None) -> Optional[Dict[int, Dict]]:
+    """
+    Résoudre des produits depuis le cache local de l'instance (ProductCache) s'il est actif ;
+    seuls les produits absents du cache sont demandés au Product Service, en un lot
+    """
+    if product_cache is None:
+        return fetch_products_batch(product_service_url, product_ids)
+    return product_cache.get_many(
+        product_ids, lambda missing: fetch_products_batch(product_service_url, missing)
+    )
+
 
 class CartService:
     """Service métier pour la gestion des paniers d'achat"""
     
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, product_cache=None):
         self.redis_cart = RedisCartClient(redis_client)
+        self.product_cache = product_cache
         self.product_service_url = os.getenv('PRODUCT_SERVICE_URL', 'http://product-service:8001')
         self.default_currency = 'CAD'
         self.default_cart_expiry = 86400  # 24 heures
     
     def get_cart(self, session_id: str) -> Optional[Dict]:
-        """Récupérer un panier existant"""
-        cart = self.redis_cart.get_cart(session_id)
-        
-        if cart:
-            # Mettre à jour la date d'accès
-            cart['updated_at'] = datetime.now().isoformat()
-            self.redis_cart.set_cart(session_id, cart)
-        
-        return cart
+        """Récupérer un panier existant (date d'accès mise à jour dans le même appel Redis)"""
+        return self.redis_cart.get_cart(session_id, datetime.now().isoformat())
     
-    def create_empty_cart(self, session_id: str, customer_id: Optional[int] = None) -> Dict:
-        """Créer un panier vide"""
+    def _new_cart(self, session_id: str, customer_id: Optional[int] = None) -> Dict:
         now = datetime.now()
         expires_at = now + timedelta(seconds=self.default_cart_expiry)
         
-        cart = {
+        return {
             'session_id': session_id,
             'customer_id': customer_id,
             'items': [],
@@ -52,17 +88,14 @@ class CartService:
             'updated_at': now.isoformat(),
             'expires_at': expires_at.isoformat()
         }
-        
-        self.redis_cart.set_cart(session_id, cart)
-        return cart
+    
+    def create_empty_cart(self, session_id: str, customer_id: Optional[int] = None) -> Dict:
+        """Créer un panier vide (sans écraser un panier créé entre-temps par une autre requête)"""
+        cart = self._new_cart(session_id, customer_id)
+        return self.redis_cart.create_cart(session_id, cart) or cart
     
     def add_item_to_cart(self, session_id: str, product_id: int, quantity: int, price: Optional[float] = None) -> Dict:
-        """Ajouter un article au panier"""
-        
-        # Récupérer ou créer le panier
-        cart = self.get_cart(session_id)
-        if not cart:
-            cart = self.create_empty_cart(session_id)
+        """Ajouter un article au panier (panier créé au besoin, article et totaux mis à jour atomiquement)"""
         
         # Récupérer les informations du produit si pas de prix fourni
         product_info = None
@@ -72,70 +105,23 @@ class CartService:
                 raise ValueError(f"Produit {product_id} introuvable")
             price = product_info['prix']
         
-        # Chercher si l'article existe déjà dans le panier
-        existing_item = None
-        for item in cart['items']:
-            if item['product_id'] == product_id:
-                existing_item = item
-                break
-        
-        if existing_item:
-            # Mettre à jour la quantité existante
-            existing_item['quantity'] += quantity
-            existing_item['subtotal'] = round(existing_item['price'] * existing_item['quantity'], 2)
-        else:
-            # Ajouter un nouvel article
-            new_item = {
-                'product_id': product_id,
-                'product_name': product_info['nom'] if product_info else f'Produit {product_id}',
-                'product_sku': product_info['sku'] if product_info else None,
-                'price': price,
-                'quantity': quantity,
-                'subtotal': round(price * quantity, 2)
-            }
-            cart['items'].append(new_item)
-        
-        # Recalculer les totaux
-        self._recalculate_cart_totals(cart)
-        
-        # Sauvegarder
-        cart['updated_at'] = datetime.now().isoformat()
-        self.redis_cart.set_cart(session_id, cart)
-        
+        item = {
+            'product_id': product_id,
+            'product_name': product_info['nom'] if product_info else f'Produit {product_id}',
+            'product_sku': product_info['sku'] if product_info else None,
+            'price': price,
+            'quantity': quantity
+        }
+        cart = self.redis_cart.add_item(
+            session_id, item, self._new_cart(session_id), datetime.now().isoformat()
+        )
+        if cart is None:
+            raise RuntimeError(f"Panier {session_id} indisponible")
         return cart
     
     def update_item_quantity(self, session_id: str, product_id: int, quantity: int) -> Optional[Dict]:
-        """Mettre à jour la quantité d'un article"""
-        
-        cart = self.get_cart(session_id)
-        if not cart:
-            return None
-        
-        # Chercher l'article
-        item_found = False
-        for item in cart['items']:
-            if item['product_id'] == product_id:
-                if quantity == 0:
-                    # Supprimer l'article si quantité = 0
-                    cart['items'].remove(item)
-                else:
-                    # Mettre à jour la quantité
-                    item['quantity'] = quantity
-                    item['subtotal'] = round(item['price'] * quantity, 2)
-                item_found = True
-                break
-        
-        if not item_found:
-            return None
-        
-        # Recalculer les totaux
-        self._recalculate_cart_totals(cart)
-        
-        # Sauvegarder
-        cart['updated_at'] = datetime.now().isoformat()
-        self.redis_cart.set_cart(session_id, cart)
-        
-        return cart
+        """Mettre à jour la quantité d'un article (0 = retirer) ; None si le panier ou l'article n'existe pas"""
+        return self.redis_cart.set_item_quantity(session_id, product_id, quantity, datetime.now().isoformat())
     
     def remove_item_from_cart(self, session_id: str, product_id: int) -> Optional[Dict]:
         """Retirer un article du panier"""
@@ -147,22 +133,15 @@ class CartService:
     
     def associate_cart_to_customer(self, session_id: str, customer_id: int) -> Optional[Dict]:
         """Associer un panier à un client connecté"""
-        
-        cart = self.get_cart(session_id)
-        if not cart:
-            return None
-        
-        cart['customer_id'] = customer_id
-        cart['updated_at'] = datetime.now().isoformat()
-        
-        self.redis_cart.set_cart(session_id, cart)
-        return cart
+        return self.redis_cart.update_cart_fields(session_id, {
+            'customer_id': customer_id,
+            'updated_at': datetime.now().isoformat()
+        })
     
     def extend_cart_expiry(self, session_id: str, hours: int = 24) -> Optional[Dict]:
         """Prolonger la durée de vie du panier"""
         
-        cart = self.get_cart(session_id)
-        if not cart:
+        if not self.redis_cart.cart_exists(session_id):
             return None
         
         # Prolonger dans Redis
@@ -171,31 +150,29 @@ class CartService:
         
         # Mettre à jour la date d'expiration dans les données du panier
         new_expiry = datetime.now() + timedelta(hours=hours)
-        cart['expires_at'] = new_expiry.isoformat()
-        cart['updated_at'] = datetime.now().isoformat()
-        
-        self.redis_cart.set_cart(session_id, cart)
-        return cart
+        return self.redis_cart.update_cart_fields(session_id, {
+            'expires_at': new_expiry.isoformat(),
+            'updated_at': datetime.now().isoformat()
+        })
     
-    def recalculate_cart(self, session_id: str, tax_service) -> Optional[Dict]:
-        """Recalculer complètement le panier avec taxes"""
-        
-        cart = self.get_cart(session_id)
-        if not cart:
-            return None
-        
-        # Recalculer les sous-totaux des articles
-        for item in cart['items']:
-            item['subtotal'] = round(item['price'] * item['quantity'], 2)
-        
-        # Recalculer les totaux avec taxes
-        self._recalculate_cart_totals(cart, tax_service)
-        
-        # Sauvegarder
-        cart['updated_at'] = datetime.now().isoformat()
-        self.redis_cart.set_cart(session_id, cart)
+    def recalculate_cart(self, session_id: str, tax_service, attempts: int = 3) -> Optional[Dict]:
+        """
+        Recalculer le panier avec taxes. Les taxes ne sont écrites que si le total n'a pas
+        changé depuis leur calcul ; sinon elles sont recalculées sur le nouveau total
+        """
+        for _ in range(attempts):
+            cart = self.get_cart(session_id)
+            if not cart:
+                return None
+            
+            tax_amount = tax_service.calculate_taxes(cart['total_amount'], cart.get('customer_id'))
+            updated = self.redis_cart.set_taxes(
+                session_id, cart['total_amount'], tax_amount, datetime.now().isoformat()
+            )
+            if updated is not False:
+                return updated
         
-        return cart
+        return None
     
     def cleanup_expired_carts(self) -> int:
         """Nettoyer les paniers expirés"""
@@ -205,44 +182,12 @@ class CartService:
         """Obtenir des statistiques sur les paniers"""
         return self.redis_cart.get_cart_stats()
     
-    def _recalculate_cart_totals(self, cart: Dict, tax_service=None):
-        """Recalculer les totaux du panier"""
-        
-        # Calculer le nombre total d'articles et le montant total
-        total_items = sum(item['quantity'] for item in cart['items'])
-        total_amount = sum(item['subtotal'] for item in cart['items'])
-        
-        # Calculer les taxes si un service de taxes est fourni
-        tax_amount = 0.0
-        if tax_service:
-            tax_amount = tax_service.calculate_taxes(total_amount, cart.get('customer_id'))
-        
-        # Montant final
-        final_amount = total_amount + tax_amount
-        
-        # Mettre à jour le panier
-        cart['total_items'] = total_items
-        cart['total_amount'] = round(total_amount, 2)
-        cart['tax_amount'] = round(tax_amount, 2)
-        cart['final_amount'] = round(final_amount, 2)
-    
     def _get_product_info(self, product_id: int) -> Optional[Dict]:
-        """Récupérer les informations d'un produit depuis le Product Service"""
-        try:
-            response = requests.get(
-                f"{self.product_service_url}/api/v1/products/{product_id}",
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Erreur lors de la récupération du produit {product_id}: {response.status_code}")
-                return None
-                
-        except requests.RequestException as e:
-            print(f"Erreur de connexion au Product Service pour le produit {product_id}: {e}")
+        """Récupérer les informations d'un produit (cache local, sinon Product Service)"""
+        products = get_products(self.product_service_url, [product_id], self.product_cache)
+        if products is None:
             return None
+        return products.get(product_id)
 
 
 class TaxService:
@@ -341,8 +286,9 @@ class TaxService:
 class CartValidationService:
     """Service de validation des paniers"""
     
-    def __init__(self, product_service_url: str):
+    def __init__(self, product_service_url: str, product_cache=None):
         self.product_service_url = product_service_url
+        self.product_cache = product_cache
     
     def validate_cart(self, cart: Dict) -> Dict:
         """Valider un panier avant checkout"""
@@ -359,9 +305,20 @@ class CartValidationService:
             validation_result['errors'].append("Le panier est vide")
             return validation_result
         
+        # Un seul appel au Product Service pour tous les articles
+        products = get_products(
+            self.product_service_url, [item['product_id'] for item in cart['items']], self.product_cache
+        )
+        if products is None:
+            # Product Service injoignable : pas de nouvel appel par article
+            validation_result['warnings'].extend(
+                f"Impossible de vérifier la disponibilité de {item['product_name']}" for item in cart['items']
+            )
+            return validation_result
+        
         # Valider chaque article
         for item in cart['items']:
-            item_validation = self._validate_cart_item(item)
+            item_validation = self._validate_cart_item(item, products)
             
             if not item_validation['valid']:
                 validation_result['valid'] = False
@@ -375,8 +332,8 @@ class CartValidationService:
         
         return validation_result
     
-    def _validate_cart_item(self, item: Dict) -> Dict:
-        """Valider un article du panier"""
+    def _validate_cart_item(self, item: Dict, products: Dict[int, Dict]) -> Dict:
+        """Valider un article du panier à partir des produits résolus par lot"""
         
         result = {
             'valid': True,
@@ -386,58 +343,44 @@ class CartValidationService:
             'updated_item': None
         }
         
-        try:
-            # Vérifier que le produit existe toujours
-            response = requests.get(
-                f"{self.product_service_url}/api/v1/products/{item['product_id']}",
-                timeout=5
-            )
-            
-            if response.status_code == 404:
-                result['valid'] = False
-                result['errors'].append(f"Produit {item['product_name']} n'est plus disponible")
-                return result
-            
-            if response.status_code != 200:
-                result['warnings'].append(f"Impossible de vérifier la disponibilité de {item['product_name']}")
-                return result
-            
-            product = response.json()
-            
-            # Vérifier le stock
-            if product['stock'] < item['quantity']:
-                if product['stock'] > 0:
-                    result['warnings'].append(
-                        f"Stock insuffisant pour {item['product_name']}. "
-                        f"Disponible: {product['stock']}, Demandé: {item['quantity']}"
-                    )
-                    # Mettre à jour la quantité
-                    updated_item = item.copy()
-                    updated_item['quantity'] = product['stock']
-                    updated_item['subtotal'] = round(updated_item['price'] * product['stock'], 2)
-                    result['updated'] = True
-                    result['updated_item'] = updated_item
-                else:
-                    result['valid'] = False
-                    result['errors'].append(f"Produit {item['product_name']} en rupture de stock")
-            
-            # Vérifier si le prix a changé
-            if abs(product['prix'] - item['price']) > 0.01:
+        # Vérifier que le produit existe toujours
+        product = products.get(item['product_id'])
+        if product is None:
+            result['valid'] = False
+            result['errors'].append(f"Produit {item['product_name']} n'est plus disponible")
+            return result
+        
+        # Vérifier le stock
+        if product['stock'] < item['quantity']:
+            if product['stock'] > 0:
                 result['warnings'].append(
-                    f"Prix modifié pour {item['product_name']}. "
-                    f"Ancien: {item['price']}$, Nouveau: {product['prix']}$"
-                )
-                # Mettre à jour le prix
-                if not result['updated']:
-                    result['updated_item'] = item.copy()
-                    result['updated'] = True
-                
-                result['updated_item']['price'] = product['prix']
-                result['updated_item']['subtotal'] = round(
-                    product['prix'] * result['updated_item']['quantity'], 2
+                    f"Stock insuffisant pour {item['product_name']}. "
+                    f"Disponible: {product['stock']}, Demandé: {item['quantity']}"
                 )
+                # Mettre à jour la quantité
+                updated_item = item.copy()
+                updated_item['quantity'] = product['stock']
+                updated_item['subtotal'] = round(updated_item['price'] * product['stock'], 2)
+                result['updated'] = True
+                result['updated_item'] = updated_item
+            else:
+                result['valid'] = False
+                result['errors'].append(f"Produit {item['product_name']} en rupture de stock")
+        
+        # Vérifier si le prix a changé
+        if abs(product['prix'] - item['price']) > 0.01:
+            result['warnings'].append(
+                f"Prix modifié pour {item['product_name']}. "
+                f"Ancien: {item['price']}$, Nouveau: {product['prix']}$"
+            )
+            # Mettre à jour le prix
+            if not result['updated']:
+                result['updated_item'] = item.copy()
+                result['updated'] = True
             
-        except requests.RequestException:
-            result['warnings'].append(f"Impossible de vérifier {item['product_name']}")
+            result['updated_item']['price'] = product['prix']
+            result['updated_item']['subtotal'] = round(
+                product['prix'] * result['updated_item']['quantity'], 2
+            )
         
         return result 
\ No newline at end of file
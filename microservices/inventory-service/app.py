@@ -9,12 +9,22 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields
 import os
+import json
 import logging
 import uuid
 import random
-from datetime import datetime, timedelta
+import atexit
+import signal
+import threading
+from datetime import datetime
 from typing import Dict, Any, List
 
+import database
+from inventory_store import InventoryStore
+from reservation_engine import ReservationEngine, ReservationError
+from reservation_sweeper import ReservationSweeper
+from stock_repository import SqlInventoryStore, SqlReservationEngine, WriteBehindJournal
+
 # Configuration de base
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'inventory-service-secret')
@@ -35,16 +45,92 @@ failure_config = {
     'out_of_stock_products': os.getenv('OUT_OF_STOCK_PRODUCTS', '').split(',') if os.getenv('OUT_OF_STOCK_PRODUCTS') else []
 }
 
-# Stockage en mémoire des stocks et réservations
-inventory_db = {
-    1: {'product_id': 1, 'location_id': 1, 'available_quantity': 100, 'reserved_quantity': 0},
-    2: {'product_id': 2, 'location_id': 1, 'available_quantity': 50, 'reserved_quantity': 0},
-    3: {'product_id': 3, 'location_id': 1, 'available_quantity': 25, 'reserved_quantity': 0},
-    4: {'product_id': 4, 'location_id': 1, 'available_quantity': 75, 'reserved_quantity': 0},
-    5: {'product_id': 5, 'location_id': 1, 'available_quantity': 200, 'reserved_quantity': 0},
-}
+# Stockage des stocks et réservations
+# INVENTORY_BACKEND: 'memory' (défaut), 'write_behind' (mémoire + journal vers inventory_db)
+# ou 'database' (inventory_db seule, partagée entre réplicas)
+INVENTORY_BACKEND = os.getenv('INVENTORY_BACKEND', 'memory')
+
+default_inventory = [
+    {'product_id': 1, 'location_id': 1, 'available_quantity': 100, 'reserved_quantity': 0},
+    {'product_id': 2, 'location_id': 1, 'available_quantity': 50, 'reserved_quantity': 0},
+    {'product_id': 3, 'location_id': 1, 'available_quantity': 25, 'reserved_quantity': 0},
+    {'product_id': 4, 'location_id': 1, 'available_quantity': 75, 'reserved_quantity': 0},
+    {'product_id': 5, 'location_id': 1, 'available_quantity': 200, 'reserved_quantity': 0},
+]
+
+stock_database = None
+reservation_journal = None
+reservation_stripes = int(os.getenv('RESERVATION_LOCK_STRIPES', '256'))
 
-reservations_db = {}
+if INVENTORY_BACKEND in ('database', 'write_behind'):
+    session = database.init_inventory_db()
+    database.create_sample_data(session)
+    session.close()
+    stock_database = SqlInventoryStore(database.SessionLocal)
+    if len(stock_database) == 0:
+        stock_database.load(default_inventory)
+
+if INVENTORY_BACKEND == 'database':
+    inventory_store = stock_database
+    reservation_engine = SqlReservationEngine(database.SessionLocal)
+else:
+    # Chemin rapide en mémoire (indexé par produit et emplacement) ; en write_behind,
+    # l'état est rechargé depuis la base au démarrage puis journalisé en arrière-plan
+    inventory_store = InventoryStore(stock_database.items() if stock_database else default_inventory)
+    if stock_database:
+        reservation_journal = WriteBehindJournal(
+            database.SessionLocal,
+            batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500')),
+            flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '0.5')),
+            max_retry_delay=float(os.getenv('WRITE_BEHIND_MAX_RETRY_DELAY', '30')),
+            dead_letter_path=os.getenv('WRITE_BEHIND_DEAD_LETTER_PATH')
+        )
+        # Arrêt du conteneur (docker stop = SIGTERM) : écrire le journal en attente avant de sortir
+        atexit.register(reservation_journal.close)
+        if threading.current_thread() is threading.main_thread():
+            def _stop_on_sigterm(signum, frame):
+                app.logger.info(f"[INVENTORY] Arrêt demandé - {reservation_journal.pending()} écritures en attente")
+                reservation_journal.close()
+                raise SystemExit(0)
+            signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    reservation_engine = ReservationEngine(
+        inventory_store, stripes=reservation_stripes, journal=reservation_journal,
+        max_references=int(os.getenv('MOVEMENT_REFERENCES_KEPT', '100000'))
+    )
+    if stock_database:
+        stock_journal = SqlReservationEngine(database.SessionLocal)
+        reservation_engine.reservations.update(
+            (reservation['reservation_id'], reservation)
+            for reservation in stock_journal.all()
+        )
+        # Ventes et retours déjà appliqués avant le redémarrage : pas de double application
+        reservation_engine.remember_movements(stock_journal.movement_references(reservation_engine.max_references))
+
+# Expiration des réservations abandonnées (sagas interrompues)
+reservation_sweeper = ReservationSweeper(
+    reservation_engine,
+    interval=float(os.getenv('RESERVATION_SWEEP_INTERVAL', '1.0')),
+    batch_size=int(os.getenv('RESERVATION_SWEEP_BATCH_SIZE', '100'))
+)
+if INVENTORY_BACKEND == 'database':
+    for reservation in reservation_engine.all(status='active'):
+        reservation_sweeper.schedule(reservation)
+else:
+    for reservation in list(reservation_engine.reservations.values()):
+        reservation_sweeper.schedule(reservation)
+if os.getenv('RESERVATION_SWEEPER_ENABLED', 'true').lower() == 'true':
+    reservation_sweeper.start()
+
+def load_inventory_fixtures(path: str) -> int:
+    """Charger un inventaire généré par generate_benchmark_data.py (JSON Lines)"""
+    with open(path, encoding='utf-8') as fixture_file:
+        items = [json.loads(line) for line in fixture_file]
+    if stock_database is not None and stock_database is not inventory_store:
+        stock_database.load(items)
+    return inventory_store.load(items)
+
+if os.getenv('INVENTORY_FIXTURES_PATH'):
+    load_inventory_fixtures(os.getenv('INVENTORY_FIXTURES_PATH'))
 
 # API Documentation
 api = Api(
@@ -71,6 +157,13 @@ inventory_item_model = api.model('InventoryItem', {
     'total_quantity': fields.Integer(description='Quantité totale')
 })
 
+stock_batch_request_model = api.model('StockBatchRequest', {
+    'operation': fields.String(required=True, description="'sale' (décrément) ou 'return' (remise en stock)"),
+    'location_id': fields.Integer(description='ID de l\'emplacement (défaut 1)'),
+    'reference': fields.String(description='Référence de la transaction'),
+    'items': fields.List(fields.Raw, required=True, description='Lignes {product_id, quantity}')
+})
+
 reservation_model = api.model('Reservation', {
     'reservation_id': fields.String(description='ID de la réservation'),
     'customer_id': fields.Integer(description='ID du client'),
@@ -80,6 +173,9 @@ reservation_model = api.model('Reservation', {
     'expires_at': fields.DateTime(description='Date d\'expiration')
 })
 
+# Opérations du endpoint /inventory/batch -> type de mouvement de stock
+STOCK_BATCH_OPERATIONS = {'sale': 'sortie', 'return': 'entree'}
+
 def should_simulate_failure(product_id: int) -> tuple[bool, str]:
     """Détermine si on doit simuler un échec de stock"""
     if not failure_config['enabled']:
@@ -97,10 +193,7 @@ def should_simulate_failure(product_id: int) -> tuple[bool, str]:
 
 def get_inventory_item(product_id: int, location_id: int = 1) -> Dict[str, Any]:
     """Récupérer un item d'inventaire"""
-    for item in inventory_db.values():
-        if item['product_id'] == product_id and item['location_id'] == location_id:
-            return item
-    return None
+    return inventory_store.get(product_id, location_id)
 
 @api.route('/inventory')
 class InventoryResource(Resource):
@@ -115,13 +208,10 @@ class InventoryResource(Resource):
             
             app.logger.info(f"[INVENTORY] Requête inventaire - Emplacement: {location_id}")
             
-            items = []
-            for item in inventory_db.values():
-                if item['location_id'] == location_id:
-                    items.append({
-                        **item,
-                        'total_quantity': item['available_quantity'] + item['reserved_quantity']
-                    })
+            items = [
+                {**item, 'total_quantity': item['available_quantity'] + item['reserved_quantity']}
+                for item in inventory_store.by_location(location_id)
+            ]
             
             app.logger.info(f"[INVENTORY] Inventaire récupéré - Emplacement: {location_id}, Items: {len(items)}")
             return items, 200
@@ -165,7 +255,8 @@ class ReservationResource(Resource):
     """Endpoint principal pour les réservations de stock"""
     
     @api.expect(reservation_request_model)
-    @api.marshal_with(reservation_model)
+    @api.response(201, 'Réservation créée', reservation_model)
+    @api.response(409, 'Stock insuffisant')
     @api.doc('reserve_stock', description='Réserver du stock pour une commande')
     def post(self):
         """Réserver du stock pour une transaction"""
@@ -183,84 +274,31 @@ class ReservationResource(Resource):
                 return {'error': 'reservation_id, customer_id et items sont requis'}, 400
             
             # Vérifier si la réservation existe déjà
-            if reservation_id in reservations_db:
-                existing = reservations_db[reservation_id]
+            existing = reservation_engine.get(reservation_id)
+            if existing:
                 app.logger.info(f"[INVENTORY] Réservation existante retournée - ID: {reservation_id}")
                 return existing, 200
             
-            # Valider et préparer la réservation
-            reserved_items = []
-            
-            app.logger.debug(f"[INVENTORY] Validation de {len(items_to_reserve)} items à réserver")
-            
+            # Vérifier la simulation d'échec
             for item_request in items_to_reserve:
-                product_id = item_request.get('product_id')
-                quantity = item_request.get('quantity', 0)
-                location_id = item_request.get('location_id', 1)
-                
-                app.logger.debug(f"[INVENTORY] Validation item - Produit: {product_id}, Quantité: {quantity}, Emplacement: {location_id}")
-                
-                if not product_id or quantity <= 0:
-                    app.logger.warning(f"[INVENTORY] Item invalide - Produit: {product_id}, Quantité: {quantity}")
-                    return {'error': f'product_id et quantity valides requis pour chaque item'}, 400
-                
-                # Vérifier la simulation d'échec
-                should_fail, failure_reason = should_simulate_failure(product_id)
+                should_fail, failure_reason = should_simulate_failure(item_request.get('product_id'))
                 if should_fail:
-                    app.logger.warning(f"[INVENTORY] Simulation échec réservation - Produit: {product_id}: {failure_reason}")
+                    app.logger.warning(f"[INVENTORY] Simulation échec réservation - Produit: {item_request.get('product_id')}: {failure_reason}")
                     return {'error': failure_reason}, 409  # Conflict
-                
-                # Vérifier la disponibilité
-                inventory_item = get_inventory_item(product_id, location_id)
-                if not inventory_item:
-                    app.logger.error(f"[INVENTORY] Produit inexistant pour réservation - ID: {product_id}, Emplacement: {location_id}")
-                    return {'error': f'Produit {product_id} non trouvé dans l\'inventaire'}, 404
-                
-                if inventory_item['available_quantity'] < quantity:
-                    app.logger.warning(f"[INVENTORY] Stock insuffisant - Produit: {product_id}, Disponible: {inventory_item['available_quantity']}, Demandé: {quantity}")
-                    return {
-                        'error': f'Stock insuffisant pour le produit {product_id}. '
-                               f'Disponible: {inventory_item["available_quantity"]}, '
-                               f'Demandé: {quantity}'
-                    }, 409
-                
-                # Préparer l'item réservé
-                reserved_items.append({
-                    'product_id': product_id,
-                    'location_id': location_id,
-                    'quantity': quantity,
-                    'reserved_at': datetime.utcnow().isoformat()
-                })
-            
-            # Effectuer les réservations
-            app.logger.info(f"[INVENTORY] Application réservations pour {len(reserved_items)} items")
-            
-            for reserved_item in reserved_items:
-                product_id = reserved_item['product_id']
-                location_id = reserved_item['location_id']
-                quantity = reserved_item['quantity']
-                
-                inventory_item = get_inventory_item(product_id, location_id)
-                old_available = inventory_item['available_quantity']
-                inventory_item['available_quantity'] -= quantity
-                inventory_item['reserved_quantity'] += quantity
-                
-                app.logger.debug(f"[INVENTORY] Stock réservé - Produit: {product_id}, Quantité: {quantity}, Disponible: {old_available} → {inventory_item['available_quantity']}")
-            
-            # Créer la réservation
-            reservation = {
-                'reservation_id': reservation_id,
-                'customer_id': customer_id,
-                'status': 'active',
-                'items': reserved_items,
-                'created_at': datetime.utcnow().isoformat(),
-                'expires_at': (datetime.utcnow() + timedelta(minutes=10)).isoformat()
-            }
             
-            # Sauvegarder la réservation
-            reservations_db[reservation_id] = reservation
+            # Vérification et application sous verrous, tout ou rien
+            try:
+                reservation, created = reservation_engine.reserve(reservation_id, customer_id, items_to_reserve)
+            except ReservationError as e:
+                app.logger.warning(f"[INVENTORY] Réservation refusée - ID: {reservation_id}: {e}")
+                return {'error': str(e)}, e.status_code
+            
+            if not created:
+                app.logger.info(f"[INVENTORY] Réservation existante retournée - ID: {reservation_id}")
+                return reservation, 200
             
-            app.logger.info(f"[INVENTORY] Réservation créée avec succès - ID: {reservation_id}, Items: {len(reserved_items)}, Client: {customer_id}")
+            reservation_sweeper.schedule(reservation)
+            app.logger.info(f"[INVENTORY] Réservation créée avec succès - ID: {reservation_id}, Items: {len(reservation['items'])}, Client: {customer_id}")
             
             return reservation, 201
             
@@ -278,37 +316,19 @@ class ReservationReleaseResource(Resource):
         try:
             app.logger.info(f"[INVENTORY] Début libération réservation - ID: {reservation_id}")
             
-            reservation = reservations_db.get(reservation_id)
+            reservation, released = reservation_engine.release(reservation_id)
             
             if not reservation:
                 app.logger.warning(f"[INVENTORY] Réservation non trouvée pour libération - ID: {reservation_id}")
                 return {'error': 'Réservation non trouvée'}, 404
             
-            if reservation['status'] == 'released':
-                app.logger.info(f"[INVENTORY] Réservation déjà libérée - ID: {reservation_id}")
-                return {'message': 'Réservation déjà libérée'}, 200
-            
-            # Libérer les stocks réservés
-            app.logger.debug(f"[INVENTORY] Libération stock pour {len(reservation['items'])} items")
-            
-            for item in reservation['items']:
-                product_id = item['product_id']
-                location_id = item['location_id']
-                quantity = item['quantity']
-                
-                inventory_item = get_inventory_item(product_id, location_id)
-                if inventory_item:
-                    old_available = inventory_item['available_quantity']
-                    inventory_item['available_quantity'] += quantity
-                    inventory_item['reserved_quantity'] -= quantity
-                    
-                    app.logger.debug(f"[INVENTORY] Stock libéré - Produit: {product_id}, Quantité: {quantity}, Disponible: {old_available} → {inventory_item['available_quantity']}")
-                else:
-                    app.logger.error(f"[INVENTORY] Item inventaire non trouvé lors libération - Produit: {product_id}")
+            if not released and reservation['status'] == 'confirmed':
+                app.logger.warning(f"[INVENTORY] Libération refusée, réservation confirmée - ID: {reservation_id}")
+                return {'error': 'Réservation confirmée : le stock est déjà sorti'}, 409
             
-            # Marquer la réservation comme libérée
-            reservation['status'] = 'released'
-            reservation['released_at'] = datetime.utcnow().isoformat()
+            if not released:
+                app.logger.info(f"[INVENTORY] Réservation déjà libérée - ID: {reservation_id}, Statut: {reservation['status']}")
+                return {'message': 'Réservation déjà libérée'}, 200
             
             app.logger.info(f"[INVENTORY] Réservation libérée avec succès - ID: {reservation_id}, Items: {len(reservation['items'])}")
             
@@ -322,6 +342,85 @@ class ReservationReleaseResource(Resource):
             app.logger.error(f"[INVENTORY] Erreur libération réservation {reservation_id}: {e}")
             return {'error': str(e)}, 500
 
+@api.route('/inventory/confirm/<string:reservation_id>')
+class ReservationConfirmResource(Resource):
+    """Endpoint pour confirmer une réservation"""
+    
+    @api.response(200, 'Réservation confirmée')
+    @api.response(409, 'Réservation libérée ou expirée')
+    @api.doc('confirm_reservation', description='Sortir définitivement le stock réservé (commande confirmée)')
+    def post(self, reservation_id):
+        """Confirmer une réservation : le stock réservé est sorti sans retour au disponible"""
+        try:
+            app.logger.info(f"[INVENTORY] Début confirmation réservation - ID: {reservation_id}")
+            
+            reservation, confirmed = reservation_engine.confirm(reservation_id)
+            
+            if not reservation:
+                app.logger.warning(f"[INVENTORY] Réservation non trouvée pour confirmation - ID: {reservation_id}")
+                return {'error': 'Réservation non trouvée'}, 404
+            
+            if not confirmed and reservation['status'] != 'confirmed':
+                app.logger.warning(f"[INVENTORY] Confirmation refusée - ID: {reservation_id}, Statut: {reservation['status']}")
+                return {'error': f"Réservation {reservation['status']}, stock non réservé"}, 409
+            
+            app.logger.info(f"[INVENTORY] Réservation confirmée - ID: {reservation_id}, Items: {len(reservation['items'])}")
+            
+            return {
+                'message': 'Réservation confirmée' if confirmed else 'Réservation déjà confirmée',
+                'reservation_id': reservation_id,
+                'confirmed_items': len(reservation['items'])
+            }, 200
+            
+        except Exception as e:
+            app.logger.error(f"[INVENTORY] Erreur confirmation réservation {reservation_id}: {e}")
+            return {'error': str(e)}, 500
+
+@api.route('/inventory/batch')
+class StockBatchResource(Resource):
+    """Endpoint pour les mouvements de stock d'un panier complet"""
+    
+    @api.expect(stock_batch_request_model)
+    @api.response(200, 'Stock mis à jour')
+    @api.response(409, 'Stock insuffisant')
+    @api.doc('apply_stock_batch', description='Vérifier et décrémenter (ou remettre en stock) tout un panier en une opération atomique')
+    def post(self):
+        """Appliquer une vente ou un retour à tout un panier, tout ou rien"""
+        try:
+            data = request.get_json() or {}
+            operation = data.get('operation')
+            location_id = data.get('location_id', 1)
+            reference = data.get('reference')
+            items = data.get('items', [])
+            
+            if operation not in STOCK_BATCH_OPERATIONS or not items:
+                return {'error': "operation ('sale' ou 'return') et items sont requis"}, 400
+            
+            app.logger.info(f"[INVENTORY] Début mouvement panier - Opération: {operation}, Référence: {reference}, Emplacement: {location_id}, Items: {len(items)}")
+            
+            lines = [{**item, 'location_id': item.get('location_id', location_id)} for item in items]
+            try:
+                updated, applied = reservation_engine.move_stock(reference, lines, STOCK_BATCH_OPERATIONS[operation])
+            except ReservationError as e:
+                app.logger.warning(f"[INVENTORY] Mouvement panier refusé - Référence: {reference}: {e}")
+                return {'error': str(e)}, e.status_code
+            
+            if applied:
+                app.logger.info(f"[INVENTORY] Mouvement panier appliqué - Opération: {operation}, Référence: {reference}, Items: {len(updated)}")
+            else:
+                app.logger.info(f"[INVENTORY] Mouvement panier déjà appliqué, ignoré - Opération: {operation}, Référence: {reference}")
+            return {
+                'operation': operation,
+                'reference': reference,
+                'location_id': location_id,
+                'items': updated,
+                'replayed': not applied
+            }, 200
+            
+        except Exception as e:
+            app.logger.error(f"[INVENTORY] Erreur mouvement panier: {e}")
+            return {'error': str(e)}, 500
+
 @api.route('/inventory/reservations/<string:reservation_id>')
 class ReservationStatusResource(Resource):
     """Endpoint pour consulter une réservation"""
@@ -333,7 +432,7 @@ class ReservationStatusResource(Resource):
         try:
             app.logger.debug(f"[INVENTORY] Recherche réservation - ID: {reservation_id}")
             
-            reservation = reservations_db.get(reservation_id)
+            reservation = reservation_engine.get(reservation_id)
             
             if not reservation:
                 app.logger.warning(f"[INVENTORY] Réservation non trouvée - ID: {reservation_id}")
@@ -392,12 +491,11 @@ class InventoryMetricsResource(Resource):
     def get(self):
         """Récupérer les statistiques d'inventaire"""
         try:
-            total_products = len(inventory_db)
-            total_reservations = len(reservations_db)
-            active_reservations = len([r for r in reservations_db.values() if r['status'] == 'active'])
+            total_products = len(inventory_store)
+            total_reservations, active_reservations = reservation_engine.counts()
             
-            total_available = sum(item['available_quantity'] for item in inventory_db.values())
-            total_reserved = sum(item['reserved_quantity'] for item in inventory_db.values())
+            total_available = inventory_store.total_available
+            total_reserved = inventory_store.total_reserved
             
             return {
                 'total_products': total_products,
@@ -406,6 +504,10 @@ class InventoryMetricsResource(Resource):
                 'total_reservations': total_reservations,
                 'active_reservations': active_reservations,
                 'failure_config': failure_config,
+                'inventory_backend': INVENTORY_BACKEND,
+                'write_behind_pending': reservation_journal.pending() if reservation_journal else 0,
+                'write_behind_dead_lettered': reservation_journal.dead_lettered if reservation_journal else 0,
+                **reservation_sweeper.stats(),
                 'timestamp': datetime.utcnow().isoformat()
             }, 200
             
@@ -426,9 +528,12 @@ def health_check():
             'inventory_management',
             'stock_reservations',
             'reservation_release',
+            'reservation_expiry',
+            'batch_stock_movements',
             'failure_simulation'
         ],
-        'failure_simulation': failure_config['enabled']
+        'failure_simulation': failure_config['enabled'],
+        'inventory_backend': INVENTORY_BACKEND
     }, 200
 
 # Point d'entrée
@@ -439,6 +544,7 @@ if __name__ == '__main__':
     )
     
     app.logger.info("[INVENTORY] Service démarré sur le port 8002")
+    app.logger.info(f"[INVENTORY] Stockage: {INVENTORY_BACKEND}")
     app.logger.info(f"[INVENTORY] Simulation d'échecs: {failure_config['enabled']}")
     app.logger.info(f"[INVENTORY] Taux d'échec: {failure_config['failure_rate']}")
     app.logger.info(f"[INVENTORY] Produits en rupture simulée: {failure_config['out_of_stock_products']}")
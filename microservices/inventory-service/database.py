@@ -5,7 +5,8 @@ Base de données: inventory_db (PostgreSQL)
 """
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Decimal, DateTime, Boolean, ForeignKey, Text
+import json
+from sqlalchemy import create_engine, Column, Integer, String, Numeric, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from datetime import datetime
 
@@ -54,7 +55,7 @@ class StockModel(Base):
     quantite_reservee = Column(Integer, default=0)
     quantite_totale = Column(Integer, default=0)
     seuil_alerte = Column(Integer, default=10)
-    prix_cout = Column(Decimal(10, 2), nullable=True)
+    prix_cout = Column(Numeric(10, 2), nullable=True)
     derniere_maj = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -62,6 +63,11 @@ class StockModel(Base):
     location = relationship("StockLocationModel", back_populates="stocks")
     mouvements = relationship("StockMovementModel", back_populates="stock")
 
+    # Une ligne de stock par produit et emplacement (cible des UPDATE conditionnels)
+    __table_args__ = (
+        Index('idx_stock_produit_location', 'product_id', 'location_id', unique=True),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -84,7 +90,7 @@ class StockMovementModel(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False)
-    type_mouvement = Column(String(50), nullable=False)  # 'entree', 'sortie', 'ajustement'
+    type_mouvement = Column(String(50), nullable=False)  # 'entree', 'sortie', 'ajustement', 'reservation', 'liberation', 'confirmation'
     quantite = Column(Integer, nullable=False)
     reference = Column(String(100), nullable=True)  # Référence commande/vente
     motif = Column(Text, nullable=True)
@@ -107,6 +113,40 @@ class StockMovementModel(Base):
         }
 
 
+class StockMovementReferenceModel(Base):
+    """Vente ou retour de panier déjà appliqué : la clé primaire refuse sa répétition"""
+    __tablename__ = 'stock_movement_references'
+
+    reference = Column(String(100), primary_key=True)
+    type_mouvement = Column(String(20), primary_key=True)  # 'sortie', 'entree'
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class StockReservationModel(Base):
+    __tablename__ = 'stock_reservations'
+
+    reservation_id = Column(String(100), primary_key=True)
+    customer_id = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default='active', index=True)  # 'active', 'released', 'expired', 'confirmed'
+    items = Column(Text, nullable=False)  # JSON: [{product_id, location_id, quantity, reserved_at}]
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    released_at = Column(DateTime, nullable=True)  # fin de la réservation : libérée, expirée ou confirmée
+
+    def to_dict(self):
+        reservation = {
+            'reservation_id': self.reservation_id,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'items': json.loads(self.items),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+        if self.released_at:
+            reservation['released_at'] = self.released_at.isoformat()
+        return reservation
+
+
 def init_inventory_db():
     """Initialiser la base de données Inventory Service"""
     global engine, SessionLocal
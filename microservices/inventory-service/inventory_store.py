@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Stockage en mémoire de l'inventaire pour Inventory Service
+Accès direct par (product_id, location_id), index par emplacement et totaux tenus à jour
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+StockKey = Tuple[int, int]
+
+
+class InventoryStore:
+    """
+    Items d'inventaire indexés par (product_id, location_id).
+    Toutes les modifications de quantités passent par adjust() ou put()
+    pour que l'index par emplacement et les totaux restent cohérents.
+    L'appelant sérialise les écritures sur un même item (ReservationEngine.locked) ;
+    les totaux, partagés par tous les items, ont leur propre verrou
+    """
+
+    def __init__(self, items: Optional[Iterable[Dict[str, Any]]] = None):
+        self._items: Dict[StockKey, Dict[str, Any]] = {}
+        self._by_location: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self.total_available = 0
+        self.total_reserved = 0
+        self._totals_lock = threading.Lock()
+        if items:
+            self.load(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: StockKey) -> bool:
+        return key in self._items
+
+    def get(self, product_id: int, location_id: int = 1) -> Optional[Dict[str, Any]]:
+        """Item d'inventaire d'un produit à un emplacement, None si absent"""
+        return self._items.get((product_id, location_id))
+
+    def by_location(self, location_id: int) -> List[Dict[str, Any]]:
+        """Items d'un emplacement, dans l'ordre d'insertion"""
+        return list(self._by_location.get(location_id, {}).values())
+
+    def locations(self) -> List[int]:
+        return list(self._by_location)
+
+    def items(self) -> Iterable[Dict[str, Any]]:
+        return self._items.values()
+
+    def put(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajouter ou remplacer un item"""
+        key = (item['product_id'], item['location_id'])
+        previous = self._items.get(key)
+        self._items[key] = item
+        self._by_location.setdefault(item['location_id'], {})[item['product_id']] = item
+        with self._totals_lock:
+            if previous is not None:
+                self.total_available -= previous['available_quantity']
+                self.total_reserved -= previous['reserved_quantity']
+            self.total_available += item['available_quantity']
+            self.total_reserved += item['reserved_quantity']
+        return item
+
+    def adjust(self, product_id: int, location_id: int, available_delta: int = 0, reserved_delta: int = 0) -> Dict[str, Any]:
+        """Modifier les quantités d'un item existant (KeyError s'il n'existe pas)"""
+        item = self._items[(product_id, location_id)]
+        item['available_quantity'] += available_delta
+        item['reserved_quantity'] += reserved_delta
+        with self._totals_lock:
+            self.total_available += available_delta
+            self.total_reserved += reserved_delta
+        return item
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Remplacer tout l'inventaire"""
+        self.clear()
+        for item in items:
+            self.put(item)
+        return len(self._items)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._by_location.clear()
+        self.total_available = 0
+        self.total_reserved = 0
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Moteur de réservation de stock pour Inventory Service
+Verrous par bandes (lock striping) sur les SKU, réservation d'un panier en tout-ou-rien
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from inventory_store import InventoryStore, StockKey
+
+RESERVATION_TTL = timedelta(minutes=10)
+MOVEMENT_REFERENCES_KEPT = 100_000
+
+
+class ReservationError(ValueError):
+    """Réservation refusée ; status_code est le code HTTP à retourner"""
+
+    def __init__(self, message: str, status_code: int = 409):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def normalize_lines(items: List[Dict[str, Any]]) -> Dict[StockKey, int]:
+    """Valider les lignes d'un panier et regrouper les quantités d'un même SKU"""
+    lines: Dict[StockKey, int] = {}
+    for item in items:
+        product_id = item.get('product_id')
+        quantity = item.get('quantity', 0)
+        if not product_id or not isinstance(quantity, int) or quantity <= 0:
+            raise ReservationError('product_id et quantity valides requis pour chaque item', 400)
+        key = (product_id, item.get('location_id', 1))
+        lines[key] = lines.get(key, 0) + quantity
+    return lines
+
+
+class ReservationEngine:
+    """
+    Réservations concurrentes sans survente.
+    Chaque (product_id, location_id) est protégé par l'un des `stripes` verrous ;
+    un panier prend ses verrous par indice croissant (pas d'interblocage), vérifie
+    toutes les lignes puis les applique. Si un journal est fourni (write-behind),
+    chaque réservation et libération lui est transmise sous le verrou de son ID.
+    Les max_references derniers (reference, type_mouvement) appliqués par move_stock
+    sont retenus : une vente ou un retour rejoué n'est pas appliqué deux fois
+    """
+
+    def __init__(self, store: InventoryStore, stripes: int = 256, ttl: timedelta = RESERVATION_TTL, journal=None,
+                 max_references: int = MOVEMENT_REFERENCES_KEPT):
+        if stripes < 1:
+            raise ValueError("stripes doit être positif")
+        self.store = store
+        self.ttl = ttl
+        self.journal = journal
+        self.reservations: Dict[str, Dict[str, Any]] = {}
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        # Idempotence : un même reservation_id est traité par un seul thread à la fois.
+        # Toujours pris avant les verrous de SKU, jamais l'inverse
+        self._id_stripes = [threading.Lock() for _ in range(stripes)]
+        self.max_references = max_references
+        self._movements: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._movements_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, keys: Iterable[StockKey]):
+        """Tenir les verrous couvrant les SKU donnés, acquis dans un ordre global fixe"""
+        indexes = sorted({hash(key) % len(self._stripes) for key in keys})
+        with ExitStack() as stack:
+            for index in indexes:
+                stack.enter_context(self._stripes[index])
+            yield
+
+    def _id_lock(self, reservation_id: str) -> threading.Lock:
+        return self._id_stripes[hash(reservation_id) % len(self._id_stripes)]
+
+    def get(self, reservation_id: str) -> Optional[Dict[str, Any]]:
+        return self.reservations.get(reservation_id)
+
+    def counts(self) -> Tuple[int, int]:
+        """(nombre total de réservations, réservations actives)"""
+        reservations = list(self.reservations.values())
+        return len(reservations), sum(1 for r in reservations if r['status'] == 'active')
+
+    def reserve(self, reservation_id: str, customer_id: int,
+                items: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Réserver tout le panier ou rien.
+        Retourne (réservation, créée) ; une réservation existante est retournée telle quelle
+        """
+        lines = normalize_lines(items)
+        with self._id_lock(reservation_id):
+            existing = self.reservations.get(reservation_id)
+            if existing is not None:
+                return existing, False
+
+            with self.locked(lines):
+                self._check_available(lines)
+                now = datetime.utcnow()
+                reserved_items = []
+                for (product_id, location_id), quantity in lines.items():
+                    self.store.adjust(product_id, location_id, -quantity, quantity)
+                    reserved_items.append({
+                        'product_id': product_id,
+                        'location_id': location_id,
+                        'quantity': quantity,
+                        'reserved_at': now.isoformat()
+                    })
+
+            reservation = {
+                'reservation_id': reservation_id,
+                'customer_id': customer_id,
+                'status': 'active',
+                'items': reserved_items,
+                'created_at': now.isoformat(),
+                'expires_at': (now + self.ttl).isoformat()
+            }
+            self.reservations[reservation_id] = reservation
+            if self.journal:
+                self.journal.record(reservation, 'reservation')
+            return reservation, True
+
+    def release(self, reservation_id: str, status: str = 'released') -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Rendre au disponible le stock d'une réservation active.
+        Retourne (réservation, libérée par cet appel) ; (None, False) si elle est inconnue
+        """
+        return self._close(reservation_id, status, 'liberation')
+
+    def confirm(self, reservation_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Sortir définitivement le stock d'une réservation active (commande confirmée) :
+        le réservé diminue, le disponible ne change pas et l'expiration ne s'applique plus.
+        Retourne (réservation, confirmée par cet appel) ; (None, False) si elle est inconnue
+        """
+        return self._close(reservation_id, 'confirmed', 'confirmation')
+
+    def _close(self, reservation_id: str, status: str, type_mouvement: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        restock = type_mouvement == 'liberation'
+        with self._id_lock(reservation_id):
+            reservation = self.reservations.get(reservation_id)
+            if reservation is None or reservation['status'] != 'active':
+                return reservation, False
+
+            keys = [(item['product_id'], item['location_id']) for item in reservation['items']]
+            with self.locked(keys):
+                for item in reservation['items']:
+                    if (item['product_id'], item['location_id']) in self.store:
+                        self.store.adjust(item['product_id'], item['location_id'],
+                                          item['quantity'] if restock else 0, -item['quantity'])
+
+            reservation['status'] = status
+            reservation['released_at'] = datetime.utcnow().isoformat()
+            if self.journal:
+                self.journal.record(reservation, type_mouvement)
+            return reservation, True
+
+    def move_stock(self, reference: Optional[str], items: List[Dict[str, Any]],
+                   type_mouvement: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Sortie ('sortie', vente) ou entrée ('entree', retour) de stock pour tout un panier.
+        Une sortie vérifie toutes les lignes sous verrous puis les décrémente, tout ou rien.
+        Retourne (items d'inventaire, appliqué par cet appel) ; un (reference, type_mouvement)
+        déjà appliqué retourne le stock courant sans rien modifier
+        """
+        if type_mouvement not in ('sortie', 'entree'):
+            raise ReservationError(f"Type de mouvement inconnu: {type_mouvement}", 400)
+        lines = normalize_lines(items)
+        if not reference:
+            return self._move_stock(None, lines, type_mouvement), True
+        with self._id_lock(reference):
+            with self._movements_lock:
+                replayed = (reference, type_mouvement) in self._movements
+            if replayed:
+                return [dict(self.store.get(*key)) for key in lines if key in self.store], False
+            updated = self._move_stock(reference, lines, type_mouvement)
+            self.remember_movements([(reference, type_mouvement)])
+            return updated, True
+
+    def _move_stock(self, reference: Optional[str], lines: Dict[StockKey, int],
+                    type_mouvement: str) -> List[Dict[str, Any]]:
+        sign = -1 if type_mouvement == 'sortie' else 1
+        with self.locked(lines):
+            if type_mouvement == 'sortie':
+                self._check_available(lines)
+            else:
+                for product_id, location_id in lines:
+                    if (product_id, location_id) not in self.store:
+                        raise ReservationError(f"Produit {product_id} non trouvé dans l'inventaire", 404)
+            updated = [
+                dict(self.store.adjust(product_id, location_id, sign * quantity))
+                for (product_id, location_id), quantity in lines.items()
+            ]
+        if self.journal:
+            self.journal.record_movement(reference, lines, type_mouvement)
+        return updated
+
+    def remember_movements(self, references: Iterable[Tuple[str, str]]) -> None:
+        """Retenir des (reference, type_mouvement) appliqués, les plus anciens oubliés au-delà de max_references"""
+        with self._movements_lock:
+            for reference in references:
+                self._movements[reference] = None
+                self._movements.move_to_end(reference)
+            while len(self._movements) > self.max_references:
+                self._movements.popitem(last=False)
+
+    def _check_available(self, lines: Dict[StockKey, int]) -> None:
+        for (product_id, location_id), quantity in lines.items():
+            item = self.store.get(product_id, location_id)
+            if item is None:
+                raise ReservationError(f"Produit {product_id} non trouvé dans l'inventaire", 404)
+            if item['available_quantity'] < quantity:
+                raise ReservationError(
+                    f"Stock insuffisant pour le produit {product_id}. "
+                    f"Disponible: {item['available_quantity']}, Demandé: {quantity}"
+                )
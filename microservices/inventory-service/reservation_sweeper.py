@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Expiration des réservations pour Inventory Service
+Tas d'échéances (expires_at, reservation_id) dépilé par un thread en arrière-plan
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationSweeper:
+    """
+    Libère (statut 'expired') les réservations actives dont expires_at est dépassé.
+    schedule() et chaque dépilement coûtent O(log n). Une réservation libérée ou confirmée
+    (commande conclue, stock sorti) entre-temps reste dans le tas : release() la refuse
+    et l'entrée est simplement ignorée.
+    Fonctionne avec ReservationEngine comme avec SqlReservationEngine
+    """
+
+    def __init__(self, engine, interval: float = 1.0, batch_size: int = 100):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self._heap: List[Tuple[datetime, str]] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.expired_reservations = 0
+        self.released_quantity = 0
+        self.skipped = 0
+
+    def schedule(self, reservation: Dict[str, Any]) -> None:
+        """Enregistrer l'échéance d'une réservation active"""
+        if reservation['status'] != 'active':
+            return
+        deadline = datetime.fromisoformat(reservation['expires_at'])
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, reservation['reservation_id']))
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def sweep(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Libérer un lot de réservations échues et retourner celles effectivement expirées"""
+        now = now or datetime.utcnow()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap)[1])
+
+        expired = []
+        for reservation_id in due:
+            reservation, released = self.engine.release(reservation_id, status='expired')
+            if not released:
+                self.skipped += 1
+                continue
+            self.expired_reservations += 1
+            self.released_quantity += sum(item['quantity'] for item in reservation['items'])
+            expired.append(reservation)
+        if expired:
+            logger.info(f"[INVENTORY] Réservations expirées libérées: {len(expired)}")
+        return expired
+
+    def _has_due(self, now: datetime) -> bool:
+        with self._lock:
+            return bool(self._heap) and self._heap[0][0] <= now
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending_expirations': self.pending(),
+            'expired_reservations': self.expired_reservations,
+            'expired_released_quantity': self.released_quantity,
+            'expirations_skipped': self.skipped
+        }
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='inventory-reservation-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                # Enchaîner les lots tant que des échéances sont dépassées
+                self.sweep()
+                while self._has_due(datetime.utcnow()):
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"[INVENTORY] Erreur expiration des réservations: {e}")
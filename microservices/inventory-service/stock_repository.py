@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Persistance de l'inventaire pour Inventory Service (StockModel, StockMovementModel, StockReservationModel)
+Deux modes : accès direct à la base (UPDATE conditionnels, partagé entre réplicas)
+ou journal write-behind derrière le stockage en mémoire
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from database import StockModel, StockMovementModel, StockMovementReferenceModel, StockReservationModel
+from inventory_store import StockKey
+from reservation_engine import RESERVATION_TTL, ReservationError, normalize_lines
+
+logger = logging.getLogger(__name__)
+
+
+def _stock_to_item(stock: StockModel) -> Dict[str, Any]:
+    """Ligne de stock au format des items d'InventoryStore"""
+    return {
+        'product_id': stock.product_id,
+        'location_id': stock.location_id,
+        'available_quantity': stock.quantite_disponible,
+        'reserved_quantity': stock.quantite_reservee
+    }
+
+
+def _shift_stock(session, key: StockKey, available_delta: int, reserved_delta: int, now: datetime,
+                 require_available: bool = False) -> Optional[int]:
+    """
+    UPDATE atomique d'une ligne de stock, retourne son id (None si aucune ligne modifiée).
+    Avec require_available, la ligne n'est modifiée que si le disponible couvre la sortie
+    """
+    product_id, location_id = key
+    statement = update(StockModel).where(
+        StockModel.product_id == product_id,
+        StockModel.location_id == location_id
+    )
+    if require_available:
+        statement = statement.where(StockModel.quantite_disponible >= -available_delta)
+    statement = statement.values(
+        quantite_disponible=StockModel.quantite_disponible + available_delta,
+        quantite_reservee=StockModel.quantite_reservee + reserved_delta,
+        quantite_totale=StockModel.quantite_totale + available_delta + reserved_delta,
+        derniere_maj=now
+    ).returning(StockModel.id)
+    return session.execute(statement).scalar_one_or_none()
+
+
+# (delta disponible, delta réservé) par unité, selon le type de mouvement
+MOVEMENT_DELTAS = {
+    'reservation': (-1, 1),
+    'liberation': (1, -1),
+    'confirmation': (0, -1),
+    'sortie': (-1, 0),
+    'entree': (1, 0)
+}
+
+
+def _movement(stock_id: int, type_mouvement: str, quantity: int, reservation_id: str,
+              now: datetime) -> Dict[str, Any]:
+    return {
+        'stock_id': stock_id,
+        'type_mouvement': type_mouvement,
+        'quantite': quantity,
+        'reference': reservation_id,
+        'utilisateur': 'inventory-service',
+        'date_mouvement': now
+    }
+
+
+def _reservation_row(reservation: Dict[str, Any]) -> Dict[str, Any]:
+    """Réservation du moteur en mémoire -> colonnes de StockReservationModel"""
+    released_at = reservation.get('released_at')
+    return {
+        'reservation_id': reservation['reservation_id'],
+        'customer_id': reservation.get('customer_id'),
+        'status': reservation['status'],
+        'items': json.dumps(reservation['items']),
+        'created_at': datetime.fromisoformat(reservation['created_at']),
+        'expires_at': datetime.fromisoformat(reservation['expires_at']),
+        'released_at': datetime.fromisoformat(released_at) if released_at else None
+    }
+
+
+class SqlInventoryStore:
+    """Lecture de l'inventaire en base, même interface que InventoryStore"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def __len__(self) -> int:
+        with self.session_factory() as session:
+            return session.scalar(select(func.count()).select_from(StockModel))
+
+    def get(self, product_id: int, location_id: int = 1) -> Optional[Dict[str, Any]]:
+        with self.session_factory() as session:
+            stock = session.scalars(select(StockModel).where(
+                StockModel.product_id == product_id,
+                StockModel.location_id == location_id
+            )).first()
+            return _stock_to_item(stock) if stock else None
+
+    def by_location(self, location_id: int) -> List[Dict[str, Any]]:
+        with self.session_factory() as session:
+            stocks = session.scalars(
+                select(StockModel).where(StockModel.location_id == location_id).order_by(StockModel.id)
+            )
+            return [_stock_to_item(stock) for stock in stocks]
+
+    def items(self) -> List[Dict[str, Any]]:
+        with self.session_factory() as session:
+            return [_stock_to_item(stock) for stock in session.scalars(select(StockModel).order_by(StockModel.id))]
+
+    def totals(self) -> Tuple[int, int]:
+        """(quantité disponible totale, quantité réservée totale) en une requête"""
+        with self.session_factory() as session:
+            available, reserved = session.execute(select(
+                func.coalesce(func.sum(StockModel.quantite_disponible), 0),
+                func.coalesce(func.sum(StockModel.quantite_reservee), 0)
+            )).one()
+            return int(available), int(reserved)
+
+    @property
+    def total_available(self) -> int:
+        return self.totals()[0]
+
+    @property
+    def total_reserved(self) -> int:
+        return self.totals()[1]
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Écrire des items en base : UPDATE groupé des lignes existantes, INSERT groupé des nouvelles.
+        Les lignes absentes de `items` sont conservées (leurs mouvements y font référence)
+        """
+        now = datetime.utcnow()
+        items = list(items)
+        with self.session_factory() as session:
+            existing = {
+                (product_id, location_id): stock_id
+                for stock_id, product_id, location_id in session.execute(
+                    select(StockModel.id, StockModel.product_id, StockModel.location_id)
+                )
+            }
+            updates, inserts = [], []
+            for item in items:
+                row = {
+                    'quantite_disponible': item['available_quantity'],
+                    'quantite_reservee': item['reserved_quantity'],
+                    'quantite_totale': item['available_quantity'] + item['reserved_quantity'],
+                    'derniere_maj': now
+                }
+                stock_id = existing.get((item['product_id'], item['location_id']))
+                if stock_id is None:
+                    inserts.append(dict(row, product_id=item['product_id'], location_id=item['location_id']))
+                else:
+                    updates.append(dict(row, id=stock_id))
+            if updates:
+                session.execute(update(StockModel), updates)
+            if inserts:
+                session.execute(insert(StockModel), inserts)
+            session.commit()
+        return len(items)
+
+
+class SqlReservationEngine:
+    """
+    Réservations directement en base, même interface que ReservationEngine.
+    Chaque ligne est réservée par un UPDATE conditionnel (disponible >= quantité) : la base
+    arbitre la concurrence entre threads et entre réplicas. La ligne de réservation est
+    insérée en premier : un doublon concurrent bloque sur sa clé primaire puis échoue
+    """
+
+    def __init__(self, session_factory, ttl=RESERVATION_TTL):
+        self.session_factory = session_factory
+        self.ttl = ttl
+
+    def get(self, reservation_id: str) -> Optional[Dict[str, Any]]:
+        with self.session_factory() as session:
+            reservation = session.get(StockReservationModel, reservation_id)
+            return reservation.to_dict() if reservation else None
+
+    def all(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        statement = select(StockReservationModel)
+        if status:
+            statement = statement.where(StockReservationModel.status == status)
+        with self.session_factory() as session:
+            return [reservation.to_dict() for reservation in session.scalars(statement)]
+
+    def counts(self) -> Tuple[int, int]:
+        """(nombre total de réservations, réservations actives)"""
+        with self.session_factory() as session:
+            total, active = session.execute(select(
+                func.count(),
+                func.coalesce(func.sum(case((StockReservationModel.status == 'active', 1), else_=0)), 0)
+            ).select_from(StockReservationModel)).one()
+            return int(total), int(active)
+
+    def reserve(self, reservation_id: str, customer_id: int,
+                items: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Réserver tout le panier ou rien (une transaction).
+        Retourne (réservation, créée) ; une réservation existante est retournée telle quelle
+        """
+        lines = normalize_lines(items)
+        now = datetime.utcnow()
+        reserved_items = [
+            {'product_id': product_id, 'location_id': location_id,
+             'quantity': quantity, 'reserved_at': now.isoformat()}
+            for (product_id, location_id), quantity in lines.items()
+        ]
+
+        with self.session_factory() as session:
+            existing = session.get(StockReservationModel, reservation_id)
+            if existing is not None:
+                return existing.to_dict(), False
+
+            reservation = StockReservationModel(
+                reservation_id=reservation_id,
+                customer_id=customer_id,
+                status='active',
+                items=json.dumps(reserved_items),
+                created_at=now,
+                expires_at=now + self.ttl
+            )
+            session.add(reservation)
+            try:
+                session.flush()
+            except IntegrityError:
+                session.rollback()
+                return session.get(StockReservationModel, reservation_id).to_dict(), False
+
+            movements = []
+            # Ordre fixe des lignes : deux paniers concurrents verrouillent les stocks dans le même ordre
+            for key in sorted(lines):
+                stock_id = _shift_stock(session, key, -lines[key], lines[key], now, require_available=True)
+                if stock_id is None:
+                    session.rollback()
+                    raise self._refusal(session, key, lines[key])
+                movements.append(_movement(stock_id, 'reservation', lines[key], reservation_id, now))
+            session.execute(insert(StockMovementModel), movements)
+            session.commit()
+            return reservation.to_dict(), True
+
+    def release(self, reservation_id: str, status: str = 'released') -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Rendre au disponible le stock d'une réservation active.
+        Retourne (réservation, libérée par cet appel) ; (None, False) si elle est inconnue
+        """
+        return self._close(reservation_id, status, 'liberation')
+
+    def confirm(self, reservation_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Sortir définitivement le stock d'une réservation active (commande confirmée).
+        Retourne (réservation, confirmée par cet appel) ; (None, False) si elle est inconnue
+        """
+        return self._close(reservation_id, 'confirmed', 'confirmation')
+
+    def _close(self, reservation_id: str, status: str, type_mouvement: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        available_sign, reserved_sign = MOVEMENT_DELTAS[type_mouvement]
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            # Seul l'appel qui fait passer la réservation hors de 'active' rend ou sort le stock
+            claimed = session.execute(
+                update(StockReservationModel)
+                .where(StockReservationModel.reservation_id == reservation_id,
+                       StockReservationModel.status == 'active')
+                .values(status=status, released_at=now)
+            ).rowcount
+            reservation = session.get(StockReservationModel, reservation_id)
+            if not claimed:
+                session.rollback()
+                return (reservation.to_dict() if reservation else None), False
+
+            lines: Dict[StockKey, int] = {}
+            for item in json.loads(reservation.items):
+                key = (item['product_id'], item['location_id'])
+                lines[key] = lines.get(key, 0) + item['quantity']
+            movements = []
+            for key in sorted(lines):
+                stock_id = _shift_stock(session, key, available_sign * lines[key], reserved_sign * lines[key], now)
+                if stock_id is not None:
+                    movements.append(_movement(stock_id, type_mouvement, lines[key], reservation_id, now))
+            if movements:
+                session.execute(insert(StockMovementModel), movements)
+            session.commit()
+            return reservation.to_dict(), True
+
+    def move_stock(self, reference: Optional[str], items: List[Dict[str, Any]],
+                   type_mouvement: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Sortie ('sortie', vente) ou entrée ('entree', retour) de stock pour tout un panier,
+        en une transaction ; une sortie est un UPDATE conditionnel par ligne, tout ou rien.
+        La référence est insérée en premier : un (reference, type_mouvement) déjà appliqué,
+        même par un autre réplica, retourne (stock courant, False) sans rien modifier
+        """
+        if type_mouvement not in ('sortie', 'entree'):
+            raise ReservationError(f"Type de mouvement inconnu: {type_mouvement}", 400)
+        lines = normalize_lines(items)
+        available_sign = MOVEMENT_DELTAS[type_mouvement][0]
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            if reference:
+                session.add(StockMovementReferenceModel(reference=reference, type_mouvement=type_mouvement,
+                                                        created_at=now))
+                try:
+                    session.flush()
+                except IntegrityError:
+                    session.rollback()
+                    return self._current_items(session, lines), False
+
+            movements = []
+            for key in sorted(lines):
+                stock_id = _shift_stock(session, key, available_sign * lines[key], 0, now,
+                                        require_available=type_mouvement == 'sortie')
+                if stock_id is None:
+                    session.rollback()
+                    raise self._refusal(session, key, lines[key])
+                movements.append(_movement(stock_id, type_mouvement, lines[key], reference, now))
+            session.execute(insert(StockMovementModel), movements)
+            updated = [_stock_to_item(stock) for stock in session.scalars(select(StockModel).where(
+                StockModel.id.in_([movement['stock_id'] for movement in movements])
+            ))]
+            session.commit()
+            return updated, True
+
+    def movement_references(self, limit: int) -> List[Tuple[str, str]]:
+        """Les limit derniers (reference, type_mouvement) appliqués, du plus ancien au plus récent"""
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(StockMovementReferenceModel.reference, StockMovementReferenceModel.type_mouvement)
+                .order_by(StockMovementReferenceModel.created_at.desc())
+                .limit(limit)
+            ).all()
+            return [(reference, type_mouvement) for reference, type_mouvement in reversed(rows)]
+
+    def _current_items(self, session, lines: Dict[StockKey, int]) -> List[Dict[str, Any]]:
+        items = []
+        for product_id, location_id in lines:
+            stock = session.scalars(select(StockModel).where(
+                StockModel.product_id == product_id,
+                StockModel.location_id == location_id
+            )).first()
+            if stock is not None:
+                items.append(_stock_to_item(stock))
+        return items
+
+    def _refusal(self, session, key: StockKey, quantity: int) -> ReservationError:
+        product_id, location_id = key
+        available = session.scalar(select(StockModel.quantite_disponible).where(
+            StockModel.product_id == product_id,
+            StockModel.location_id == location_id
+        ))
+        if available is None:
+            return ReservationError(f"Produit {product_id} non trouvé dans l'inventaire", 404)
+        return ReservationError(
+            f"Stock insuffisant pour le produit {product_id}. "
+            f"Disponible: {available}, Demandé: {quantity}"
+        )
+
+
+class WriteBehindJournal:
+    """
+    Journal write-behind du ReservationEngine en mémoire.
+    record() et record_movement() ne font qu'empiler le mouvement ; un thread écrit les lots
+    (au plus batch_size entrées ou toutes les flush_interval secondes) en une transaction :
+    réservations fusionnées, deltas de stock cumulés par SKU, mouvements en INSERT groupé.
+    Un lot en échec (base injoignable) est réessayé jusqu'au retour de la base, avec un délai
+    doublé à chaque essai et borné à max_retry_delay. Seul un lot refusé par la base elle-même
+    (contrainte, donnée invalide) est réécrit entrée par entrée : les entrées refusées sont
+    écartées (journalisées en erreur et ajoutées en JSON à dead_letter_path s'il est fourni)
+    pour ne pas bloquer les écritures suivantes.
+    close() écrit tout ce qui est en attente ; un arrêt brutal perd au plus le lot en attente
+    """
+
+    def __init__(self, session_factory, batch_size: int = 500, flush_interval: float = 0.5,
+                 retry_delay: float = 1.0, max_retry_delay: float = 30.0, dead_letter_path: Optional[str] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dead_letter_path = dead_letter_path
+        self.dead_lettered = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='inventory-write-behind', daemon=True)
+        self._thread.start()
+
+    def record(self, reservation: Dict[str, Any], type_mouvement: str) -> None:
+        """Empiler une réservation ('reservation') ou une libération ('liberation')"""
+        snapshot = dict(reservation, items=[dict(item) for item in reservation['items']])
+        lines: Dict[StockKey, int] = {}
+        for item in snapshot['items']:
+            key = (item['product_id'], item['location_id'])
+            lines[key] = lines.get(key, 0) + item['quantity']
+        self._queue.put((type_mouvement, reservation['reservation_id'], lines, snapshot))
+
+    def record_movement(self, reference: str, lines: Dict[StockKey, int], type_mouvement: str) -> None:
+        """Empiler une sortie ('sortie') ou une entrée ('entree') de stock"""
+        self._queue.put((type_mouvement, reference, dict(lines), None))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Attendre que tout ce qui a été empilé soit écrit"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Écrire tout ce qui est en attente puis arrêter le thread (sans effet s'il est déjà arrêté)"""
+        if self._stopping.is_set():
+            return
+        self.flush()
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write_with_retries(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_with_retries(self, batch) -> None:
+        delay = self.retry_delay
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self._write(batch)
+                return
+            except (IntegrityError, DataError) as e:
+                error = e
+                logger.error(f"[INVENTORY] Écriture write-behind refusée par la base ({len(batch)} entrées): {e}")
+                break
+            except Exception as e:
+                logger.error(f"[INVENTORY] Écriture write-behind échouée ({len(batch)} entrées, essai {attempt}), "
+                             f"nouvel essai dans {delay:.1f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        # Lot refusé : isoler les entrées fautives pour écrire les autres
+        if len(batch) == 1:
+            self._dead_letter(batch[0], error)
+            return
+        for entry in batch:
+            self._write_with_retries([entry])
+
+    def _dead_letter(self, entry, error: Exception) -> None:
+        type_mouvement, reference, lines, reservation = entry
+        record = json.dumps({
+            'type_mouvement': type_mouvement,
+            'reference': reference,
+            'lines': [[product_id, location_id, quantity] for (product_id, location_id), quantity in lines.items()],
+            'reservation': reservation,
+            'error': str(error),
+            'failed_at': datetime.utcnow().isoformat()
+        }, default=str)
+        self.dead_lettered += 1
+        logger.error(f"[INVENTORY] Entrée write-behind refusée par la base, écartée: {record}")
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as dead_letters:
+                    dead_letters.write(record + '\n')
+            except OSError as e:
+                logger.error(f"[INVENTORY] Fichier des entrées écartées inaccessible: {e}")
+
+    def _write(self, batch: List[Tuple[str, str, Dict[StockKey, int], Optional[Dict[str, Any]]]]) -> None:
+        now = datetime.utcnow()
+        reservations: Dict[str, Dict[str, Any]] = {}
+        references = set()
+        deltas: Dict[StockKey, List[int]] = {}
+        entries = []
+        for type_mouvement, reference, lines, reservation in batch:
+            if reservation is not None:
+                reservations[reference] = reservation
+            elif reference:
+                references.add((reference, type_mouvement))
+            available_sign, reserved_sign = MOVEMENT_DELTAS[type_mouvement]
+            for key, quantity in lines.items():
+                delta = deltas.setdefault(key, [0, 0])
+                delta[0] += available_sign * quantity
+                delta[1] += reserved_sign * quantity
+                entries.append((key, type_mouvement, quantity, reference))
+
+        with self.session_factory() as session:
+            for reservation in reservations.values():
+                session.merge(StockReservationModel(**_reservation_row(reservation)))
+            for reference, type_mouvement in references:
+                session.merge(StockMovementReferenceModel(reference=reference, type_mouvement=type_mouvement,
+                                                          created_at=now))
+            stock_ids = {key: _shift_stock(session, key, *deltas[key], now) for key in sorted(deltas)}
+            movements = [
+                _movement(stock_ids[key], type_mouvement, quantity, reference, now)
+                for key, type_mouvement, quantity, reference in entries
+                if stock_ids[key] is not None
+            ]
+            if movements:
+                session.execute(insert(StockMovementModel), movements)
+            session.commit()
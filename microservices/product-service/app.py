@@ -46,6 +46,15 @@ product_model = api.model('Product', {
     'description': fields.String(description='Description du produit')
 })
 
+product_page_model = api.model('ProductPage', {
+    'data': fields.List(fields.Nested(product_model), description='Produits de la page'),
+    'meta': fields.Raw(description='Pagination : page, per_page, total, total_estimated')
+})
+
+product_batch_model = api.model('ProductBatchRequest', {
+    'ids': fields.List(fields.Integer, required=True, description='IDs des produits à résoudre')
+})
+
 category_model = api.model('Category', {
     'id': fields.Integer(description='ID de la catégorie'),
     'nom': fields.String(required=True, description='Nom de la catégorie'),
@@ -55,14 +64,17 @@ category_model = api.model('Category', {
 # Import des services métier (à adapter depuis l'existant)
 from database import init_product_db, get_product_session
 from services import ProductService, CategoryService
+from product_events import create_event_publisher
 
 # Initialisation de la base de données
 db_session = None
+event_publisher = None
 
 def init_app():
     """Initialiser l'application avec la base de données"""
-    global db_session
+    global db_session, event_publisher
     db_session = init_product_db()
+    event_publisher = create_event_publisher()
     
     logging.basicConfig(
         level=logging.INFO,
@@ -71,11 +83,13 @@ def init_app():
     
     app.logger.info("[PRODUCT] Service démarré sur le port 8001")
     app.logger.info("[PRODUCT] Base de données initialisée")
+    if event_publisher:
+        app.logger.info(f"[PRODUCT] Flux de changements publié sur {event_publisher.stream}")
 
 # Endpoints Produits
 @api.route('/products')
 class ProductList(Resource):
-    @api.marshal_list_with(product_model)
+    @api.marshal_with(product_page_model)
     @api.doc('get_products', description='Lister tous les produits')
     def get(self):
         """Récupérer la liste des produits avec pagination"""
@@ -87,8 +101,7 @@ class ProductList(Resource):
             app.logger.info(f"[PRODUCT] Requête liste produits - Page: {page}, Par page: {per_page}, Recherche: '{search}'")
             
             service = ProductService(db_session)
-            products = service.get_products_paginated(page, per_page, search)
-            total = service.count_products(search)
+            products, total, estimated = service.get_products_page(page, per_page, search)
             
             app.logger.debug(f"[PRODUCT] Récupéré {len(products)} produits sur {total} total")
             
@@ -97,7 +110,8 @@ class ProductList(Resource):
                 'meta': {
                     'page': page,
                     'per_page': per_page,
-                    'total': total
+                    'total': total,
+                    'total_estimated': estimated
                 }
             }
             
@@ -119,7 +133,7 @@ class ProductList(Resource):
             app.logger.info(f"[PRODUCT] Début création produit - Nom: {data.get('nom', 'N/A')}")
             app.logger.debug(f"[PRODUCT] Données produit reçues: {data}")
             
-            service = ProductService(db_session)
+            service = ProductService(db_session, event_publisher)
             product = service.create_product(data)
             
             app.logger.info(f"[PRODUCT] Produit créé avec succès - Nom: {product['nom']}, ID: {product['id']}, Prix: {product.get('prix')}$")
@@ -132,6 +146,45 @@ class ProductList(Resource):
             app.logger.error(f"[PRODUCT] Erreur création produit: {str(e)}")
             api.abort(500, f"Erreur interne: {str(e)}")
 
+@api.route('/products/batch')
+class ProductBatch(Resource):
+    @api.doc('get_products_batch', description='Résoudre plusieurs produits en un appel (?ids=1,2,3)',
+             params={'ids': 'IDs séparés par des virgules'})
+    def get(self):
+        """Récupérer plusieurs produits par leurs IDs (query string)"""
+        raw_ids = request.args.get('ids', '')
+        try:
+            product_ids = [int(value) for value in raw_ids.split(',') if value.strip()]
+        except ValueError:
+            api.abort(400, "Paramètre 'ids' invalide : entiers séparés par des virgules attendus")
+        return self._resolve(product_ids)
+    
+    @api.expect(product_batch_model)
+    @api.doc('post_products_batch', description='Résoudre plusieurs produits en un appel')
+    def post(self):
+        """Récupérer plusieurs produits par leurs IDs (corps JSON)"""
+        data = request.get_json() or {}
+        product_ids = data.get('ids')
+        if not isinstance(product_ids, list) or not all(isinstance(value, int) for value in product_ids):
+            api.abort(400, "Le champ 'ids' doit être une liste d'entiers")
+        return self._resolve(product_ids)
+    
+    def _resolve(self, product_ids):
+        try:
+            service = ProductService(db_session)
+            result = service.get_products_by_ids(product_ids)
+            
+            app.logger.info(f"[PRODUCT] Batch produits - Demandés: {len(product_ids)}, Trouvés: {len(result['products'])}, Manquants: {len(result['missing'])}")
+            return result, 200
+            
+        except ValueError as e:
+            app.logger.warning(f"[PRODUCT] Batch produits refusé: {str(e)}")
+            api.abort(400, str(e))
+        except Exception as e:
+            db_session.rollback()
+            app.logger.error(f"[PRODUCT] Erreur batch produits: {str(e)}")
+            api.abort(500, f"Erreur interne: {str(e)}")
+
 @api.route('/products/<int:product_id>')
 class Product(Resource):
     @api.marshal_with(product_model)
@@ -166,7 +219,7 @@ class Product(Resource):
             app.logger.info(f"[PRODUCT] Début mise à jour produit ID: {product_id}")
             app.logger.debug(f"[PRODUCT] Données de mise à jour: {data}")
             
-            service = ProductService(db_session)
+            service = ProductService(db_session, event_publisher)
             product = service.update_product(product_id, data)
             
             if not product:
@@ -189,7 +242,7 @@ class Product(Resource):
         try:
             app.logger.info(f"[PRODUCT] Début suppression produit ID: {product_id}")
             
-            service = ProductService(db_session)
+            service = ProductService(db_session, event_publisher)
             success = service.delete_product(product_id)
             
             if not success:
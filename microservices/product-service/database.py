@@ -5,7 +5,8 @@ Base de données: product_db (PostgreSQL)
 """
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Numeric, Text, DateTime, ForeignKey
+import json
+from sqlalchemy import create_engine, insert, text, Column, Integer, String, Numeric, Text, DateTime, ForeignKey
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -94,6 +95,7 @@ def init_product_db():
     
     # Créer les tables
     Base.metadata.create_all(bind=engine)
+    create_search_indexes()
     
     # Session factory
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -102,6 +104,25 @@ def init_product_db():
     return get_product_session()
 
 
+def create_search_indexes():
+    """Créer les index trigrammes (pg_trgm) servant les recherches ILIKE '%...%' sur PostgreSQL"""
+    if engine.dialect.name != 'postgresql':
+        return False
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for column in ('nom', 'description', 'sku'):
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_products_{column}_trgm "
+                    f"ON products USING gin ({column} gin_trgm_ops)"
+                ))
+        return True
+    except Exception as e:
+        # Sans pg_trgm, la recherche reste fonctionnelle (parcours séquentiel)
+        print(f"Index de recherche PostgreSQL non créés: {e}")
+        return False
+
+
 def get_product_session():
     """Obtenir une session de base de données"""
     if SessionLocal is None:
@@ -176,13 +197,50 @@ def create_sample_products(session):
     print("Produits d'exemple créés")
 
 
+def load_fixtures(session, fixtures_dir, batch_size=5000):
+    """
+    Charger les fixtures produites par generate_benchmark_data.py
+    (categories.jsonl et products.jsonl) par insertions groupées
+    """
+    for model, filename in ((CategoryModel, 'categories.jsonl'), (ProductModel, 'products.jsonl')):
+        path = os.path.join(fixtures_dir, filename)
+        if not os.path.exists(path):
+            continue
+
+        batch = []
+        total = 0
+        with open(path, encoding='utf-8') as fixture_file:
+            for line in fixture_file:
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    session.execute(insert(model), batch)
+                    total += len(batch)
+                    batch = []
+        if batch:
+            session.execute(insert(model), batch)
+            total += len(batch)
+
+        if session.bind.dialect.name == 'postgresql':
+            table = model.__tablename__
+            session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            ))
+        session.commit()
+        print(f"{total} lignes chargées depuis {filename}")
+
+
 # Fonction utilitaire pour l'initialisation complète
 def init_product_service_db():
     """Initialisation complète du Product Service avec données par défaut"""
     session = init_product_db()
     try:
-        create_default_categories(session)
-        create_sample_products(session)
+        fixtures_dir = os.getenv('PRODUCT_FIXTURES_DIR')
+        if fixtures_dir and not session.query(ProductModel).first():
+            load_fixtures(session, fixtures_dir)
+        else:
+            create_default_categories(session)
+            create_sample_products(session)
     finally:
         session.close()
     
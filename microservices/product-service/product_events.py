@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Flux de changements du catalogue (change-data feed)
+Chaque écriture produit est publiée sur un Redis Stream avec une version croissante
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_EVENTS_STREAM = os.getenv('PRODUCT_EVENTS_STREAM', 'events:products')
+PRODUCT_EVENTS_MAXLEN = int(os.getenv('PRODUCT_EVENTS_MAXLEN', '100000'))
+
+PRODUCT_CREATED = 'ProductCreated'
+PRODUCT_UPDATED = 'ProductUpdated'
+PRODUCT_DELETED = 'ProductDeleted'
+PRODUCT_PRICE_CHANGED = 'ProductPriceChanged'
+
+# INCR + XADD dans le même script : l'ordre du stream est celui des versions.
+# Si le compteur a disparu (flush, restauration), il repart de la dernière version du stream.
+_PUBLISH_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+    if last[1] then
+        local fields = last[1][2]
+        for i = 1, #fields, 2 do
+            if fields[i] == 'version' then
+                redis.call('SET', KEYS[2], fields[i + 1])
+            end
+        end
+    end
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*',
+    'version', version, 'event_type', ARGV[2], 'product_id', ARGV[3],
+    'data', ARGV[4], 'timestamp', ARGV[5])
+return version
+"""
+
+
+class ProductEventPublisher:
+    """Publication des événements produit (ProductCreated/Updated/Deleted, ProductPriceChanged)"""
+
+    def __init__(self, redis_client, stream: str = PRODUCT_EVENTS_STREAM, maxlen: int = PRODUCT_EVENTS_MAXLEN):
+        self.redis = redis_client
+        self.stream = stream
+        self.maxlen = maxlen
+        self._script = redis_client.register_script(_PUBLISH_SCRIPT)
+
+    def publish(self, event_type: str, product: Dict, **extra) -> Optional[int]:
+        """
+        Publier un événement et retourner sa version.
+        Une panne Redis n'annule pas l'écriture : les caches clients retombent sur leur TTL
+        """
+        data = dict(product, **extra)
+        try:
+            return int(self._script(
+                keys=[self.stream, f"{self.stream}:version"],
+                args=[self.maxlen, event_type, product['id'],
+                      json.dumps(data, default=str), datetime.utcnow().isoformat()]
+            ))
+        except Exception as e:
+            logger.warning(f"[PRODUCT] Événement {event_type} non publié - Produit {product.get('id')}: {e}")
+            return None
+
+    def product_created(self, product: Dict) -> Optional[int]:
+        return self.publish(PRODUCT_CREATED, product)
+
+    def product_updated(self, product: Dict, old_price: Optional[float] = None) -> Optional[int]:
+        """ProductUpdated, suivi de ProductPriceChanged si le prix a changé"""
+        version = self.publish(PRODUCT_UPDATED, product)
+        if old_price is not None and old_price != product['prix']:
+            version = self.publish(PRODUCT_PRICE_CHANGED, product, old_price=old_price) or version
+        return version
+
+    def product_deleted(self, product: Dict) -> Optional[int]:
+        return self.publish(PRODUCT_DELETED, product)
+
+
+def create_event_publisher() -> Optional[ProductEventPublisher]:
+    """Publisher configuré par PRODUCT_EVENTS_REDIS_URL, None si le flux est désactivé"""
+    redis_url = os.getenv('PRODUCT_EVENTS_REDIS_URL')
+    if not redis_url:
+        return None
+    import redis
+    return ProductEventPublisher(redis.from_url(redis_url, socket_timeout=2))
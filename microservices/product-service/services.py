@@ -4,52 +4,99 @@ Services métier pour Product Service
 Logique métier extraite de l'architecture monolithique
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy import and_, or_, func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
+import json
+import os
 
 from database import ProductModel, CategoryModel
 
+# Nombre maximal d'IDs résolus par un appel batch
+MAX_BATCH_IDS = int(os.getenv('PRODUCT_BATCH_MAX_IDS', '200'))
+
+# Au-delà de ce nombre de lignes estimé, la liste paginée retourne un total approximatif
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv('PRODUCT_ESTIMATED_COUNT_THRESHOLD', '100000'))
+
+# Nombre maximal de résultats retournés par la recherche avancée
+SEARCH_MAX_RESULTS = int(os.getenv('PRODUCT_SEARCH_MAX_RESULTS', '200'))
+
+
+def search_filter(search: str):
+    """Filtre texte sur nom, description et SKU (servi par les index trigrammes)"""
+    pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return or_(
+        ProductModel.nom.ilike(pattern, escape='\\'),
+        ProductModel.description.ilike(pattern, escape='\\'),
+        ProductModel.sku.ilike(pattern, escape='\\')
+    )
+
 
 class ProductService:
     """Service métier pour la gestion des produits"""
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, events=None):
         self.session = session
+        self.events = events  # ProductEventPublisher optionnel (flux de changements)
     
-    def get_products_paginated(self, page: int = 1, per_page: int = 20, search: str = '') -> List[Dict]:
-        """Récupérer les produits avec pagination et recherche"""
+    def _active_products(self, search: str = ''):
+        """Requête des produits actifs, filtrée par nom, description ou SKU"""
         query = self.session.query(ProductModel).filter(ProductModel.actif == 'ACTIF')
-        
-        # Filtrage par recherche
         if search:
-            search_filter = or_(
-                ProductModel.nom.ilike(f'%{search}%'),
-                ProductModel.description.ilike(f'%{search}%'),
-                ProductModel.sku.ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
-        
-        # Pagination
+            query = query.filter(search_filter(search))
+        return query
+    
+    def get_products_page(self, page: int = 1, per_page: int = 20, search: str = '') -> Tuple[List[Dict], int, bool]:
+        """
+        Récupérer une page de produits et le total en un seul aller-retour (COUNT(*) OVER ()).
+        Au-delà de ESTIMATED_COUNT_THRESHOLD lignes estimées par le planificateur PostgreSQL,
+        le total exact n'est plus calculé : retourne (produits, total, total_estime)
+        """
+        query = self._active_products(search)
         offset = (page - 1) * per_page
-        products = query.offset(offset).limit(per_page).all()
         
-        return [product.to_dict() for product in products]
+        estimate = self._estimate_count(query)
+        if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+            products = query.options(joinedload(ProductModel.categorie)) \
+                .order_by(ProductModel.id).offset(offset).limit(per_page).all()
+            return [product.to_dict() for product in products], estimate, True
+        
+        rows = query.add_columns(func.count().over().label('total')) \
+            .options(joinedload(ProductModel.categorie)) \
+            .order_by(ProductModel.id).offset(offset).limit(per_page).all()
+        if rows:
+            return [product.to_dict() for product, _ in rows], rows[0].total, False
+        
+        # Page au-delà de la fin : la fenêtre ne retourne aucune ligne
+        total = query.count() if page > 1 else 0
+        return [], total, False
+    
+    def _estimate_count(self, query) -> Optional[int]:
+        """Nombre de lignes estimé par EXPLAIN (PostgreSQL uniquement, sans parcours de la table)"""
+        if self.session.get_bind().dialect.name != 'postgresql':
+            return None
+        try:
+            compiled = query.statement.compile(dialect=self.session.get_bind().dialect)
+            plan = self.session.connection().exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception:
+            # Un EXPLAIN en échec laisse la transaction PostgreSQL avortée pour la session partagée
+            self.session.rollback()
+            return None
+    
+    def get_products_paginated(self, page: int = 1, per_page: int = 20, search: str = '') -> List[Dict]:
+        """Récupérer les produits avec pagination et recherche"""
+        products, _, _ = self.get_products_page(page, per_page, search)
+        return products
     
     def count_products(self, search: str = '') -> int:
         """Compter le nombre total de produits"""
-        query = self.session.query(ProductModel).filter(ProductModel.actif == 'ACTIF')
-        
-        if search:
-            search_filter = or_(
-                ProductModel.nom.ilike(f'%{search}%'),
-                ProductModel.description.ilike(f'%{search}%'),
-                ProductModel.sku.ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
-        
-        return query.count()
+        return self._active_products(search).count()
     
     def get_product_by_id(self, product_id: int) -> Optional[Dict]:
         """Récupérer un produit par son ID"""
@@ -59,6 +106,24 @@ class ProductService:
         
         return product.to_dict() if product else None
     
+    def get_products_by_ids(self, product_ids: List[int]) -> Dict:
+        """Récupérer plusieurs produits en une requête IN (catégories chargées dans la même requête)"""
+        requested = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+        if len(requested) > MAX_BATCH_IDS:
+            raise ValueError(f"Au plus {MAX_BATCH_IDS} IDs par requête ({len(requested)} reçus)")
+        if not requested:
+            return {'products': [], 'missing': []}
+        
+        products = self.session.query(ProductModel).options(joinedload(ProductModel.categorie)).filter(
+            and_(ProductModel.id.in_(requested), ProductModel.actif == 'ACTIF')
+        ).all()
+        
+        found = {product.id: product.to_dict() for product in products}
+        return {
+            'products': [found[product_id] for product_id in requested if product_id in found],
+            'missing': [product_id for product_id in requested if product_id not in found]
+        }
+    
     def get_product_by_sku(self, sku: str) -> Optional[Dict]:
         """Récupérer un produit par son SKU"""
         product = self.session.query(ProductModel).filter(
@@ -110,7 +175,10 @@ class ProductService:
         self.session.commit()
         self.session.refresh(product)
         
-        return product.to_dict()
+        result = product.to_dict()
+        if self.events:
+            self.events.product_created(result)
+        return result
     
     def update_product(self, product_id: int, update_data: Dict) -> Optional[Dict]:
         """Mettre à jour un produit"""
@@ -121,6 +189,8 @@ class ProductService:
         if not product:
             return None
         
+        old_price = float(product.prix)
+        
         # Champs autorisés à la mise à jour
         allowed_fields = ['nom', 'prix', 'stock', 'seuil_alerte', 'description', 'sku']
         
@@ -139,7 +209,10 @@ class ProductService:
         self.session.commit()
         self.session.refresh(product)
         
-        return product.to_dict()
+        result = product.to_dict()
+        if self.events:
+            self.events.product_updated(result, old_price=old_price)
+        return result
     
     def delete_product(self, product_id: int) -> bool:
         """Supprimer un produit (soft delete)"""
@@ -155,6 +228,8 @@ class ProductService:
         product.updated_at = datetime.utcnow()
         
         self.session.commit()
+        if self.events:
+            self.events.product_deleted(product.to_dict())
         return True
     
     def get_products_by_category(self, category_id: int) -> List[Dict]:
@@ -280,19 +355,16 @@ class ProductSearchService:
                        category_id: Optional[int] = None,
                        min_price: Optional[float] = None,
                        max_price: Optional[float] = None,
-                       in_stock_only: bool = False) -> List[Dict]:
-        """Recherche avancée de produits avec filtres multiples"""
+                       in_stock_only: bool = False,
+                       limit: int = 50,
+                       offset: int = 0) -> List[Dict]:
+        """Recherche avancée de produits avec filtres multiples (au plus SEARCH_MAX_RESULTS résultats)"""
         
         db_query = self.session.query(ProductModel).filter(ProductModel.actif == 'ACTIF')
         
         # Filtrage par texte
         if query:
-            text_filter = or_(
-                ProductModel.nom.ilike(f'%{query}%'),
-                ProductModel.description.ilike(f'%{query}%'),
-                ProductModel.sku.ilike(f'%{query}%')
-            )
-            db_query = db_query.filter(text_filter)
+            db_query = db_query.filter(search_filter(query))
         
         # Filtrage par catégorie
         if category_id:
@@ -308,5 +380,7 @@ class ProductSearchService:
         if in_stock_only:
             db_query = db_query.filter(ProductModel.stock > 0)
         
-        products = db_query.all()
+        limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+        products = db_query.options(joinedload(ProductModel.categorie)) \
+            .order_by(ProductModel.nom, ProductModel.id).offset(max(offset, 0)).limit(limit).all()
         return [product.to_dict() for product in products] 
\ No newline at end of file
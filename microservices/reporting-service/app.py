@@ -5,18 +5,31 @@ Port: 8004
 Responsabilité: Rapports, tableaux de bord, analytique multi-magasins
 """
 
+import gzip
+import json
 import os
 import requests
 import logging
+import threading
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from collections import defaultdict
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
-from flask import Flask, request, jsonify
+from requests.adapters import HTTPAdapter
+
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
+import report_columns
+from report_cache import ReportCache
+from report_jobs import ReportJobs
+from sales_aggregates import SalesAggregates, SalesEventConsumer
+
 # Configuration de base
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'reporting-service-secret')
@@ -48,16 +61,47 @@ api = Api(
 REPORTS_GENERATED = Counter('reports_generated_total', 'Total number of reports generated', ['report_type'])
 REPORT_GENERATION_DURATION = Histogram('report_generation_duration_seconds', 'Report generation time', ['report_type'])
 DASHBOARD_REQUESTS = Counter('dashboard_requests_total', 'Total dashboard requests', ['dashboard_type'])
+UPSTREAM_FAILURES = Counter('reporting_upstream_failures_total', 'Failed or timed out upstream calls', ['service'])
 
 # Configuration des services externes
 SALES_SERVICE_URL = os.getenv('SALES_SERVICE_URL', 'http://sales-service:8003')
 INVENTORY_SERVICE_URL = os.getenv('INVENTORY_SERVICE_URL', 'http://inventory-service:8002')
 PRODUCT_SERVICE_URL = os.getenv('PRODUCT_SERVICE_URL', 'http://product-service:8001')
+PRODUCT_BATCH_SIZE = int(os.getenv('PRODUCT_BATCH_SIZE', '200'))
+DEFAULT_STORE_IDS = [int(store_id) for store_id in os.getenv('REPORTING_DEFAULT_STORE_IDS', '1,2,3,4,5').split(',')]
+
+# Appels sortants : connexions réutilisées (keep-alive) et appels en parallèle.
+# UPSTREAM_TIMEOUT borne chaque appel (connexion, lecture), FANOUT_TIMEOUT l'ensemble d'une fan-out
+UPSTREAM_TIMEOUT = (float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '2')), float(os.getenv('UPSTREAM_READ_TIMEOUT', '10')))
+FANOUT_TIMEOUT = float(os.getenv('FANOUT_TIMEOUT', '12'))
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '16'))
+
+http_session = requests.Session()
+http_session.mount('http://', HTTPAdapter(pool_connections=8, pool_maxsize=FANOUT_WORKERS))
+http_session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=FANOUT_WORKERS))
+fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='reporting-fanout')
+# Sources appelées en parallèle par un même rapport (chacune fait sa propre fan-out)
+source_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='reporting-sources')
 
-# Cache des rapports
-reports_cache = {}
-dashboard_cache = {}
-cache_ttl = 300  # 5 minutes
+# Cache des rapports : LRU borné avec TTL, partagé entre réplicas si REPORT_CACHE_REDIS_URL est défini
+REPORT_CACHE_REDIS_URL = os.getenv('REPORT_CACHE_REDIS_URL')
+REPORT_CACHE_TTL = float(os.getenv('REPORT_CACHE_TTL', '300'))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', '256'))
+if REPORT_CACHE_REDIS_URL:
+    import redis
+    report_cache = ReportCache(redis.from_url(REPORT_CACHE_REDIS_URL, socket_timeout=2),
+                               ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES)
+else:
+    report_cache = ReportCache(ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES)
+
+# Jobs de rapport asynchrones (longues périodes) : résultats gzip dans REPORT_JOBS_DIR
+REPORT_JOB_CHUNK_DAYS = int(os.getenv('REPORT_JOB_CHUNK_DAYS', '7'))
+REPORT_JOB_SALES_PAGE_SIZE = int(os.getenv('REPORT_JOB_SALES_PAGE_SIZE', '1000'))
+report_jobs = ReportJobs(
+    os.getenv('REPORT_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'report_jobs')),
+    workers=int(os.getenv('REPORT_JOB_WORKERS', '2')),
+    retention=float(os.getenv('REPORT_JOB_RETENTION', '3600'))
+)
 
 # Modèles API
 date_range_model = api.model('DateRange', {
@@ -72,6 +116,11 @@ report_filter_model = api.model('ReportFilter', {
     'date_range': fields.Nested(date_range_model, description='Plage de dates')
 })
 
+report_job_request_model = api.model('ReportJobRequest', {
+    'report_type': fields.String(required=True, description='Type de rapport (sales)'),
+    'filters': fields.Nested(report_filter_model, description='Filtres du rapport')
+})
+
 sales_report_model = api.model('SalesReport', {
     'report_id': fields.String(description='ID unique du rapport'),
     'type': fields.String(description='Type de rapport'),
@@ -81,119 +130,149 @@ sales_report_model = api.model('SalesReport', {
     'data': fields.Raw(description='Données détaillées')
 })
 
+class UpstreamError(RuntimeError):
+    """Appels sortants en échec alors qu'un résultat complet est exigé"""
+
+
 class DataAggregator:
     """Agrégateur de données pour les rapports"""
     
     @staticmethod
-    def get_sales_data(store_ids: List[int] = None, date_from: str = None, date_to: str = None) -> List[Dict]:
-        """Récupérer les données de ventes"""
-        try:
-            logger.info(f"[REPORTING] Récupération données ventes - Magasins: {store_ids}, Période: {date_from} à {date_to}")
-            
-            params = {}
-            if date_from:
-                params['date_from'] = date_from
-            if date_to:
-                params['date_to'] = date_to
-            
-            all_sales = []
-            
-            if store_ids:
-                # Récupérer les ventes pour chaque magasin
-                logger.debug(f"[REPORTING] Récupération pour {len(store_ids)} magasins spécifiques")
-                for store_id in store_ids:
-                    params['store_id'] = store_id
-                    logger.debug(f"[REPORTING] Appel sales service - Magasin: {store_id}")
-                    response = requests.get(f"{SALES_SERVICE_URL}/api/v1/sales", params=params, timeout=10)
-                    if response.status_code == 200:
-                        store_sales = response.json().get('sales', [])
-                        logger.debug(f"[REPORTING] Récupéré {len(store_sales)} ventes pour magasin {store_id}")
-                        all_sales.extend(store_sales)
-                    else:
-                        logger.warning(f"[REPORTING] Échec récupération ventes magasin {store_id} - Code: {response.status_code}")
-            else:
-                # Récupérer toutes les ventes
-                logger.debug(f"[REPORTING] Récupération toutes les ventes")
-                response = requests.get(f"{SALES_SERVICE_URL}/api/v1/sales", params=params, timeout=10)
-                if response.status_code == 200:
-                    all_sales = response.json().get('sales', [])
-                    logger.debug(f"[REPORTING] Récupéré {len(all_sales)} ventes au total")
-                else:
-                    logger.warning(f"[REPORTING] Échec récupération toutes ventes - Code: {response.status_code}")
-            
-            logger.info(f"[REPORTING] Données ventes récupérées - Total: {len(all_sales)} ventes")
-            return all_sales
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"[REPORTING] Erreur récupération ventes: {e}")
-            return []
+    def fan_out(service: str, calls: List[Tuple[str, Callable[[], requests.Response]]],
+                strict: bool = False) -> List[Tuple[str, Any]]:
+        """
+        Exécuter des appels HTTP en parallèle et retourner (libellé, JSON) des réponses 200.
+        Les appels en erreur, en échec ou hors délai sont journalisés et ignorés (résultat partiel) ;
+        avec strict, UpstreamError est levée s'il en manque un
+        """
+        futures = {fanout_executor.submit(call): label for label, call in calls}
+        done, not_done = wait(futures, timeout=FANOUT_TIMEOUT)
+        results = []
+        failures = []
+        for future, label in futures.items():
+            if future in not_done:
+                future.cancel()
+                logger.warning(f"[REPORTING] Appel {service} hors délai - {label}")
+                failures.append(f"{label} (hors délai)")
+                continue
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"[REPORTING] Échec appel {service} - {label}: {e}")
+                failures.append(f"{label} ({e})")
+                continue
+            if response.status_code != 200:
+                logger.warning(f"[REPORTING] Échec appel {service} - {label} - Code: {response.status_code}")
+                failures.append(f"{label} (code {response.status_code})")
+                continue
+            try:
+                results.append((label, response.json()))
+            except ValueError as e:
+                logger.warning(f"[REPORTING] Réponse invalide {service} - {label}: {e}")
+                failures.append(f"{label} (réponse invalide)")
+        if failures:
+            UPSTREAM_FAILURES.labels(service=service).inc(len(failures))
+            if strict:
+                raise UpstreamError(f"Appels {service} en échec: {', '.join(failures)}")
+            logger.warning(f"[REPORTING] Résultat partiel {service} - {len(results)}/{len(calls)} appels réussis")
+        return results
+    
+    @staticmethod
+    def in_parallel(*sources: Callable[[], Any]) -> List[Any]:
+        """Récupérer plusieurs sources en même temps ; la latence est celle de la plus lente"""
+        return [future.result() for future in [source_executor.submit(source) for source in sources]]
+    
+    @staticmethod
+    def get_sales_data(store_ids: List[int] = None, date_from: str = None, date_to: str = None,
+                       page_size: Optional[int] = None, strict: bool = False) -> List[Dict]:
+        """
+        Récupérer les données de ventes (un appel par magasin, en parallèle).
+        Sans page_size : la première page de sales-service (100 ventes par défaut) ;
+        avec page_size : toutes les ventes, page par page (offset / next_offset).
+        Avec strict, un appel en échec lève UpstreamError au lieu d'un résultat partiel
+        """
+        logger.info(f"[REPORTING] Récupération données ventes - Magasins: {store_ids}, Période: {date_from} à {date_to}")
+        
+        params = {}
+        if date_from:
+            params['date_from'] = date_from
+        if date_to:
+            params['date_to'] = date_to
+        if page_size:
+            params['limit'] = page_size
+        
+        url = f"{SALES_SERVICE_URL}/api/v1/sales"
+        if store_ids:
+            logger.debug(f"[REPORTING] Récupération pour {len(store_ids)} magasins spécifiques")
+            pending = {f"magasin {store_id}": {**params, 'store_id': store_id} for store_id in store_ids}
+        else:
+            logger.debug(f"[REPORTING] Récupération toutes les ventes")
+            pending = {'tous magasins': params}
+        
+        all_sales = []
+        while pending:
+            calls = [
+                (label, lambda call_params=call_params: http_session.get(url, params=call_params, timeout=UPSTREAM_TIMEOUT))
+                for label, call_params in pending.items()
+            ]
+            next_pages = {}
+            for label, body in DataAggregator.fan_out('sales-service', calls, strict=strict):
+                store_sales = body.get('sales', [])
+                logger.debug(f"[REPORTING] Récupéré {len(store_sales)} ventes - {label}")
+                all_sales.extend(store_sales)
+                if page_size and body.get('next_offset') is not None:
+                    next_pages[label] = {**pending[label], 'offset': body['next_offset']}
+            pending = next_pages
+        
+        logger.info(f"[REPORTING] Données ventes récupérées - Total: {len(all_sales)} ventes")
+        return all_sales
     
     @staticmethod
     def get_inventory_data(store_ids: List[int] = None) -> List[Dict]:
-        """Récupérer les données d'inventaire"""
-        try:
-            logger.info(f"[REPORTING] Récupération données inventaire - Magasins: {store_ids}")
-            all_inventory = []
-            
-            if store_ids:
-                logger.debug(f"[REPORTING] Récupération pour {len(store_ids)} magasins spécifiques")
-                for store_id in store_ids:
-                    logger.debug(f"[REPORTING] Appel inventory service - Magasin: {store_id}")
-                    response = requests.get(
-                        f"{INVENTORY_SERVICE_URL}/api/v1/inventory",
-                        params={'location_id': store_id},
-                        timeout=10
-                    )
-                    if response.status_code == 200:
-                        store_inventory = response.json()
-                        logger.debug(f"[REPORTING] Récupéré {len(store_inventory)} items inventaire pour magasin {store_id}")
-                        all_inventory.extend(store_inventory)
-                    else:
-                        logger.warning(f"[REPORTING] Échec récupération inventaire magasin {store_id} - Code: {response.status_code}")
-            else:
-                # Par défaut, récupérer pour tous les magasins (1 à 5)
-                logger.debug(f"[REPORTING] Récupération inventaire pour tous les magasins (1-5)")
-                for store_id in range(1, 6):
-                    logger.debug(f"[REPORTING] Appel inventory service - Magasin: {store_id}")
-                    response = requests.get(
-                        f"{INVENTORY_SERVICE_URL}/api/v1/inventory",
-                        params={'location_id': store_id},
-                        timeout=10
-                    )
-                    if response.status_code == 200:
-                        store_inventory = response.json()
-                        logger.debug(f"[REPORTING] Récupéré {len(store_inventory)} items inventaire pour magasin {store_id}")
-                        all_inventory.extend(store_inventory)
-                    else:
-                        logger.warning(f"[REPORTING] Échec récupération inventaire magasin {store_id} - Code: {response.status_code}")
-            
-            logger.info(f"[REPORTING] Données inventaire récupérées - Total: {len(all_inventory)} items")
-            return all_inventory
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"[REPORTING] Erreur récupération inventaire: {e}")
-            return []
+        """Récupérer les données d'inventaire (un appel par magasin, en parallèle)"""
+        store_ids = store_ids or DEFAULT_STORE_IDS
+        logger.info(f"[REPORTING] Récupération données inventaire - Magasins: {store_ids}")
+        
+        url = f"{INVENTORY_SERVICE_URL}/api/v1/inventory"
+        calls = [
+            (f"magasin {store_id}",
+             lambda store_id=store_id: http_session.get(url, params={'location_id': store_id}, timeout=UPSTREAM_TIMEOUT))
+            for store_id in store_ids
+        ]
+        
+        all_inventory = []
+        for label, store_inventory in DataAggregator.fan_out('inventory-service', calls):
+            logger.debug(f"[REPORTING] Récupéré {len(store_inventory)} items inventaire - {label}")
+            all_inventory.extend(store_inventory)
+        
+        logger.info(f"[REPORTING] Données inventaire récupérées - Total: {len(all_inventory)} items")
+        return all_inventory
     
     @staticmethod
-    def get_products_data() -> List[Dict]:
-        """Récupérer les données des produits"""
-        try:
+    def get_products_data(product_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Récupérer les données des produits (par lots d'IDs via /products/batch si fournis, en parallèle)"""
+        if product_ids is not None:
+            unique_ids = list(dict.fromkeys(product_ids))
+            logger.info(f"[REPORTING] Récupération données produits - {len(unique_ids)} IDs")
+            url = f"{PRODUCT_SERVICE_URL}/api/v1/products/batch"
+            calls = [
+                (f"lot {start // PRODUCT_BATCH_SIZE + 1}",
+                 lambda chunk=unique_ids[start:start + PRODUCT_BATCH_SIZE]: http_session.post(url, json={'ids': chunk}, timeout=UPSTREAM_TIMEOUT))
+                for start in range(0, len(unique_ids), PRODUCT_BATCH_SIZE)
+            ]
+        else:
             logger.info(f"[REPORTING] Récupération données produits")
-            response = requests.get(f"{PRODUCT_SERVICE_URL}/api/v1/products", timeout=10)
-            if response.status_code == 200:
-                products = response.json().get('products', [])
-                logger.info(f"[REPORTING] Données produits récupérées - Total: {len(products)} produits")
-                return products
-            else:
-                logger.warning(f"[REPORTING] Échec récupération produits - Code: {response.status_code}")
-                return []
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"[REPORTING] Erreur récupération produits: {e}")
-            return []
+            url = f"{PRODUCT_SERVICE_URL}/api/v1/products"
+            calls = [('catalogue', lambda: http_session.get(url, timeout=UPSTREAM_TIMEOUT))]
+        
+        products = []
+        for _, body in DataAggregator.fan_out('product-service', calls):
+            products.extend(body.get('products', []))
+        logger.info(f"[REPORTING] Données produits récupérées - Total: {len(products)} produits")
+        return products
 
 class ReportGenerator:
-    """Générateur de rapports"""
+    """Générateur de rapports (calcul colonnaire NumPy au-delà de REPORT_COLUMNAR_MIN_ROWS lignes)"""
     
     @staticmethod
     def generate_sales_summary(sales_data: List[Dict], filters: Dict = None) -> Dict:
@@ -209,6 +288,9 @@ class ReportGenerator:
                 'by_day': {}
             }
         
+        if report_columns.columnar_enabled(len(sales_data)):
+            return report_columns.SalesColumns(sales_data).sales_summary()
+        
         # Calculs de base
         total_transactions = len(sales_data)
         total_revenue = sum(sale.get('final_amount', 0) for sale in sales_data)
@@ -259,6 +341,9 @@ class ReportGenerator:
                 'stock_distribution': {}
             }
         
+        if report_columns.columnar_enabled(len(inventory_data)):
+            return report_columns.inventory_report(inventory_data)
+        
         total_products = len(set(item['product_id'] for item in inventory_data))
         low_stock_alerts = []
         by_location = defaultdict(lambda: {'products': 0, 'total_quantity': 0, 'stock_value': 0.0})
@@ -296,6 +381,10 @@ class ReportGenerator:
     @staticmethod
     def generate_product_performance(sales_data: List[Dict], products_data: List[Dict]) -> Dict:
         """Générer un rapport de performance des produits"""
+        if report_columns.columnar_enabled(len(sales_data)):
+            product_sales = report_columns.SalesColumns(sales_data).product_sales()
+            return ReportGenerator.summarize_product_performance(product_sales, products_data)
+        
         product_sales = defaultdict(lambda: {'quantity': 0, 'revenue': 0.0, 'transactions': 0})
         
         # Analyser les ventes par produit
@@ -309,6 +398,11 @@ class ReportGenerator:
                 product_sales[product_id]['revenue'] += revenue
                 product_sales[product_id]['transactions'] += 1
         
+        return ReportGenerator.summarize_product_performance(product_sales, products_data)
+    
+    @staticmethod
+    def summarize_product_performance(product_sales: Dict[int, Dict], products_data: List[Dict]) -> Dict:
+        """Classer des ventes par produit déjà agrégées, enrichies avec le catalogue"""
         # Enrichir avec les informations produits
         products_dict = {p['id']: p for p in products_data}
         enriched_performance = []
@@ -334,6 +428,33 @@ class ReportGenerator:
             'total_products_sold': len(enriched_performance)
         }
 
+# Agrégats incrémentaux alimentés par le flux des ventes (SALES_EVENTS_REDIS_URL) ;
+# sans flux, ou hors de la période couverte, les rapports repartent des ventes brutes
+sales_aggregates = SalesAggregates()
+sales_event_consumer = None
+INVENTORY_REFRESH_INTERVAL = float(os.getenv('INVENTORY_REFRESH_INTERVAL', '60'))
+
+def refresh_inventory_aggregates() -> None:
+    """Tenir à jour les compteurs de stock bas lus par le tableau de bord"""
+    while True:
+        try:
+            sales_aggregates.update_inventory(DataAggregator.get_inventory_data())
+        except Exception as e:
+            logger.warning(f"[REPORTING] Rafraîchissement inventaire échoué: {e}")
+        time.sleep(INVENTORY_REFRESH_INTERVAL)
+
+if os.getenv('SALES_EVENTS_REDIS_URL'):
+    import redis
+    sales_event_consumer = SalesEventConsumer(
+        redis.from_url(os.getenv('SALES_EVENTS_REDIS_URL')), sales_aggregates,
+        # Une vente retire les rapports en cache dont la période la contient
+        on_sale=lambda sale: report_cache.invalidate_sale(
+            sale['timestamp'][:10] if sale else None, sale.get('store_id') if sale else None
+        )
+    )
+    sales_event_consumer.start()
+    threading.Thread(target=refresh_inventory_aggregates, name='inventory-aggregates', daemon=True).start()
+
 def get_cache_key(report_type: str, filters: Dict = None) -> str:
     """Générer une clé de cache pour un rapport"""
     import hashlib
@@ -343,13 +464,92 @@ def get_cache_key(report_type: str, filters: Dict = None) -> str:
     cache_string = json.dumps(cache_data, sort_keys=True)
     return hashlib.md5(cache_string.encode()).hexdigest()
 
-def is_cache_valid(cache_entry: Dict) -> bool:
-    """Vérifier si l'entrée de cache est valide"""
-    if not cache_entry:
-        return False
+def build_sales_report(filters: Dict, fetch_sales: Optional[Callable[[Optional[List[int]], Optional[str], Optional[str]], List[Dict]]] = None,
+                       detail_limit: Optional[int] = 100) -> Dict:
+    """
+    Générer un rapport de ventes. Sans fetch_sales : agrégats incrémentaux si la période
+    est couverte, sinon ventes brutes. Avec fetch_sales (jobs) : toujours les ventes brutes
+    """
+    # Extraire les filtres
+    store_ids = filters.get('store_ids')
+    date_range = filters.get('date_range', {})
+    date_from = date_range.get('start_date')
+    date_to = date_range.get('end_date')
+    
+    logger.debug(f"[REPORTING] Filtres extraits - Magasins: {store_ids}, Période: {date_from} à {date_to}")
+    
+    cashier_ids = filters.get('cashier_ids')
+    if fetch_sales is None and not cashier_ids and sales_aggregates.covers(date_from, date_to):
+        # Fusion des buckets pré-agrégés (pas d'index par caissier dans les agrégats)
+        logger.info(f"[REPORTING] Rapport ventes depuis les agrégats incrémentaux")
+        summary = sales_aggregates.sales_summary(store_ids, date_from, date_to)
+        sales_data = [
+            sale for sale in reversed(sales_aggregates.recent)
+            if (not store_ids or sale.get('store_id') in store_ids)
+            and (not date_from or sale['timestamp'][:10] >= date_from)
+            and (not date_to or sale['timestamp'][:10] <= date_to)
+        ]
+    else:
+        # Récupérer les données
+        logger.info(f"[REPORTING] Récupération données pour rapport ventes")
+        sales_data = (fetch_sales or DataAggregator.get_sales_data)(store_ids, date_from, date_to)
+        
+        # Filtrer par caissier si spécifié
+        if cashier_ids:
+            original_count = len(sales_data)
+            sales_data = [sale for sale in sales_data if sale.get('cashier_id') in cashier_ids]
+            logger.debug(f"[REPORTING] Filtre caissier appliqué - {original_count} → {len(sales_data)} ventes")
+        
+        # Générer le rapport
+        logger.info(f"[REPORTING] Génération rapport ventes avec {len(sales_data)} ventes")
+        summary = ReportGenerator.generate_sales_summary(sales_data, filters)
     
-    cache_time = datetime.fromisoformat(cache_entry['cached_at'])
-    return (datetime.utcnow() - cache_time).total_seconds() < cache_ttl
+    return {
+        'report_id': f"sales_report_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+        'type': 'sales_summary',
+        'generated_at': datetime.utcnow().isoformat(),
+        'filters_applied': filters,
+        'summary': summary,
+        'data': sales_data[:detail_limit]  # Limiter les données détaillées (None : toutes)
+    }
+
+def fetch_sales_in_chunks(store_ids: Optional[List[int]], date_from: Optional[str], date_to: Optional[str],
+                          progress: Callable[[float, str], None]) -> List[Dict]:
+    """
+    Ventes d'une longue période, récupérées par tranches de REPORT_JOB_CHUNK_DAYS jours.
+    Toutes les pages sont exigées : une tranche ou une page en échec fait échouer le job
+    """
+    if not date_from or not date_to:
+        progress(0.0, 'récupération des ventes')
+        return DataAggregator.get_sales_data(store_ids, date_from, date_to,
+                                             page_size=REPORT_JOB_SALES_PAGE_SIZE, strict=True)
+    
+    chunks = []
+    chunk_start, last_day = datetime.fromisoformat(date_from), datetime.fromisoformat(date_to)
+    while chunk_start <= last_day:
+        chunk_end = min(chunk_start + timedelta(days=REPORT_JOB_CHUNK_DAYS - 1), last_day)
+        chunks.append((chunk_start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')))
+        chunk_start = chunk_end + timedelta(days=1)
+    
+    sales = []
+    for index, (chunk_from, chunk_to) in enumerate(chunks, start=1):
+        sales.extend(DataAggregator.get_sales_data(store_ids, chunk_from, chunk_to,
+                                                   page_size=REPORT_JOB_SALES_PAGE_SIZE, strict=True))
+        progress(0.9 * index / len(chunks), f"ventes {chunk_from} à {chunk_to} ({index}/{len(chunks)})")
+    return sales
+
+def run_sales_report_job(filters: Dict, progress: Callable[[float, str], None]) -> Dict:
+    """Rapport de ventes complet (toutes les ventes en détail) pour un job asynchrone"""
+    report = build_sales_report(
+        filters,
+        fetch_sales=lambda store_ids, date_from, date_to: fetch_sales_in_chunks(store_ids, date_from, date_to, progress),
+        detail_limit=None
+    )
+    progress(0.92, 'calcul du résumé')
+    REPORTS_GENERATED.labels(report_type='sales_job').inc()
+    return report
+
+REPORT_JOB_TYPES = {'sales': run_sales_report_job}
 
 @api.route('/reports/sales')
 class SalesReportResource(Resource):
@@ -367,61 +567,119 @@ class SalesReportResource(Resource):
                 
                 logger.info(f"[REPORTING] Début génération rapport ventes - Filtres: {filters}")
                 
-                # Vérifier le cache
-                if cache_key in reports_cache and is_cache_valid(reports_cache[cache_key]):
-                    logger.info(f"[REPORTING] Rapport ventes servi depuis le cache - Clé: {cache_key[:8]}...")
-                    REPORTS_GENERATED.labels(report_type='sales_cached').inc()
-                    return reports_cache[cache_key]['data'], 200
-                
-                # Extraire les filtres
-                store_ids = filters.get('store_ids')
-                date_range = filters.get('date_range', {})
-                date_from = date_range.get('start_date')
-                date_to = date_range.get('end_date')
-                
-                logger.debug(f"[REPORTING] Filtres extraits - Magasins: {store_ids}, Période: {date_from} à {date_to}")
-                
-                # Récupérer les données
-                logger.info(f"[REPORTING] Récupération données pour rapport ventes")
-                sales_data = DataAggregator.get_sales_data(store_ids, date_from, date_to)
-                
-                # Filtrer par caissier si spécifié
-                cashier_ids = filters.get('cashier_ids')
-                if cashier_ids:
-                    original_count = len(sales_data)
-                    sales_data = [sale for sale in sales_data if sale.get('cashier_id') in cashier_ids]
-                    logger.debug(f"[REPORTING] Filtre caissier appliqué - {original_count} → {len(sales_data)} ventes")
-                
-                # Générer le rapport
-                logger.info(f"[REPORTING] Génération rapport ventes avec {len(sales_data)} ventes")
-                summary = ReportGenerator.generate_sales_summary(sales_data, filters)
-                
-                report = {
-                    'report_id': f"sales_report_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                    'type': 'sales_summary',
-                    'generated_at': datetime.utcnow().isoformat(),
-                    'filters_applied': filters,
-                    'summary': summary,
-                    'data': sales_data[:100]  # Limiter les données détaillées
-                }
-                
-                # Mettre en cache
-                reports_cache[cache_key] = {
-                    'data': report,
-                    'cached_at': datetime.utcnow().isoformat()
-                }
-                
-                logger.info(f"[REPORTING] Rapport ventes généré - ID: {report['report_id']}, Ventes: {summary['total_transactions']}, Revenus: {summary['total_revenue']}$")
-                logger.debug(f"[REPORTING] Rapport mis en cache - Clé: {cache_key[:8]}...")
-                
-                REPORTS_GENERATED.labels(report_type='sales').inc()
-                
-                return report, 200
-                
+                # Vérifier le cache (une seule génération concurrente par clé)
+                with report_cache.single_flight(cache_key) as cached:
+                    if cached is not None:
+                        logger.info(f"[REPORTING] Rapport ventes servi depuis le cache - Clé: {cache_key[:8]}...")
+                        REPORTS_GENERATED.labels(report_type='sales_cached').inc()
+                        return cached, 200
+                    
+                    report = build_sales_report(filters)
+                    summary = report['summary']
+                    date_range = filters.get('date_range', {})
+                    
+                    # Mettre en cache
+                    report_cache.put(cache_key, report, period=(
+                        date_range.get('start_date'), date_range.get('end_date'), filters.get('store_ids')
+                    ))
+                    
+                    logger.info(f"[REPORTING] Rapport ventes généré - ID: {report['report_id']}, Ventes: {summary['total_transactions']}, Revenus: {summary['total_revenue']}$")
+                    logger.debug(f"[REPORTING] Rapport mis en cache - Clé: {cache_key[:8]}...")
+                    
+                    REPORTS_GENERATED.labels(report_type='sales').inc()
+                    
+                    return report, 200
+                    
             except Exception as e:
                 logger.error(f"[REPORTING] Erreur génération rapport ventes: {e}")
                 return {'error': str(e)}, 500
 
+@api.route('/reports/jobs')
+class ReportJobsResource(Resource):
+    """Endpoint pour les rapports asynchrones (longues périodes, tous magasins)"""
+    
+    @api.expect(report_job_request_model)
+    @api.doc('create_report_job', description='Lancer un rapport en arrière-plan')
+    def post(self):
+        """Lancer un rapport asynchrone ; une demande identique en cours retourne le même job"""
+        payload = request.get_json() or {}
+        report_type = payload.get('report_type', 'sales')
+        filters = payload.get('filters') or {}
+        build = REPORT_JOB_TYPES.get(report_type)
+        if build is None:
+            return {'error': f"Type de rapport inconnu: {report_type}", 'supported': list(REPORT_JOB_TYPES)}, 400
+        
+        job, created = report_jobs.submit(
+            get_cache_key(report_type, filters), report_type, filters,
+            lambda progress: build(filters, progress)
+        )
+        logger.info(f"[REPORTING] Job rapport {report_type} {'créé' if created else 'déjà en cours'} - {job['job_id']}")
+        return dict(job, deduplicated=not created, links={
+            'status': f"/api/v1/reports/jobs/{job['job_id']}",
+            'events': f"/api/v1/reports/jobs/{job['job_id']}/events",
+            'result': f"/api/v1/reports/jobs/{job['job_id']}/result"
+        }), 202
+
+@api.route('/reports/jobs/<string:job_id>')
+class ReportJobResource(Resource):
+    """Endpoint pour l'état d'un rapport asynchrone"""
+    
+    @api.doc('get_report_job', description='État et progression d\'un rapport asynchrone')
+    def get(self, job_id):
+        job = report_jobs.get(job_id)
+        if job is None:
+            return {'error': 'Job introuvable'}, 404
+        return job, 200
+
+@api.route('/reports/jobs/<string:job_id>/events')
+class ReportJobEventsResource(Resource):
+    """Progression d'un rapport asynchrone en Server-Sent Events"""
+    
+    @api.doc('stream_report_job', description='Suivre la progression (text/event-stream)')
+    def get(self, job_id):
+        if report_jobs.get(job_id) is None:
+            return {'error': 'Job introuvable'}, 404
+        
+        def events():
+            for job in report_jobs.watch(job_id):
+                if job is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+        
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/reports/jobs/<string:job_id>/result')
+class ReportJobResultResource(Resource):
+    """Téléchargement du résultat d'un rapport asynchrone"""
+    
+    @api.doc('download_report_job', description='Télécharger le rapport (JSON, compressé gzip si accepté)')
+    def get(self, job_id):
+        job = report_jobs.get(job_id)
+        if job is None:
+            return {'error': 'Job introuvable'}, 404
+        path = report_jobs.result_path(job_id)
+        if path is None:
+            return {'error': f"Rapport non disponible (statut: {job['status']})", 'job': job}, 409
+        
+        filename = f"{job['report_type']}_report_{job_id}.json"
+        if 'gzip' in request.accept_encodings:
+            response = send_file(path, mimetype='application/json', as_attachment=True, download_name=filename)
+            response.headers['Content-Encoding'] = 'gzip'
+            return response
+        
+        def decompressed():
+            with gzip.open(path, 'rb') as result_file:
+                while True:
+                    chunk = result_file.read(64 * 1024)
+                    if not chunk:
+                        return
+                    yield chunk
+        
+        return Response(decompressed(), mimetype='application/json',
+                        headers={'Content-Disposition': f"attachment; filename={filename}"})
+
 @api.route('/reports/inventory')
 class InventoryReportResource(Resource):
     """Endpoint pour les rapports d'inventaire"""
@@ -436,46 +694,44 @@ class InventoryReportResource(Resource):
                 
                 logger.info(f"[REPORTING] Début génération rapport inventaire - Filtres: {filters}")
                 
-                # Vérifier le cache
-                if cache_key in reports_cache and is_cache_valid(reports_cache[cache_key]):
-                    logger.info(f"[REPORTING] Rapport inventaire servi depuis le cache - Clé: {cache_key[:8]}...")
-                    REPORTS_GENERATED.labels(report_type='inventory_cached').inc()
-                    return reports_cache[cache_key]['data'], 200
-                
-                store_ids = filters.get('store_ids')
-                
-                logger.debug(f"[REPORTING] Filtres extraits - Magasins: {store_ids}")
-                
-                # Récupérer les données
-                logger.info(f"[REPORTING] Récupération données pour rapport inventaire")
-                inventory_data = DataAggregator.get_inventory_data(store_ids)
-                
-                # Générer le rapport
-                logger.info(f"[REPORTING] Génération rapport inventaire avec {len(inventory_data)} items")
-                inventory_report = ReportGenerator.generate_inventory_report(inventory_data)
-                
-                report = {
-                    'report_id': f"inventory_report_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                    'type': 'inventory_summary',
-                    'generated_at': datetime.utcnow().isoformat(),
-                    'filters_applied': filters,
-                    'summary': inventory_report,
-                    'data': inventory_data
-                }
-                
-                # Mettre en cache
-                reports_cache[cache_key] = {
-                    'data': report,
-                    'cached_at': datetime.utcnow().isoformat()
-                }
-                
-                logger.info(f"[REPORTING] Rapport inventaire généré - ID: {report['report_id']}, Produits: {inventory_report['total_products']}, Alertes: {inventory_report['low_stock_count']}")
-                logger.debug(f"[REPORTING] Rapport mis en cache - Clé: {cache_key[:8]}...")
-                
-                REPORTS_GENERATED.labels(report_type='inventory').inc()
-                
-                return report, 200
-                
+                # Vérifier le cache (une seule génération concurrente par clé)
+                with report_cache.single_flight(cache_key) as cached:
+                    if cached is not None:
+                        logger.info(f"[REPORTING] Rapport inventaire servi depuis le cache - Clé: {cache_key[:8]}...")
+                        REPORTS_GENERATED.labels(report_type='inventory_cached').inc()
+                        return cached, 200
+                    
+                    store_ids = filters.get('store_ids')
+                    
+                    logger.debug(f"[REPORTING] Filtres extraits - Magasins: {store_ids}")
+                    
+                    # Récupérer les données
+                    logger.info(f"[REPORTING] Récupération données pour rapport inventaire")
+                    inventory_data = DataAggregator.get_inventory_data(store_ids)
+                    
+                    # Générer le rapport
+                    logger.info(f"[REPORTING] Génération rapport inventaire avec {len(inventory_data)} items")
+                    inventory_report = ReportGenerator.generate_inventory_report(inventory_data)
+                    
+                    report = {
+                        'report_id': f"inventory_report_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+                        'type': 'inventory_summary',
+                        'generated_at': datetime.utcnow().isoformat(),
+                        'filters_applied': filters,
+                        'summary': inventory_report,
+                        'data': inventory_data
+                    }
+                    
+                    # Mettre en cache
+                    report_cache.put(cache_key, report)
+                    
+                    logger.info(f"[REPORTING] Rapport inventaire généré - ID: {report['report_id']}, Produits: {inventory_report['total_products']}, Alertes: {inventory_report['low_stock_count']}")
+                    logger.debug(f"[REPORTING] Rapport mis en cache - Clé: {cache_key[:8]}...")
+                    
+                    REPORTS_GENERATED.labels(report_type='inventory').inc()
+                    
+                    return report, 200
+                    
             except Exception as e:
                 logger.error(f"[REPORTING] Erreur génération rapport inventaire: {e}")
                 return {'error': str(e)}, 500
@@ -493,56 +749,63 @@ class ProductPerformanceResource(Resource):
                 filters = request.get_json() or {}
                 cache_key = get_cache_key('product_performance', filters)
                 
-                # Vérifier le cache
-                if cache_key in reports_cache and is_cache_valid(reports_cache[cache_key]):
-                    REPORTS_GENERATED.labels(report_type='product_performance_cached').inc()
-                    return reports_cache[cache_key]['data'], 200
-                
-                # Extraire les filtres
-                store_ids = filters.get('store_ids')
-                product_ids = filters.get('product_ids')
-                date_range = filters.get('date_range', {})
-                date_from = date_range.get('start_date')
-                date_to = date_range.get('end_date')
-                
-                # Récupérer les données
-                sales_data = DataAggregator.get_sales_data(store_ids, date_from, date_to)
-                products_data = DataAggregator.get_products_data()
-                
-                # Filtrer par produits si spécifié
-                if product_ids:
-                    filtered_sales = []
-                    for sale in sales_data:
-                        filtered_items = [item for item in sale.get('items', []) 
-                                        if item['product_id'] in product_ids]
-                        if filtered_items:
-                            sale_copy = sale.copy()
-                            sale_copy['items'] = filtered_items
-                            filtered_sales.append(sale_copy)
-                    sales_data = filtered_sales
-                
-                # Générer le rapport
-                performance_report = ReportGenerator.generate_product_performance(sales_data, products_data)
-                
-                report = {
-                    'report_id': f"product_performance_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                    'type': 'product_performance',
-                    'generated_at': datetime.utcnow().isoformat(),
-                    'filters_applied': filters,
-                    'summary': performance_report,
-                    'data': performance_report['all_products'][:50]  # Limiter à 50 produits
-                }
-                
-                # Mettre en cache
-                reports_cache[cache_key] = {
-                    'data': report,
-                    'cached_at': datetime.utcnow().isoformat()
-                }
-                
-                REPORTS_GENERATED.labels(report_type='product_performance').inc()
-                
-                return report, 200
-                
+                # Vérifier le cache (une seule génération concurrente par clé)
+                with report_cache.single_flight(cache_key) as cached:
+                    if cached is not None:
+                        REPORTS_GENERATED.labels(report_type='product_performance_cached').inc()
+                        return cached, 200
+                    
+                    # Extraire les filtres
+                    store_ids = filters.get('store_ids')
+                    product_ids = filters.get('product_ids')
+                    date_range = filters.get('date_range', {})
+                    date_from = date_range.get('start_date')
+                    date_to = date_range.get('end_date')
+                    
+                    if sales_aggregates.covers(date_from, date_to):
+                        # Ventes par produit fusionnées depuis les agrégats incrémentaux
+                        product_sales = sales_aggregates.product_sales(store_ids, date_from, date_to, product_ids)
+                        products_data = DataAggregator.get_products_data(list(product_sales))
+                        performance_report = ReportGenerator.summarize_product_performance(product_sales, products_data)
+                    else:
+                        # Récupérer les données
+                        sales_data = DataAggregator.get_sales_data(store_ids, date_from, date_to)
+                        
+                        # Filtrer par produits si spécifié
+                        if product_ids:
+                            filtered_sales = []
+                            for sale in sales_data:
+                                filtered_items = [item for item in sale.get('items', []) 
+                                                if item['product_id'] in product_ids]
+                                if filtered_items:
+                                    sale_copy = sale.copy()
+                                    sale_copy['items'] = filtered_items
+                                    filtered_sales.append(sale_copy)
+                            sales_data = filtered_sales
+                        
+                        # Résoudre uniquement les produits vendus, en lots
+                        sold_product_ids = [item['product_id'] for sale in sales_data for item in sale.get('items', [])]
+                        products_data = DataAggregator.get_products_data(sold_product_ids)
+                        
+                        # Générer le rapport
+                        performance_report = ReportGenerator.generate_product_performance(sales_data, products_data)
+                    
+                    report = {
+                        'report_id': f"product_performance_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+                        'type': 'product_performance',
+                        'generated_at': datetime.utcnow().isoformat(),
+                        'filters_applied': filters,
+                        'summary': performance_report,
+                        'data': performance_report['all_products'][:50]  # Limiter à 50 produits
+                    }
+                    
+                    # Mettre en cache
+                    report_cache.put(cache_key, report, period=(date_from, date_to, store_ids))
+                    
+                    REPORTS_GENERATED.labels(report_type='product_performance').inc()
+                    
+                    return report, 200
+                    
             except Exception as e:
                 logger.error(f"Erreur lors de la génération du rapport de performance: {e}")
                 return {'error': str(e)}, 500
@@ -560,72 +823,87 @@ class DashboardOverviewResource(Resource):
                 
                 logger.info(f"[REPORTING] Début génération dashboard overview")
                 
-                # Vérifier le cache
-                if cache_key in dashboard_cache and is_cache_valid(dashboard_cache[cache_key]):
-                    logger.info(f"[REPORTING] Dashboard servi depuis le cache")
-                    DASHBOARD_REQUESTS.labels(dashboard_type='overview_cached').inc()
-                    return dashboard_cache[cache_key]['data'], 200
-                
-                # Récupérer les données des dernières 24h
-                yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
-                today = datetime.utcnow().strftime('%Y-%m-%d')
-                
-                logger.info(f"[REPORTING] Récupération données dashboard - Période: {yesterday} à {today}")
-                
-                sales_data = DataAggregator.get_sales_data(date_from=yesterday, date_to=today)
-                inventory_data = DataAggregator.get_inventory_data()
-                
-                # Calculs du dashboard
-                total_revenue_today = sum(sale.get('final_amount', 0) for sale in sales_data)
-                total_transactions_today = len(sales_data)
-                
-                # Ventes par magasin
-                sales_by_store = defaultdict(lambda: {'revenue': 0.0, 'transactions': 0})
-                for sale in sales_data:
-                    store_id = sale.get('store_id')
-                    sales_by_store[store_id]['revenue'] += sale.get('final_amount', 0)
-                    sales_by_store[store_id]['transactions'] += 1
-                
-                # Alertes de stock
-                low_stock_count = len([item for item in inventory_data 
-                                     if item.get('available_quantity', 0) <= item.get('reorder_point', 5)])
-                
-                # Top 5 produits vendus aujourd'hui
-                product_sales = defaultdict(int)
-                for sale in sales_data:
-                    for item in sale.get('items', []):
-                        product_sales[item['product_id']] += item['quantity']
-                
-                top_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:5]
-                
-                dashboard = {
-                    'generated_at': datetime.utcnow().isoformat(),
-                    'period': f"{yesterday} to {today}",
-                    'summary': {
-                        'total_revenue_today': round(total_revenue_today, 2),
-                        'total_transactions_today': total_transactions_today,
-                        'average_transaction_value': round(total_revenue_today / total_transactions_today, 2) if total_transactions_today > 0 else 0,
-                        'low_stock_alerts': low_stock_count
-                    },
-                    'sales_by_store': dict(sales_by_store),
-                    'top_products_today': [{'product_id': pid, 'quantity_sold': qty} for pid, qty in top_products],
-                    'total_stores': len(sales_by_store),
-                    'total_products_in_system': len(set(item['product_id'] for item in inventory_data))
-                }
-                
-                # Mettre en cache
-                dashboard_cache[cache_key] = {
-                    'data': dashboard,
-                    'cached_at': datetime.utcnow().isoformat()
-                }
-                
-                logger.info(f"[REPORTING] Dashboard généré - Transactions: {total_transactions_today}, Revenus: {total_revenue_today}$, Magasins actifs: {len(sales_by_store)}")
-                logger.debug(f"[REPORTING] Dashboard mis en cache")
-                
-                DASHBOARD_REQUESTS.labels(dashboard_type='overview').inc()
-                
-                return dashboard, 200
-                
+                # Vérifier le cache (une seule génération concurrente par clé)
+                with report_cache.single_flight(cache_key) as cached:
+                    if cached is not None:
+                        logger.info(f"[REPORTING] Dashboard servi depuis le cache")
+                        DASHBOARD_REQUESTS.labels(dashboard_type='overview_cached').inc()
+                        return cached, 200
+                    
+                    # Récupérer les données des dernières 24h
+                    yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+                    today = datetime.utcnow().strftime('%Y-%m-%d')
+                    
+                    logger.info(f"[REPORTING] Récupération données dashboard - Période: {yesterday} à {today}")
+                    
+                    if sales_aggregates.covers(yesterday, today) and sales_aggregates.inventory_refreshed_at:
+                        # Lecture des agrégats incrémentaux, sans appel aux autres services
+                        period_summary = sales_aggregates.sales_summary(date_from=yesterday, date_to=today)
+                        total_revenue_today = period_summary['total_revenue']
+                        total_transactions_today = period_summary['total_transactions']
+                        sales_by_store = {
+                            store_id: {'revenue': totals['revenue'], 'transactions': totals['transactions']}
+                            for store_id, totals in period_summary['by_store'].items()
+                        }
+                        low_stock_count = sales_aggregates.low_stock_count
+                        top_products = [(entry['product_id'], entry['quantity_sold'])
+                                        for entry in sales_aggregates.top_products(yesterday, today, 5)]
+                        products_in_system = sales_aggregates.products_in_system
+                    else:
+                        sales_data, inventory_data = DataAggregator.in_parallel(
+                            lambda: DataAggregator.get_sales_data(date_from=yesterday, date_to=today),
+                            DataAggregator.get_inventory_data
+                        )
+                        
+                        # Calculs du dashboard
+                        total_revenue_today = sum(sale.get('final_amount', 0) for sale in sales_data)
+                        total_transactions_today = len(sales_data)
+                        
+                        # Ventes par magasin
+                        sales_by_store = defaultdict(lambda: {'revenue': 0.0, 'transactions': 0})
+                        for sale in sales_data:
+                            store_id = sale.get('store_id')
+                            sales_by_store[store_id]['revenue'] += sale.get('final_amount', 0)
+                            sales_by_store[store_id]['transactions'] += 1
+                        
+                        # Alertes de stock
+                        low_stock_count = len([item for item in inventory_data 
+                                             if item.get('available_quantity', 0) <= item.get('reorder_point', 5)])
+                        
+                        # Top 5 produits vendus aujourd'hui
+                        product_sales = defaultdict(int)
+                        for sale in sales_data:
+                            for item in sale.get('items', []):
+                                product_sales[item['product_id']] += item['quantity']
+                        
+                        top_products = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:5]
+                        products_in_system = len(set(item['product_id'] for item in inventory_data))
+                    
+                    dashboard = {
+                        'generated_at': datetime.utcnow().isoformat(),
+                        'period': f"{yesterday} to {today}",
+                        'summary': {
+                            'total_revenue_today': round(total_revenue_today, 2),
+                            'total_transactions_today': total_transactions_today,
+                            'average_transaction_value': round(total_revenue_today / total_transactions_today, 2) if total_transactions_today > 0 else 0,
+                            'low_stock_alerts': low_stock_count
+                        },
+                        'sales_by_store': dict(sales_by_store),
+                        'top_products_today': [{'product_id': pid, 'quantity_sold': qty} for pid, qty in top_products],
+                        'total_stores': len(sales_by_store),
+                        'total_products_in_system': products_in_system
+                    }
+                    
+                    # Mettre en cache
+                    report_cache.put(cache_key, dashboard, period=(yesterday, today, None))
+                    
+                    logger.info(f"[REPORTING] Dashboard généré - Transactions: {total_transactions_today}, Revenus: {total_revenue_today}$, Magasins actifs: {len(sales_by_store)}")
+                    logger.debug(f"[REPORTING] Dashboard mis en cache")
+                    
+                    DASHBOARD_REQUESTS.labels(dashboard_type='overview').inc()
+                    
+                    return dashboard, 200
+                    
             except Exception as e:
                 logger.error(f"[REPORTING] Erreur génération dashboard: {e}")
                 return {'error': str(e)}, 500
@@ -675,10 +953,9 @@ def health():
         'status': 'healthy',
         'service': 'reporting-service',
         'timestamp': datetime.utcnow().isoformat(),
-        'cache_stats': {
-            'reports_cached': len(reports_cache),
-            'dashboard_cached': len(dashboard_cache)
-        },
+        'cache_stats': report_cache.stats(),
+        'report_jobs': report_jobs.stats(),
+        'sales_aggregates': sales_event_consumer.stats() if sales_event_consumer else None,
         'dependencies': {
             'sales-service': 'available',
             'inventory-service': 'available',
@@ -694,9 +971,7 @@ def metrics():
 @app.route('/cache/clear')
 def clear_cache():
     """Vider le cache des rapports"""
-    global reports_cache, dashboard_cache
-    reports_cache.clear()
-    dashboard_cache.clear()
+    report_cache.clear()
     return {'message': 'Cache cleared successfully'}, 200
 
 if __name__ == '__main__':
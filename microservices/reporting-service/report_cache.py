@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Cache des rapports pour Reporting Service
+LRU borné avec TTL, local au processus ou partagé entre réplicas dans Redis ;
+une seule génération par clé à la fois, invalidation par les ventes du flux events:sales
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (date de début, date de fin, magasins) couverts par un rapport de ventes ;
+# None ou liste vide = sans borne. Les rapports sans période ne sont jamais invalidés par une vente
+Period = Tuple[Optional[str], Optional[str], Optional[List[int]]]
+
+# Écriture + mise à jour de l'ordre LRU + éviction des plus anciennes entrées, atomiques
+_PUT_SCRIPT = """
+redis.call('SET', KEYS[1] .. ARGV[1], ARGV[2], 'PX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[5])
+else
+    redis.call('HDEL', KEYS[3], ARGV[1])
+end
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[6])
+if excess <= 0 then
+    return 0
+end
+local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+for _, key in ipairs(evicted) do
+    redis.call('DEL', KEYS[1] .. key)
+    redis.call('HDEL', KEYS[3], key)
+end
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+return #evicted
+"""
+
+# Retrait des rapports dont la période contient la vente (ARGV[1] = jour, ARGV[2] = magasin ;
+# jour vide = tous les rapports de ventes)
+_INVALIDATE_SCRIPT = """
+local periods = redis.call('HGETALL', KEYS[3])
+local removed = 0
+for i = 1, #periods, 2 do
+    local key, period = periods[i], cjson.decode(periods[i + 1])
+    local match = ARGV[1] == '' or (
+        (not period['from'] or period['from'] <= ARGV[1])
+        and (not period['to'] or period['to'] >= ARGV[1]))
+    if match and ARGV[1] ~= '' and period['stores'] then
+        match = false
+        for _, store_id in ipairs(period['stores']) do
+            if tostring(store_id) == ARGV[2] then
+                match = true
+            end
+        end
+    end
+    if match then
+        redis.call('DEL', KEYS[1] .. key)
+        redis.call('HDEL', KEYS[3], key)
+        redis.call('ZREM', KEYS[2], key)
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _in_period(period: Period, day: Optional[str], store_id: Optional[int]) -> bool:
+    if day is None:
+        return True
+    date_from, date_to, store_ids = period
+    return ((not date_from or date_from <= day) and (not date_to or day <= date_to)
+            and (not store_ids or store_id in store_ids))
+
+
+class ReportCache:
+    """
+    Rapports générés, indexés par clé de filtres. Sans Redis : OrderedDict borné à
+    max_entries (LRU) avec expiration TTL. Avec Redis : entrées à expiration (PX),
+    ordre LRU dans un ZSET et périodes dans un HASH, communs à tous les réplicas.
+    single_flight() fait attendre les requêtes concurrentes sur la génération en cours
+    (verrou par clé dans le processus, SET NX entre réplicas)
+    """
+
+    def __init__(self, redis_client=None, ttl: float = 300.0, max_entries: int = 256,
+                 namespace: str = 'reporting:cache', lock_timeout: float = 30.0, poll_interval: float = 0.05):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._entry_prefix = f"{namespace}:entry:"
+        self._lock_prefix = f"{namespace}:lock:"
+        self._lru_key = f"{namespace}:lru"
+        self._periods_key = f"{namespace}:periods"
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights: Dict[str, list] = {}  # clé -> [verrou, nombre d'utilisateurs]
+        # Séquence des invalidations : un rapport dont la génération a commencé avant
+        # une vente de sa période n'est pas mis en cache
+        self._sequence = 0
+        self._recent_sales: deque = deque(maxlen=1024)  # (séquence, jour, magasin)
+        self._generating: Dict[str, int] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'coalesced': 0, 'errors': 0}
+        if redis_client is not None:
+            self._put_script = redis_client.register_script(_PUT_SCRIPT)
+            self._invalidate_script = redis_client.register_script(_INVALIDATE_SCRIPT)
+            self._release_script = redis_client.register_script(_RELEASE_SCRIPT)
+
+    def __len__(self) -> int:
+        if self.redis is not None:
+            try:
+                return self.redis.zcard(self._lru_key)
+            except Exception:
+                return 0
+        return len(self._entries)
+
+    # Lecture / écriture
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._redis_get(key) if self.redis is not None else self._local_get(key)
+        with self._lock:
+            self._stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any], period: Optional[Period] = None) -> None:
+        if period is not None and self._outdated(key, period):
+            logger.debug(f"[REPORTING] Rapport non mis en cache (vente reçue pendant la génération) - Clé: {key[:8]}...")
+            return
+        if self.redis is not None:
+            self._redis_put(key, value, period)
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, period)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _outdated(self, key: str, period: Period) -> bool:
+        with self._lock:
+            started_at = self._generating.get(key)
+            if started_at is None or started_at == self._sequence:
+                return False
+            if not self._recent_sales or self._recent_sales[0][0] > started_at + 1:
+                return True  # historique dépassé : par prudence
+            return any(sequence > started_at and _in_period(period, day, store_id)
+                       for sequence, day, store_id in self._recent_sales)
+
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.get(self._entry_prefix + key)
+            pipeline.zadd(self._lru_key, {key: time.time()}, xx=True)
+            raw = pipeline.execute()[0]
+        except Exception as e:
+            self._redis_error('lecture', e)
+            return None
+        return json.loads(raw) if raw else None
+
+    def _redis_put(self, key: str, value: Dict[str, Any], period: Optional[Period]) -> None:
+        encoded_period = ''
+        if period is not None:
+            bounds = {'from': period[0], 'to': period[1], 'stores': period[2]}
+            encoded_period = json.dumps({name: bound for name, bound in bounds.items() if bound})
+        try:
+            evicted = self._put_script(
+                keys=[self._entry_prefix, self._lru_key, self._periods_key],
+                args=[key, json.dumps(value, default=str), int(self.ttl * 1000), time.time(),
+                      encoded_period, self.max_entries]
+            )
+        except Exception as e:
+            self._redis_error('écriture', e)
+            return
+        with self._lock:
+            self._stats['evictions'] += int(evicted or 0)
+
+    # Génération unique
+
+    @contextmanager
+    def single_flight(self, key: str) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Donne le rapport en cache, ou None si l'appelant doit le générer (puis put()).
+        Pendant la génération, les autres appelants de la même clé attendent son résultat
+        """
+        with self._lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            waited = flight[0].locked()
+            with flight[0]:
+                cached = self.get(key)
+                token = None
+                if cached is None and self.redis is not None:
+                    token = self._acquire_shared(key)
+                    if token is None:
+                        waited = True
+                        cached = self.get(key)
+                if cached is not None:
+                    if waited:
+                        with self._lock:
+                            self._stats['coalesced'] += 1
+                    yield cached
+                    return
+                with self._lock:
+                    self._generating[key] = self._sequence
+                try:
+                    yield None
+                finally:
+                    if token is not None:
+                        self._release_shared(key, token)
+        finally:
+            with self._lock:
+                self._generating.pop(key, None)
+                flight[1] -= 1
+                if flight[1] == 0:
+                    del self._flights[key]
+
+    def _acquire_shared(self, key: str) -> Optional[str]:
+        """Verrou de génération entre réplicas ; None si un autre réplica a produit le rapport pendant l'attente"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                acquired = self.redis.set(self._lock_prefix + key, token, nx=True, px=int(self.lock_timeout * 1000))
+                if self.redis.exists(self._entry_prefix + key):
+                    if acquired:
+                        self._release_shared(key, token)
+                    return None
+                if acquired:
+                    return token
+            except Exception as e:
+                self._redis_error('verrou', e)
+                return token  # Redis indisponible : générer localement
+            if time.monotonic() >= deadline:
+                return token
+            time.sleep(self.poll_interval)
+
+    def _release_shared(self, key: str, token: str) -> None:
+        try:
+            self._release_script(keys=[self._lock_prefix + key], args=[token])
+        except Exception as e:
+            self._redis_error('verrou', e)
+
+    # Invalidation
+
+    def invalidate_sale(self, day: Optional[str] = None, store_id: Optional[int] = None) -> int:
+        """Retirer les rapports dont la période contient une nouvelle vente (day None : tous les rapports de ventes)"""
+        with self._lock:
+            self._sequence += 1
+            self._recent_sales.append((self._sequence, day, store_id))
+        if self.redis is not None:
+            try:
+                removed = int(self._invalidate_script(
+                    keys=[self._entry_prefix, self._lru_key, self._periods_key],
+                    args=[day or '', '' if store_id is None else str(store_id)]
+                ))
+            except Exception as e:
+                self._redis_error('invalidation', e)
+                return 0
+        else:
+            with self._lock:
+                stale = [key for key, (_, _, period) in self._entries.items()
+                         if period is not None and _in_period(period, day, store_id)]
+                for key in stale:
+                    del self._entries[key]
+            removed = len(stale)
+        with self._lock:
+            self._stats['invalidations'] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.redis is not None:
+            try:
+                keys = self.redis.zrange(self._lru_key, 0, -1)
+                pipeline = self.redis.pipeline()
+                for key in keys:
+                    pipeline.delete(self._entry_prefix + (key.decode() if isinstance(key, bytes) else key))
+                pipeline.delete(self._lru_key, self._periods_key)
+                pipeline.execute()
+            except Exception as e:
+                self._redis_error('vidage', e)
+
+    def stats(self) -> Dict[str, Any]:
+        size = len(self)
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats, size=size, max_entries=self.max_entries,
+                        backend='redis' if self.redis is not None else 'local',
+                        hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0.0)
+
+    def _redis_error(self, operation: str, error: Exception) -> None:
+        with self._lock:
+            self._stats['errors'] += 1
+        logger.warning(f"[REPORTING] Cache Redis indisponible ({operation}): {error}")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Calcul colonnaire des rapports pour Reporting Service
+Les ventes et leurs lignes sont chargées une seule fois dans des tableaux NumPy ;
+chaque regroupement (magasin, caissier, moyen de paiement, jour, heure, produit)
+est ensuite un np.bincount sur des codes entiers
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # sans NumPy, ReportGenerator garde le calcul par boucles
+    np = None
+
+# En dessous de ce nombre de lignes, la conversion en tableaux coûte plus qu'elle ne rapporte
+REPORT_COLUMNAR_MIN_ROWS = int(os.getenv('REPORT_COLUMNAR_MIN_ROWS', '5000'))
+
+
+def columnar_enabled(rows: int) -> bool:
+    return np is not None and rows >= REPORT_COLUMNAR_MIN_ROWS
+
+
+def _factorize(values: List[Any]):
+    """Codes entiers attribués dans l'ordre de première apparition, et les valeurs distinctes"""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    return list(index), codes
+
+
+def _sums(codes, size: int, weights=None):
+    return np.bincount(codes, weights=weights, minlength=size)
+
+
+class SalesColumns:
+    """
+    Ventes en colonnes : une ligne par vente (codes de regroupement, montant,
+    nombre d'articles) et une ligne par article (produit, quantité, revenu)
+    """
+
+    def __init__(self, sales: List[Dict[str, Any]]):
+        # Une compréhension par colonne : les dictionnaires ne sont lus qu'une fois par champ
+        timestamps = [sale['timestamp'] for sale in sales]
+        columns = {
+            'store': [sale.get('store_id') for sale in sales],
+            'cashier': [sale.get('cashier_id') for sale in sales],
+            'payment_method': [sale.get('payment_method', 'unknown') for sale in sales],
+            'day': [timestamp[:10] for timestamp in timestamps],
+            'hour': [int(timestamp[11:13]) if len(timestamp) > 12 else 0 for timestamp in timestamps],
+        }
+        items = [sale.get('items', []) for sale in sales]
+        lines = [item for sale_items in items for item in sale_items]
+
+        self.size = len(sales)
+        self.labels: Dict[str, List[Any]] = {}
+        self.codes = {}
+        for name, values in columns.items():
+            self.labels[name], self.codes[name] = _factorize(values)
+        self.amount = np.array([sale.get('final_amount', 0) for sale in sales], dtype=np.float64)
+        self.item_count = np.array([len(sale_items) for sale_items in items], dtype=np.int64)
+
+        self.product_labels, self.line_product = _factorize([item['product_id'] for item in lines])
+        self.line_quantity = np.array([item['quantity'] for item in lines], dtype=np.int64)
+        self.line_revenue = self.line_quantity * np.array([item['unit_price'] for item in lines], dtype=np.float64)
+
+    def group_by(self, key: str) -> Dict[Any, Dict[str, Any]]:
+        """Transactions, revenu et articles par valeur de key (magasin, caissier, moyen de paiement, jour, heure)"""
+        labels = self.labels[key]
+        codes = self.codes[key]
+        transactions = _sums(codes, len(labels)).tolist()
+        revenue = _sums(codes, len(labels), self.amount).tolist()
+        items = _sums(codes, len(labels), self.item_count).astype(np.int64).tolist()
+        return {
+            label: {'transactions': transactions[code], 'revenue': revenue[code], 'items': items[code]}
+            for code, label in enumerate(labels)
+        }
+
+    def product_sales(self, product_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Quantité, revenu et lignes par produit, éventuellement limités à product_ids"""
+        size = len(self.product_labels)
+        quantity = _sums(self.line_product, size, self.line_quantity).astype(np.int64).tolist()
+        revenue = _sums(self.line_product, size, self.line_revenue).tolist()
+        transactions = _sums(self.line_product, size).tolist()
+        wanted = set(product_ids) if product_ids else None
+        return {
+            product_id: {'quantity': quantity[code], 'revenue': revenue[code], 'transactions': transactions[code]}
+            for code, product_id in enumerate(self.product_labels)
+            if wanted is None or product_id in wanted
+        }
+
+    def sales_summary(self) -> Dict[str, Any]:
+        """Même structure que ReportGenerator.generate_sales_summary"""
+        total_revenue = float(self.amount.sum())
+        by_store = self.group_by('store')
+        by_payment_method = self.group_by('payment_method')
+        by_day = self.group_by('day')
+        for totals in list(by_payment_method.values()) + list(by_day.values()):
+            del totals['items']
+        return {
+            'total_transactions': self.size,
+            'total_revenue': round(total_revenue, 2),
+            'total_items_sold': int(self.item_count.sum()),
+            'average_transaction_value': round(total_revenue / self.size, 2) if self.size else 0.0,
+            'by_store': by_store,
+            'by_payment_method': by_payment_method,
+            'by_day': dict(sorted(by_day.items()))
+        }
+
+
+def inventory_report(inventory_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Même structure que ReportGenerator.generate_inventory_report, calculée par colonnes"""
+    location_ids, location_codes = _factorize([item.get('location_id') for item in inventory_data])
+    product_ids, _ = _factorize([item['product_id'] for item in inventory_data])
+    available = np.array([item.get('available_quantity', 0) for item in inventory_data], dtype=np.int64)
+    reserved = np.array([item.get('reserved_quantity', 0) for item in inventory_data], dtype=np.int64)
+    reorder_point = np.array([item.get('reorder_point', 5) for item in inventory_data], dtype=np.int64)
+    unit_cost = np.array([item.get('unit_cost', 0) for item in inventory_data], dtype=np.float64)
+
+    total_quantity = available + reserved
+    size = len(location_ids)
+    counts = _sums(location_codes, size).tolist()
+    quantities = _sums(location_codes, size, total_quantity).astype(np.int64).tolist()
+    values = _sums(location_codes, size, total_quantity * unit_cost)
+
+    low_stock_alerts = [
+        {
+            'product_id': inventory_data[index]['product_id'],
+            'location_id': inventory_data[index].get('location_id'),
+            'available_quantity': int(available[index]),
+            'reorder_point': int(reorder_point[index])
+        }
+        for index in np.flatnonzero(available <= reorder_point).tolist()
+    ]
+    return {
+        'total_products': len(product_ids),
+        'total_stock_value': round(float(values.sum()), 2),
+        'low_stock_alerts': low_stock_alerts,
+        'low_stock_count': len(low_stock_alerts),
+        'by_location': {
+            location_id: {'products': counts[code], 'total_quantity': quantities[code], 'stock_value': float(values[code])}
+            for code, location_id in enumerate(location_ids)
+        }
+    }
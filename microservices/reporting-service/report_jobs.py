@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Rapports asynchrones pour Reporting Service
+Une demande devient un job exécuté par un pool de workers ; la progression est suivie
+en direct et le résultat est conservé en JSON compressé (gzip) pour téléchargement
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Progress = Callable[[float, str], None]
+ReportBuilder = Callable[[Progress], Dict[str, Any]]
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+FINISHED = (COMPLETED, FAILED)
+
+
+class ReportJobs:
+    """
+    Jobs de rapport en mémoire, résultats sur disque (directory/<job_id>.json.gz).
+    Une demande identique (même clé) à un job en attente ou en cours retourne ce job.
+    Les jobs terminés et leurs fichiers sont retirés après retention secondes
+    """
+
+    def __init__(self, directory: str, workers: int = 2, retention: float = 3600.0):
+        self.directory = directory
+        self.retention = retention
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-jobs')
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Dict[str, str] = {}  # clé de la demande -> job_id
+        self._condition = threading.Condition()
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, key: str, report_type: str, filters: Dict[str, Any],
+               build: ReportBuilder) -> Tuple[Dict[str, Any], bool]:
+        """Créer un job (ou retrouver le job identique en cours) ; retourne (job, créé)"""
+        self._purge()
+        with self._condition:
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                self._stats['deduplicated'] += 1
+                return dict(self._jobs[job_id]), False
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'report_type': report_type,
+                'filters': filters,
+                'status': QUEUED,
+                'progress': 0.0,
+                'stage': 'en attente',
+                'created_at': datetime.utcnow().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'result_bytes': None,
+                'version': 0
+            }
+            self._in_flight[key] = job_id
+            self._stats['submitted'] += 1
+            job = dict(self._jobs[job_id])
+        self._executor.submit(self._run, job_id, key, build)
+        logger.info(f"[REPORTING] Job rapport {report_type} créé - {job_id}")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def watch(self, job_id: str, keepalive: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        États successifs d'un job jusqu'à sa fin (None après keepalive secondes sans changement).
+        Les états intermédiaires manqués par un lecteur lent sont fusionnés dans le suivant
+        """
+        seen = -1
+        while True:
+            with self._condition:
+                job = self._jobs.get(job_id)
+                if job is not None and job['version'] == seen:
+                    self._condition.wait(keepalive)
+                    job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if job['version'] == seen:
+                    snapshot = None
+                else:
+                    seen = job['version']
+                    snapshot = dict(job)
+            yield snapshot
+            if snapshot is not None and snapshot['status'] in FINISHED:
+                return
+
+    def result_path(self, job_id: str) -> Optional[str]:
+        """Fichier gzip du résultat d'un job terminé"""
+        job = self.get(job_id)
+        if job is None or job['status'] != COMPLETED:
+            return None
+        return self._path(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            statuses = [job['status'] for job in self._jobs.values()]
+            return dict(self._stats, queued=statuses.count(QUEUED), running=statuses.count(RUNNING),
+                        retained=len(statuses))
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json.gz")
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._condition:
+            job = self._jobs[job_id]
+            job.update(changes)
+            job['version'] += 1
+            self._condition.notify_all()
+
+    def _run(self, job_id: str, key: str, build: ReportBuilder) -> None:
+        self._update(job_id, status=RUNNING, started_at=datetime.utcnow().isoformat(), stage='démarrage')
+        started = time.monotonic()
+
+        def progress(fraction: float, stage: str) -> None:
+            self._update(job_id, progress=round(min(max(fraction, 0.0), 1.0), 4), stage=stage)
+
+        try:
+            report = build(progress)
+            progress(0.95, 'écriture du résultat')
+            temporary_path = self._path(job_id) + '.tmp'
+            with gzip.open(temporary_path, 'wt', encoding='utf-8', compresslevel=6) as result_file:
+                json.dump(report, result_file, default=str)
+            os.replace(temporary_path, self._path(job_id))
+            result_bytes = os.path.getsize(self._path(job_id))
+        except Exception as e:
+            logger.error(f"[REPORTING] Job rapport en échec - {job_id}: {e}")
+            with self._condition:
+                self._in_flight.pop(key, None)
+                self._stats['failed'] += 1
+            self._update(job_id, status=FAILED, error=str(e), finished_at=datetime.utcnow().isoformat())
+            return
+
+        with self._condition:
+            self._in_flight.pop(key, None)
+            self._stats['completed'] += 1
+        self._update(job_id, status=COMPLETED, progress=1.0, stage='terminé', result_bytes=result_bytes,
+                     finished_at=datetime.utcnow().isoformat())
+        logger.info(f"[REPORTING] Job rapport terminé - {job_id} en {time.monotonic() - started:.1f}s ({result_bytes} octets)")
+
+    def _purge(self) -> None:
+        """Retirer les jobs terminés depuis plus de retention secondes"""
+        now = datetime.utcnow()
+        with self._condition:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in FINISHED
+                and (now - datetime.fromisoformat(job['finished_at'])).total_seconds() > self.retention
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        for job_id in expired:
+            try:
+                os.remove(self._path(job_id))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Agrégats incrémentaux des ventes pour Reporting Service
+Alimentés par le flux SaleCompleted de sales-service (stream events:sales) :
+buckets par jour, magasin et heure, ventes par produit, compteurs de stock bas
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SALES_EVENTS_STREAM = os.getenv('SALES_EVENTS_STREAM', 'events:sales')
+
+
+def _store_day() -> Dict[str, Any]:
+    return {'transactions': 0, 'revenue': 0.0, 'items': 0,
+            'by_payment': {}, 'by_hour': {}, 'products': {}}
+
+
+def _add(bucket: Dict[str, Any], **amounts) -> None:
+    for key, amount in amounts.items():
+        bucket[key] = bucket.get(key, 0) + amount
+
+
+def _next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+class SalesAggregates:
+    """
+    Ventes pré-agrégées par (jour, magasin) : totaux, par moyen de paiement, par heure
+    et par produit. Un rapport fusionne les buckets de l'intervalle demandé au lieu de
+    retélécharger et reparcourir les ventes. covered_since indique à partir de quel jour
+    les agrégats sont complets (None tant qu'aucun événement n'a été reçu)
+    """
+
+    def __init__(self, recent_size: int = 50):
+        self._days: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.covered_since: Optional[str] = None
+        self.recent = deque(maxlen=recent_size)
+        self.low_stock_count = 0
+        self.products_in_system = 0
+        self.inventory_refreshed_at: Optional[float] = None
+
+    # Alimentation
+
+    def apply_sale(self, sale: Dict[str, Any]) -> None:
+        day, hour = sale['timestamp'][:10], int(sale['timestamp'][11:13])
+        amount = sale.get('final_amount', 0)
+        items = sale.get('items', [])
+        with self._lock:
+            bucket = self._days.setdefault(day, {}).setdefault(sale.get('store_id'), _store_day())
+            _add(bucket, transactions=1, revenue=amount, items=len(items))
+            _add(bucket['by_payment'].setdefault(sale.get('payment_method', 'unknown'), {}), transactions=1, revenue=amount)
+            _add(bucket['by_hour'].setdefault(hour, {}), transactions=1, revenue=amount)
+            for item in items:
+                _add(bucket['products'].setdefault(item['product_id'], {}),
+                     quantity=item['quantity'], revenue=item['quantity'] * item['unit_price'], transactions=1)
+            self.recent.append(sale)
+
+    def reset(self, covered_since: str) -> None:
+        """Tout oublier ; les agrégats ne sont complets qu'à partir de covered_since"""
+        with self._lock:
+            self._days.clear()
+            self.recent.clear()
+            self.covered_since = covered_since
+
+    def update_inventory(self, inventory_data: Iterable[Dict[str, Any]]) -> None:
+        """Recalculer les compteurs de stock à partir d'un inventaire complet"""
+        inventory_data = list(inventory_data)
+        self.low_stock_count = sum(
+            1 for item in inventory_data
+            if item.get('available_quantity', 0) <= item.get('reorder_point', 5)
+        )
+        self.products_in_system = len({item['product_id'] for item in inventory_data})
+        self.inventory_refreshed_at = time.monotonic()
+
+    # Lecture
+
+    def covers(self, date_from: Optional[str], date_to: Optional[str] = None) -> bool:
+        """Les agrégats contiennent-ils toutes les ventes de l'intervalle ?"""
+        if self.covered_since is None:
+            return False
+        return date_from is not None and date_from >= self.covered_since
+
+    def _buckets(self, store_ids: Optional[List[int]], date_from: Optional[str], date_to: Optional[str]):
+        with self._lock:
+            for day in sorted(self._days):
+                if (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                for store_id, bucket in self._days[day].items():
+                    if not store_ids or store_id in store_ids:
+                        yield day, store_id, bucket
+
+    def sales_summary(self, store_ids: Optional[List[int]] = None,
+                      date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+        """Même structure que ReportGenerator.generate_sales_summary, par fusion de buckets"""
+        by_store, by_payment_method, by_day = {}, {}, {}
+        for day, store_id, bucket in self._buckets(store_ids, date_from, date_to):
+            _add(by_store.setdefault(store_id, {'transactions': 0, 'revenue': 0.0, 'items': 0}),
+                 transactions=bucket['transactions'], revenue=bucket['revenue'], items=bucket['items'])
+            _add(by_day.setdefault(day, {'transactions': 0, 'revenue': 0.0}),
+                 transactions=bucket['transactions'], revenue=bucket['revenue'])
+            for method, totals in bucket['by_payment'].items():
+                _add(by_payment_method.setdefault(method, {'transactions': 0, 'revenue': 0.0}), **totals)
+
+        total_transactions = sum(store['transactions'] for store in by_store.values())
+        total_revenue = sum(store['revenue'] for store in by_store.values())
+        return {
+            'total_transactions': total_transactions,
+            'total_revenue': round(total_revenue, 2),
+            'total_items_sold': sum(store['items'] for store in by_store.values()),
+            'average_transaction_value': round(total_revenue / total_transactions, 2) if total_transactions else 0.0,
+            'by_store': by_store,
+            'by_payment_method': by_payment_method,
+            'by_day': by_day
+        }
+
+    def product_sales(self, store_ids: Optional[List[int]] = None, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, product_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Quantité, revenu et transactions par produit sur l'intervalle"""
+        wanted = set(product_ids) if product_ids else None
+        merged: Dict[int, Dict[str, Any]] = {}
+        for _, _, bucket in self._buckets(store_ids, date_from, date_to):
+            for product_id, stats in bucket['products'].items():
+                if wanted is None or product_id in wanted:
+                    _add(merged.setdefault(product_id, {'quantity': 0, 'revenue': 0.0, 'transactions': 0}), **stats)
+        return merged
+
+    def top_products(self, date_from: str, date_to: str, k: int = 5) -> List[Dict[str, Any]]:
+        """k produits les plus vendus (en quantité) sur l'intervalle, par sélection sur tas"""
+        quantities = {product_id: stats['quantity']
+                      for product_id, stats in self.product_sales(date_from=date_from, date_to=date_to).items()}
+        return [{'product_id': product_id, 'quantity_sold': quantity}
+                for product_id, quantity in heapq.nlargest(k, quantities.items(), key=lambda entry: entry[1])]
+
+
+class SalesEventConsumer:
+    """
+    Lecture du stream events:sales (XREAD bloquant) vers SalesAggregates.
+    Le stream est relu depuis le début au démarrage pour reconstruire les agrégats.
+    Si la première version lue n'est pas 1 ou si une version manque (stream tronqué),
+    les agrégats repartent à zéro et ne couvrent que les jours suivant l'événement
+    """
+
+    def __init__(self, redis_client, aggregates: SalesAggregates,
+                 stream: str = SALES_EVENTS_STREAM, block_ms: int = 1000,
+                 on_sale: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None):
+        self.redis = redis_client
+        self.aggregates = aggregates
+        self.on_sale = on_sale  # appelé après chaque vente appliquée, avec None après une réinitialisation
+        self.stream = stream
+        self.block_ms = block_ms
+        self.version: Optional[int] = None
+        self.events = 0
+        self._last_id = '0-0'
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def apply(self, fields: Dict[str, str]) -> None:
+        """Appliquer un événement du stream (champs décodés)"""
+        version = int(fields['version'])
+        sale = json.loads(fields['data'])
+        expected = 1 if self.version is None else self.version + 1
+        if version != expected:
+            logger.warning(f"Flux ventes discontinu (version {self.version} -> {version}), agrégats réinitialisés")
+            self.aggregates.reset(covered_since=_next_day(sale['timestamp'][:10]))
+        elif self.version is None:
+            # Les ventes antérieures au flux (journal rejoué, fixtures) n'y sont jamais
+            # publiées : couverture à partir du jour du premier événement seulement
+            self.aggregates.reset(covered_since=sale['timestamp'][:10])
+        self.version = version
+        self.events += 1
+        self.aggregates.apply_sale(sale)
+        if self.on_sale:
+            self.on_sale(None if version != expected else sale)
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._consume, name='sales-aggregates-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(self.block_ms / 1000 + 1)
+            self._thread = None
+
+    def _consume(self) -> None:
+        disconnected = False
+        while self._running:
+            try:
+                messages = self.redis.xread({self.stream: self._last_id}, count=500, block=self.block_ms)
+            except Exception as e:
+                if not disconnected:
+                    logger.warning(f"Flux ventes indisponible: {e}")
+                    disconnected = True
+                time.sleep(1)
+                continue
+            disconnected = False
+            for _, entries in messages or []:
+                for message_id, fields in entries:
+                    self._last_id = _decode(message_id)
+                    self.apply({_decode(k): _decode(v) for k, v in fields.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        return {'events': self.events, 'version': self.version,
+                'covered_since': self.aggregates.covered_since}
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
@@ -118,7 +118,8 @@ class SagaOrchestrator:
             'sagas_started': 0,
             'sagas_completed': 0,
             'sagas_failed': 0,
-            'compensations_executed': 0
+            'compensations_executed': 0,
+            'stock_confirmations_failed': 0
         }
     
     def start_order_saga(self, session_id: str, customer_id: int, 
@@ -178,6 +179,9 @@ class SagaOrchestrator:
                 self._handle_failure(saga, SagaStatus.PAYMENT_FAILED)  # Nécessite compensation
                 return
             
+            # Étape 5: Sortie définitive du stock réservé (sinon l'expiration le remettrait en vente)
+            self._confirm_stock(saga)
+            
             # Saga terminée avec succès
             SagaStateMachine.transition(saga, SagaStatus.COMPLETED)
             saga.total_duration_ms = int((time.time() - start_time) * 1000)
@@ -388,6 +392,37 @@ class SagaOrchestrator:
             self.repository.save(saga)
             return False
     
+    def _confirm_stock(self, saga: SagaExecution) -> bool:
+        """Étape 5: Confirmer la réservation, le stock réservé sort définitivement"""
+        
+        step = SagaStep(
+            step_type=SagaStepType.CONFIRM_STOCK,
+            status="pending",
+            service_name="inventory-service",
+            endpoint=f"/inventory/confirm/{saga.saga_id}",
+            payload={}
+        )
+        
+        result = self.client.call_service('POST', step.endpoint)
+        
+        step.response = result
+        step.duration_ms = result.get('duration_ms', 0)
+        step.timestamp = datetime.utcnow()
+        
+        if result['success']:
+            step.status = "success"
+            saga.completed_steps.append(step)
+            self.logger.info(f"Stock confirmé pour la réservation {saga.saga_id}")
+            return True
+        
+        # La commande est déjà créée et payée : pas de compensation, mais le stock
+        # de la réservation (expirée entre-temps) doit être rapproché manuellement
+        step.status = "failed"
+        step.error = result.get('error', 'Erreur de confirmation du stock')
+        self.metrics['stock_confirmations_failed'] += 1
+        self.logger.error(f"Échec de confirmation du stock pour la réservation {saga.saga_id}: {step.error}")
+        return False
+    
     def _handle_failure(self, saga: SagaExecution, failure_status: SagaStatus) -> None:
         """Gérer l'échec d'une saga avec compensation si nécessaire"""
         
@@ -39,6 +39,7 @@ class SagaStepType(Enum):
     RESERVE_STOCK = "RESERVE_STOCK"
     PROCESS_PAYMENT = "PROCESS_PAYMENT"
     CONFIRM_ORDER = "CONFIRM_ORDER"
+    CONFIRM_STOCK = "CONFIRM_STOCK"
     
     # Étapes de compensation
     RELEASE_STOCK = "RELEASE_STOCK"
@@ -6,18 +6,23 @@ Responsabilité: Ventes en magasin physique, transactions POS
 """
 
 import os
+import json
 import uuid
 import requests
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
+from sales_events import create_sale_event_publisher
+from sales_journal import SalesJournal
+from sales_store import SalesStore
+
 # Configuration de base
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'sales-service-secret')
@@ -54,10 +59,48 @@ ITEMS_SOLD = Counter('items_sold_total', 'Total number of items sold', ['product
 # Configuration des services externes
 INVENTORY_SERVICE_URL = os.getenv('INVENTORY_SERVICE_URL', 'http://inventory-service:8002')
 PRODUCT_SERVICE_URL = os.getenv('PRODUCT_SERVICE_URL', 'http://product-service:8001')
+PRODUCT_EVENTS_REDIS_URL = os.getenv('PRODUCT_EVENTS_REDIS_URL')
+
+# Cache local du catalogue, invalidé par le flux de changements de product-service
+try:
+    from product_cache import ProductCache
+except ImportError:  # module partagé copié dans l'image (microservices/shared)
+    ProductCache = None
+
+product_cache = None
+if ProductCache and PRODUCT_EVENTS_REDIS_URL:
+    import redis
+    product_cache = ProductCache(
+        redis.from_url(PRODUCT_EVENTS_REDIS_URL),
+        ttl=float(os.getenv('PRODUCT_CACHE_TTL', '3600'))
+    )
+    product_cache.start()
+
+# Ventes en mémoire, partitionnées par jour et indexées par magasin et caissier
+sales_store = SalesStore()
+
+# Flux des ventes conclues, consommé par reporting-service (agrégats incrémentaux)
+sale_events = create_sale_event_publisher()
 
-# Base de données simulée des ventes
-sales_db = {}
-daily_sales_summary = {}
+# Journal write-ahead (source de vérité) : rejoué au démarrage pour reconstruire les index
+SALES_JOURNAL_DIR = os.getenv('SALES_JOURNAL_DIR')
+sales_journal = None
+if SALES_JOURNAL_DIR:
+    sales_journal = SalesJournal(
+        SALES_JOURNAL_DIR,
+        commit_delay=float(os.getenv('SALES_JOURNAL_COMMIT_DELAY', '0.002')),
+        compact_bytes=int(os.getenv('SALES_JOURNAL_COMPACT_BYTES', str(64 * 1024 * 1024)))
+    )
+    sales_store.load(sales_journal.replay())
+    sales_journal.start()
+
+def load_sales_fixtures(path: str) -> int:
+    """Charger des ventes générées par generate_benchmark_data.py (JSON Lines)"""
+    with open(path, encoding='utf-8') as fixture_file:
+        return sales_store.load(json.loads(line) for line in fixture_file)
+
+if os.getenv('SALES_FIXTURES_PATH'):
+    load_sales_fixtures(os.getenv('SALES_FIXTURES_PATH'))
 
 # Modèles API
 sale_item_model = api.model('SaleItem', {
@@ -140,72 +183,64 @@ class SalesCalculator:
             'final_amount': round(final_amount, 2)
         }
 
-def get_product_info(product_id: int) -> Optional[Dict]:
-    """Récupérer les informations d'un produit"""
-    try:
-        logger.debug(f"[SALES] Appel service produit - ID: {product_id}")
-        response = requests.get(f"{PRODUCT_SERVICE_URL}/api/v1/products/{product_id}", timeout=5)
-        if response.status_code == 200:
-            logger.debug(f"[SALES] Produit récupéré avec succès - ID: {product_id}")
-            return response.json()
-        else:
-            logger.warning(f"[SALES] Produit non trouvé - ID: {product_id}, Code: {response.status_code}")
-    except requests.exceptions.RequestException as e:
-        logger.warning(f"[SALES] Échec appel service produit - ID {product_id}: {e}")
-    return None
+def get_products_info(product_ids: List[int]) -> Dict[int, Dict]:
+    """Récupérer plusieurs produits, depuis le cache local si le flux de changements est actif"""
+    if product_cache:
+        return product_cache.get_many(product_ids, fetch_products_info)
+    return fetch_products_info(product_ids)
 
-def check_inventory(product_id: int, quantity: int, store_id: int) -> bool:
-    """Vérifier la disponibilité en stock"""
+def fetch_products_info(product_ids: List[int]) -> Dict[int, Dict]:
+    """Récupérer plusieurs produits en un appel (POST /products/batch)"""
+    unique_ids = list(dict.fromkeys(product_ids))
+    if not unique_ids:
+        return {}
     try:
-        logger.debug(f"[SALES] Appel service inventory - Produit: {product_id}, Magasin: {store_id}")
-        response = requests.get(
-            f"{INVENTORY_SERVICE_URL}/api/v1/inventory",
-            params={'location_id': store_id, 'product_id': product_id},
+        logger.debug(f"[SALES] Appel batch service produit - IDs: {unique_ids}")
+        response = requests.post(
+            f"{PRODUCT_SERVICE_URL}/api/v1/products/batch",
+            json={'ids': unique_ids},
             timeout=5
         )
         if response.status_code == 200:
-            inventory_items = response.json()
-            for item in inventory_items:
-                if item['product_id'] == product_id and item['available_quantity'] >= quantity:
-                    logger.debug(f"[SALES] Stock OK - Produit: {product_id}, Disponible: {item['available_quantity']}, Demandé: {quantity}")
-                    return True
-            logger.debug(f"[SALES] Stock insuffisant - Produit: {product_id}")
-        else:
-            logger.warning(f"[SALES] Service inventory indisponible - Code: {response.status_code}")
+            result = response.json()
+            if result.get('missing'):
+                logger.warning(f"[SALES] Produits non trouvés - IDs: {result['missing']}")
+            return {product['id']: product for product in result.get('products', [])}
+        logger.warning(f"[SALES] Échec batch service produit - Code: {response.status_code}")
     except requests.exceptions.RequestException as e:
-        logger.warning(f"[SALES] Échec appel service inventory - Produit {product_id}: {e}")
-    return False
+        logger.warning(f"[SALES] Échec appel batch service produit - IDs {unique_ids}: {e}")
+    return {}
 
-def update_inventory(product_id: int, quantity: int, store_id: int, operation: str = 'sale') -> bool:
-    """Mettre à jour le stock après une vente ou un retour"""
+def get_product_info(product_id: int) -> Optional[Dict]:
+    """Récupérer les informations d'un produit"""
+    return get_products_info([product_id]).get(product_id)
+
+def apply_inventory_batch(items: List[Dict[str, Any]], store_id: int, operation: str, reference: str) -> Tuple[bool, str]:
+    """
+    Vérifier et décrémenter (vente) ou remettre en stock (retour) tout le panier
+    en un seul appel à inventory-service, tout ou rien
+    """
     try:
-        # Pour une vente, on décrémente le stock
-        # Pour un retour, on incrémente le stock
-        adjustment = -quantity if operation == 'sale' else quantity
-        
-        logger.debug(f"[SALES] Appel ajustement stock - Produit: {product_id}, Opération: {operation}, Ajustement: {adjustment}")
-        
+        logger.debug(f"[SALES] Appel batch service inventory - Opération: {operation}, Magasin: {store_id}, Articles: {len(items)}")
         response = requests.post(
-            f"{INVENTORY_SERVICE_URL}/api/v1/inventory/adjust",
+            f"{INVENTORY_SERVICE_URL}/api/v1/inventory/batch",
             json={
-                'product_id': product_id,
+                'operation': operation,
                 'location_id': store_id,
-                'quantity_change': adjustment,
-                'reason': f'POS {operation}'
+                'reference': reference,
+                'items': [{'product_id': item['product_id'], 'quantity': item['quantity']} for item in items]
             },
             timeout=5
         )
-        
         if response.status_code == 200:
-            logger.debug(f"[SALES] Ajustement stock réussi - Produit: {product_id}")
-            return True
-        else:
-            logger.error(f"[SALES] Échec ajustement stock - Produit: {product_id}, Code: {response.status_code}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"[SALES] Erreur communication inventory - Produit {product_id}: {e}")
-        return False
+            logger.debug(f"[SALES] Stock mis à jour - Opération: {operation}, Référence: {reference}")
+            return True, ''
+        error = response.json().get('error', f'Code {response.status_code}')
+        logger.warning(f"[SALES] Mouvement de stock refusé - Opération: {operation}, Référence: {reference}: {error}")
+        return False, error
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"[SALES] Erreur communication inventory - Référence {reference}: {e}")
+        return False, 'Service inventory indisponible'
 
 @api.route('/sales')
 class SalesResource(Resource):
@@ -231,23 +266,19 @@ class SalesResource(Resource):
                 
                 logger.info(f"[SALES] Validation - Magasin: {store_id}, Articles: {len(items)}")
                 
-                # Vérifier le stock pour tous les articles
-                logger.info(f"[SALES] Vérification stock pour {len(items)} articles")
-                for item in items:
-                    product_id = item['product_id']
-                    quantity = item['quantity']
-                    
-                    logger.debug(f"[SALES] Vérification stock - Produit: {product_id}, Quantité: {quantity}")
-                    if not check_inventory(product_id, quantity, store_id):
-                        logger.warning(f"[SALES] Stock insuffisant - Produit: {product_id}, Demandé: {quantity}")
-                        SALES_TOTAL.labels(store_id=store_id, status='failed_inventory').inc()
-                        return {'error': f'Stock insuffisant pour le produit {product_id}'}, 400
-                
                 # Calculer les totaux
                 logger.info(f"[SALES] Calcul des totaux pour la transaction {transaction_id}")
                 calculation = SalesCalculator.calculate_sale(items, store_id)
                 logger.debug(f"[SALES] Calculs terminés - Total: {calculation['final_amount']}$")
                 
+                # Vérifier et décrémenter le stock de tout le panier en un appel
+                logger.info(f"[SALES] Décrément stock pour {len(items)} articles")
+                stock_ok, stock_error = apply_inventory_batch(items, store_id, 'sale', transaction_id)
+                if not stock_ok:
+                    logger.warning(f"[SALES] Stock insuffisant - Transaction: {transaction_id}: {stock_error}")
+                    SALES_TOTAL.labels(store_id=store_id, status='failed_inventory').inc()
+                    return {'error': stock_error}, 400
+                
                 # Créer la transaction
                 sale_record = {
                     'transaction_id': transaction_id,
@@ -262,37 +293,22 @@ class SalesResource(Resource):
                     **calculation
                 }
                 
-                # Sauvegarder la vente
-                sales_db[transaction_id] = sale_record
+                # Journaliser (durable) puis indexer la vente
+                if sales_journal:
+                    try:
+                        sales_journal.record_sale(sale_record)
+                    except OSError as e:
+                        logger.error(f"[SALES] Vente non journalisée, remise en stock - Transaction: {transaction_id}: {e}")
+                        apply_inventory_batch(items, store_id, 'return', transaction_id)
+                        SALES_TOTAL.labels(store_id=str(store_id), status='error').inc()
+                        return {'error': 'Vente non enregistrée'}, 503
+                sales_store.add(sale_record)
+                if sale_events:
+                    sale_events.sale_completed(sale_record)
                 
-                # Mettre à jour les stocks
-                logger.info(f"[SALES] Mise à jour des stocks pour {len(items)} articles")
+                # Métriques
                 for item in items:
-                    product_id = item['product_id']
-                    quantity = item['quantity']
-                    logger.debug(f"[SALES] Mise à jour stock - Produit: {product_id}, Quantité vendue: {quantity}")
-                    
-                    if update_inventory(product_id, quantity, store_id, 'sale'):
-                        logger.debug(f"[SALES] Stock mis à jour avec succès - Produit: {product_id}")
-                    else:
-                        logger.error(f"[SALES] Échec mise à jour stock - Produit: {product_id}")
-                    
-                    # Métriques
-                    ITEMS_SOLD.labels(product_id=str(product_id), store_id=str(store_id)).inc(quantity)
-                
-                # Mettre à jour le résumé quotidien
-                date_key = timestamp.strftime('%Y-%m-%d')
-                if date_key not in daily_sales_summary:
-                    daily_sales_summary[date_key] = {
-                        'date': date_key,
-                        'total_sales': 0,
-                        'total_amount': 0.0,
-                        'transactions': 0
-                    }
-                
-                daily_sales_summary[date_key]['transactions'] += 1
-                daily_sales_summary[date_key]['total_amount'] += calculation['final_amount']
-                daily_sales_summary[date_key]['total_sales'] += len(items)
+                    ITEMS_SOLD.labels(product_id=str(item['product_id']), store_id=str(store_id)).inc(item['quantity'])
                 
                 # Métriques
                 SALES_TOTAL.labels(store_id=str(store_id), status='completed').inc()
@@ -318,34 +334,23 @@ class SalesResource(Resource):
             date_from = request.args.get('date_from')  # YYYY-MM-DD
             date_to = request.args.get('date_to')  # YYYY-MM-DD
             limit = request.args.get('limit', 100, type=int)
+            offset = request.args.get('offset', 0, type=int)
+            if limit < 1 or offset < 0:
+                return {'error': 'limit doit être positif et offset non négatif'}, 400
             
-            logger.info(f"[SALES] Requête liste ventes - Filtres: magasin={store_id}, caissier={cashier_id}, dates={date_from} à {date_to}, limite={limit}")
+            logger.info(f"[SALES] Requête liste ventes - Filtres: magasin={store_id}, caissier={cashier_id}, dates={date_from} à {date_to}, limite={limit}, décalage={offset}")
             
-            filtered_sales = []
-            
-            for sale in sales_db.values():
-                # Filtrer par magasin
-                if store_id and sale['store_id'] != store_id:
-                    continue
-                
-                # Filtrer par caissier
-                if cashier_id and sale['cashier_id'] != cashier_id:
-                    continue
-                
-                # Filtrer par date
-                sale_date = datetime.fromisoformat(sale['timestamp']).strftime('%Y-%m-%d')
-                if date_from and sale_date < date_from:
-                    continue
-                if date_to and sale_date > date_to:
-                    continue
-                
-                filtered_sales.append(sale)
-                
-                if len(filtered_sales) >= limit:
-                    break
-            
-            # Trier par date décroissante
-            filtered_sales.sort(key=lambda x: x['timestamp'], reverse=True)
+            # Une vente de plus que la page : indique s'il reste des ventes à lire
+            filtered_sales = sales_store.query(
+                store_id=store_id,
+                cashier_id=cashier_id,
+                date_from=date_from,
+                date_to=date_to,
+                limit=limit + 1,
+                offset=offset
+            )
+            has_more = len(filtered_sales) > limit
+            filtered_sales = filtered_sales[:limit]
             
             logger.info(f"[SALES] Liste ventes récupérée - {len(filtered_sales)} résultats trouvés")
             logger.debug(f"[SALES] Filtres appliqués: {{'store_id': {store_id}, 'cashier_id': '{cashier_id}', 'date_from': '{date_from}', 'date_to': '{date_to}'}}")
@@ -353,6 +358,7 @@ class SalesResource(Resource):
             return {
                 'sales': filtered_sales,
                 'total_count': len(filtered_sales),
+                'next_offset': offset + limit if has_more else None,
                 'filters_applied': {
                     'store_id': store_id,
                     'cashier_id': cashier_id,
@@ -374,10 +380,11 @@ class SaleResource(Resource):
     def get(self, transaction_id):
         """Récupérer une vente spécifique"""
         try:
-            if transaction_id not in sales_db:
+            sale = sales_store.get(transaction_id)
+            if sale is None:
                 return {'error': 'Transaction non trouvée'}, 404
             
-            return sales_db[transaction_id], 200
+            return sale, 200
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la vente {transaction_id}: {e}")
@@ -394,12 +401,12 @@ class SaleReturnResource(Resource):
         try:
             logger.info(f"[SALES] Début traitement retour - Transaction originale: {transaction_id}")
             
-            if transaction_id not in sales_db:
+            if transaction_id not in sales_store:
                 logger.warning(f"[SALES] Transaction originale non trouvée: {transaction_id}")
                 return {'error': 'Transaction originale non trouvée'}, 404
             
             data = request.get_json()
-            original_sale = sales_db[transaction_id]
+            original_sale = sales_store.get(transaction_id)
             
             return_id = str(uuid.uuid4())
             timestamp = datetime.utcnow()
@@ -439,17 +446,21 @@ class SaleReturnResource(Resource):
                 'return_amount': return_calculation['final_amount']
             }
             
-            # Mettre à jour les stocks (remettre en stock)
+            # Journaliser (durable) avant toute remise en stock : un retour non enregistré
+            # ne doit pas avoir restauré le stock
+            if sales_journal:
+                try:
+                    sales_journal.record_return(transaction_id, return_record)
+                except OSError as e:
+                    logger.error(f"[SALES] Retour non journalisé, stock inchangé - Retour: {return_id}: {e}")
+                    SALES_TOTAL.labels(store_id=str(original_sale['store_id']), status='error').inc()
+                    return {'error': 'Retour non enregistré'}, 503
+            
+            # Remettre en stock tout le retour en un appel
             logger.info(f"[SALES] Remise en stock pour {len(return_items)} articles")
-            for item in return_items:
-                product_id = item['product_id']
-                quantity = item['quantity']
-                logger.debug(f"[SALES] Remise en stock - Produit: {product_id}, Quantité: {quantity}")
-                
-                if update_inventory(product_id, quantity, original_sale['store_id'], 'return'):
-                    logger.debug(f"[SALES] Stock restauré avec succès - Produit: {product_id}")
-                else:
-                    logger.error(f"[SALES] Échec restauration stock - Produit: {product_id}")
+            stock_ok, stock_error = apply_inventory_batch(return_items, original_sale['store_id'], 'return', return_id)
+            if not stock_ok:
+                logger.error(f"[SALES] Échec restauration stock - Retour: {return_id}: {stock_error}")
             
             # Sauvegarder le retour dans la vente originale
             if 'returns' not in original_sale:
@@ -480,32 +491,11 @@ class DailySalesResource(Resource):
             store_id = request.args.get('store_id', type=int)
             
             if date:
-                # Résumé pour une date spécifique
-                if date in daily_sales_summary:
-                    summary = daily_sales_summary[date].copy()
-                    
-                    # Filtrer par magasin si demandé
-                    if store_id:
-                        store_sales = [s for s in sales_db.values() 
-                                     if s['store_id'] == store_id and 
-                                     datetime.fromisoformat(s['timestamp']).strftime('%Y-%m-%d') == date]
-                        
-                        summary = {
-                            'date': date,
-                            'store_id': store_id,
-                            'transactions': len(store_sales),
-                            'total_amount': sum(s['final_amount'] for s in store_sales),
-                            'total_sales': sum(len(s['items']) for s in store_sales)
-                        }
-                    
-                    return summary, 200
-                else:
-                    return {'date': date, 'transactions': 0, 'total_amount': 0.0, 'total_sales': 0}, 200
+                # Résumé pour une date spécifique, éventuellement par magasin
+                return sales_store.daily_summary(date, store_id), 200
             else:
                 # Résumé de tous les jours
-                summaries = list(daily_sales_summary.values())
-                summaries.sort(key=lambda x: x['date'], reverse=True)
-                return {'daily_summaries': summaries}, 200
+                return {'daily_summaries': sales_store.daily_summaries()}, 200
                 
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du résumé quotidien: {e}")
@@ -521,7 +511,8 @@ def health():
         'dependencies': {
             'inventory-service': 'available',
             'product-service': 'available'
-        }
+        },
+        'sale_events_failed': sale_events.failed if sale_events else 0
     }, 200
 
 @app.route('/metrics')
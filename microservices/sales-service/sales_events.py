@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Flux des ventes conclues (SaleCompleted)
+Chaque vente enregistrée est publiée sur un Redis Stream avec une version croissante
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SALES_EVENTS_STREAM = os.getenv('SALES_EVENTS_STREAM', 'events:sales')
+SALES_EVENTS_MAXLEN = int(os.getenv('SALES_EVENTS_MAXLEN', '1000000'))
+
+SALE_COMPLETED = 'SaleCompleted'
+
+# INCRBY + XADD dans le même script : l'ordre du stream est celui des versions,
+# et un consommateur détecte un trou (stream tronqué, vente non publiée) par un saut
+# de version. ARGV[6] vaut 1 plus le nombre de ventes non publiées depuis la dernière
+_PUBLISH_SCRIPT = """
+local version = redis.call('INCRBY', KEYS[2], ARGV[6])
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*',
+    'version', version, 'event_type', ARGV[2], 'transaction_id', ARGV[3],
+    'data', ARGV[4], 'timestamp', ARGV[5])
+return version
+"""
+
+
+class SaleEventPublisher:
+    """
+    Publication des ventes conclues pour les agrégats de reporting-service.
+    Les ventes non publiées (panne Redis) sont comptées ; la publication suivante saute
+    autant de versions, et le consommateur voit le trou au lieu d'agrégats incomplets
+    """
+
+    def __init__(self, redis_client, stream: str = SALES_EVENTS_STREAM, maxlen: int = SALES_EVENTS_MAXLEN):
+        self.redis = redis_client
+        self.stream = stream
+        self.maxlen = maxlen
+        self.failed = 0
+        self._missed = 0  # ventes non publiées depuis la dernière publication réussie
+        self._lock = threading.Lock()
+        self._script = redis_client.register_script(_PUBLISH_SCRIPT)
+
+    def sale_completed(self, sale: Dict) -> Optional[int]:
+        """
+        Publier une vente et retourner sa version.
+        Une panne Redis n'annule pas la vente : les rapports retombent sur les ventes brutes
+        """
+        with self._lock:
+            missed = self._missed
+        try:
+            version = int(self._script(
+                keys=[self.stream, f"{self.stream}:version"],
+                args=[self.maxlen, SALE_COMPLETED, sale['transaction_id'],
+                      json.dumps(sale, default=str), datetime.utcnow().isoformat(), 1 + missed]
+            ))
+        except Exception as e:
+            with self._lock:
+                self._missed += 1
+                self.failed += 1
+            logger.error(f"[SALES] Événement {SALE_COMPLETED} non publié - Transaction {sale.get('transaction_id')}: {e}")
+            return None
+        with self._lock:
+            self._missed -= missed
+        return version
+
+
+def create_sale_event_publisher() -> Optional[SaleEventPublisher]:
+    """Publisher configuré par SALES_EVENTS_REDIS_URL, None si le flux est désactivé"""
+    redis_url = os.getenv('SALES_EVENTS_REDIS_URL')
+    if not redis_url:
+        return None
+    import redis
+    return SaleEventPublisher(redis.from_url(redis_url, socket_timeout=2))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Journal d'écriture anticipée (write-ahead) des ventes pour Sales Service
+Ajouts JSON Lines avec fsync groupé, relecture par mmap au démarrage, compaction en snapshot
+"""
+
+import json
+import logging
+import mmap
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = 'sales.journal'
+ROTATED_FILE = 'sales.journal.1'
+SNAPSHOT_FILE = 'sales.snapshot'
+
+
+def _read_records(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Enregistrements complets d'un fichier JSON Lines lu par mmap, et la longueur valide.
+    Une dernière ligne tronquée (arrêt pendant une écriture) est ignorée
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return [], 0
+    records = []
+    valid_length = 0
+    with open(path, 'rb') as journal_file, \
+            mmap.mmap(journal_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = 0
+        while True:
+            end = mapped.find(b'\n', position)
+            if end < 0:
+                break
+            try:
+                records.append(json.loads(mapped[position:end]))
+            except ValueError:
+                break
+            position = valid_length = end + 1
+    return records, valid_length
+
+
+def _apply(sales: Dict[str, Dict[str, Any]], record: Dict[str, Any]) -> None:
+    """Rejouer un enregistrement ; rejouer deux fois le même est sans effet"""
+    if record['op'] == 'sale':
+        sales[record['sale']['transaction_id']] = record['sale']
+    elif record['op'] == 'return':
+        sale = sales.get(record['transaction_id'])
+        if sale is None:
+            return
+        returns = sale.setdefault('returns', [])
+        if all(r['return_id'] != record['return']['return_id'] for r in returns):
+            returns.append(record['return'])
+
+
+def _fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SalesJournal:
+    """
+    Source de vérité des ventes : sales.snapshot + sales.journal(.1).
+    append() retourne une fois l'enregistrement sur disque ; un thread écrivain regroupe
+    les ajouts concurrents (au plus commit_delay secondes d'attente) sous un seul fsync.
+    compact() fait tourner le journal puis réécrit snapshot + journal tourné en un
+    nouveau snapshot (écriture dans un fichier temporaire puis rename atomique)
+    """
+
+    def __init__(self, directory: str, commit_delay: float = 0.002,
+                 compact_bytes: int = 64 * 1024 * 1024, compact_interval: float = 300.0):
+        self.directory = directory
+        self.commit_delay = commit_delay
+        self.compact_bytes = compact_bytes
+        self.compact_interval = compact_interval
+        os.makedirs(directory, exist_ok=True)
+        self._journal_path = os.path.join(directory, JOURNAL_FILE)
+        self._rotated_path = os.path.join(directory, ROTATED_FILE)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+
+        self._condition = threading.Condition()
+        self._buffer: List[Tuple[bytes, Dict[str, Any]]] = []
+        self._io_lock = threading.Lock()  # écritures du journal et rotation
+        self._compact_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._file = None
+        self._writer = None
+        self.commits = 0
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """Reconstruire les ventes (snapshot, journal tourné, journal) et ouvrir le journal"""
+        sales: Dict[str, Dict[str, Any]] = {}
+        for path in (self._snapshot_path, self._rotated_path, self._journal_path):
+            records, valid_length = _read_records(path)
+            for record in records:
+                _apply(sales, record)
+            if path == self._journal_path and os.path.exists(path) and os.path.getsize(path) != valid_length:
+                logger.warning(f"[SALES] Journal tronqué à {valid_length} octets (écriture interrompue)")
+                os.truncate(path, valid_length)
+        self._file = open(self._journal_path, 'ab')
+        logger.info(f"[SALES] Journal rejoué - {len(sales)} ventes")
+        return list(sales.values())
+
+    def start(self) -> None:
+        if self._file is None:
+            self._file = open(self._journal_path, 'ab')
+        self._writer = threading.Thread(target=self._run_writer, name='sales-journal-writer', daemon=True)
+        self._writer.start()
+        threading.Thread(target=self._run_compaction, name='sales-journal-compaction', daemon=True).start()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Ajouter un enregistrement et attendre qu'il soit durable (OSError si l'écriture échoue)"""
+        line = json.dumps(record, default=str).encode('utf-8') + b'\n'
+        commit = {'done': False, 'error': None}
+        with self._condition:
+            self._buffer.append((line, commit))
+            self._condition.notify_all()
+            while not commit['done']:
+                self._condition.wait()
+        if commit['error'] is not None:
+            raise OSError(f"Journal des ventes indisponible: {commit['error']}")
+
+    def record_sale(self, sale: Dict[str, Any]) -> None:
+        self.append({'op': 'sale', 'sale': sale})
+
+    def record_return(self, transaction_id: str, return_record: Dict[str, Any]) -> None:
+        self.append({'op': 'return', 'transaction_id': transaction_id, 'return': return_record})
+
+    def close(self) -> None:
+        """Écrire les ajouts en attente puis fermer le journal"""
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._writer:
+            self._writer.join()
+        if self._file:
+            self._file.close()
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._condition:
+                while not self._buffer and not self._stopping.is_set():
+                    self._condition.wait()
+                if not self._buffer:
+                    return  # arrêt demandé, plus rien à écrire
+            # Laisser les ajouts concurrents rejoindre le même fsync
+            self._stopping.wait(self.commit_delay)
+            with self._condition:
+                batch, self._buffer = self._buffer, []
+            error = None
+            with self._io_lock:
+                offset = self._file.tell()
+                try:
+                    self._file.write(b''.join(line for line, _ in batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self.commits += 1
+                except OSError as e:
+                    logger.error(f"[SALES] Échec écriture journal ({len(batch)} enregistrements): {e}")
+                    error = e
+                    try:
+                        self._file.truncate(offset)  # pas de ligne partielle avant les prochains ajouts
+                    except OSError:
+                        pass
+            with self._condition:
+                for _, commit in batch:
+                    commit['done'] = True
+                    commit['error'] = error
+                self._condition.notify_all()
+
+    def _run_compaction(self) -> None:
+        while not self._stopping.wait(self.compact_interval):
+            try:
+                if os.path.getsize(self._journal_path) >= self.compact_bytes:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"[SALES] Erreur compaction journal: {e}")
+
+    def compact(self) -> int:
+        """Fusionner snapshot et journal courant dans un nouveau snapshot ; retourne le nombre de ventes"""
+        with self._compact_lock:
+            with self._io_lock:
+                if not os.path.exists(self._rotated_path):
+                    self._file.close()
+                    os.replace(self._journal_path, self._rotated_path)
+                    self._file = open(self._journal_path, 'ab')
+                    _fsync_directory(self.directory)
+
+            sales: Dict[str, Dict[str, Any]] = {}
+            for path in (self._snapshot_path, self._rotated_path):
+                for record in _read_records(path)[0]:
+                    _apply(sales, record)
+
+            temporary_path = self._snapshot_path + '.tmp'
+            with open(temporary_path, 'wb') as snapshot_file:
+                for sale in sales.values():
+                    snapshot_file.write(json.dumps({'op': 'sale', 'sale': sale}, default=str).encode('utf-8') + b'\n')
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary_path, self._snapshot_path)
+            os.remove(self._rotated_path)
+            _fsync_directory(self.directory)
+            logger.info(f"[SALES] Journal compacté - {len(sales)} ventes dans le snapshot")
+            return len(sales)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Stockage en mémoire des ventes pour Sales Service
+Ventes partitionnées par jour, index par magasin et par caissier, agrégats quotidiens tenus à jour
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def _empty_summary(date: str) -> Dict[str, Any]:
+    return {'date': date, 'total_sales': 0, 'total_amount': 0.0, 'transactions': 0}
+
+
+class SalesStore:
+    """
+    Ventes indexées par transaction_id et partitionnées par jour (timestamp[:10]).
+    Dans chaque jour, index secondaires par magasin et par caissier ; résumés par jour
+    et par (jour, magasin) mis à jour à chaque ajout. Une requête ne parcourt que les
+    jours de l'intervalle et, dans chacun, le plus petit index qui couvre les filtres
+    """
+
+    def __init__(self, sales: Optional[Iterable[Dict[str, Any]]] = None):
+        self._sales: Dict[str, Dict[str, Any]] = {}
+        self._days: List[str] = []  # jours triés, pour les intervalles
+        self._by_day: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_day_store: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._by_day_cashier: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._store_summaries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if sales:
+            self.load(sales)
+
+    def __len__(self) -> int:
+        return len(self._sales)
+
+    def __contains__(self, transaction_id: str) -> bool:
+        return transaction_id in self._sales
+
+    def get(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        return self._sales.get(transaction_id)
+
+    def add(self, sale: Dict[str, Any]) -> Dict[str, Any]:
+        """Enregistrer une nouvelle vente (transaction_id unique)"""
+        day = sale['timestamp'][:10]
+        with self._lock:
+            self._sales[sale['transaction_id']] = sale
+            if day not in self._by_day:
+                insort(self._days, day)
+                self._by_day[day] = []
+                self._summaries[day] = _empty_summary(day)
+            self._by_day[day].append(sale)
+            self._by_day_store.setdefault((day, sale['store_id']), []).append(sale)
+            self._by_day_cashier.setdefault((day, sale['cashier_id']), []).append(sale)
+
+            store_summary = self._store_summaries.setdefault(
+                (day, sale['store_id']), dict(_empty_summary(day), store_id=sale['store_id'])
+            )
+            for summary in (self._summaries[day], store_summary):
+                summary['transactions'] += 1
+                summary['total_amount'] += sale['final_amount']
+                summary['total_sales'] += len(sale['items'])
+        return sale
+
+    def query(self, store_id: Optional[int] = None, cashier_id: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Ventes filtrées, les plus récentes d'abord (dates YYYY-MM-DD incluses), à partir de offset"""
+        end = offset + limit
+        days = self._days[
+            bisect_left(self._days, date_from) if date_from else 0:
+            bisect_right(self._days, date_to) if date_to else len(self._days)
+        ]
+        results: List[Dict[str, Any]] = []
+        for day in reversed(days):
+            candidates = self._day_candidates(day, store_id, cashier_id)
+            matching = [
+                sale for sale in candidates
+                if (store_id is None or sale['store_id'] == store_id)
+                and (cashier_id is None or sale['cashier_id'] == cashier_id)
+            ]
+            matching.sort(key=lambda sale: sale['timestamp'], reverse=True)
+            results.extend(matching[:end - len(results)])
+            if len(results) >= end:
+                break
+        return results[offset:]
+
+    def _day_candidates(self, day: str, store_id: Optional[int], cashier_id: Optional[str]) -> List[Dict[str, Any]]:
+        indexes = [self._by_day.get(day, [])]
+        if store_id is not None:
+            indexes.append(self._by_day_store.get((day, store_id), []))
+        if cashier_id is not None:
+            indexes.append(self._by_day_cashier.get((day, cashier_id), []))
+        return list(min(indexes, key=len))
+
+    def daily_summary(self, date: str, store_id: Optional[int] = None) -> Dict[str, Any]:
+        """Résumé d'un jour, éventuellement limité à un magasin"""
+        if store_id:
+            summary = self._store_summaries.get((date, store_id))
+            return dict(summary) if summary else dict(_empty_summary(date), store_id=store_id)
+        summary = self._summaries.get(date)
+        return dict(summary) if summary else _empty_summary(date)
+
+    def daily_summaries(self) -> List[Dict[str, Any]]:
+        """Résumés de tous les jours, du plus récent au plus ancien"""
+        return [dict(self._summaries[day]) for day in reversed(self._days)]
+
+    def load(self, sales: Iterable[Dict[str, Any]]) -> int:
+        """Remplacer toutes les ventes"""
+        self.clear()
+        for sale in sales:
+            self.add(sale)
+        return len(self._sales)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sales.clear()
+            self._days.clear()
+            self._by_day.clear()
+            self._by_day_store.clear()
+            self._by_day_cashier.clear()
+            self._summaries.clear()
+            self._store_summaries.clear()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Cache local du catalogue produits pour les services consommateurs
+Les entrées vivent longtemps (TTL) et sont invalidées une à une par le flux
+de changements publié par product-service (stream events:products)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_EVENTS_STREAM = os.getenv('PRODUCT_EVENTS_STREAM', 'events:products')
+
+# Produits trouvés par ID ; les IDs absents sont inexistants, None si la source est injoignable
+ProductLoader = Callable[[List[int]], Optional[Dict[int, Dict]]]
+
+
+class ProductCache:
+    """
+    Produits indexés par ID avec TTL et borne LRU.
+    Un thread lit le stream (XREAD bloquant) et retire le produit concerné ;
+    un trou dans les versions (stream tronqué, Redis redémarré) vide tout le cache.
+    Avec negative_ttl > 0, un produit inexistant est aussi mémorisé (entrée None)
+    pendant negative_ttl secondes, ou jusqu'à un événement le concernant
+    """
+
+    def __init__(self, redis_client=None, stream: str = PRODUCT_EVENTS_STREAM,
+                 ttl: float = 3600.0, max_entries: int = 50_000, block_ms: int = 1000,
+                 negative_ttl: float = 0.0):
+        self.redis = redis_client
+        self.stream = stream
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.block_ms = block_ms
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Séquence locale des invalidations : un chargement commencé avant une
+        # invalidation ne doit pas réinsérer une valeur périmée. Les invalidations ne sont
+        # retenues que tant qu'un chargement commencé avant elles est en cours
+        self._sequence = 0
+        self._invalidated: Dict[int, int] = {}
+        self._loads: Dict[int, int] = {}  # séquence de départ -> chargements en cours
+        self._cleared_at = 0
+        self._version: Optional[int] = None
+        self._last_id = '$'
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'load_failures': 0,
+                       'invalidations': 0, 'resets': 0, 'events': 0}
+
+    # Lecture
+
+    def get_many(self, product_ids: Iterable[int], loader: ProductLoader) -> Optional[Dict[int, Dict]]:
+        """
+        Produits en cache, les absents sont chargés en un seul appel à loader.
+        None si loader est appelé et retourne None (rien n'est alors mis en cache)
+        """
+        requested = list(dict.fromkeys(product_ids))
+        found, missing = {}, []
+        negative = 0
+        now = time.monotonic()
+        with self._lock:
+            for product_id in requested:
+                entry = self._entries.get(product_id)
+                if entry and entry[1] > now:
+                    self._entries.move_to_end(product_id)
+                    if entry[0] is None:
+                        negative += 1
+                    else:
+                        found[product_id] = entry[0]
+                else:
+                    missing.append(product_id)
+            self._stats['hits'] += len(found) + negative
+            self._stats['negative_hits'] += negative
+            self._stats['misses'] += len(missing)
+            started_at = self._sequence
+            if missing:
+                self._loads[started_at] = self._loads.get(started_at, 0) + 1
+
+        if missing:
+            try:
+                loaded = loader(missing)
+                if loaded is None:
+                    with self._lock:
+                        self._stats['load_failures'] += 1
+                    return None
+                found.update(loaded)
+                self._store(loaded, started_at, [product_id for product_id in missing if product_id not in loaded])
+            finally:
+                self._load_done(started_at)
+        return found
+
+    def _load_done(self, started_at: int) -> None:
+        """Oublier les invalidations qu'aucun chargement en cours ne peut plus ignorer"""
+        with self._lock:
+            self._loads[started_at] -= 1
+            if not self._loads[started_at]:
+                del self._loads[started_at]
+            if not self._loads:
+                self._invalidated.clear()
+                return
+            oldest = min(self._loads)
+            self._invalidated = {product_id: sequence for product_id, sequence in self._invalidated.items()
+                                 if sequence > oldest}
+
+    def get(self, product_id: int, loader: ProductLoader) -> Optional[Dict]:
+        products = self.get_many([product_id], loader)
+        return products.get(product_id) if products else None
+
+    def _store(self, products: Dict[int, Dict], started_at: int, absent: List[int] = ()) -> None:
+        now = time.monotonic()
+        entries = [(product_id, product, now + self.ttl) for product_id, product in products.items()]
+        if self.negative_ttl > 0:
+            entries += [(product_id, None, now + self.negative_ttl) for product_id in absent]
+        with self._lock:
+            if self._cleared_at > started_at:
+                return
+            for product_id, product, expires_at in entries:
+                if self._invalidated.get(product_id, 0) > started_at:
+                    continue
+                self._entries[product_id] = (product, expires_at)
+                self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Invalidation
+
+    def invalidate(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        """Retirer des produits du cache, ou tout le cache si product_ids est None"""
+        with self._lock:
+            self._sequence += 1
+            if product_ids is None:
+                self._entries.clear()
+                self._invalidated.clear()
+                self._cleared_at = self._sequence
+                self._stats['resets'] += 1
+                return
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+                if self._loads:
+                    self._invalidated[product_id] = self._sequence
+                self._stats['invalidations'] += 1
+
+    def apply(self, fields: Dict) -> None:
+        """Appliquer un événement du stream (champs décodés)"""
+        version = int(fields['version'])
+        with self._lock:
+            self._stats['events'] += 1
+            previous, self._version = self._version, version
+        if previous is not None and version != previous + 1:
+            logger.warning(f"Flux produits discontinu (version {previous} -> {version}), cache vidé")
+            self.invalidate()
+        else:
+            self.invalidate([int(fields['product_id'])])
+
+    # Abonnement
+
+    def start(self) -> None:
+        """Démarrer la lecture du flux (sans Redis, seul le TTL s'applique)"""
+        if self.redis is None or self._running:
+            return
+        try:
+            # Position de départ fixée avant tout chargement : aucun événement
+            # postérieur au remplissage du cache ne peut être manqué
+            last = self.redis.xrevrange(self.stream, count=1)
+            self._last_id = _decode(last[0][0]) if last else '0-0'
+        except Exception as e:
+            logger.warning(f"Flux produits indisponible au démarrage: {e}")
+        self._running = True
+        self._thread = threading.Thread(target=self._consume, name="product-cache-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join(self.block_ms / 1000 + 1)
+            self._thread = None
+
+    def _consume(self) -> None:
+        disconnected = False
+        while self._running:
+            try:
+                messages = self.redis.xread({self.stream: self._last_id}, count=500, block=self.block_ms)
+            except Exception as e:
+                if not disconnected:
+                    logger.warning(f"Flux produits indisponible: {e}")
+                    disconnected = True
+                time.sleep(1)
+                continue
+            # Les événements manqués pendant la coupure sont relus depuis _last_id ;
+            # s'ils ont été tronqués, le trou de versions vide le cache
+            disconnected = False
+            for _, entries in messages or []:
+                for message_id, fields in entries:
+                    self._last_id = _decode(message_id)
+                    self.apply({_decode(k): _decode(v) for k, v in fields.items()})
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats, size=len(self._entries), version=self._version,
+                        hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0.0)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
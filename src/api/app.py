@@ -20,6 +20,8 @@ from .error_handlers import register_error_handlers
 from .metrics import init_prometheus_metrics
 from .structured_logging import setup_structured_logging
 from .cache import init_cache
+from .bounded_contexts.shared.events.domain_event import DomainEventPublisher, SynchronousEventTransport
+from .bounded_contexts.shared.events.event_transports import BackgroundEventTransport, RedisStreamSink
 
 
 def create_api_app():
@@ -68,6 +70,7 @@ def create_api_app():
     register_error_handlers(app)
     init_prometheus_metrics(app)
     init_cache(app)
+    configure_domain_events(app)
     
     @app.route('/api/health')
     def health_check():
@@ -132,6 +135,31 @@ def configure_api_logging(app):
         app.logger.info('Démarrage de l\'API POS Multi-Magasins')
 
 
+def configure_domain_events(app):
+    """
+    Transport des Domain Events (DOMAIN_EVENTS_TRANSPORT) :
+    sync (dans la requête), async (threads de fond, défaut) ou redis (async + Redis Streams)
+    """
+    mode = os.getenv('DOMAIN_EVENTS_TRANSPORT', 'async').lower()
+    if mode == 'sync':
+        DomainEventPublisher.configure(SynchronousEventTransport())
+        return
+    
+    sinks = [DomainEventPublisher.deliver]
+    if mode == 'redis':
+        from .cache import redis_client
+        if redis_client is not None:
+            sinks.append(RedisStreamSink(redis_client))
+        else:
+            app.logger.warning('Redis indisponible : Domain Events livrés localement uniquement')
+    
+    DomainEventPublisher.configure(BackgroundEventTransport(
+        sinks=sinks,
+        workers=int(os.getenv('DOMAIN_EVENTS_WORKERS', '2')),
+        batch_size=int(os.getenv('DOMAIN_EVENTS_BATCH_SIZE', '100'))
+    ))
+
+
 def create_app(config_name=None):
     """Factory pour créer l'application Flask - Compatible avec les tests"""
     app = create_api_app()
@@ -2,11 +2,13 @@
 Application Service pour Product Catalog
 Orchestre les opérations du domaine et coordonne avec l'infrastructure
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from decimal import Decimal
 
 from ..domain.aggregates.product import Product
-from ..domain.services.product_domain_service import ProductDomainService, IProductRepository
+from ..domain.services.product_domain_service import (
+    ProductDomainService, IProductRepository, IProductSearchIndex
+)
 from ..domain.value_objects.product_id import (
     ProductId, ProductName, ProductDescription, 
     StockQuantity, AlertThreshold
@@ -25,9 +27,11 @@ class ProductApplicationService:
     Point d'entrée pour l'API REST (remplace les anciens services métier)
     """
     
-    def __init__(self, product_repository: IProductRepository):
+    def __init__(self, product_repository: IProductRepository,
+                 search_index: Optional[IProductSearchIndex] = None):
         self._product_repository = product_repository
-        self._domain_service = ProductDomainService(product_repository)
+        self._search_index = search_index
+        self._domain_service = ProductDomainService(product_repository, search_index)
     
     def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -78,6 +82,29 @@ class ProductApplicationService:
             logger.error(f"Erreur lors de la récupération des produits: {str(e)}")
             raise
     
+    def search_products(self, search: str, page: int = 1, per_page: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        UC4 - Recherche caisse (nom ou code) classée par pertinence, paginée par l'index
+        """
+        try:
+            if not self._search_index or len(search.strip()) < 2:
+                products = self.list_products(search=search)
+                start = (page - 1) * per_page
+                return products[start:start + per_page], len(products)
+            
+            result = self._search_index.search(search, limit=per_page, offset=(page - 1) * per_page)
+            products = self._product_repository.find_by_ids(
+                [ProductId(product_id) for product_id in result.product_ids]
+            )
+            
+            logger.info(f"Recherche produits - Terme: {search}, Page: {page}, Total: {result.total}")
+            return [product.to_dict() for product in products], result.total
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de produits: {str(e)}")
+            raise
+    
+    @DomainEventPublisher.unit_of_work()
     def create_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         UC4 - Créer un nouveau produit
@@ -111,9 +138,14 @@ class ProductApplicationService:
             events = product.get_uncommitted_events()
             DomainEventPublisher.publish(events)
             
-            created_products = self._domain_service.search_products_by_name(name.value)
+            created_products = [
+                p for p in self._product_repository.find_by_name(name)
+                if p.name.value == name.value
+            ]
             if created_products:
-                created_product = created_products[0]
+                created_product = max(created_products, key=lambda p: p.id.value)
+                if self._search_index:
+                    self._search_index.index_product(created_product.id.value, created_product.name.value)
                 logger.info(f"Produit créé - ID: {created_product.id.value}, Nom: {created_product.name.value}")
                 return created_product.to_dict()
             
@@ -123,6 +155,7 @@ class ProductApplicationService:
             logger.error(f"Erreur lors de la création du produit: {str(e)}")
             raise
     
+    @DomainEventPublisher.unit_of_work()
     def update_product(self, product_id: int, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         UC4 - Mettre à jour un produit existant
@@ -163,6 +196,9 @@ class ProductApplicationService:
             
             self._product_repository.save(product)
             
+            if self._search_index:
+                self._search_index.index_product(product.id.value, product.name.value)
+            
             events = product.get_uncommitted_events()
             DomainEventPublisher.publish(events)
             
@@ -173,6 +209,7 @@ class ProductApplicationService:
             logger.error(f"Erreur lors de la mise à jour du produit {product_id}: {str(e)}")
             raise
     
+    @DomainEventPublisher.unit_of_work()
     def delete_product(self, product_id: int) -> bool:
         """
         UC4 - Supprimer un produit
@@ -191,6 +228,9 @@ class ProductApplicationService:
             
             self._product_repository.delete(domain_product_id)
             
+            if self._search_index:
+                self._search_index.remove_product(product_id)
+            
             events = product.get_uncommitted_events()
             DomainEventPublisher.publish(events)
             
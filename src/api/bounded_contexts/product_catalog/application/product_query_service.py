@@ -0,0 +1,76 @@
+"""
+Query Service pour Product Catalog (côté lecture CQRS)
+Les lectures passent par le Read Model ; l'agrégat Product reste réservé aux écritures
+"""
+from typing import List, Optional, Dict, Any, Tuple
+import logging
+
+from ..domain.services.product_domain_service import IProductSearchIndex
+from ..infrastructure.product_read_model import ProductReadModel
+
+logger = logging.getLogger(__name__)
+
+
+class ProductQueryService:
+    """
+    QUERY SERVICE : Lectures du catalogue sans invariants métier
+    Retourne les mêmes dictionnaires que ProductApplicationService
+    """
+
+    def __init__(self, read_model: ProductReadModel,
+                 search_index: Optional[IProductSearchIndex] = None):
+        self._read_model = read_model
+        self._search_index = search_index
+
+    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        """
+        UC4 - Récupérer un produit par son ID
+        """
+        view = self._read_model.get(product_id)
+        return view.to_dict() if view else None
+
+    def list_products(self,
+                      search: Optional[str] = None,
+                      category_id: Optional[int] = None,
+                      sort_field: str = 'nom',
+                      sort_order: str = 'asc',
+                      page: int = 1,
+                      per_page: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        UC4 - Lister les produits avec filtrage, tri et pagination en base
+        """
+        product_ids = None
+        name_contains = None
+        if search:
+            if len(search.strip()) < 2:
+                return [], 0
+            if self._search_index:
+                product_ids = self._search_index.search(search, limit=None).product_ids
+            else:
+                name_contains = search.strip()
+            category_id = None  # Comme ProductApplicationService : la recherche prime
+
+        offset = (page - 1) * per_page if per_page else 0
+        views, total = self._read_model.page(
+            category_id=category_id,
+            product_ids=product_ids,
+            name_contains=name_contains,
+            sort_field=sort_field,
+            sort_order=sort_order,
+            limit=per_page,
+            offset=offset
+        )
+
+        logger.info(f"Liste produits (read model) - Total: {total}, Recherche: {search}, Catégorie: {category_id}")
+        return [view.to_dict() for view in views], total
+
+    def search_products(self, search: str, page: int = 1, per_page: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        UC4 - Recherche caisse classée par pertinence, paginée par l'index
+        """
+        if not self._search_index or len(search.strip()) < 2:
+            return self.list_products(search=search, page=page, per_page=per_page)
+
+        result = self._search_index.search(search, limit=per_page, offset=(page - 1) * per_page)
+        views = self._read_model.get_many(result.product_ids)
+        return [view.to_dict() for view in views], result.total
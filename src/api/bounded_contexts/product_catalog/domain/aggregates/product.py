@@ -21,6 +21,9 @@ class ProductCreatedEvent(DomainEvent):
     product_name: str
     price: float
     
+    def aggregate_key(self) -> str:
+        return f"Product:{self.product_id.value}"
+    
     def to_dict(self):
         return {
             'event_id': self.event_id,
@@ -38,6 +41,9 @@ class ProductUpdatedEvent(DomainEvent):
     product_id: ProductId
     updated_fields: List[str]
     
+    def aggregate_key(self) -> str:
+        return f"Product:{self.product_id.value}"
+    
     def to_dict(self):
         return {
             'event_id': self.event_id,
@@ -54,6 +60,9 @@ class ProductDeletedEvent(DomainEvent):
     product_id: ProductId
     product_name: str
     
+    def aggregate_key(self) -> str:
+        return f"Product:{self.product_id.value}"
+    
     def to_dict(self):
         return {
             'event_id': self.event_id,
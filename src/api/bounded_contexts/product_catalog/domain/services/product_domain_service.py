@@ -4,6 +4,7 @@ Logique métier qui ne peut pas être placée dans un seul agrégat
 """
 from typing import List, Optional
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 
 from ..aggregates.product import Product
 from ..value_objects.product_id import ProductId, ProductName
@@ -18,6 +19,11 @@ class IProductRepository(ABC):
         """Trouver un produit par son ID"""
         pass
     
+    @abstractmethod
+    def find_by_ids(self, product_ids: List[ProductId]) -> List[Product]:
+        """Trouver des produits par IDs (dans l'ordre demandé)"""
+        pass
+    
     @abstractmethod
     def find_by_name(self, name: ProductName) -> List[Product]:
         """Trouver des produits par nom"""
@@ -49,14 +55,42 @@ class IProductRepository(ABC):
         pass
 
 
+@dataclass(frozen=True)
+class ProductSearchResult:
+    """Résultat de recherche : IDs classés par pertinence et total des correspondances"""
+    product_ids: List[int]
+    total: int
+
+
+class IProductSearchIndex(ABC):
+    """Interface pour l'index de recherche du catalogue"""
+    
+    @abstractmethod
+    def search(self, query: str, limit: Optional[int] = 20, offset: int = 0) -> ProductSearchResult:
+        """Rechercher par nom ou par code (ID produit), résultats classés et paginés"""
+        pass
+    
+    @abstractmethod
+    def index_product(self, product_id: int, name: str) -> None:
+        """Ajouter ou mettre à jour un produit dans l'index"""
+        pass
+    
+    @abstractmethod
+    def remove_product(self, product_id: int) -> None:
+        """Retirer un produit de l'index"""
+        pass
+
+
 class ProductDomainService:
     """
     Domain Service pour la logique métier complexe des produits
     qui implique plusieurs agrégats ou règles métier transversales
     """
     
-    def __init__(self, product_repository: IProductRepository):
+    def __init__(self, product_repository: IProductRepository,
+                 search_index: Optional[IProductSearchIndex] = None):
         self._product_repository = product_repository
+        self._search_index = search_index
     
     def ensure_unique_product_name(self, name: ProductName, product_id: Optional[ProductId] = None) -> None:
         """
@@ -109,6 +143,12 @@ class ProductDomainService:
         if not search_term or len(search_term.strip()) < 2:
             return []
         
+        if self._search_index:
+            result = self._search_index.search(search_term, limit=None)
+            return self._product_repository.find_by_ids(
+                [ProductId(product_id) for product_id in result.product_ids]
+            )
+        
         all_products = self._product_repository.find_all()
         search_lower = search_term.lower().strip()
         
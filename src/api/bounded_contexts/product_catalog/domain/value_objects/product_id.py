@@ -5,13 +5,13 @@ from dataclasses import dataclass
 from src.api.bounded_contexts.shared.value_objects.entity_id import EntityId
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, init=False)
 class ProductId(EntityId):
     """Value Object pour l'ID de produit"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ProductCode:
     """Value Object pour le code produit"""
     value: str
@@ -22,7 +22,7 @@ class ProductCode:
         object.__setattr__(self, 'value', self.value.strip().upper())
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ProductName:
     """Value Object pour le nom de produit"""
     value: str
@@ -35,7 +35,7 @@ class ProductName:
         object.__setattr__(self, 'value', self.value.strip())
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ProductDescription:
     """Value Object pour la description de produit"""
     value: str
@@ -47,7 +47,7 @@ class ProductDescription:
             object.__setattr__(self, 'value', self.value.strip() if self.value.strip() else None)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StockQuantity:
     """Value Object pour les quantités de stock"""
     value: int
@@ -76,7 +76,7 @@ class StockQuantity:
         return self.value == 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AlertThreshold:
     """Value Object pour le seuil d'alerte"""
     value: int
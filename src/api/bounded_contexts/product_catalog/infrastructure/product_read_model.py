@@ -0,0 +1,147 @@
+"""
+Read Model pour Product Catalog (côté requête CQRS)
+Lecture directe des colonnes, sans hydratation de l'agrégat ni des Value Objects
+"""
+from typing import List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, select
+
+from src.persistence.models import ProduitModel
+
+logger = logging.getLogger(__name__)
+
+
+class ProductView:
+    """DTO de lecture compact (__slots__), même forme que Product.to_dict()"""
+    __slots__ = ('id', 'nom', 'prix', 'stock', 'id_categorie', 'seuil_alerte', 'description')
+
+    def __init__(self, id, nom, prix, stock, id_categorie, seuil_alerte, description):
+        self.id = id
+        self.nom = nom
+        self.prix = prix
+        self.stock = stock
+        self.id_categorie = id_categorie
+        self.seuil_alerte = seuil_alerte
+        self.description = description
+
+    @classmethod
+    def from_row(cls, row) -> 'ProductView':
+        description = row.description.strip() if row.description else None
+        return cls(
+            row.id,
+            row.nom.strip(),
+            round(float(row.prix), 2),
+            row.stock,
+            row.id_categorie,
+            row.seuil_alerte,
+            description or None,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'nom': self.nom,
+            'prix': self.prix,
+            'stock': self.stock,
+            'id_categorie': self.id_categorie,
+            'seuil_alerte': self.seuil_alerte,
+            'description': self.description
+        }
+
+
+_COLUMNS = (
+    ProduitModel.id,
+    ProduitModel.nom,
+    ProduitModel.prix,
+    ProduitModel.stock,
+    ProduitModel.id_categorie,
+    ProduitModel.seuil_alerte,
+    ProduitModel.description,
+)
+
+_SORT_COLUMNS = {
+    'nom': ProduitModel.nom,
+    'prix': ProduitModel.prix,
+}
+
+
+class ProductReadModel:
+    """
+    Projection de lecture sur la table produits
+    Tri, filtrage et pagination réalisés en SQL
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    def get(self, product_id: int) -> Optional[ProductView]:
+        try:
+            row = self._session.execute(
+                select(*_COLUMNS).where(ProduitModel.id == product_id)
+            ).first()
+        except Exception as e:
+            self._on_error(e)
+            return None
+        return ProductView.from_row(row) if row else None
+
+    def get_many(self, product_ids: List[int]) -> List[ProductView]:
+        """Charger plusieurs produits en une requête IN, dans l'ordre demandé"""
+        if not product_ids:
+            return []
+        try:
+            rows = self._session.execute(
+                select(*_COLUMNS).where(ProduitModel.id.in_(product_ids))
+            ).all()
+        except Exception as e:
+            self._on_error(e)
+            return []
+        by_id = {row.id: row for row in rows}
+        return [ProductView.from_row(by_id[pid]) for pid in product_ids if pid in by_id]
+
+    def page(self,
+             category_id: Optional[int] = None,
+             product_ids: Optional[List[int]] = None,
+             name_contains: Optional[str] = None,
+             sort_field: str = 'nom',
+             sort_order: str = 'asc',
+             limit: Optional[int] = None,
+             offset: int = 0) -> Tuple[List[ProductView], int]:
+        """Page de produits triée et total des correspondances (COUNT(*) OVER())"""
+        if product_ids is not None and not product_ids:
+            return [], 0
+
+        query = select(*_COLUMNS, func.count().over().label('total'))
+        if category_id:
+            query = query.where(ProduitModel.id_categorie == category_id)
+        if product_ids is not None:
+            query = query.where(ProduitModel.id.in_(product_ids))
+        if name_contains:
+            query = query.where(ProduitModel.nom.ilike(f"%{name_contains}%"))
+
+        sort_column = _SORT_COLUMNS.get(sort_field)
+        if sort_column is not None:
+            sort_column = sort_column.desc() if sort_order == 'desc' else sort_column.asc()
+            query = query.order_by(sort_column, ProduitModel.id)
+        else:
+            query = query.order_by(ProduitModel.id)
+
+        query = query.limit(limit).offset(offset)
+        try:
+            rows = self._session.execute(query).all()
+        except Exception as e:
+            self._on_error(e)
+            return [], 0
+
+        if rows:
+            total = rows[0].total
+        elif offset:
+            total = self.page(category_id, product_ids, name_contains, sort_field, sort_order, limit=1)[1]
+        else:
+            total = 0
+        return [ProductView.from_row(row) for row in rows], total
+
+    def _on_error(self, error: Exception) -> None:
+        """Même politique que ProductRepositoryAdapter : lecture vide en cas d'erreur"""
+        self._session.rollback()
+        logger.error(f"Erreur de lecture du catalogue: {str(error)}")
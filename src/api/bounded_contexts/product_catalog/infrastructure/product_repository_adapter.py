@@ -33,6 +33,16 @@ class ProductRepositoryAdapter(IProductRepository):
         except Exception:
             return None
     
+    def find_by_ids(self, product_ids: List[ProductId]) -> List[Product]:
+        """Trouver des produits par IDs (dans l'ordre demandé)"""
+        try:
+            produits_entities = self._repo_produit.obtenir_par_ids(
+                [product_id.value for product_id in product_ids]
+            )
+            return [self._map_to_domain(entity) for entity in produits_entities]
+        except Exception:
+            return []
+    
     def find_by_name(self, name: ProductName) -> List[Product]:
         """Trouver des produits par nom"""
         try:
@@ -0,0 +1,230 @@
+"""
+Index de recherche du catalogue produits
+PostgreSQL (pg_trgm + tsvector) avec repli sur un index inversé en mémoire
+"""
+import threading
+import time
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from ..domain.services.product_domain_service import IProductSearchIndex, ProductSearchResult
+from src.persistence.models import ProduitModel
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_SIZE = 3
+
+
+def _normalize(value: str) -> str:
+    return value.lower().strip()
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + TRIGRAM_SIZE] for i in range(len(value) - TRIGRAM_SIZE + 1)}
+
+
+def _barcode(query: str) -> Optional[int]:
+    """Un code numérique saisi à la caisse correspond à l'ID produit"""
+    return int(query) if query.isdigit() else None
+
+
+class PostgresProductSearchIndex(IProductSearchIndex):
+    """
+    Recherche déléguée à PostgreSQL : ILIKE servi par l'index GIN trigramme,
+    classement par code exact, préfixe, ts_rank puis similarité
+    """
+
+    SEARCH_SQL = text("""
+        SELECT id, COUNT(*) OVER() AS total
+        FROM produits
+        WHERE nom ILIKE :pattern ESCAPE '\\' OR id = :barcode
+        ORDER BY (id = :barcode) DESC,
+                 (lower(nom) LIKE :prefix ESCAPE '\\') DESC,
+                 ts_rank(to_tsvector('simple', nom), plainto_tsquery('simple', :query)) DESC,
+                 similarity(nom, :query) DESC,
+                 nom ASC
+        LIMIT :limit OFFSET :offset
+    """)
+
+    def __init__(self, session):
+        self._session = session
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def search(self, query: str, limit: Optional[int] = 20, offset: int = 0) -> ProductSearchResult:
+        normalized = _normalize(query)
+        if not normalized:
+            return ProductSearchResult(product_ids=[], total=0)
+
+        escaped = self._escape_like(normalized)
+        rows = self._session.execute(self.SEARCH_SQL, {
+            'pattern': f"%{escaped}%",
+            'prefix': f"{escaped}%",
+            'query': normalized,
+            'barcode': _barcode(normalized) or -1,
+            'limit': limit,
+            'offset': offset,
+        }).fetchall()
+
+        total = rows[0].total if rows else 0
+        if not rows and offset:
+            # Page au-delà de la fin : le total reste nécessaire pour la pagination
+            total = self.search(query, limit=1, offset=0).total
+        return ProductSearchResult(product_ids=[row.id for row in rows], total=total)
+
+    def index_product(self, product_id: int, name: str) -> None:
+        """Les index GIN sont maintenus par PostgreSQL"""
+        pass
+
+    def remove_product(self, product_id: int) -> None:
+        """Les index GIN sont maintenus par PostgreSQL"""
+        pass
+
+
+class InMemoryProductSearchIndex(IProductSearchIndex):
+    """
+    Index inversé trigramme -> IDs produits, partagé par le processus
+    Les correspondances sont vérifiées (sous-chaîne) puis classées comme côté PostgreSQL
+    """
+
+    def __init__(self, max_age_seconds: Optional[float] = 60.0):
+        self._lock = threading.RLock()
+        self._names: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._built_at: Optional[float] = None
+        self._max_age_seconds = max_age_seconds
+
+    def is_stale(self) -> bool:
+        if self._built_at is None:
+            return True
+        if self._max_age_seconds is None:
+            return False
+        return time.monotonic() - self._built_at > self._max_age_seconds
+
+    def rebuild(self, rows: Iterable[Tuple[int, str]]) -> None:
+        """Reconstruire l'index à partir de tuples (id, nom)"""
+        names: Dict[int, str] = {}
+        postings: Dict[str, Set[int]] = {}
+        for product_id, name in rows:
+            normalized = _normalize(name)
+            names[product_id] = normalized
+            for gram in _trigrams(normalized):
+                postings.setdefault(gram, set()).add(product_id)
+
+        with self._lock:
+            self._names = names
+            self._postings = postings
+            self._built_at = time.monotonic()
+
+    def index_product(self, product_id: int, name: str) -> None:
+        with self._lock:
+            self._remove_unlocked(product_id)
+            normalized = _normalize(name)
+            self._names[product_id] = normalized
+            for gram in _trigrams(normalized):
+                self._postings.setdefault(gram, set()).add(product_id)
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            self._remove_unlocked(product_id)
+
+    def _remove_unlocked(self, product_id: int) -> None:
+        previous = self._names.pop(product_id, None)
+        if previous is None:
+            return
+        for gram in _trigrams(previous):
+            posting = self._postings.get(gram)
+            if posting:
+                posting.discard(product_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _candidates(self, normalized: str) -> Iterable[int]:
+        grams = _trigrams(normalized)
+        if not grams:
+            # Requête plus courte qu'un trigramme : parcours des noms
+            return list(self._names)
+
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, query: str, limit: Optional[int] = 20, offset: int = 0) -> ProductSearchResult:
+        normalized = _normalize(query)
+        if not normalized:
+            return ProductSearchResult(product_ids=[], total=0)
+
+        barcode = _barcode(normalized)
+        scored = []
+        with self._lock:
+            matches = {product_id for product_id in self._candidates(normalized)
+                       if normalized in self._names[product_id]}
+            if barcode is not None and barcode in self._names:
+                matches.add(barcode)
+            for product_id in matches:
+                name = self._names[product_id]
+                scored.append((self._rank(product_id, name, normalized, barcode), product_id))
+
+        scored.sort()
+        ids = [product_id for _, product_id in scored]
+        end = None if limit is None else offset + limit
+        return ProductSearchResult(product_ids=ids[offset:end], total=len(ids))
+
+    @staticmethod
+    def _rank(product_id: int, name: str, query: str, barcode: Optional[int]):
+        """Clé de tri croissante : code exact, préfixe, mot entier, similarité, nom"""
+        return (
+            product_id != barcode,
+            not name.startswith(query),
+            query not in name.split(),
+            len(name) - len(query),
+            name,
+        )
+
+    def size(self) -> int:
+        return len(self._names)
+
+
+_shared_memory_index = InMemoryProductSearchIndex()
+_postgres_search_available: Optional[bool] = None
+
+
+def _postgres_search_supported(session) -> bool:
+    global _postgres_search_available
+    if _postgres_search_available is None:
+        if session.get_bind().dialect.name != 'postgresql':
+            _postgres_search_available = False
+        else:
+            _postgres_search_available = session.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+    return _postgres_search_available
+
+
+def get_product_search_index(session) -> Optional[IProductSearchIndex]:
+    """
+    Sélectionner le backend de recherche : PostgreSQL si pg_trgm est installé,
+    sinon l'index mémoire du processus (reconstruit lorsqu'il est périmé).
+    Retourne None si la base est injoignable (recherche par parcours du catalogue)
+    """
+    try:
+        if _postgres_search_supported(session):
+            return PostgresProductSearchIndex(session)
+
+        if _shared_memory_index.is_stale():
+            rows = session.query(ProduitModel.id, ProduitModel.nom).all()
+            _shared_memory_index.rebuild(rows)
+            logger.info(f"Index de recherche mémoire reconstruit - {_shared_memory_index.size()} produits")
+        return _shared_memory_index
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Index de recherche indisponible: {str(e)}")
+        return None
@@ -2,11 +2,17 @@
 Base pour les Domain Events dans l'architecture DDD
 """
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import atexit
+import logging
+import threading
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass(frozen=True)
 class DomainEvent(ABC):
@@ -25,12 +31,45 @@ class DomainEvent(ABC):
     def to_dict(self) -> Dict[str, Any]:
         """Sérialiser l'événement en dictionnaire"""
         pass
+    
+    def aggregate_key(self) -> str:
+        """Clé d'ordonnancement : les événements de même clé sont livrés dans l'ordre"""
+        return self.event_type
+
+
+class DomainEventTransport(ABC):
+    """Acheminement des événements publiés vers les abonnés (ou un broker)"""
+
+    @abstractmethod
+    def send(self, events: List[DomainEvent]) -> None:
+        """Remettre un lot d'événements, dans l'ordre de publication"""
+        pass
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attendre la livraison des événements en attente"""
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Libérer les ressources du transport"""
+        pass
+
+
+class SynchronousEventTransport(DomainEventTransport):
+    """Livraison immédiate dans le thread appelant (comportement historique)"""
+
+    def send(self, events: List[DomainEvent]) -> None:
+        DomainEventPublisher.deliver(events)
 
 
 class DomainEventPublisher:
-    """Publisher pour les événements du domaine"""
+    """
+    Publisher pour les événements du domaine
+    Les événements publiés dans une unité de travail sont retenus puis envoyés
+    en un seul lot au transport configuré lorsque celle-ci se termine sans erreur
+    """
     _subscribers: List = []
-    _events_to_publish: List[DomainEvent] = []
+    _transport: DomainEventTransport = SynchronousEventTransport()
+    _local = threading.local()
     
     @classmethod
     def subscribe(cls, subscriber):
@@ -42,33 +81,105 @@ class DomainEventPublisher:
         """Nettoyer les abonnés (utile pour les tests)"""
         cls._subscribers.clear()
     
+    @classmethod
+    def configure(cls, transport: DomainEventTransport):
+        """Remplacer le transport (le précédent est vidé puis fermé)"""
+        previous, cls._transport = cls._transport, transport
+        if previous is not transport:
+            previous.close(timeout=5.0)
+    
+    @classmethod
+    def transport(cls) -> DomainEventTransport:
+        return cls._transport
+    
+    @classmethod
+    def shutdown(cls, timeout: Optional[float] = 5.0):
+        """Livrer les événements en attente avant l'arrêt du processus"""
+        cls._transport.close(timeout=timeout)
+    
+    @classmethod
+    @contextmanager
+    def unit_of_work(cls):
+        """
+        Retenir les événements publiés jusqu'à la fin de l'unité de travail (après le commit).
+        Utilisable comme context manager ou décorateur ; les unités imbriquées rejoignent l'unité externe
+        """
+        depth = getattr(cls._local, 'depth', 0)
+        if depth == 0:
+            cls._local.pending = []
+        cls._local.depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            if depth == 0:
+                cls._local.pending = []  # Travail annulé : les événements ne sont pas publiés
+            raise
+        finally:
+            cls._local.depth = depth
+        
+        if depth == 0:
+            events, cls._local.pending = cls._local.pending, []
+            if events:
+                cls._transport.send(events)
+    
     @classmethod
     def publish(cls, events: List[DomainEvent]):
         """Publier une liste d'événements"""
-        for event in events:
-            cls._publish_single_event(event)
+        events = list(events)
+        if not events:
+            return
+        if getattr(cls._local, 'depth', 0):
+            cls._local.pending.extend(events)
+        else:
+            cls._transport.send(events)
+    
+    @classmethod
+    def deliver(cls, events: List[DomainEvent]):
+        """
+        Livrer un lot aux abonnés : handle_batch() si l'abonné le propose,
+        sinon handle() événement par événement dans l'ordre du lot
+        """
+        for subscriber in list(cls._subscribers):
+            handle_batch = getattr(subscriber, 'handle_batch', None)
+            if handle_batch is not None:
+                try:
+                    handle_batch(events)
+                except Exception as e:
+                    logger.error(f"Error handling batch of {len(events)} events: {str(e)}")
+                continue
+            for event in events:
+                try:
+                    subscriber.handle(event)
+                except Exception as e:
+                    # Log l'erreur mais ne bloque pas les autres subscribers
+                    logger.error(f"Error handling event {event.event_type}: {str(e)}")
     
     @classmethod
     def _publish_single_event(cls, event: DomainEvent):
         """Publier un seul événement à tous les abonnés"""
-        for subscriber in cls._subscribers:
-            try:
-                subscriber.handle(event)
-            except Exception as e:
-                # Log l'erreur mais ne bloque pas les autres subscribers
-                print(f"Error handling event {event.event_type}: {str(e)}")
+        cls.deliver([event])
     
     @classmethod
     def collect_events(cls, event: DomainEvent):
         """Collecter un événement pour publication ultérieure"""
-        cls._events_to_publish.append(event)
+        cls._collected().append(event)
     
     @classmethod
     def publish_collected_events(cls):
         """Publier tous les événements collectés"""
-        events_to_publish = cls._events_to_publish.copy()
-        cls._events_to_publish.clear()
+        collected = cls._collected()
+        events_to_publish = collected.copy()
+        collected.clear()
         cls.publish(events_to_publish)
+    
+    @classmethod
+    def _collected(cls) -> List[DomainEvent]:
+        if not hasattr(cls._local, 'collected'):
+            cls._local.collected = []
+        return cls._local.collected
+
+
+atexit.register(DomainEventPublisher.shutdown)
 
 
 class DomainEventHandler(ABC):
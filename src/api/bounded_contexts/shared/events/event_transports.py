@@ -0,0 +1,153 @@
+"""
+Transports asynchrones pour les Domain Events
+Livraison par lots hors du thread de la requête, ordre conservé par agrégat
+"""
+from typing import Callable, Dict, List, Optional, Sequence
+import json
+import logging
+import queue
+import threading
+import time
+
+from .domain_event import DomainEvent, DomainEventPublisher, DomainEventTransport
+
+logger = logging.getLogger(__name__)
+
+EventSink = Callable[[List[DomainEvent]], None]
+
+_STOP = object()
+
+
+class BackgroundEventTransport(DomainEventTransport):
+    """
+    Files en mémoire consommées par des threads de fond.
+    Chaque agrégat est affecté à un seul worker (hash de aggregate_key), ce qui
+    préserve l'ordre de ses événements ; un worker regroupe jusqu'à batch_size
+    événements ou attend au plus max_delay secondes avant de livrer le lot aux sinks
+    """
+
+    def __init__(self,
+                 sinks: Optional[Sequence[EventSink]] = None,
+                 workers: int = 1,
+                 batch_size: int = 100,
+                 max_delay: float = 0.05,
+                 max_queue: int = 10_000):
+        if workers < 1 or batch_size < 1:
+            raise ValueError("workers and batch_size must be positive")
+        self._sinks = list(sinks) if sinks else [DomainEventPublisher.deliver]
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._queues = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._stats = {'events_sent': 0, 'events_delivered': 0, 'batches': 0, 'sink_errors': 0}
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, args=(q,), name=f"domain-events-{i}", daemon=True)
+            for i, q in enumerate(self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def send(self, events: List[DomainEvent]) -> None:
+        if not events:
+            return
+        with self._idle:
+            self._pending += len(events)
+            self._stats['events_sent'] += len(events)
+        if self._closed:
+            # Transport remplacé pendant la requête : livraison dans le thread appelant
+            self._dispatch(list(events))
+            return
+        for event in events:
+            # File pleine : la publication attend (back-pressure) plutôt que de perdre l'événement
+            self._queues[self._shard(event)].put(event)
+
+    def _shard(self, event: DomainEvent) -> int:
+        return hash(event.aggregate_key()) % len(self._queues)
+
+    def _run(self, events_queue: queue.Queue) -> None:
+        while True:
+            first = events_queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self._max_delay
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = events_queue.get(timeout=remaining) if remaining > 0 else events_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[DomainEvent]) -> None:
+        errors = 0
+        for sink in self._sinks:
+            try:
+                sink(batch)
+            except Exception as e:
+                errors += 1
+                logger.error(f"Échec de livraison d'un lot de {len(batch)} événements: {str(e)}")
+
+        with self._idle:
+            self._pending -= len(batch)
+            self._stats['events_delivered'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['sink_errors'] += errors
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        for events_queue in self._queues:
+            events_queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._idle:
+            return dict(self._stats, pending=self._pending)
+
+
+class RedisStreamSink:
+    """
+    Sink Redis Streams : un pipeline XADD par lot, au même format que les
+    services event-driven (stream events:<type> et stream global events:all)
+    """
+
+    def __init__(self, redis_client, stream_prefix: str = 'events', maxlen: Optional[int] = 100_000):
+        self._redis = redis_client
+        self._stream_prefix = stream_prefix
+        self._maxlen = maxlen
+
+    def __call__(self, events: List[DomainEvent]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for event in events:
+            fields = {
+                'event_id': event.event_id,
+                'event_type': event.event_type,
+                'aggregate_id': event.aggregate_key(),
+                'data': json.dumps(event.to_dict(), default=str),
+                'timestamp': event.occurred_on.isoformat(),
+            }
+            pipeline.xadd(f"{self._stream_prefix}:{event.event_type.lower()}", fields,
+                          maxlen=self._maxlen, approximate=True)
+            pipeline.xadd(f"{self._stream_prefix}:all", fields, maxlen=self._maxlen, approximate=True)
+        pipeline.execute()
@@ -1,54 +1,76 @@
 """
 Value Objects partagés pour les identifiants d'entités
+Compacts (__slots__), immuables, et internés pour les petits IDs
 """
 from dataclasses import dataclass
-from typing import Union
+from typing import Dict, Tuple
 import uuid
 
 
-@dataclass(frozen=True)
+# Les IDs jusqu'à cette valeur sont partagés : ProductId(42) renvoie toujours la même instance
+INTERN_MAX_ID = 65_536
+
+_interned: Dict[Tuple[type, int], 'EntityId'] = {}
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class EntityId:
     """Value Object de base pour les identifiants d'entités"""
     value: int
-    
-    def __post_init__(self):
-        if not isinstance(self.value, int) or self.value <= 0:
+
+    def __new__(cls, value: int):
+        # Validation avant le cache : 1.0 et True sont égaux à 1 comme clés de dictionnaire
+        if type(value) is not int or value <= 0:
             raise ValueError("Entity ID must be a positive integer")
 
+        key = (cls, value)
+        cached = _interned.get(key)
+        if cached is not None:
+            return cached
 
-@dataclass(frozen=True)
+        instance = object.__new__(cls)
+        object.__setattr__(instance, 'value', value)
+        if value <= INTERN_MAX_ID:
+            instance = _interned.setdefault(key, instance)
+        return instance
+
+    def __getnewargs__(self):
+        return (self.value,)
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class StoreId(EntityId):
     """Value Object pour l'ID de magasin/entité"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, init=False)
 class CashierId(EntityId):
     """Value Object pour l'ID de caissier"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, init=False)
 class CategoryId(EntityId):
     """Value Object pour l'ID de catégorie"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True, init=False)
 class UserId(EntityId):
     """Value Object pour l'ID d'utilisateur"""
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GeneratedId:
     """Value Object pour les IDs générés automatiquement"""
     value: str
-    
+
     @classmethod
     def generate(cls) -> 'GeneratedId':
         return cls(str(uuid.uuid4()))
-    
+
     def __post_init__(self):
         if not self.value or not isinstance(self.value, str):
-            raise ValueError("Generated ID must be a non-empty string") 
\ No newline at end of file
+            raise ValueError("Generated ID must be a non-empty string")
@@ -1,16 +1,17 @@
 """
 Value Object pour représenter l'argent avec validation métier
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal
 from typing import Union
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Money:
     """Value Object pour représenter une valeur monétaire"""
     amount: Decimal
     currency: str = "CAD"
+    _hash: int = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if not isinstance(self.amount, Decimal):
@@ -21,6 +22,12 @@ class Money:
         
         if not self.currency or len(self.currency) != 3:
             raise ValueError("Currency must be a 3-character code")
+        
+        # Le hash d'un Decimal est coûteux : calculé une seule fois
+        object.__setattr__(self, '_hash', hash((self.amount, self.currency)))
+    
+    def __hash__(self):
+        return self._hash
     
     def add(self, other: 'Money') -> 'Money':
         """Additionner deux montants de même devise"""
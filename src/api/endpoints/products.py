@@ -9,7 +9,10 @@ from ...persistence.database import get_db_session
 from ..auth import auth_token
 from ..models import product_model, product_create_model, product_update_model, error_model
 from ..bounded_contexts.product_catalog.application.product_application_service import ProductApplicationService
+from ..bounded_contexts.product_catalog.application.product_query_service import ProductQueryService
 from ..bounded_contexts.product_catalog.infrastructure.product_repository_adapter import ProductRepositoryAdapter
+from ..bounded_contexts.product_catalog.infrastructure.product_search_index import get_product_search_index
+from ..bounded_contexts.product_catalog.infrastructure.product_read_model import ProductReadModel
 from ..cache import cache_endpoint, get_cache_timeout, invalidate_cache_pattern
 import logging
 from werkzeug.exceptions import NotFound
@@ -42,7 +45,7 @@ class ProductListResource(Resource):
     @ns_products.param('per_page', 'Éléments par page (défaut: 20, max: 100)', type=int)
     @ns_products.param('search', 'Recherche par nom de produit', type=str)
     @ns_products.param('category', 'Filtrer par identifiant de catégorie', type=int)
-    @ns_products.param('sort', 'Tri: nom,asc|nom,desc|prix,asc|prix,desc (défaut: nom,asc)', type=str)
+    @ns_products.param('sort', 'Tri: nom,asc|nom,desc|prix,asc|prix,desc (défaut: nom,asc, pertinence avec search)', type=str)
     @cache_endpoint(timeout=get_cache_timeout('products_list'), key_prefix='products_')
     @auth_token
     def get(self):
@@ -60,22 +63,24 @@ class ProductListResource(Resource):
         
         session = get_db_session()
         try:
-            product_repo = ProductRepositoryAdapter(session)
-            product_service = ProductApplicationService(product_repo)
-            
-            search_term = search if search else None
-            tous_produits = product_service.list_products(
-                search=search_term,
-                category_id=category,
-                sort_field=sort_field,
-                sort_order=sort_order
+            # Lecture CQRS : read model sans hydratation de l'agrégat Product
+            query_service = ProductQueryService(
+                ProductReadModel(session),
+                search_index=get_product_search_index(session) if search else None
             )
             
-            # Pagination (reste au niveau API)
-            total = len(tous_produits)
-            start = (page - 1) * per_page
-            end = start + per_page
-            produits_page = tous_produits[start:end]
+            if search and 'sort' not in request.args:
+                # Recherche caisse : classement par pertinence, pagination par l'index
+                produits_page, total = query_service.search_products(search, page, per_page)
+            else:
+                produits_page, total = query_service.list_products(
+                    search=search if search else None,
+                    category_id=category,
+                    sort_field=sort_field,
+                    sort_order=sort_order,
+                    page=page,
+                    per_page=per_page
+                )
             
             pages = (total + per_page - 1) // per_page if total > 0 else 1
             has_prev = page > 1
@@ -136,7 +141,9 @@ class ProductListResource(Resource):
         session = get_db_session()
         try:
             product_repo = ProductRepositoryAdapter(session)
-            product_service = ProductApplicationService(product_repo)
+            product_service = ProductApplicationService(
+                product_repo, search_index=get_product_search_index(session)
+            )
             
             # Préparation des données
             product_data = {
@@ -179,10 +186,9 @@ class ProductResource(Resource):
         """
         session = get_db_session()
         try:
-            product_repo = ProductRepositoryAdapter(session)
-            product_service = ProductApplicationService(product_repo)
+            query_service = ProductQueryService(ProductReadModel(session))
             
-            response = product_service.get_product_by_id(product_id)
+            response = query_service.get_product_by_id(product_id)
             
             if not response:
                 raise NotFound(description=f'Produit avec l\'ID {product_id} introuvable')
@@ -213,7 +219,9 @@ class ProductResource(Resource):
         session = get_db_session()
         try:
             product_repo = ProductRepositoryAdapter(session)
-            product_service = ProductApplicationService(product_repo)
+            product_service = ProductApplicationService(
+                product_repo, search_index=get_product_search_index(session)
+            )
             
             # Préparer les données de mise à jour
             updates = {}
@@ -251,7 +259,9 @@ class ProductResource(Resource):
         session = get_db_session()
         try:
             product_repo = ProductRepositoryAdapter(session)
-            product_service = ProductApplicationService(product_repo)
+            product_service = ProductApplicationService(
+                product_repo, search_index=get_product_search_index(session)
+            )
             
             success = product_service.delete_product(product_id)
             
@@ -0,0 +1,335 @@
+"""
+Catalogue local de la caisse (SQLite)
+Instantané des produits synchronisé par deltas (date_modification) et file de ventes hors ligne
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List, Optional, Tuple
+import json
+import logging
+import sqlite3
+import threading
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from ..domain.entities import Categorie, LigneVente, Produit
+from ..persistence.models import CategorieModel, ProduitModel
+
+logger = logging.getLogger(__name__)
+
+# Recouvrement appliqué au filigrane : tolère les écarts d'horloge entre écrivains
+MARGE_SYNCHRO = timedelta(seconds=5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS produits (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    prix TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    seuil_alerte INTEGER NOT NULL,
+    id_categorie INTEGER NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_produits_categorie ON produits (id_categorie);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT
+);
+CREATE TABLE IF NOT EXISTS ventes_en_attente (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_caisse INTEGER NOT NULL,
+    id_caissier INTEGER NOT NULL,
+    id_entite INTEGER NOT NULL,
+    lignes TEXT NOT NULL,
+    horodatage TEXT NOT NULL,
+    statut TEXT NOT NULL DEFAULT 'EN_ATTENTE',
+    erreur TEXT
+);
+"""
+
+_COLONNES_PRODUIT = "p.id, p.nom, p.prix, p.stock, p.seuil_alerte, p.id_categorie, p.description, c.nom, c.description"
+
+
+def est_erreur_connexion(erreur: Exception) -> bool:
+    """Base injoignable ou connexion perdue (par opposition à un refus métier)"""
+    return isinstance(erreur, (OperationalError, InterfaceError)) or getattr(erreur, 'connection_invalidated', False)
+
+
+class CatalogueLocal:
+    """
+    Instantané SQLite du catalogue pour la caisse.
+    Les recherches sont servies localement (index FTS5 trigramme sur le nom) ;
+    la base centrale n'est interrogée que par la synchronisation en arrière-plan
+    """
+
+    def __init__(self, chemin: str = ':memory:', intervalle_rapprochement: float = 600.0):
+        self._chemin = chemin
+        self._intervalle_rapprochement = intervalle_rapprochement
+        self._verrou = threading.RLock()
+        self._connexion: Optional[sqlite3.Connection] = None
+        self._fts = False
+        self._dernier_rapprochement: Optional[datetime] = None
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def connexion(self) -> sqlite3.Connection:
+        """Ouverture paresseuse de la base locale"""
+        with self._verrou:
+            if self._connexion is None:
+                connexion = sqlite3.connect(self._chemin, check_same_thread=False)
+                connexion.execute("PRAGMA journal_mode=WAL")
+                connexion.execute("PRAGMA synchronous=NORMAL")
+                connexion.executescript(_SCHEMA)
+                try:
+                    connexion.execute(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS produits_fts USING fts5(nom, tokenize='trigram')"
+                    )
+                    self._fts = True
+                except sqlite3.OperationalError:
+                    # SQLite sans FTS5 trigramme (< 3.34) : recherche par LIKE
+                    self._fts = False
+                connexion.commit()
+                self._connexion = connexion
+            return self._connexion
+
+    # --- Lecture locale -------------------------------------------------
+
+    def est_pret(self) -> bool:
+        """Au moins une synchronisation complète a eu lieu"""
+        return self._lire_meta('filigrane') is not None
+
+    def obtenir(self, produit_id: int) -> Optional[Produit]:
+        with self._verrou:
+            ligne = self.connexion.execute(
+                f"SELECT {_COLONNES_PRODUIT} FROM produits p "
+                f"LEFT JOIN categories c ON c.id = p.id_categorie WHERE p.id = ?",
+                (produit_id,)
+            ).fetchone()
+        return self._vers_produit(ligne) if ligne else None
+
+    def rechercher(self, critere: str, valeur: str) -> List[Produit]:
+        """Même sémantique que RepositoryProduit.rechercher (id exact, nom/catégorie contient)"""
+        if critere == "id":
+            produit = self.obtenir(int(valeur))
+            return [produit] if produit else []
+
+        motif = f"%{valeur}%"
+        requete = f"SELECT {_COLONNES_PRODUIT} FROM produits p LEFT JOIN categories c ON c.id = p.id_categorie "
+        if critere == "nom":
+            if self._fts and len(valeur) >= 3:
+                requete += "WHERE p.id IN (SELECT rowid FROM produits_fts WHERE nom LIKE ?)"
+            else:
+                requete += "WHERE p.nom LIKE ?"
+        elif critere == "categorie":
+            requete += "WHERE c.nom LIKE ?"
+        else:
+            return []
+
+        with self._verrou:
+            lignes = self.connexion.execute(requete + " ORDER BY p.id", (motif,)).fetchall()
+        return [self._vers_produit(ligne) for ligne in lignes]
+
+    @staticmethod
+    def _vers_produit(ligne) -> Produit:
+        categorie = Categorie(id=ligne[5], nom=ligne[7], description=ligne[8]) if ligne[7] is not None else None
+        return Produit(
+            id=ligne[0],
+            nom=ligne[1],
+            prix=Decimal(ligne[2]),
+            stock=ligne[3],
+            id_categorie=ligne[5],
+            seuil_alerte=ligne[4],
+            description=ligne[6],
+            categorie=categorie
+        )
+
+    # --- Synchronisation -------------------------------------------------
+
+    def synchroniser(self, session) -> Optional[int]:
+        """
+        Appliquer les produits modifiés depuis le dernier filigrane.
+        Retourne le nombre de produits reçus, ou None si la base est injoignable
+        """
+        filigrane = self._lire_meta('filigrane')
+        try:
+            requete = session.query(
+                ProduitModel.id, ProduitModel.nom, ProduitModel.prix, ProduitModel.stock,
+                ProduitModel.seuil_alerte, ProduitModel.id_categorie, ProduitModel.description,
+                ProduitModel.date_modification
+            )
+            depuis = datetime.fromisoformat(filigrane) if filigrane else datetime.min
+            if depuis > datetime.min + MARGE_SYNCHRO:
+                requete = requete.filter(ProduitModel.date_modification >= depuis - MARGE_SYNCHRO)
+            produits = requete.all()
+            categories = session.query(CategorieModel.id, CategorieModel.nom, CategorieModel.description).all()
+
+            identifiants = None
+            maintenant = datetime.now()
+            if filigrane is None or self._rapprochement_du(maintenant):
+                identifiants = {row[0] for row in session.query(ProduitModel.id).all()}
+            session.rollback()  # Lecture seule : libérer la transaction
+        except Exception as e:
+            session.rollback()
+            logger.warning(f"Synchronisation du catalogue impossible: {str(e)}")
+            return None
+
+        nouveau_filigrane = max((p.date_modification for p in produits), default=None)
+        with self._verrou:
+            connexion = self.connexion
+            connexion.executemany(
+                "INSERT OR REPLACE INTO categories (id, nom, description) VALUES (?, ?, ?)",
+                [tuple(c) for c in categories]
+            )
+            connexion.executemany(
+                "INSERT OR REPLACE INTO produits (id, nom, prix, stock, seuil_alerte, id_categorie, description) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(p.id, p.nom, str(p.prix), p.stock, p.seuil_alerte, p.id_categorie, p.description) for p in produits]
+            )
+            if self._fts and produits:
+                connexion.executemany("DELETE FROM produits_fts WHERE rowid = ?", [(p.id,) for p in produits])
+                connexion.executemany("INSERT INTO produits_fts (rowid, nom) VALUES (?, ?)",
+                                      [(p.id, p.nom) for p in produits])
+            if identifiants is not None:
+                self._supprimer_absents(connexion, identifiants)
+                self._dernier_rapprochement = maintenant
+            if nouveau_filigrane is not None:
+                self._ecrire_meta('filigrane', nouveau_filigrane.isoformat())
+            elif filigrane is None:
+                self._ecrire_meta('filigrane', datetime.min.isoformat())
+            connexion.commit()
+
+        if produits:
+            logger.info(f"Catalogue local synchronisé - {len(produits)} produit(s) reçu(s)")
+        return len(produits)
+
+    def _rapprochement_du(self, maintenant: datetime) -> bool:
+        if self._dernier_rapprochement is None:
+            return True
+        return (maintenant - self._dernier_rapprochement).total_seconds() >= self._intervalle_rapprochement
+
+    def _supprimer_absents(self, connexion: sqlite3.Connection, identifiants: set) -> None:
+        """Les suppressions n'ont pas de date_modification : rapprochement des IDs"""
+        locaux = {row[0] for row in connexion.execute("SELECT id FROM produits")}
+        absents = [(produit_id,) for produit_id in locaux - identifiants]
+        if absents:
+            connexion.executemany("DELETE FROM produits WHERE id = ?", absents)
+            if self._fts:
+                connexion.executemany("DELETE FROM produits_fts WHERE rowid = ?", absents)
+
+    def _lire_meta(self, cle: str) -> Optional[str]:
+        with self._verrou:
+            ligne = self.connexion.execute("SELECT valeur FROM meta WHERE cle = ?", (cle,)).fetchone()
+        return ligne[0] if ligne else None
+
+    def _ecrire_meta(self, cle: str, valeur: str) -> None:
+        self.connexion.execute("INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)", (cle, valeur))
+
+    # --- Ventes hors ligne -------------------------------------------------
+
+    def mettre_vente_en_attente(self, panier: List[LigneVente], id_caisse: int,
+                                id_caissier: int, id_entite: int) -> int:
+        """Enregistrer localement une vente non transmise ; retourne son numéro d'attente"""
+        lignes = [
+            {'id_produit': ligne.produit.id, 'nom': ligne.produit.nom, 'prix': str(ligne.produit.prix),
+             'id_categorie': ligne.produit.id_categorie, 'qte': ligne.qte}
+            for ligne in panier
+        ]
+        with self._verrou:
+            curseur = self.connexion.execute(
+                "INSERT INTO ventes_en_attente (id_caisse, id_caissier, id_entite, lignes, horodatage) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (id_caisse, id_caissier, id_entite, json.dumps(lignes), datetime.now().isoformat())
+            )
+            self.connexion.commit()
+        return curseur.lastrowid
+
+    def nombre_ventes_en_attente(self) -> int:
+        with self._verrou:
+            return self.connexion.execute(
+                "SELECT COUNT(*) FROM ventes_en_attente WHERE statut = 'EN_ATTENTE'"
+            ).fetchone()[0]
+
+    def vider_ventes_en_attente(self, service_vente, taille_lot: int = 50) -> Tuple[int, int]:
+        """
+        Transmettre les ventes en attente, dans l'ordre, par lots de taille_lot.
+        Une vente refusée (stock insuffisant...) est marquée REJETEE ; une erreur
+        de connexion interrompt le lot. Retourne (transmises, rejetées)
+        """
+        with self._verrou:
+            attente = self.connexion.execute(
+                "SELECT id, id_caisse, id_caissier, id_entite, lignes, horodatage FROM ventes_en_attente "
+                "WHERE statut = 'EN_ATTENTE' ORDER BY id LIMIT ?",
+                (taille_lot,)
+            ).fetchall()
+
+        transmises, rejetees = 0, 0
+        for numero, id_caisse, id_caissier, id_entite, lignes, horodatage in attente:
+            panier = [
+                LigneVente(
+                    produit=Produit(id=l['id_produit'], nom=l['nom'], prix=Decimal(l['prix']),
+                                    stock=0, id_categorie=l['id_categorie']),
+                    qte=l['qte']
+                )
+                for l in json.loads(lignes)
+            ]
+            try:
+                service_vente.creer_vente(panier, id_caisse, id_caissier, id_entite,
+                                          horodatage=datetime.fromisoformat(horodatage))
+            except Exception as e:
+                if est_erreur_connexion(e):
+                    logger.warning(f"Transmission des ventes interrompue: {str(e)}")
+                    break
+                with self._verrou:
+                    self.connexion.execute(
+                        "UPDATE ventes_en_attente SET statut = 'REJETEE', erreur = ? WHERE id = ?",
+                        (str(e), numero)
+                    )
+                    self.connexion.commit()
+                rejetees += 1
+                continue
+
+            with self._verrou:
+                self.connexion.execute("DELETE FROM ventes_en_attente WHERE id = ?", (numero,))
+                self.connexion.commit()
+            transmises += 1
+
+        if transmises or rejetees:
+            logger.info(f"Ventes hors ligne transmises: {transmises}, rejetées: {rejetees}")
+        return transmises, rejetees
+
+    # --- Tâche de fond -------------------------------------------------
+
+    def demarrer(self, session_factory: Callable, service_vente_factory: Callable,
+                 intervalle: float = 30.0) -> None:
+        """Synchroniser le catalogue et transmettre les ventes en attente toutes les `intervalle` secondes"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(
+            target=self._boucle, args=(session_factory, service_vente_factory, intervalle),
+            name="catalogue-local", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self, timeout: Optional[float] = 5.0) -> None:
+        self._arret.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _boucle(self, session_factory: Callable, service_vente_factory: Callable, intervalle: float) -> None:
+        while not self._arret.is_set():
+            session = session_factory()
+            try:
+                if self.synchroniser(session) is not None and self.nombre_ventes_en_attente():
+                    self.vider_ventes_en_attente(service_vente_factory(session))
+            except Exception as e:
+                logger.error(f"Erreur de la synchronisation du catalogue local: {str(e)}")
+            finally:
+                session.close()
+            self._arret.wait(intervalle)
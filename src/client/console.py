@@ -1,13 +1,15 @@
 from typing import List
 from decimal import Decimal
+import os
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 
-from ..persistence.database import get_db_session
+from ..persistence.database import get_db_session, SessionLocal
 from ..domain.services import ServiceProduit, ServiceVente, ServiceInventaire, ServiceApprovisionnement, ServiceRapport
 from ..persistence.repositories import RepositoryCaisse, RepositoryEntite
 from ..domain.entities import LigneVente, Produit, TypeEntite
+from .catalogue_local import CatalogueLocal, est_erreur_connexion
 
 console = Console()
 
@@ -27,6 +29,8 @@ class ApplicationConsole:
         self.id_entite = None  # ID de l'entité (magasin) courante
         self.entite = None  # Entité courante
         self.panier: List[LigneVente] = []
+        # Catalogue local : recherches sans aller-retour vers PostgreSQL, ventes mises en attente hors ligne
+        self.catalogue = CatalogueLocal(os.environ.get('CATALOGUE_LOCAL_PATH', 'catalogue_caisse.sqlite'))
 
     def selectionner_caisse_et_caissier(self):
         """Permettre à l'utilisateur de sélectionner sa caisse et son identité"""
@@ -153,7 +157,10 @@ class ApplicationConsole:
             return
 
         try:
-            produits = self.service_produit.rechercher(critere, valeur)
+            if self.catalogue.est_pret():
+                produits = self.catalogue.rechercher(critere, valeur)
+            else:
+                produits = self.service_produit.rechercher(critere, valeur)
             self.afficher_produits(produits)
         except Exception as e:
             console.print(f"[red]Erreur: {e}[/red]")
@@ -188,7 +195,9 @@ class ApplicationConsole:
             produit_id = int(console.input("ID du produit: "))
             quantite = int(console.input("Quantité: "))
 
-            produit = self.service_produit.repo_produit.obtenir_par_id(produit_id)
+            produit = self.catalogue.obtenir(produit_id) if self.catalogue.est_pret() else None
+            if not produit:
+                produit = self.service_produit.repo_produit.obtenir_par_id(produit_id)
             if not produit:
                 console.print("[red]Produit introuvable[/red]")
                 return
@@ -245,6 +254,14 @@ class ApplicationConsole:
             self.panier.clear()
 
         except Exception as e:
+            if est_erreur_connexion(e):
+                numero = self.catalogue.mettre_vente_en_attente(
+                    self.panier, self.id_caisse, self.id_caissier, self.id_entite
+                )
+                console.print(f"[yellow]⚠ Base indisponible : vente mise en attente (#{numero}), "
+                              f"elle sera transmise automatiquement[/yellow]")
+                self.panier.clear()
+                return
             console.print(f"[red]Erreur lors de la vente: {e}[/red]")
 
     def retourner_vente(self):
@@ -708,6 +725,8 @@ class ApplicationConsole:
             console.print("[red]Impossible de configurer la caisse après plusieurs tentatives. Arrêt.[/red]")
             return
 
+        self.demarrer_catalogue_local()
+
         while True:
             try:
                 self.afficher_menu_principal()
@@ -782,6 +801,20 @@ class ApplicationConsole:
             except Exception as e:
                 console.print(f"[red]Erreur inattendue: {e}[/red]")
 
+    def demarrer_catalogue_local(self):
+        """Synchroniser le catalogue local puis le tenir à jour en arrière-plan"""
+        recus = self.catalogue.synchroniser(self.session)
+        if recus is not None:
+            console.print(f"[green]✓ Catalogue local synchronisé ({recus} produit(s))[/green]")
+        elif self.catalogue.est_pret():
+            console.print("[yellow]⚠ Base indisponible : utilisation du catalogue local[/yellow]")
+        self.catalogue.demarrer(
+            SessionLocal, ServiceVente,
+            intervalle=float(os.environ.get('CATALOGUE_SYNC_INTERVAL', '30'))
+        )
+
     def __del__(self):
+        if hasattr(self, 'catalogue'):
+            self.catalogue.arreter(timeout=1.0)
         if hasattr(self, 'session'):
             self.session.close()
@@ -114,8 +114,12 @@ class ServiceVente:
         self.repo_vente = RepositoryVente(session)
 
     def creer_vente(self, panier: List[LigneVente], id_caisse: int,
-                    id_caissier: int, id_entite: int) -> Optional[Vente]:
-        """Créer une nouvelle vente avec gestion des transactions"""
+                    id_caissier: int, id_entite: int,
+                    horodatage: Optional[datetime] = None) -> Optional[Vente]:
+        """
+        Créer une nouvelle vente avec gestion des transactions.
+        horodatage : moment réel de la vente (vente hors ligne transmise plus tard), maintenant par défaut
+        """
         logger.info(f"Début création vente - Caisse: {id_caisse}, Caissier: {id_caissier}, Entité: {id_entite}")
         
         try:
@@ -134,7 +138,7 @@ class ServiceVente:
 
             vente = Vente(
                 id=None,
-                horodatage=datetime.now(),
+                horodatage=horodatage or datetime.now(),
                 id_caisse=id_caisse,
                 id_caissier=id_caissier,
                 id_entite=id_entite,
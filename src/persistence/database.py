@@ -37,6 +37,45 @@ def create_tables():
     """Créer toutes les tables de la base de données"""
     wait_for_db()
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    create_search_indexes()
+
+
+def migrate_schema():
+    """Ajouter les colonnes introduites après la création initiale du schéma"""
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE produits ADD COLUMN IF NOT EXISTS "
+            "date_modification TIMESTAMP NOT NULL DEFAULT now()"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_produit_date_modification "
+            "ON produits (date_modification)"
+        ))
+
+
+def create_search_indexes():
+    """Créer les index de recherche produits (pg_trgm + tsvector) sur PostgreSQL"""
+    if engine.dialect.name != 'postgresql':
+        return False
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_produit_nom_trgm "
+                "ON produits USING gin (nom gin_trgm_ops)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_produit_nom_fts "
+                "ON produits USING gin (to_tsvector('simple', nom))"
+            ))
+        return True
+    except Exception as e:
+        # Sans pg_trgm, la recherche se replie sur l'index en mémoire
+        print(f"Index de recherche PostgreSQL non créés: {e}")
+        return False
 
 
 def get_db_session():
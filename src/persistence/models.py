@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -61,6 +62,9 @@ class ProduitModel(Base):
     seuil_alerte = Column(Integer, nullable=False, default=5)
     id_categorie = Column(Integer, ForeignKey('categories.id'), nullable=False)
     description = Column(String(500), nullable=True)
+    # Horodatage de dernière modification : synchronisation incrémentale des caisses (updated_since)
+    date_modification = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                               server_default=func.now())
 
     categorie = relationship("CategorieModel", back_populates="produits")
     lignes_vente = relationship("LigneVenteModel", back_populates="produit")
@@ -195,4 +199,5 @@ class RapportModel(Base):
 Index('idx_vente_entite_date', VenteModel.id_entite, VenteModel.horodatage)
 Index('idx_stock_entite_produit', StockEntiteModel.id_entite, StockEntiteModel.id_produit)
 Index('idx_produit_nom', ProduitModel.nom)
+Index('idx_produit_date_modification', ProduitModel.date_modification)
 Index('idx_demande_statut', DemandeApprovisionnementModel.statut)
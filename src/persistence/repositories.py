@@ -23,6 +23,16 @@ class RepositoryProduit:
             ProduitModel.id == produit_id).first()
         return self._model_to_entity(model) if model else None
 
+    def obtenir_par_ids(self, produit_ids: List[int]) -> List[Produit]:
+        """Récupérer plusieurs produits en une requête IN, dans l'ordre demandé"""
+        if not produit_ids:
+            return []
+        models = self.session.query(ProduitModel).filter(
+            ProduitModel.id.in_(produit_ids)).all()
+        par_id = {model.id: model for model in models}
+        return [self._model_to_entity(par_id[produit_id])
+                for produit_id in produit_ids if produit_id in par_id]
+
     def rechercher(self, critere: str, valeur: str) -> List[Produit]:
         query = self.session.query(ProduitModel)
 
@@ -4,7 +4,7 @@ Interface web simplifiée - UC3 et UC8 uniquement
 Système POS Multi-Magasins
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, flash
 from datetime import datetime, timedelta
 import json
 import logging
@@ -15,6 +15,7 @@ from ..persistence.database import get_db_session
 from ..domain.services import ServiceTableauBord
 from ..persistence.repositories import RepositoryEntite
 from ..domain.entities import TypeEntite
+from .diffusion_indicateurs import DiffuseurIndicateurs
 
 
 def create_app():
@@ -30,6 +31,20 @@ def create_app():
         datetime=datetime
     )
     
+    def calculer_indicateurs():
+        session = get_db_session()
+        try:
+            return ServiceTableauBord(session).obtenir_indicateurs_performance()
+        finally:
+            session.close()
+    
+    # Un seul calcul par intervalle, partagé par toutes les pages et tous les flux SSE
+    diffuseur = DiffuseurIndicateurs(
+        calculer_indicateurs,
+        intervalle=float(os.getenv('DASHBOARD_REFRESH_INTERVAL', '15'))
+    )
+    app.extensions['diffuseur_indicateurs'] = diffuseur
+    
     @app.route('/')
     def index():
         """Page d'accueil - Interface web légère pour supervision"""
@@ -41,21 +56,31 @@ def create_app():
         """UC3 - Tableau de bord avec indicateurs clés pour supervision"""
         app.logger.info("Accès au tableau de bord de supervision")
         
-        session = get_db_session()
         try:
-            service_tableau_bord = ServiceTableauBord(session)
-            indicateurs = service_tableau_bord.obtenir_indicateurs_performance()
+            indicateurs = diffuseur.instantane()
             
             app.logger.info(f"Tableau de bord généré - {len(indicateurs)} magasins")
             return render_template('dashboard.html', 
                                    indicateurs=indicateurs,
+                                   version=diffuseur.version,
                                    titre="Supervision - Indicateurs clés")
         except Exception as e:
             app.logger.error(f"Erreur génération tableau de bord: {str(e)}")
             flash("Erreur lors du chargement des indicateurs", "error")
             return redirect(url_for('index'))
-        finally:
-            session.close()
+
+    @app.route('/dashboard/stream')
+    def dashboard_stream():
+        """UC3 - Flux SSE : deltas des indicateurs poussés à chaque recalcul"""
+        derniere_version = request.headers.get('Last-Event-ID') or request.args.get('version')
+        derniere_version = int(derniere_version) if derniere_version and derniere_version.isdigit() else None
+        
+        app.logger.info(f"Ouverture d'un flux de supervision - {diffuseur.spectateurs + 1} spectateur(s)")
+        return Response(
+            diffuseur.flux(derniere_version),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
 
     @app.errorhandler(404)
     def page_not_found(e):
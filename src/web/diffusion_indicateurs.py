@@ -0,0 +1,185 @@
+"""
+Diffusion des indicateurs du tableau de bord (Server-Sent Events)
+Les indicateurs sont calculés au plus une fois par intervalle et partagés par tous les superviseurs
+"""
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+
+from ..domain.entities import IndicateurPerformance
+
+logger = logging.getLogger(__name__)
+
+CHAMPS_INDICATEUR = (
+    'entite_nom', 'chiffre_affaires', 'nombre_ventes',
+    'produits_en_rupture', 'produits_en_surstock', 'tendance_hebdomadaire'
+)
+
+
+def _serialiser(indicateur: IndicateurPerformance) -> Dict[str, Any]:
+    valeurs = {}
+    for champ in CHAMPS_INDICATEUR:
+        valeur = getattr(indicateur, champ)
+        valeurs[champ] = round(float(valeur), 2) if isinstance(valeur, Decimal) else valeur
+    return valeurs
+
+
+def calculer_totaux(indicateurs: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Résumé général affiché en tête du tableau de bord"""
+    return {
+        'magasins': len(indicateurs),
+        'chiffre_affaires': round(sum(i['chiffre_affaires'] for i in indicateurs.values()), 2),
+        'nombre_ventes': sum(i['nombre_ventes'] for i in indicateurs.values()),
+        'produits_en_rupture': sum(i['produits_en_rupture'] for i in indicateurs.values()),
+    }
+
+
+class DiffuseurIndicateurs:
+    """
+    Instantané partagé des indicateurs + deltas versionnés.
+    Un thread de fond recalcule toutes les `intervalle` secondes tant qu'un
+    flux SSE est ouvert ; chaque calcul ne publie que les magasins modifiés
+    """
+
+    def __init__(self, calculer: Callable[[], List[IndicateurPerformance]],
+                 intervalle: float = 15.0, battement: float = 15.0):
+        self._calculer = calculer
+        self._intervalle = intervalle
+        self._battement = battement
+        self._condition = threading.Condition()
+        self._verrou_calcul = threading.Lock()
+        self._indicateurs: List[IndicateurPerformance] = []
+        self._etat: Dict[int, Dict[str, Any]] = {}
+        self._version = 0
+        self._dernier_delta: Optional[Dict[str, Any]] = None
+        self._calcule_a: Optional[float] = None
+        self._spectateurs = 0
+        self._thread: Optional[threading.Thread] = None
+        self.calculs = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def spectateurs(self) -> int:
+        return self._spectateurs
+
+    def instantane(self) -> List[IndicateurPerformance]:
+        """Indicateurs courants, recalculés seulement s'ils ont plus d'un intervalle"""
+        if self._est_perime():
+            self.rafraichir()
+        return self._indicateurs
+
+    def _est_perime(self) -> bool:
+        return self._calcule_a is None or time.monotonic() - self._calcule_a >= self._intervalle
+
+    def rafraichir(self) -> Optional[Dict[str, Any]]:
+        """
+        Recalculer une seule fois même si plusieurs requêtes arrivent ensemble,
+        puis publier le delta s'il y a des changements
+        """
+        with self._verrou_calcul:
+            if self._calcule_a is not None and not self._est_perime():
+                return None  # Un autre thread vient de calculer
+            try:
+                indicateurs = self._calculer()
+            except Exception:
+                if self._calcule_a is None:
+                    raise
+                logger.exception("Calcul des indicateurs impossible, instantané précédent conservé")
+                return None
+            self.calculs += 1
+            return self._publier(indicateurs)
+
+    def _publier(self, indicateurs: List[IndicateurPerformance]) -> Optional[Dict[str, Any]]:
+        etat = {i.entite_id: _serialiser(i) for i in indicateurs}
+        changements = {}
+        for entite_id, valeurs in etat.items():
+            precedent = self._etat.get(entite_id, {})
+            modifies = {champ: v for champ, v in valeurs.items() if precedent.get(champ) != v}
+            if modifies:
+                changements[str(entite_id)] = modifies
+        retires = [entite_id for entite_id in self._etat if entite_id not in etat]
+
+        with self._condition:
+            self._indicateurs = indicateurs
+            self._calcule_a = time.monotonic()
+            if self._version and not changements and not retires:
+                return None
+            self._etat = etat
+            self._version += 1
+            self._dernier_delta = {
+                'version': self._version,
+                'changements': changements,
+                'retires': retires,
+                'totaux': calculer_totaux(etat),
+            }
+            self._condition.notify_all()
+            return self._dernier_delta
+
+    def _message_complet(self) -> Dict[str, Any]:
+        return {
+            'version': self._version,
+            'indicateurs': {str(k): v for k, v in self._etat.items()},
+            'totaux': calculer_totaux(self._etat),
+        }
+
+    def prochain_message(self, derniere_version: Optional[int], timeout: float) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Attendre une version plus récente que `derniere_version`.
+        Retourne ('delta', ...) si le client est à jour à une version près,
+        ('instantane', ...) s'il en a manqué, ou ('battement', None) au timeout.
+        Une version inconnue ou supérieure à la version courante (serveur redémarré)
+        reçoit l'instantané tout de suite
+        """
+        with self._condition:
+            if derniere_version is None or derniere_version > self._version:
+                return 'instantane', self._message_complet()
+            if not self._condition.wait_for(lambda: self._version > derniere_version, timeout):
+                return 'battement', None
+            if self._version == derniere_version + 1:
+                return 'delta', self._dernier_delta
+            return 'instantane', self._message_complet()
+
+    def flux(self, derniere_version: Optional[int] = None) -> Iterator[str]:
+        """Générateur text/event-stream pour un superviseur"""
+        self._ouvrir()
+        try:
+            self.instantane()
+            while True:
+                evenement, donnees = self.prochain_message(derniere_version, self._battement)
+                if evenement == 'battement':
+                    yield ": battement\n\n"
+                    continue
+                derniere_version = donnees['version']
+                yield f"id: {derniere_version}\nevent: {evenement}\ndata: {json.dumps(donnees)}\n\n"
+        finally:
+            self._fermer()
+
+    def _ouvrir(self) -> None:
+        with self._condition:
+            self._spectateurs += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name="diffusion-indicateurs", daemon=True)
+                self._thread.start()
+
+    def _fermer(self) -> None:
+        with self._condition:
+            self._spectateurs -= 1
+
+    def _boucle(self) -> None:
+        """Recalcul périodique ; le thread s'arrête quand plus personne n'écoute"""
+        while True:
+            time.sleep(self._intervalle)
+            with self._condition:
+                if self._spectateurs == 0:
+                    self._thread = None
+                    return
+            try:
+                self.rafraichir()
+            except Exception:
+                logger.exception("Erreur lors du rafraîchissement des indicateurs")
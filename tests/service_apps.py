@@ -0,0 +1,28 @@
+"""
+Chargement des modules app des microservices pour les tests.
+Chaque service a son propre app.py : le module est chargé depuis le répertoire du
+service puis retiré de sys.modules, et gardé ici pour ne l'importer qu'une fois
+(ses métriques Prometheus ne peuvent être enregistrées qu'une fois par processus)
+"""
+import importlib
+import os
+import sys
+
+_SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'microservices'))
+_apps = {}
+
+
+def load_service_app(service: str):
+    """Module app.py de microservices/<service>, importé une seule fois"""
+    if service not in _apps:
+        service_dir = os.path.join(_SERVICES_DIR, service)
+        other_app = sys.modules.pop('app', None)
+        sys.path.insert(0, service_dir)
+        try:
+            _apps[service] = importlib.import_module('app')
+        finally:
+            sys.path.remove(service_dir)
+            sys.modules.pop('app', None)
+            if other_app is not None:
+                sys.modules['app'] = other_app
+    return _apps[service]
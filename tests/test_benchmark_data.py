@@ -0,0 +1,62 @@
+"""
+Tests du générateur de jeux de données de benchmark
+"""
+
+import json
+
+from sqlalchemy import create_engine, text
+
+from generate_benchmark_data import main
+
+
+def _generer(tmp_path, nom, *extra):
+    database_url = f"sqlite:///{tmp_path / (nom + '.db')}"
+    fixtures_dir = tmp_path / nom
+    argv = [
+        '--database-url', database_url, '--fixtures-dir', str(fixtures_dir),
+        '--stores', '2', '--products', '50', '--registers', '2', '--days', '2',
+        '--sales-per-register-day', '5', '--max-lines-per-sale', '3', *extra
+    ]
+    assert main(argv) == 0
+    return database_url, fixtures_dir
+
+
+def test_generation_volumes(tmp_path):
+    """Les volumes chargés correspondent aux paramètres"""
+    database_url, fixtures_dir = _generer(tmp_path, 'volumes')
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM produits")).scalar() == 50
+        assert conn.execute(text("SELECT COUNT(*) FROM entites")).scalar() == 4
+        assert conn.execute(text("SELECT COUNT(*) FROM caisses")).scalar() == 4
+        assert conn.execute(text("SELECT COUNT(*) FROM ventes")).scalar() == 2 * 2 * 2 * 5
+        nb_lignes = conn.execute(text("SELECT COUNT(*) FROM lignes_vente")).scalar()
+    engine.dispose()
+
+    ventes = [json.loads(line) for line in open(fixtures_dir / 'sales-service' / 'sales.jsonl')]
+    assert len(ventes) == 40
+    assert sum(len(v['items']) for v in ventes) == nb_lignes
+
+    inventaire = open(fixtures_dir / 'inventory-service' / 'inventory.jsonl').readlines()
+    assert len(inventaire) == 2 * 50
+
+
+def test_generation_deterministe(tmp_path):
+    """Une même graine produit exactement les mêmes fixtures"""
+    _, premier = _generer(tmp_path, 'a', '--seed', '7')
+    _, second = _generer(tmp_path, 'b', '--seed', '7')
+    _, autre = _generer(tmp_path, 'c', '--seed', '8')
+
+    for fichier in ('product-service/products.jsonl', 'sales-service/sales.jsonl'):
+        assert (premier / fichier).read_text() == (second / fichier).read_text()
+        assert (premier / fichier).read_text() != (autre / fichier).read_text()
+
+
+def test_generation_sans_base(tmp_path):
+    """--skip-db produit les fixtures sans connexion à la base"""
+    fixtures_dir = tmp_path / 'fixtures'
+    argv = ['--skip-db', '--fixtures-dir', str(fixtures_dir), '--stores', '1',
+            '--products', '10', '--days', '1', '--sales-per-register-day', '2']
+    assert main(argv) == 0
+    assert (fixtures_dir / 'product-service' / 'products.jsonl').exists()
@@ -0,0 +1,190 @@
+"""
+Tests du stockage des paniers de cart-service (HASH Redis, scripts Lua par article)
+et du cache local des produits
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+for service_dir in ('cart-service', 'shared'):
+    sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..', 'microservices', service_dir
+    )))
+
+import services
+from product_cache import ProductCache
+from services import CartService, CartValidationService, TaxService
+
+
+@pytest.fixture
+def cart_service():
+    return CartService(fakeredis.FakeStrictRedis())
+
+
+class TestCartStore:
+    """Opérations atomiques sur un article et les totaux"""
+
+    def test_ajout_mise_a_jour_et_retrait(self, cart_service):
+        cart_service.add_item_to_cart('s1', 1, 2, price=10.99)
+        cart_service.add_item_to_cart('s1', 2, 1, price=5.00)
+        cart = cart_service.add_item_to_cart('s1', 1, 1, price=12.00)  # prix existant conservé
+
+        assert [item['product_id'] for item in cart['items']] == [1, 2]
+        assert cart['items'][0]['quantity'] == 3 and cart['items'][0]['subtotal'] == 32.97
+        assert cart['total_items'] == 4 and cart['total_amount'] == 37.97
+
+        cart = cart_service.update_item_quantity('s1', 2, 4)
+        assert cart['total_amount'] == 52.97
+        cart = cart_service.remove_item_from_cart('s1', 1)
+        assert cart['items'][0]['product_id'] == 2 and cart['total_items'] == 4
+        assert cart_service.update_item_quantity('s1', 99, 1) is None
+        assert cart_service.update_item_quantity('inconnu', 2, 1) is None
+
+    def test_ajouts_concurrents_sans_perte(self, cart_service):
+        threads = [
+            threading.Thread(target=cart_service.add_item_to_cart, args=('s2', product_id % 3, 1, 1.50))
+            for product_id in range(30)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        cart = cart_service.get_cart('s2')
+        assert cart['total_items'] == 30 and cart['total_amount'] == 45.0
+        assert sorted(item['quantity'] for item in cart['items']) == [10, 10, 10]
+
+    def test_taxes_client_et_prolongation(self, cart_service):
+        cart_service.add_item_to_cart('s3', 1, 2, price=50.00)
+        cart = cart_service.recalculate_cart('s3', TaxService())
+        assert cart['tax_amount'] == 14.97 and cart['final_amount'] == 114.97
+
+        # Un ajout remet les taxes à zéro jusqu'au prochain recalcul
+        cart = cart_service.add_item_to_cart('s3', 2, 1, price=1.00)
+        assert cart['tax_amount'] == 0.0 and cart['final_amount'] == 101.0
+
+        assert cart_service.associate_cart_to_customer('s3', 42)['customer_id'] == 42
+        cart_service.extend_cart_expiry('s3', hours=24)
+        assert cart_service.redis_cart.get_cart_ttl('s3') > 86400
+        cart_service.get_cart('s3')  # la lecture ne raccourcit pas une prolongation
+        assert cart_service.redis_cart.get_cart_ttl('s3') > 86400
+
+    def test_migration_ancien_format_json(self, cart_service):
+        legacy = cart_service._new_cart('s4', customer_id=7)
+        legacy['items'] = [{'product_id': 5, 'product_name': 'Stylo', 'product_sku': 'STY-1',
+                            'price': 2.25, 'quantity': 2, 'subtotal': 4.5}]
+        legacy.update(total_items=2, total_amount=4.5, final_amount=4.5)
+        cart_service.redis_cart.client.set('cart:s4', json.dumps(legacy), ex=3600)
+
+        cart = cart_service.add_item_to_cart('s4', 5, 1, price=2.25)
+        assert cart['customer_id'] == 7 and cart['items'][0]['product_name'] == 'Stylo'
+        assert cart['items'][0]['quantity'] == 3 and cart['total_amount'] == 6.75
+        assert cart_service.redis_cart.client.type('cart:s4') == b'hash'
+
+    def test_statistiques_et_nettoyage_par_index(self, cart_service):
+        redis_cart = cart_service.redis_cart
+        for session_id in ('a', 'b', 'c'):
+            cart_service.add_item_to_cart(session_id, 1, 1, price=1.00)
+        cart_service.create_empty_cart('a')  # déjà existant : pas de nouvelle création
+        redis_cart.client.pexpire('cart:b', 1)
+        time.sleep(0.01)
+        redis_cart.client.zadd(redis_cart.index_key, {'cart:b': time.time() - 1})
+        cart_service.clear_cart('c')
+
+        stats = cart_service.get_cart_stats()
+        assert stats['total_carts'] == 2 and stats['active_carts'] == 1 and stats['expired_carts'] == 1
+        assert stats['created_carts'] == 3 and stats['deleted_carts'] == 1
+
+        assert cart_service.cleanup_expired_carts() == 1
+        stats = cart_service.get_cart_stats()
+        assert stats['total_carts'] == 1 and stats['expired_carts_cleaned'] == 1
+
+    def test_reconstruction_index_par_scan(self, cart_service):
+        redis_cart = cart_service.redis_cart
+        for session_id in range(12):
+            cart_service.add_item_to_cart(f"s{session_id}", 1, 1, price=1.00)
+        redis_cart.client.delete(redis_cart.index_key)
+
+        assert redis_cart.rebuild_cart_index(batch_size=5) == 12
+        assert cart_service.get_cart_stats()['active_carts'] == 12
+        assert len(redis_cart.get_all_cart_keys()) == 12
+
+
+class TestCartProductCache:
+    """Cache local des produits : remplissage par lot, cache négatif, invalidation"""
+
+    @pytest.fixture
+    def product_service(self, monkeypatch):
+        """Catalogue simulé et liste des lots demandés au Product Service"""
+        catalogue = {1: {'id': 1, 'nom': 'Cahier', 'sku': 'CAH-1', 'prix': 3.50, 'stock': 10},
+                     2: {'id': 2, 'nom': 'Crayon', 'sku': 'CRA-1', 'prix': 0.75, 'stock': 0}}
+        calls = []
+
+        def fetch(product_service_url, product_ids):
+            calls.append(list(product_ids))
+            if catalogue.get('indisponible'):
+                return None
+            return {product_id: catalogue[product_id] for product_id in product_ids if product_id in catalogue}
+
+        monkeypatch.setattr(services, 'fetch_products_batch', fetch)
+        return catalogue, calls
+
+    def test_ajouts_sans_appel_au_product_service(self, product_service):
+        _, calls = product_service
+        cache = ProductCache(negative_ttl=60)
+        cart_service = CartService(fakeredis.FakeStrictRedis(), cache)
+
+        cart_service.add_item_to_cart('s1', 1, 1)
+        cart = cart_service.add_item_to_cart('s1', 1, 2)
+        assert cart['items'][0]['product_name'] == 'Cahier' and cart['total_amount'] == 10.5
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                cart_service.add_item_to_cart('s1', 99, 1)
+        assert calls == [[1], [99]]
+
+        validation = CartValidationService('http://product-service', cache).validate_cart(
+            cart_service.add_item_to_cart('s1', 2, 1, price=0.75)
+        )
+        assert calls[-1] == [2]  # seul le produit absent du cache est demandé
+        assert not validation['valid'] and 'rupture' in validation['errors'][0]
+
+        stats = cache.stats()
+        assert stats['negative_hits'] == 1 and stats['hit_rate'] == 0.5
+
+    def test_invalidation_et_service_indisponible(self, product_service):
+        catalogue, calls = product_service
+        cache = ProductCache(negative_ttl=60)
+        cart_service = CartService(fakeredis.FakeStrictRedis(), cache)
+        cart_service.add_item_to_cart('s2', 1, 1)
+
+        catalogue[1] = dict(catalogue[1], prix=4.00)
+        cache.apply({'version': '1', 'product_id': '1'})
+        catalogue['indisponible'] = True
+        with pytest.raises(ValueError):
+            cart_service.add_item_to_cart('s2', 1, 1)
+        assert cache.stats()['load_failures'] == 1
+
+        del catalogue['indisponible']
+        cart = cart_service.add_item_to_cart('s3', 1, 1)
+        assert cart['items'][0]['price'] == 4.00 and calls == [[1], [1], [1]]
+
+    def test_validation_sans_product_service_un_seul_appel(self, product_service):
+        """Product Service injoignable : un avertissement par article, sans appel supplémentaire"""
+        catalogue, calls = product_service
+        cart_service = CartService(fakeredis.FakeStrictRedis())
+        cart_service.add_item_to_cart('s4', 1, 1, price=3.50)
+        cart = cart_service.add_item_to_cart('s4', 2, 1, price=0.75)
+        del calls[:]
+
+        catalogue['indisponible'] = True
+        validation = CartValidationService('http://product-service').validate_cart(cart)
+        assert calls == [[1, 2]]
+        assert validation['valid'] and len(validation['warnings']) == 2
+        assert all(warning.startswith('Impossible de vérifier') for warning in validation['warnings'])
@@ -0,0 +1,120 @@
+"""
+Tests du catalogue local de la caisse (synchronisation par deltas, ventes hors ligne)
+"""
+
+import time
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.client.catalogue_local import CatalogueLocal
+from src.domain.entities import LigneVente
+from src.persistence.models import Base, CategorieModel, ProduitModel
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        CategorieModel(id=1, nom="Alimentaire"),
+        CategorieModel(id=2, nom="Boissons"),
+    ])
+    session.add_all([
+        ProduitModel(id=1, nom="Pain complet", prix=Decimal("2.50"), stock=50, id_categorie=1),
+        ProduitModel(id=2, nom="Lait", prix=Decimal("1.20"), stock=3, id_categorie=1),
+        ProduitModel(id=3, nom="Eau gazeuse", prix=Decimal("0.80"), stock=40, id_categorie=2),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def catalogue(session):
+    catalogue = CatalogueLocal()
+    assert catalogue.synchroniser(session) == 3
+    return catalogue
+
+
+class TestSynchronisation:
+    """Tests de la synchronisation incrémentale"""
+
+    def test_recherche_locale(self, catalogue):
+        """Mêmes critères que RepositoryProduit.rechercher"""
+        assert catalogue.est_pret()
+        assert [p.nom for p in catalogue.rechercher("nom", "gaz")] == ["Eau gazeuse"]
+        assert [p.id for p in catalogue.rechercher("categorie", "alim")] == [1, 2]
+        produit = catalogue.rechercher("id", "2")[0]
+        assert produit.prix == Decimal("1.20")
+        assert produit.categorie.nom == "Alimentaire"
+
+    def test_deltas_depuis_le_filigrane(self, session, catalogue):
+        """Seuls les produits modifiés récemment sont relus"""
+        ancien = datetime.now() - timedelta(hours=1)
+        session.query(ProduitModel).update({ProduitModel.date_modification: ancien})
+        session.commit()
+        catalogue._ecrire_meta('filigrane', (ancien + timedelta(minutes=1)).isoformat())
+
+        produit = session.get(ProduitModel, 2)
+        produit.prix = Decimal("1.35")
+        session.commit()
+
+        assert catalogue.synchroniser(session) == 1
+        assert catalogue.obtenir(2).prix == Decimal("1.35")
+
+    def test_suppressions_par_rapprochement(self, session, catalogue):
+        """Les produits supprimés disparaissent au rapprochement des IDs"""
+        session.query(ProduitModel).filter(ProduitModel.id == 3).delete()
+        session.commit()
+        catalogue._dernier_rapprochement = None
+
+        catalogue.synchroniser(session)
+        assert catalogue.obtenir(3) is None
+        assert catalogue.rechercher("nom", "gazeuse") == []
+
+    def test_base_injoignable(self, catalogue):
+        """La synchronisation échoue sans perdre l'instantané local"""
+        session = Mock()
+        session.query.side_effect = OperationalError("SELECT", {}, Exception("timeout"))
+
+        assert catalogue.synchroniser(session) is None
+        assert catalogue.obtenir(1).nom == "Pain complet"
+
+
+class TestVentesHorsLigne:
+    """Tests de la file de ventes locale"""
+
+    def test_transmission_par_lot(self, catalogue):
+        """Ventes transmises dans l'ordre ; refus métier marqués, coupure réseau interrompue"""
+        panier = [LigneVente(produit=catalogue.obtenir(1), qte=2)]
+        avant = datetime.now()
+        for _ in range(3):
+            catalogue.mettre_vente_en_attente(panier, 1, 1, 1)
+        apres = datetime.now()
+        time.sleep(0.01)
+
+        service_vente = Mock()
+        service_vente.creer_vente.side_effect = [
+            Mock(),
+            ValueError("Stock insuffisant"),
+            OperationalError("INSERT", {}, Exception("connexion perdue")),
+        ]
+        assert catalogue.vider_ventes_en_attente(service_vente) == (1, 1)
+        assert catalogue.nombre_ventes_en_attente() == 1
+
+        lignes = service_vente.creer_vente.call_args_list[0].args[0]
+        horodatage = service_vente.creer_vente.call_args_list[0].kwargs['horodatage']
+        assert avant <= horodatage <= apres  # moment de la vente, pas de la transmission
+        assert lignes[0].produit.id == 1
+        assert lignes[0].produit.prix == Decimal("2.50")
+        assert lignes[0].qte == 2
+
+        service_vente.creer_vente.side_effect = None
+        assert catalogue.vider_ventes_en_attente(service_vente) == (1, 0)
+        assert catalogue.nombre_ventes_en_attente() == 0
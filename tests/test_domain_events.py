@@ -0,0 +1,158 @@
+"""
+Tests de la publication des Domain Events (unité de travail, transports asynchrones)
+"""
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from src.api.bounded_contexts.shared.events.domain_event import (
+    DomainEventPublisher, SynchronousEventTransport
+)
+from src.api.bounded_contexts.shared.events.event_transports import (
+    BackgroundEventTransport, RedisStreamSink
+)
+from src.api.bounded_contexts.product_catalog.application.product_application_service import ProductApplicationService
+from src.api.bounded_contexts.product_catalog.domain.aggregates.product import Product, ProductUpdatedEvent
+from src.api.bounded_contexts.product_catalog.domain.value_objects.product_id import (
+    ProductId, ProductName, StockQuantity, AlertThreshold
+)
+from src.api.bounded_contexts.shared.value_objects.money import Money
+from src.api.bounded_contexts.shared.value_objects.entity_id import CategoryId
+
+
+def _event(product_id, champ='price'):
+    return ProductUpdatedEvent(
+        event_id="",
+        occurred_on=datetime.now(),
+        event_type="ProductUpdated",
+        product_id=ProductId(product_id),
+        updated_fields=[champ]
+    )
+
+
+class RecordingSubscriber:
+    def __init__(self, delay=0.0):
+        self.events = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def handle(self, event):
+        time.sleep(self.delay)
+        with self._lock:
+            self.events.append(event)
+
+
+@pytest.fixture
+def subscriber():
+    DomainEventPublisher.configure(SynchronousEventTransport())
+    DomainEventPublisher.clear_subscribers()
+    recorder = RecordingSubscriber()
+    DomainEventPublisher.subscribe(recorder)
+    yield recorder
+    DomainEventPublisher.configure(SynchronousEventTransport())
+    DomainEventPublisher.clear_subscribers()
+
+
+class TestUnitOfWork:
+    """Tests de la rétention des événements par unité de travail"""
+
+    def test_evenements_publies_a_la_fin_de_l_unite(self, subscriber):
+        """Les événements ne sont livrés qu'à la sortie de l'unité de travail"""
+        with DomainEventPublisher.unit_of_work():
+            DomainEventPublisher.publish([_event(1)])
+            with DomainEventPublisher.unit_of_work():
+                DomainEventPublisher.publish([_event(2)])
+            assert subscriber.events == []
+
+        assert [e.product_id.value for e in subscriber.events] == [1, 2]
+
+    def test_evenements_abandonnes_si_erreur(self, subscriber):
+        """Une unité de travail en échec ne publie rien"""
+        with pytest.raises(ValueError):
+            with DomainEventPublisher.unit_of_work():
+                DomainEventPublisher.publish([_event(1)])
+                raise ValueError("rollback")
+
+        DomainEventPublisher.publish([_event(3)])
+        assert [e.product_id.value for e in subscriber.events] == [3]
+
+
+class TestBackgroundEventTransport:
+    """Tests du transport par threads de fond"""
+
+    def test_ordre_conserve_par_agregat(self, subscriber):
+        """Plusieurs workers, mais l'ordre de chaque agrégat est respecté"""
+        transport = BackgroundEventTransport(workers=4, batch_size=16)
+        DomainEventPublisher.configure(transport)
+
+        for sequence in range(50):
+            DomainEventPublisher.publish([_event(pid, champ=str(sequence)) for pid in range(1, 9)])
+
+        assert transport.flush(timeout=5)
+        for pid in range(1, 9):
+            sequences = [int(e.updated_fields[0]) for e in subscriber.events if e.product_id.value == pid]
+            assert sequences == list(range(50))
+
+        stats = transport.stats()
+        assert stats['events_delivered'] == 400
+        assert stats['batches'] < 400
+        assert stats['pending'] == 0
+
+    def test_sink_en_erreur_n_arrete_pas_le_worker(self):
+        """Un sink défaillant est compté sans bloquer les autres"""
+        received = []
+        transport = BackgroundEventTransport(sinks=[Mock(side_effect=RuntimeError("down")), received.extend])
+
+        transport.send([_event(1), _event(2)])
+        assert transport.flush(timeout=5)
+        transport.close(timeout=5)
+
+        assert len(received) == 2
+        assert transport.stats()['sink_errors'] >= 1
+
+    def test_ecriture_produit_n_attend_pas_les_abonnes(self, subscriber):
+        """update_product retourne avant le traitement des abonnés"""
+        subscriber.delay = 0.5
+        transport = BackgroundEventTransport()
+        DomainEventPublisher.configure(transport)
+
+        product = Product.create(
+            product_id=ProductId(7),
+            name=ProductName("Pain"),
+            price=Money.from_float(2.5),
+            stock_quantity=StockQuantity(10),
+            category_id=CategoryId(1),
+            alert_threshold=AlertThreshold(2)
+        )
+        product.get_uncommitted_events()
+        repository = Mock()
+        repository.find_by_id.return_value = product
+        repository.exists_by_name.return_value = False
+
+        started = time.perf_counter()
+        ProductApplicationService(repository).update_product(7, {'prix': 3.0, 'seuil_alerte': 4})
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.5
+        assert transport.flush(timeout=5)
+        assert len(subscriber.events) == 2
+
+
+class TestRedisStreamSink:
+    """Tests du sink Redis Streams"""
+
+    def test_un_pipeline_par_lot(self):
+        """Chaque événement est ajouté au stream de son type et au stream global"""
+        redis_client = Mock()
+        pipeline = redis_client.pipeline.return_value
+
+        RedisStreamSink(redis_client)([_event(1), _event(2)])
+
+        redis_client.pipeline.assert_called_once_with(transaction=False)
+        streams = [call.args[0] for call in pipeline.xadd.call_args_list]
+        assert streams == ['events:productupdated', 'events:all'] * 2
+        assert pipeline.xadd.call_args_list[0].args[1]['aggregate_id'] == 'Product:1'
+        pipeline.execute.assert_called_once()
@@ -0,0 +1,214 @@
+"""
+Tests de la persistance d'inventory-service (UPDATE conditionnels, journal write-behind)
+"""
+import json
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'inventory-service'
+)))
+
+from database import Base, StockMovementModel
+from inventory_store import InventoryStore
+from reservation_engine import ReservationEngine, ReservationError
+from stock_repository import SqlInventoryStore, SqlReservationEngine, WriteBehindJournal
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    SqlInventoryStore(factory).load(
+        {'product_id': pid, 'location_id': 1, 'available_quantity': 10, 'reserved_quantity': 0}
+        for pid in range(1, 4)
+    )
+    yield factory
+    engine.dispose()
+
+
+def _mouvements(session_factory):
+    with session_factory() as session:
+        return [(m.type_mouvement, m.quantite, m.reference) for m in session.scalars(
+            select(StockMovementModel).order_by(StockMovementModel.id)
+        )]
+
+
+class TestSqlReservationEngine:
+    """Réservations directement en base"""
+
+    def test_reservation_et_liberation(self, session_factory):
+        """Les quantités, la réservation et les mouvements sont écrits dans la même transaction"""
+        store = SqlInventoryStore(session_factory)
+        engine = SqlReservationEngine(session_factory)
+
+        reservation, created = engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 4}, {'product_id': 2, 'quantity': 1}])
+        assert created and reservation['status'] == 'active'
+        assert engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 4}])[1] is False
+        assert store.get(1, 1) == {'product_id': 1, 'location_id': 1, 'available_quantity': 6, 'reserved_quantity': 4}
+        assert store.totals() == (25, 5)
+        assert engine.counts() == (1, 1)
+
+        reservation, released = engine.release('r1')
+        assert released and reservation['status'] == 'released'
+        assert engine.release('r1')[1] is False
+        assert engine.release('inconnue') == (None, False)
+        assert store.totals() == (30, 0)
+        assert engine.counts() == (1, 0)
+        assert _mouvements(session_factory) == [
+            ('reservation', 4, 'r1'), ('reservation', 1, 'r1'),
+            ('liberation', 4, 'r1'), ('liberation', 1, 'r1')
+        ]
+
+    def test_confirmation(self, session_factory):
+        """Le réservé sort du stock sans retour au disponible ; une seule confirmation compte"""
+        store = SqlInventoryStore(session_factory)
+        engine = SqlReservationEngine(session_factory)
+        engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 4}])
+
+        reservation, confirmee = engine.confirm('r1')
+        assert confirmee and reservation['status'] == 'confirmed'
+        assert engine.confirm('r1')[1] is False and engine.release('r1')[1] is False
+        assert engine.confirm('inconnue') == (None, False)
+        assert store.get(1, 1) == {'product_id': 1, 'location_id': 1, 'available_quantity': 6, 'reserved_quantity': 0}
+        assert engine.counts() == (1, 0)
+        assert _mouvements(session_factory) == [('reservation', 4, 'r1'), ('confirmation', 4, 'r1')]
+
+    def test_panier_tout_ou_rien(self, session_factory):
+        """Un UPDATE conditionnel refusé annule les lignes déjà réservées"""
+        store = SqlInventoryStore(session_factory)
+        engine = SqlReservationEngine(session_factory)
+
+        with pytest.raises(ReservationError) as insuffisant:
+            engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 5}, {'product_id': 2, 'quantity': 11}])
+        with pytest.raises(ReservationError) as inconnu:
+            engine.reserve('r2', 1, [{'product_id': 99, 'quantity': 1}])
+
+        assert insuffisant.value.status_code == 409
+        assert inconnu.value.status_code == 404
+        assert store.totals() == (30, 0)
+        assert engine.get('r1') is None
+        assert _mouvements(session_factory) == []
+
+    def test_vente_et_retour(self, session_factory):
+        """Sortie conditionnelle tout ou rien, entrée sans condition, un mouvement par ligne"""
+        store = SqlInventoryStore(session_factory)
+        engine = SqlReservationEngine(session_factory)
+
+        with pytest.raises(ReservationError):
+            engine.move_stock('v1', [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 11}], 'sortie')
+        assert store.totals() == (30, 0)
+
+        vendus, applique = engine.move_stock('v2', [{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 10}], 'sortie')
+        assert applique and [item['available_quantity'] for item in vendus] == [8, 0]
+        engine.move_stock('r2', [{'product_id': 2, 'quantity': 1}], 'entree')
+        assert store.totals() == (19, 0)
+        assert _mouvements(session_factory) == [('sortie', 2, 'v2'), ('sortie', 10, 'v2'), ('entree', 1, 'r2')]
+
+    def test_vente_rejouee_ignoree(self, session_factory):
+        """Un même (référence, type) n'est appliqué qu'une fois ; une sortie refusée peut être rejouée"""
+        store = SqlInventoryStore(session_factory)
+        engine = SqlReservationEngine(session_factory)
+
+        with pytest.raises(ReservationError):
+            engine.move_stock('v1', [{'product_id': 1, 'quantity': 11}], 'sortie')
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'sortie')[1] is True
+        items, applique = engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'sortie')
+        assert not applique and items == [store.get(1, 1)] and store.get(1, 1)['available_quantity'] == 7
+
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'entree')[1] is True  # retour de la vente
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'entree')[1] is False
+        assert store.get(1, 1)['available_quantity'] == 10
+        assert _mouvements(session_factory) == [('sortie', 3, 'v1'), ('entree', 3, 'v1')]
+        assert engine.movement_references(10) == [('v1', 'sortie'), ('v1', 'entree')]
+
+
+class TestWriteBehindJournal:
+    """Moteur en mémoire journalisé en base"""
+
+    def test_etat_recharge_apres_redemarrage(self, session_factory):
+        """Après flush, un nouveau processus retrouve stocks et réservations"""
+        journal = WriteBehindJournal(session_factory, batch_size=2, flush_interval=0.01)
+        engine = ReservationEngine(InventoryStore(SqlInventoryStore(session_factory).items()), journal=journal)
+        engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 3}])
+        engine.reserve('r2', 2, [{'product_id': 1, 'quantity': 2}, {'product_id': 3, 'quantity': 5}])
+        engine.release('r1')
+        engine.move_stock('v1', [{'product_id': 3, 'quantity': 4}], 'sortie')
+        engine.reserve('r3', 3, [{'product_id': 2, 'quantity': 1}])
+        engine.confirm('r3')
+        journal.close()
+
+        store = InventoryStore(SqlInventoryStore(session_factory).items())
+        reservations = {r['reservation_id']: r for r in SqlReservationEngine(session_factory).all()}
+        assert store.get(1, 1)['available_quantity'] == 8
+        assert store.get(1, 1)['reserved_quantity'] == 2
+        assert store.get(3, 1)['available_quantity'] == 1
+        assert store.total_reserved == 7
+        assert reservations['r1']['status'] == 'released'
+        assert reservations['r2']['items'] == engine.get('r2')['items']
+        assert reservations['r3']['status'] == 'confirmed'
+        assert store.get(2, 1) == {'product_id': 2, 'location_id': 1, 'available_quantity': 9, 'reserved_quantity': 0}
+        assert len(_mouvements(session_factory)) == 7
+
+        # Vente rejouée après le redémarrage : références rechargées depuis la base
+        restarted = ReservationEngine(store)
+        restarted.remember_movements(SqlReservationEngine(session_factory).movement_references(100))
+        assert restarted.move_stock('v1', [{'product_id': 3, 'quantity': 4}], 'sortie')[1] is False
+        assert store.get(3, 1)['available_quantity'] == 1
+
+    def test_entree_en_echec_ecartee_sans_bloquer_la_suite(self, session_factory, tmp_path):
+        """Un lot refusé par une contrainte est réécrit entrée par entrée ; la fautive est écartée"""
+        dead_letters = tmp_path / 'write_behind.jsonl'
+        journal = WriteBehindJournal(session_factory, batch_size=10, flush_interval=0.05, retry_delay=0,
+                                     dead_letter_path=str(dead_letters))
+        write = journal._write
+
+        def write_sans_poison(batch):
+            if any(reference == 'poison' for _, reference, _, _ in batch):
+                raise IntegrityError('INSERT', {}, Exception('contrainte violée'))
+            write(batch)
+
+        journal._write = write_sans_poison
+        journal.record_movement('poison', {(1, 1): 1}, 'sortie')
+        journal.record_movement('v1', {(3, 1): 2}, 'sortie')
+        journal.close()
+        journal.close()  # idempotent (atexit après SIGTERM)
+
+        assert _mouvements(session_factory) == [('sortie', 2, 'v1')]
+        assert journal.dead_lettered == 1
+        assert json.loads(dead_letters.read_text())['reference'] == 'poison'
+
+    def test_base_indisponible_reessayee_sans_perte(self, session_factory, monkeypatch):
+        """Base injoignable : le lot est réessayé (délai doublé, borné) jusqu'à son retour"""
+        journal = WriteBehindJournal(session_factory, batch_size=10, flush_interval=0.05,
+                                     retry_delay=0.001, max_retry_delay=0.004)
+        write = journal._write
+        pannes = [6]
+        attentes = []
+
+        def write_apres_panne(batch):
+            if pannes[0]:
+                pannes[0] -= 1
+                raise OperationalError('UPDATE', {}, Exception('connexion refusée'))
+            write(batch)
+
+        journal._write = write_apres_panne
+        monkeypatch.setattr(time, 'sleep', attentes.append)
+        journal.record_movement('v1', {(1, 1): 1}, 'sortie')
+        journal.record_movement('v2', {(3, 1): 2}, 'sortie')
+        journal.close()
+
+        assert _mouvements(session_factory) == [('sortie', 1, 'v1'), ('sortie', 2, 'v2')]
+        assert journal.dead_lettered == 0
+        assert attentes == [0.001, 0.002, 0.004, 0.004, 0.004, 0.004]
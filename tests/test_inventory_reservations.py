@@ -0,0 +1,225 @@
+"""
+Tests du moteur de réservation d'inventory-service (verrous par bandes, tout-ou-rien)
+"""
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'inventory-service'
+)))
+
+from inventory_store import InventoryStore
+from reservation_engine import ReservationEngine, ReservationError
+from reservation_sweeper import ReservationSweeper
+
+
+def _store(nb_produits=5, quantite=100):
+    return InventoryStore(
+        {'product_id': pid, 'location_id': 1, 'available_quantity': quantite, 'reserved_quantity': 0}
+        for pid in range(1, nb_produits + 1)
+    )
+
+
+class TestReservationEngine:
+    """Tests fonctionnels du moteur"""
+
+    def test_panier_tout_ou_rien(self):
+        """Une ligne en rupture annule tout le panier"""
+        store = _store(quantite=10)
+        engine = ReservationEngine(store)
+
+        with pytest.raises(ReservationError) as erreur:
+            engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 5}, {'product_id': 2, 'quantity': 11}])
+
+        assert erreur.value.status_code == 409
+        assert store.get(1, 1)['available_quantity'] == 10
+        assert store.total_reserved == 0
+        assert engine.get('r1') is None
+
+    def test_idempotence_par_reservation_id(self):
+        """Un même reservation_id ne réserve qu'une fois, même en concurrence"""
+        store = _store(quantite=100)
+        engine = ReservationEngine(store)
+        barrier = threading.Barrier(16)
+
+        def reserver():
+            barrier.wait()
+            return engine.reserve('saga-42', 7, [{'product_id': 1, 'quantity': 3}])[1]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            creations = list(executor.map(lambda _: reserver(), range(16)))
+
+        assert creations.count(True) == 1
+        assert store.get(1, 1)['available_quantity'] == 97
+
+        reservation, released = engine.release('saga-42')
+        assert released and reservation['status'] == 'released'
+        assert engine.release('saga-42')[1] is False
+        assert store.get(1, 1)['available_quantity'] == 100
+        assert store.total_reserved == 0
+
+    def test_lignes_invalides_et_produit_inconnu(self):
+        """Quantités invalides en 400, produit absent en 404"""
+        engine = ReservationEngine(_store())
+
+        with pytest.raises(ReservationError) as invalide:
+            engine.reserve('r1', 1, [{'product_id': 1, 'quantity': 0}])
+        with pytest.raises(ReservationError) as inconnu:
+            engine.reserve('r2', 1, [{'product_id': 99, 'quantity': 1}])
+
+        assert invalide.value.status_code == 400
+        assert inconnu.value.status_code == 404
+
+
+class TestMouvementsPanier:
+    """Vente et retour d'un panier complet (endpoint /inventory/batch)"""
+
+    def test_vente_tout_ou_rien_puis_retour(self):
+        """Une ligne insuffisante n'applique aucun décrément ; le retour remet en stock"""
+        store = _store(quantite=10)
+        engine = ReservationEngine(store)
+
+        with pytest.raises(ReservationError) as insuffisant:
+            engine.move_stock('v1', [{'product_id': 1, 'quantity': 4}, {'product_id': 2, 'quantity': 11}], 'sortie')
+        assert insuffisant.value.status_code == 409
+        assert store.total_available == 50
+
+        vendus, applique = engine.move_stock('v2', [{'product_id': 1, 'quantity': 4}, {'product_id': 1, 'quantity': 2}], 'sortie')
+        assert applique and vendus == [{'product_id': 1, 'location_id': 1, 'available_quantity': 4, 'reserved_quantity': 0}]
+        engine.move_stock('r2', [{'product_id': 1, 'quantity': 6}], 'entree')
+        assert store.get(1, 1)['available_quantity'] == 10
+        assert store.total_reserved == 0
+
+    def test_vente_rejouee_ignoree(self):
+        """Un (référence, type) déjà appliqué ne modifie plus le stock ; les plus anciens sont oubliés"""
+        store = _store(quantite=10)
+        engine = ReservationEngine(store, max_references=2)
+
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'sortie')[1] is True
+        items, applique = engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'sortie')
+        assert not applique and items[0]['available_quantity'] == 7
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'entree')[1] is True
+        assert engine.move_stock(None, [{'product_id': 2, 'quantity': 1}], 'sortie')[1] is True
+        assert engine.move_stock(None, [{'product_id': 2, 'quantity': 1}], 'sortie')[1] is True  # sans référence
+        assert store.get(1, 1)['available_quantity'] == 10 and store.get(2, 1)['available_quantity'] == 8
+
+        engine.move_stock('v2', [{'product_id': 3, 'quantity': 1}], 'sortie')  # ('v1', 'sortie') oublié
+        assert engine.move_stock('v1', [{'product_id': 1, 'quantity': 3}], 'sortie')[1] is True
+
+    def test_ventes_rejouees_concurrentes(self):
+        """La même vente envoyée par plusieurs threads n'est décrémentée qu'une fois"""
+        store = _store(quantite=10)
+        engine = ReservationEngine(store)
+        resultats = []
+        threads = [
+            threading.Thread(target=lambda: resultats.append(
+                engine.move_stock('v1', [{'product_id': 1, 'quantity': 2}], 'sortie')[1]
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(resultats) == [False] * 7 + [True]
+        assert store.get(1, 1)['available_quantity'] == 8
+
+
+class TestReservationSweeper:
+    """Expiration des réservations abandonnées"""
+
+    def test_liberation_des_reservations_echues(self):
+        """Seules les réservations actives échues sont expirées, par lots"""
+        store = _store(quantite=20)
+        engine = ReservationEngine(store)
+        sweeper = ReservationSweeper(engine, batch_size=2)
+        for numero in range(4):
+            sweeper.schedule(engine.reserve(f"r{numero}", 1, [{'product_id': 1, 'quantity': 2}])[0])
+        engine.release('r0')
+
+        apres_echeance = datetime.utcnow() + engine.ttl + timedelta(seconds=1)
+        assert sweeper.sweep(datetime.utcnow()) == []
+        premier_lot = sweeper.sweep(apres_echeance)
+        second_lot = sweeper.sweep(apres_echeance)
+
+        assert [r['reservation_id'] for r in premier_lot] == ['r1']
+        assert [r['reservation_id'] for r in second_lot] == ['r2', 'r3']
+        assert engine.get('r3')['status'] == 'expired'
+        assert store.get(1, 1)['available_quantity'] == 20
+        assert sweeper.stats() == {
+            'pending_expirations': 0,
+            'expired_reservations': 3,
+            'expired_released_quantity': 6,
+            'expirations_skipped': 1
+        }
+
+    def test_reservation_confirmee_jamais_expiree(self):
+        """Commande conclue : le stock réservé sort définitivement, l'échéance est ignorée"""
+        store = _store(quantite=20)
+        engine = ReservationEngine(store)
+        sweeper = ReservationSweeper(engine)
+        sweeper.schedule(engine.reserve('saga-1', 1, [{'product_id': 1, 'quantity': 3}])[0])
+        sweeper.schedule(engine.reserve('saga-2', 1, [{'product_id': 1, 'quantity': 4}])[0])
+
+        reservation, confirmee = engine.confirm('saga-1')
+        assert confirmee and reservation['status'] == 'confirmed'
+        assert engine.confirm('saga-1')[1] is False
+        assert engine.release('saga-1')[1] is False  # plus de remise en stock possible
+        assert store.get(1, 1) == {'product_id': 1, 'location_id': 1, 'available_quantity': 13, 'reserved_quantity': 4}
+
+        expirees = sweeper.sweep(datetime.utcnow() + engine.ttl + timedelta(seconds=1))
+        assert [r['reservation_id'] for r in expirees] == ['saga-2']
+        assert engine.confirm('saga-2') == (engine.get('saga-2'), False)
+        assert store.get(1, 1)['available_quantity'] == 17 and store.total_reserved == 0
+
+
+class TestReservationConcurrente:
+    """Test de charge multithreadé : aucune survente"""
+
+    def test_aucune_survente_sous_forte_concurrence(self):
+        """Paniers multi-lignes concurrents sur peu de SKU, avec libérations intercalées"""
+        nb_produits, stock_initial = 8, 50
+        store = _store(nb_produits, stock_initial)
+        engine = ReservationEngine(store, stripes=4)  # plusieurs SKU par bande
+        reussies = []
+        verrou = threading.Lock()
+
+        def client(numero):
+            rng = random.Random(numero)
+            for essai in range(40):
+                panier = [
+                    {'product_id': pid, 'quantity': rng.randint(1, 3)}
+                    for pid in rng.sample(range(1, nb_produits + 1), rng.randint(1, 4))
+                ]
+                reservation_id = f"{numero}-{essai}"
+                try:
+                    engine.reserve(reservation_id, numero, panier)
+                except ReservationError:
+                    continue
+                if rng.random() < 0.3:
+                    engine.release(reservation_id)
+                else:
+                    with verrou:
+                        reussies.append(reservation_id)
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            list(executor.map(client, range(32)))
+
+        reserve_par_produit = {pid: 0 for pid in range(1, nb_produits + 1)}
+        for reservation_id in reussies:
+            for item in engine.get(reservation_id)['items']:
+                reserve_par_produit[item['product_id']] += item['quantity']
+
+        for pid in range(1, nb_produits + 1):
+            item = store.get(pid, 1)
+            assert item['available_quantity'] >= 0
+            assert item['reserved_quantity'] == reserve_par_produit[pid]
+            assert item['available_quantity'] + item['reserved_quantity'] == stock_initial
+        assert store.total_reserved == sum(reserve_par_produit.values())
+        assert store.total_available == nb_produits * stock_initial - store.total_reserved
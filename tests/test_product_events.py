@@ -0,0 +1,121 @@
+"""
+Tests du flux de changements du catalogue (ProductEventPublisher) et du cache
+local des produits des services consommateurs (ProductCache)
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'shared'
+)))
+
+from product_cache import ProductCache
+
+# Seul product_events est importé : app et services de product-service ne doivent pas
+# masquer ceux des autres services
+_PRODUCT_SERVICE_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'product-service'
+))
+sys.path.insert(0, _PRODUCT_SERVICE_DIR)
+try:
+    from product_events import PRODUCT_PRICE_CHANGED, PRODUCT_UPDATED, ProductEventPublisher
+finally:
+    sys.path.remove(_PRODUCT_SERVICE_DIR)
+
+
+def _catalogue(product_ids):
+    return {product_id: {'id': product_id, 'prix': 1.0} for product_id in product_ids}
+
+
+class TestProductCache:
+    """TTL, borne LRU, invalidation et garde contre les chargements périmés"""
+
+    def test_eviction_lru(self):
+        cache = ProductCache(max_entries=2)
+        cache.get_many([1, 2], _catalogue)
+        cache.get(1, _catalogue)  # 1 devient le plus récent
+        cache.get(3, _catalogue)
+
+        loads = []
+        cache.get_many([1, 2, 3], lambda ids: loads.append(ids) or _catalogue(ids))
+        assert loads == [[2]] and cache.stats()['size'] == 2
+
+    def test_trou_de_versions_vide_le_cache(self):
+        cache = ProductCache()
+        cache.get_many([1, 2, 3], _catalogue)
+        cache.apply({'version': '10', 'product_id': '1'})
+        cache.apply({'version': '11', 'product_id': '2'})
+        assert cache.stats()['size'] == 1 and cache.stats()['resets'] == 0
+
+        cache.apply({'version': '14', 'product_id': '3'})  # versions 12 et 13 manquées
+        assert cache.stats()['size'] == 0 and cache.stats()['resets'] == 1
+
+    def test_chargement_perime_non_mis_en_cache(self):
+        cache = ProductCache()
+        chargement_commence, invalidation_faite = threading.Event(), threading.Event()
+
+        def loader_lent(product_ids):
+            chargement_commence.set()
+            invalidation_faite.wait(1)
+            return {product_id: {'id': product_id, 'prix': 1.0} for product_id in product_ids}
+
+        thread = threading.Thread(target=cache.get_many, args=([1, 2], loader_lent))
+        thread.start()
+        chargement_commence.wait(1)
+        cache.apply({'version': '1', 'product_id': '1'})  # prix modifié pendant le chargement
+        invalidation_faite.set()
+        thread.join()
+
+        loads = []
+        cache.get_many([1, 2], lambda ids: loads.append(ids) or _catalogue(ids))
+        assert loads == [[1]]  # 1 rechargé, 2 resté en cache
+
+    def test_invalidations_retenues_seulement_pendant_un_chargement(self):
+        cache = ProductCache()
+        cache.get_many(range(100), _catalogue)
+        cache.invalidate(range(100))
+        assert cache._invalidated == {}
+
+        def loader(product_ids):
+            cache.invalidate([product_ids[0]])
+            return _catalogue(product_ids)
+
+        cache.get_many([500, 501], loader)
+        assert cache._invalidated == {} and cache._loads == {}
+
+
+class TestProductEventPublisher:
+    """Versions croissantes publiées sur le stream, reprises après perte du compteur"""
+
+    @pytest.fixture
+    def redis_client(self):
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        return fakeredis.FakeStrictRedis(decode_responses=True)
+
+    def test_versions_et_changement_de_prix(self, redis_client):
+        publisher = ProductEventPublisher(redis_client, stream='events:test')
+        assert publisher.product_created({'id': 1, 'prix': 2.0}) == 1
+        assert publisher.product_updated({'id': 1, 'prix': 2.5}, old_price=2.0) == 3
+
+        events = [fields for _, fields in redis_client.xrange('events:test')]
+        assert [event['version'] for event in events] == ['1', '2', '3']
+        assert [event['event_type'] for event in events[1:]] == [PRODUCT_UPDATED, PRODUCT_PRICE_CHANGED]
+
+        redis_client.delete('events:test:version')  # compteur perdu : reprise depuis le stream
+        assert publisher.product_deleted({'id': 1, 'prix': 2.5}) == 4
+
+    def test_flux_applique_au_cache_sans_trou(self, redis_client):
+        publisher = ProductEventPublisher(redis_client, stream='events:test')
+        cache = ProductCache(redis_client, stream='events:test')
+        cache.get_many([1, 2], _catalogue)
+        for product_id in (1, 2):
+            publisher.product_updated({'id': product_id, 'prix': 3.0})
+
+        for _, fields in redis_client.xrange('events:test'):
+            cache.apply(fields)
+        assert cache.stats()['invalidations'] == 2 and cache.stats()['resets'] == 0
+        assert cache.stats()['size'] == 0
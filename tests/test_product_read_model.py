@@ -0,0 +1,90 @@
+"""
+Tests du read model (côté lecture CQRS) du catalogue produits
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.persistence.models import Base, CategorieModel, ProduitModel
+from src.api.bounded_contexts.product_catalog.infrastructure.product_read_model import ProductReadModel
+from src.api.bounded_contexts.product_catalog.infrastructure.product_repository_adapter import (
+    ProductRepositoryAdapter
+)
+from src.api.bounded_contexts.product_catalog.application.product_query_service import ProductQueryService
+from src.api.bounded_contexts.product_catalog.application.product_application_service import (
+    ProductApplicationService
+)
+from src.api.bounded_contexts.product_catalog.domain.services.product_domain_service import (
+    ProductSearchResult
+)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        CategorieModel(id=1, nom="Alimentaire"),
+        CategorieModel(id=2, nom="Boissons"),
+    ])
+    session.add_all([
+        ProduitModel(id=1, nom="Pain", prix=Decimal("1.50"), stock=50, id_categorie=1),
+        ProduitModel(id=2, nom="Lait", prix=Decimal("1.20"), stock=3, id_categorie=1,
+                     description="  Lait entier  "),
+        ProduitModel(id=3, nom="Eau", prix=Decimal("0.80"), stock=40, id_categorie=2),
+        ProduitModel(id=4, nom="Coca-Cola", prix=Decimal("1.90"), stock=35, id_categorie=2,
+                     description=""),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+class TestProductReadModel:
+
+    def test_memes_donnees_que_l_agregat(self, session):
+        """Le read model renvoie exactement Product.to_dict()"""
+        query_service = ProductQueryService(ProductReadModel(session))
+        application_service = ProductApplicationService(ProductRepositoryAdapter(session))
+
+        lecture, total = query_service.list_products()
+        assert total == 4
+        assert lecture == application_service.list_products()
+        assert query_service.get_product_by_id(2) == application_service.get_product_by_id(2)
+
+    def test_tri_filtre_et_pagination_en_base(self, session):
+        """Tri, filtre catégorie et pagination sont faits par la requête"""
+        query_service = ProductQueryService(ProductReadModel(session))
+
+        page, total = query_service.list_products(sort_field='prix', sort_order='desc', page=2, per_page=2)
+        assert [p['id'] for p in page] == [2, 3]
+        assert total == 4
+
+        page, total = query_service.list_products(category_id=2)
+        assert [p['nom'] for p in page] == ["Coca-Cola", "Eau"]
+        assert total == 2
+
+        page, total = query_service.list_products(page=5, per_page=2)
+        assert page == []
+        assert total == 4
+
+    def test_recherche_via_index(self, session):
+        """La recherche paginée conserve l'ordre de pertinence de l'index"""
+        search_index = Mock()
+        search_index.search.return_value = ProductSearchResult(product_ids=[4, 3], total=2)
+        query_service = ProductQueryService(ProductReadModel(session), search_index=search_index)
+
+        page, total = query_service.search_products("co", page=1, per_page=20)
+        assert [p['id'] for p in page] == [4, 3]
+        assert total == 2
+
+    def test_recherche_sans_index(self, session):
+        """Sans index, la recherche se replie sur un filtre SQL"""
+        query_service = ProductQueryService(ProductReadModel(session))
+        page, total = query_service.list_products(search="ai")
+        assert [p['nom'] for p in page] == ["Lait", "Pain"]
+        assert total == 2
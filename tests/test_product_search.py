@@ -0,0 +1,82 @@
+"""
+Tests de l'index de recherche du catalogue produits
+"""
+
+from unittest.mock import Mock
+
+from src.api.bounded_contexts.product_catalog.infrastructure.product_search_index import (
+    InMemoryProductSearchIndex
+)
+from src.api.bounded_contexts.product_catalog.application.product_application_service import (
+    ProductApplicationService
+)
+from src.api.bounded_contexts.product_catalog.domain.services.product_domain_service import (
+    ProductSearchResult
+)
+
+
+def _index():
+    index = InMemoryProductSearchIndex(max_age_seconds=None)
+    index.rebuild([
+        (1, "Pain"),
+        (2, "Pain de mie complet"),
+        (3, "Chocolat au pain"),
+        (4, "Lait"),
+        (12, "Eau (1.5L)"),
+    ])
+    return index
+
+
+class TestInMemoryProductSearchIndex:
+
+    def test_recherche_classee_par_pertinence(self):
+        """Nom exact et préfixe passent avant les correspondances internes"""
+        result = _index().search("pain")
+        assert result.product_ids == [1, 2, 3]
+        assert result.total == 3
+
+    def test_recherche_paginee(self):
+        """La pagination s'applique après le classement"""
+        result = _index().search("pain", limit=1, offset=1)
+        assert result.product_ids == [2]
+        assert result.total == 3
+
+    def test_recherche_par_code(self):
+        """Un code numérique retrouve le produit par son ID"""
+        assert _index().search("12").product_ids == [12]
+
+    def test_requete_courte(self):
+        """Les requêtes plus courtes qu'un trigramme restent supportées"""
+        assert _index().search("ai").product_ids == [4, 1, 3, 2]
+
+    def test_mise_a_jour_et_suppression(self):
+        """L'index suit les créations, renommages et suppressions"""
+        index = _index()
+        index.index_product(4, "Lait d'avoine")
+        index.index_product(5, "Painvoine")
+        index.remove_product(3)
+
+        assert index.search("avoine").product_ids == [4]
+        assert index.search("pain").product_ids == [1, 2, 5]
+        assert index.search("chocolat").total == 0
+
+
+class TestProductApplicationServiceSearch:
+
+    def test_search_products_utilise_l_index(self):
+        """La recherche paginée charge uniquement les IDs de la page"""
+        repository = Mock()
+        product = Mock()
+        product.to_dict.return_value = {'id': 2, 'nom': 'Pain de mie complet'}
+        repository.find_by_ids.return_value = [product]
+        search_index = Mock()
+        search_index.search.return_value = ProductSearchResult(product_ids=[2], total=3)
+
+        service = ProductApplicationService(repository, search_index=search_index)
+        produits, total = service.search_products("pain", page=2, per_page=1)
+
+        search_index.search.assert_called_once_with("pain", limit=1, offset=1)
+        assert [p.value for p in repository.find_by_ids.call_args[0][0]] == [2]
+        repository.find_all.assert_not_called()
+        assert produits == [{'id': 2, 'nom': 'Pain de mie complet'}]
+        assert total == 3
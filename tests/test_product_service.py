@@ -0,0 +1,121 @@
+"""
+Tests de product-service : résolution de produits par lot, page de produits et total
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('flask_restx')
+
+from unittest.mock import Mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+# app, services et database existent aussi dans d'autres services : modules chargés
+# depuis product-service puis retirés de sys.modules pour ne pas masquer les autres
+_SERVICE_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'product-service'
+))
+_MODULES = ('app', 'services', 'database', 'product_events')
+_autres = {name: sys.modules.pop(name) for name in _MODULES if name in sys.modules}
+sys.path.insert(0, _SERVICE_DIR)
+try:
+    import app as product_app
+    import services as product_services
+    from database import Base, CategoryModel, ProductModel
+finally:
+    sys.path.remove(_SERVICE_DIR)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    sys.modules.update(_autres)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(CategoryModel(id=1, nom='Papeterie'))
+    session.add_all([
+        ProductModel(id=product_id, nom=f'Produit {product_id}', prix=product_id + 0.5, stock=10,
+                     id_categorie=1, sku=f'SKU-{product_id}', actif='INACTIF' if product_id == 4 else 'ACTIF')
+        for product_id in range(1, 8)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(session, monkeypatch):
+    monkeypatch.setattr(product_app, 'db_session', session)
+    return product_app.app.test_client()
+
+
+class TestProductBatch:
+    """POST/GET /api/v1/products/batch"""
+
+    def test_produits_trouves_dans_l_ordre_et_manquants(self, client):
+        response = client.post('/api/v1/products/batch', json={'ids': [3, 99, 1, 3, 4]})
+        assert response.status_code == 200
+        result = response.get_json()
+        assert [product['id'] for product in result['products']] == [3, 1]  # doublon résolu une fois
+        assert result['products'][0]['categorie']['nom'] == 'Papeterie'
+        assert result['missing'] == [99, 4]  # inexistant ou inactif
+
+    def test_query_string_et_liste_vide(self, client):
+        result = client.get('/api/v1/products/batch?ids=2,5').get_json()
+        assert [product['id'] for product in result['products']] == [2, 5]
+        assert client.post('/api/v1/products/batch', json={'ids': []}).get_json() == {'products': [], 'missing': []}
+
+    def test_requetes_invalides(self, client, monkeypatch):
+        assert client.get('/api/v1/products/batch?ids=1,a').status_code == 400
+        assert client.post('/api/v1/products/batch', json={'ids': '1,2'}).status_code == 400
+        assert client.post('/api/v1/products/batch', json={'ids': [1, 'x']}).status_code == 400
+
+        monkeypatch.setattr(product_services, 'MAX_BATCH_IDS', 3)
+        assert client.post('/api/v1/products/batch', json={'ids': [1, 2, 3]}).status_code == 200
+        assert client.post('/api/v1/products/batch', json={'ids': [1, 1, 2, 3]}).status_code == 200
+        response = client.post('/api/v1/products/batch', json={'ids': [1, 2, 3, 5]})
+        assert response.status_code == 400 and 'Au plus 3 IDs' in response.get_json()['message']
+
+
+class TestProductPage:
+    """Page de produits et total en une requête"""
+
+    def test_page_et_total_exact(self, session):
+        service = product_services.ProductService(session)
+        products, total, estimated = service.get_products_page(page=2, per_page=2)
+        assert [product['id'] for product in products] == [3, 5]  # le produit 4 est inactif
+        assert (total, estimated) == (6, False)
+
+        products, total, _ = service.get_products_page(page=1, per_page=10, search='SKU-7')
+        assert [product['id'] for product in products] == [7] and total == 1
+        assert service.get_products_page(page=9, per_page=2) == ([], 6, False)
+        assert service.get_products_page(page=1, per_page=2, search='introuvable') == ([], 0, False)
+
+    def test_total_estime_au_dela_du_seuil(self, session, monkeypatch):
+        service = product_services.ProductService(session)
+        monkeypatch.setattr(service, '_estimate_count', lambda query: 250_000)
+        products, total, estimated = service.get_products_page(page=1, per_page=3)
+        assert [product['id'] for product in products] == [1, 2, 3]
+        assert (total, estimated) == (250_000, True)
+
+    def test_liste_http_avec_meta(self, client):
+        result = client.get('/api/v1/products?page=1&per_page=4').get_json()
+        assert len(result['data']) == 4
+        assert result['meta'] == {'page': 1, 'per_page': 4, 'total': 6, 'total_estimated': False}
+
+    def test_explain_en_echec_annule_la_transaction(self, session):
+        """PostgreSQL : la session partagée doit rester utilisable après un EXPLAIN en échec"""
+        postgres_session = Mock()
+        postgres_session.get_bind.return_value.dialect = postgresql.dialect()
+        postgres_session.connection.return_value.exec_driver_sql.side_effect = RuntimeError('EXPLAIN refusé')
+        service = product_services.ProductService(postgres_session)
+
+        assert service._estimate_count(session.query(ProductModel)) is None
+        postgres_session.rollback.assert_called_once()
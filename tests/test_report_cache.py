@@ -0,0 +1,74 @@
+"""
+Tests du cache des rapports de reporting-service (LRU borné, TTL, génération unique, invalidation)
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'reporting-service'
+)))
+
+from report_cache import ReportCache
+
+
+class TestReportCache:
+    """Cache local au processus"""
+
+    def test_lru_borne_et_ttl(self):
+        cache = ReportCache(ttl=0.05, max_entries=2)
+        cache.put('a', {'rapport': 'a'})
+        cache.put('b', {'rapport': 'b'})
+        assert cache.get('a') == {'rapport': 'a'}  # 'a' devient la plus récente
+        cache.put('c', {'rapport': 'c'})
+        assert cache.get('b') is None
+        assert len(cache) == 2 and cache.stats()['evictions'] == 1
+        time.sleep(0.06)
+        assert cache.get('a') is None
+
+    def test_invalidation_par_periode_et_magasin(self):
+        cache = ReportCache()
+        cache.put('janvier_m1', {}, period=('2025-01-01', '2025-01-31', [1]))
+        cache.put('fevrier', {}, period=('2025-02-01', '2025-02-28', None))
+        cache.put('tout', {}, period=(None, None, None))
+        cache.put('inventaire', {})
+
+        assert cache.invalidate_sale('2025-01-15', 2) == 1  # seul 'tout' couvre le magasin 2
+        assert cache.invalidate_sale('2025-01-15', 1) == 1
+        assert cache.get('fevrier') is not None
+        assert cache.invalidate_sale() == 1  # flux discontinu : tous les rapports de ventes
+        assert cache.get('inventaire') is not None
+
+    def test_generation_unique(self):
+        cache = ReportCache()
+        generations = []
+
+        def rapport():
+            with cache.single_flight('cle') as cached:
+                if cached is None:
+                    generations.append(1)
+                    time.sleep(0.05)
+                    cache.put('cle', {'rapport': 1})
+
+        threads = [threading.Thread(target=rapport) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(generations) == 1
+        assert cache.stats()['coalesced'] == 7
+
+    def test_vente_pendant_la_generation(self):
+        """Un rapport commencé avant une vente de sa période n'est pas mis en cache"""
+        cache = ReportCache()
+        with cache.single_flight('cle') as cached:
+            assert cached is None
+            cache.invalidate_sale('2025-03-02', 1)
+            cache.put('cle', {}, period=('2025-03-01', '2025-03-31', None))
+        assert cache.get('cle') is None
+
+        with cache.single_flight('cle'):
+            cache.invalidate_sale('2025-04-02', 1)
+            cache.put('cle', {}, period=('2025-03-01', '2025-03-31', None))
+        assert cache.get('cle') is not None
@@ -0,0 +1,62 @@
+"""
+Tests du calcul colonnaire des rapports de reporting-service
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'reporting-service'
+)))
+
+from report_columns import SalesColumns, inventory_report
+
+VENTES = [
+    {'store_id': 2, 'cashier_id': 'c1', 'payment_method': 'card', 'timestamp': '2025-01-02T09:10:00',
+     'final_amount': 12.5, 'items': [{'product_id': 7, 'quantity': 2, 'unit_price': 5.0},
+                                     {'product_id': 3, 'quantity': 1, 'unit_price': 2.5}]},
+    {'store_id': 1, 'cashier_id': 'c2', 'payment_method': 'cash', 'timestamp': '2025-01-01T18:00:00',
+     'final_amount': 4.0, 'items': [{'product_id': 3, 'quantity': 4, 'unit_price': 1.0}]},
+    {'store_id': 2, 'cashier_id': 'c1', 'timestamp': '2025-01-02T09:45:00',
+     'final_amount': 3.0, 'items': [{'product_id': 7, 'quantity': 1, 'unit_price': 3.0}]},
+]
+
+
+class TestSalesColumns:
+    """Regroupements par np.bincount"""
+
+    def test_resume_des_ventes(self):
+        resume = SalesColumns(VENTES).sales_summary()
+        assert resume['total_transactions'] == 3
+        assert resume['total_revenue'] == 19.5
+        assert resume['total_items_sold'] == 4
+        assert resume['average_transaction_value'] == 6.5
+        assert resume['by_store'] == {2: {'transactions': 2, 'revenue': 15.5, 'items': 3},
+                                      1: {'transactions': 1, 'revenue': 4.0, 'items': 1}}
+        assert resume['by_payment_method']['unknown'] == {'transactions': 1, 'revenue': 3.0}
+        assert list(resume['by_day']) == ['2025-01-01', '2025-01-02']
+
+    def test_caissier_heure_et_produits(self):
+        colonnes = SalesColumns(VENTES)
+        assert colonnes.group_by('cashier')['c1'] == {'transactions': 2, 'revenue': 15.5, 'items': 3}
+        assert colonnes.group_by('hour')[9]['transactions'] == 2
+        assert colonnes.product_sales() == {
+            7: {'quantity': 3, 'revenue': 13.0, 'transactions': 2},
+            3: {'quantity': 5, 'revenue': 6.5, 'transactions': 2}
+        }
+        assert list(colonnes.product_sales(product_ids=[3])) == [3]
+
+
+def test_rapport_inventaire():
+    rapport = inventory_report([
+        {'product_id': 1, 'location_id': 1, 'available_quantity': 3, 'reserved_quantity': 1, 'unit_cost': 2.0},
+        {'product_id': 1, 'location_id': 2, 'available_quantity': 20, 'reserved_quantity': 0},
+        {'product_id': 2, 'location_id': 1, 'available_quantity': 8, 'reorder_point': 10, 'unit_cost': 1.5},
+    ])
+    assert rapport['total_products'] == 2
+    assert rapport['total_stock_value'] == 20.0
+    assert [(a['product_id'], a['location_id']) for a in rapport['low_stock_alerts']] == [(1, 1), (2, 1)]
+    assert rapport['by_location'][1] == {'products': 2, 'total_quantity': 12, 'stock_value': 20.0}
@@ -0,0 +1,72 @@
+"""
+Tests des appels sortants de reporting-service (fan-out parallèle, délai, réponses en échec)
+"""
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip('flask_restx')
+pytest.importorskip('prometheus_client')
+
+import requests
+from prometheus_client import REGISTRY
+
+from tests.service_apps import load_service_app
+
+reporting_app = load_service_app('reporting-service')
+DataAggregator = reporting_app.DataAggregator
+
+
+def _echecs(service):
+    return REGISTRY.get_sample_value('reporting_upstream_failures_total', {'service': service}) or 0
+
+
+@pytest.fixture
+def inventaire(monkeypatch):
+    """http_session simulée : une réponse par magasin (location_id)"""
+    liberer = threading.Event()
+
+    def reponse_invalide():
+        raise ValueError('JSON invalide')
+
+    def get(url, params=None, timeout=None):
+        magasin = params['location_id']
+        if magasin == 3:
+            liberer.wait(2)  # plus lent que FANOUT_TIMEOUT
+        if magasin == 5:
+            raise requests.exceptions.ConnectionError('refusé')
+        return {
+            1: Mock(status_code=200, json=lambda: [{'product_id': 1, 'location_id': 1}]),
+            2: Mock(status_code=500, json=lambda: {'error': 'panne'}),
+            3: Mock(status_code=200, json=lambda: [{'product_id': 3, 'location_id': 3}]),
+            4: Mock(status_code=200, json=reponse_invalide),
+            6: Mock(status_code=200, json=lambda: [{'product_id': 6, 'location_id': 6}]),
+        }[magasin]
+
+    monkeypatch.setattr(reporting_app.http_session, 'get', get)
+    monkeypatch.setattr(reporting_app, 'FANOUT_TIMEOUT', 0.2)
+    yield
+    liberer.set()
+
+
+class TestFanOut:
+    """Appels en parallèle : les réponses valides sont gardées, les autres comptées et ignorées"""
+
+    def test_appels_lents_et_en_erreur_ignores(self, inventaire):
+        avant = _echecs('inventory-service')
+        debut = time.monotonic()
+        items = DataAggregator.get_inventory_data([1, 2, 3, 4, 5, 6])
+        assert time.monotonic() - debut < 1.5  # borné par FANOUT_TIMEOUT, pas par l'appel lent
+        assert sorted(item['product_id'] for item in items) == [1, 6]
+        assert _echecs('inventory-service') - avant == 4  # 500, hors délai, JSON invalide, connexion
+
+    def test_sources_en_parallele_dans_l_ordre(self):
+        debut = time.monotonic()
+        resultats = DataAggregator.in_parallel(
+            lambda: time.sleep(0.2) or 'ventes',
+            lambda: time.sleep(0.2) or 'inventaire'
+        )
+        assert resultats == ['ventes', 'inventaire']
+        assert time.monotonic() - debut < 0.35
@@ -0,0 +1,75 @@
+"""
+Tests des rapports asynchrones de reporting-service (pool de workers, progression, résultat gzip)
+"""
+import gzip
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'reporting-service'
+)))
+
+from report_jobs import ReportJobs
+
+
+def _attendre_fin(jobs, job_id):
+    return [etat for etat in jobs.watch(job_id, keepalive=1) if etat is not None][-1]
+
+
+class TestReportJobs:
+    """Jobs en mémoire, résultats sur disque"""
+
+    def test_demandes_identiques_dedupliquees(self, tmp_path):
+        jobs = ReportJobs(str(tmp_path))
+        debloquer = threading.Event()
+        executions = []
+
+        def rapport(progress):
+            executions.append(1)
+            debloquer.wait(5)
+            progress(0.5, 'moitié')
+            return {'summary': {'total_transactions': 3}, 'data': [1, 2, 3]}
+
+        premier, cree = jobs.submit('cle', 'sales', {}, rapport)
+        second, cree_second = jobs.submit('cle', 'sales', {}, rapport)
+        assert cree and not cree_second
+        assert premier['job_id'] == second['job_id']
+        assert jobs.result_path(premier['job_id']) is None
+
+        debloquer.set()
+        fin = _attendre_fin(jobs, premier['job_id'])
+        assert fin['status'] == 'completed' and fin['progress'] == 1.0
+        with gzip.open(jobs.result_path(premier['job_id']), 'rt') as resultat:
+            assert json.load(resultat)['data'] == [1, 2, 3]
+        assert executions == [1]
+
+        # Une fois terminé, une nouvelle demande identique relance un job
+        troisieme, cree_troisieme = jobs.submit('cle', 'sales', {}, rapport)
+        assert cree_troisieme and troisieme['job_id'] != premier['job_id']
+        _attendre_fin(jobs, troisieme['job_id'])
+
+    def test_progression_et_echec(self, tmp_path):
+        jobs = ReportJobs(str(tmp_path))
+
+        def rapport(progress):
+            progress(0.3, 'ventes 1/3')
+            raise RuntimeError('sales-service indisponible')
+
+        job, _ = jobs.submit('cle', 'sales', {}, rapport)
+        etats = [etat for etat in jobs.watch(job['job_id'], keepalive=1) if etat is not None]
+        assert etats[-1]['status'] == 'failed'
+        assert etats[-1]['error'] == 'sales-service indisponible'
+        assert [etat['version'] for etat in etats] == sorted(etat['version'] for etat in etats)
+        assert jobs.stats()['failed'] == 1
+
+    def test_purge_des_jobs_expires(self, tmp_path):
+        jobs = ReportJobs(str(tmp_path), retention=0)
+        job, _ = jobs.submit('cle', 'sales', {}, lambda progress: {'data': []})
+        _attendre_fin(jobs, job['job_id'])
+        assert os.path.exists(jobs.result_path(job['job_id']))
+
+        jobs.submit('autre', 'sales', {}, lambda progress: {'data': []})
+        assert jobs.get(job['job_id']) is None
+        assert not os.path.exists(os.path.join(str(tmp_path), f"{job['job_id']}.json.gz"))
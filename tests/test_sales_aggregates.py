@@ -0,0 +1,123 @@
+"""
+Tests des agrégats incrémentaux de reporting-service (flux SaleCompleted)
+"""
+import json
+import os
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+for service_dir in ('reporting-service', 'sales-service'):
+    sys.path.insert(0, os.path.abspath(os.path.join(
+        os.path.dirname(__file__), '..', 'microservices', service_dir
+    )))
+
+from sales_aggregates import SalesAggregates, SalesEventConsumer
+from sales_events import SaleEventPublisher
+
+
+def _vente(numero, jour, magasin, heure=10):
+    return {
+        'transaction_id': f"t{numero}",
+        'timestamp': f"2025-01-{jour:02d}T{heure:02d}:15:00",
+        'store_id': magasin,
+        'payment_method': 'card' if numero % 2 else 'cash',
+        'items': [{'product_id': 1 + numero % 4, 'quantity': 1 + numero % 3, 'unit_price': 2.5}],
+        'final_amount': 10.0 + numero
+    }
+
+
+def _evenement(version, vente):
+    return {'version': str(version), 'event_type': 'SaleCompleted', 'data': json.dumps(vente)}
+
+
+class TestSalesAggregates:
+    """Fusion des buckets comparée à un calcul direct sur les ventes"""
+
+    def test_resume_et_ventes_par_produit(self):
+        agregats = SalesAggregates()
+        agregats.reset(covered_since='2025-01-01')
+        ventes = [_vente(n, jour=1 + n % 3, magasin=1 + n % 2, heure=n % 24) for n in range(30)]
+        for vente in ventes:
+            agregats.apply_sale(vente)
+
+        retenues = [v for v in ventes if v['store_id'] == 2 and '2025-01-02' <= v['timestamp'][:10] <= '2025-01-03']
+        resume = agregats.sales_summary([2], '2025-01-02', '2025-01-03')
+        assert resume['total_transactions'] == len(retenues)
+        assert resume['total_revenue'] == round(sum(v['final_amount'] for v in retenues), 2)
+        assert resume['by_payment_method']['card']['transactions'] == len([v for v in retenues if v['payment_method'] == 'card'])
+        assert list(resume['by_day']) == ['2025-01-02', '2025-01-03']
+
+        par_produit = agregats.product_sales(date_from='2025-01-01', date_to='2025-01-03', product_ids=[2])
+        assert par_produit == {2: {
+            'quantity': sum(v['items'][0]['quantity'] for v in ventes if v['items'][0]['product_id'] == 2),
+            'revenue': sum(v['items'][0]['quantity'] * 2.5 for v in ventes if v['items'][0]['product_id'] == 2),
+            'transactions': len([v for v in ventes if v['items'][0]['product_id'] == 2])
+        }}
+        top = agregats.top_products('2025-01-01', '2025-01-03', k=2)
+        quantites = agregats.product_sales()
+        assert [p['quantity_sold'] for p in top] == sorted((s['quantity'] for s in quantites.values()), reverse=True)[:2]
+
+    def test_stock_bas(self):
+        agregats = SalesAggregates()
+        agregats.update_inventory([
+            {'product_id': 1, 'available_quantity': 3},
+            {'product_id': 1, 'available_quantity': 50},
+            {'product_id': 2, 'available_quantity': 8, 'reorder_point': 10}
+        ])
+        assert agregats.low_stock_count == 2
+        assert agregats.products_in_system == 2
+
+
+class TestSalesEventConsumer:
+    """Couverture des agrégats selon la continuité des versions"""
+
+    def test_flux_complet_puis_trou(self):
+        agregats = SalesAggregates()
+        consommateur = SalesEventConsumer(None, agregats)
+        assert not agregats.covers('2025-01-01', '2025-01-05')
+
+        consommateur.apply(_evenement(1, _vente(1, jour=1, magasin=1)))
+        consommateur.apply(_evenement(2, _vente(2, jour=2, magasin=1)))
+        # Ventes d'avant le flux jamais publiées : couverture depuis le premier événement
+        assert agregats.covered_since == '2025-01-01' and not agregats.covers(None)
+        assert agregats.covers('2025-01-01') and agregats.sales_summary()['total_transactions'] == 2
+
+        consommateur.apply(_evenement(5, _vente(5, jour=3, magasin=1)))
+        assert agregats.covered_since == '2025-01-04'
+        assert not agregats.covers('2025-01-03', '2025-01-05')
+        assert agregats.covers('2025-01-04', '2025-01-05')
+        assert agregats.sales_summary()['total_transactions'] == 1
+
+    def test_flux_deja_tronque_au_demarrage(self):
+        agregats = SalesAggregates()
+        SalesEventConsumer(None, agregats).apply(_evenement(40, _vente(40, jour=7, magasin=1)))
+        assert agregats.covered_since == '2025-01-08'
+        assert not agregats.covers(None)
+
+
+class TestSaleEventPublisher:
+    """Une vente non publiée apparaît comme un trou de versions"""
+
+    def test_publication_manquee_reinitialise_la_couverture(self):
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        redis_client = fakeredis.FakeStrictRedis(decode_responses=True)
+        publisher = SaleEventPublisher(redis_client, stream='events:test')
+        assert publisher.sale_completed(_vente(1, jour=1, magasin=1)) == 1
+
+        script = publisher._script
+        publisher._script = Mock(side_effect=ConnectionError('Redis indisponible'))
+        assert publisher.sale_completed(_vente(2, jour=2, magasin=1)) is None
+        publisher._script = script
+        assert publisher.sale_completed(_vente(3, jour=2, magasin=1)) == 3  # version 2 sautée
+        assert publisher.sale_completed(_vente(4, jour=3, magasin=1)) == 4
+        assert publisher.failed == 1
+
+        agregats = SalesAggregates()
+        consommateur = SalesEventConsumer(None, agregats)
+        for _, fields in redis_client.xrange('events:test'):
+            consommateur.apply(fields)
+        assert agregats.covered_since == '2025-01-03'  # vente 2 absente : le 2 janvier n'est plus couvert
+        assert not agregats.covers('2025-01-02', '2025-01-03')
@@ -0,0 +1,76 @@
+"""
+Tests du journal write-ahead de sales-service (fsync groupé, relecture, compaction)
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'sales-service'
+)))
+
+from sales_journal import JOURNAL_FILE, SalesJournal
+
+
+def _vente(numero):
+    return {
+        'transaction_id': f"t{numero}",
+        'timestamp': '2025-01-01T10:00:00',
+        'store_id': 1,
+        'cashier_id': 'c1',
+        'items': [{'product_id': 1, 'quantity': 1}],
+        'final_amount': 10.0
+    }
+
+
+class TestSalesJournal:
+    """Durabilité et reconstruction des ventes"""
+
+    def test_ajouts_concurrents_groupes_et_relus(self, tmp_path):
+        """Les ajouts concurrents partagent les fsync ; un redémarrage retrouve tout"""
+        journal = SalesJournal(str(tmp_path), commit_delay=0.01)
+        journal.replay()
+        journal.start()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(lambda n: journal.record_sale(_vente(n)), range(64)))
+        journal.record_return('t3', {'return_id': 'r1', 'items': []})
+        journal.close()
+
+        assert journal.commits < 65
+        ventes = {v['transaction_id']: v for v in SalesJournal(str(tmp_path)).replay()}
+        assert len(ventes) == 64
+        assert ventes['t3']['returns'] == [{'return_id': 'r1', 'items': []}]
+
+    def test_ligne_tronquee_ignoree(self, tmp_path):
+        """Une écriture interrompue est coupée au démarrage ; les ajouts suivants restent lisibles"""
+        journal = SalesJournal(str(tmp_path))
+        journal.replay()
+        journal.start()
+        journal.record_sale(_vente(1))
+        journal.close()
+        with open(tmp_path / JOURNAL_FILE, 'ab') as fichier:
+            fichier.write(b'{"op": "sale", "sale": {"transac')
+
+        redemarre = SalesJournal(str(tmp_path))
+        assert [v['transaction_id'] for v in redemarre.replay()] == ['t1']
+        redemarre.start()
+        redemarre.record_sale(_vente(2))
+        redemarre.close()
+        assert [v['transaction_id'] for v in SalesJournal(str(tmp_path)).replay()] == ['t1', 't2']
+
+    def test_compaction_en_snapshot(self, tmp_path):
+        """Après compaction, le journal est vide et le snapshot contient ventes et retours"""
+        journal = SalesJournal(str(tmp_path))
+        journal.replay()
+        journal.start()
+        for numero in range(5):
+            journal.record_sale(_vente(numero))
+        journal.record_return('t1', {'return_id': 'r1', 'items': []})
+        assert journal.compact() == 5
+        journal.record_sale(_vente(5))
+        journal.close()
+
+        assert os.path.getsize(tmp_path / JOURNAL_FILE) < 400
+        ventes = {v['transaction_id']: v for v in SalesJournal(str(tmp_path)).replay()}
+        assert len(ventes) == 6
+        assert ventes['t1']['returns'][0]['return_id'] == 'r1'
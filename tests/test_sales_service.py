@@ -0,0 +1,142 @@
+"""
+Tests de l'API de sales-service (retours et journal write-ahead, liste paginée)
+et des jobs de rapport de reporting-service qui lisent cette liste
+"""
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip('flask_restx')
+pytest.importorskip('prometheus_client')
+
+from tests.service_apps import load_service_app
+
+sales_app = load_service_app('sales-service')
+reporting_app = load_service_app('reporting-service')
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Client HTTP, journal simulé et mouvements de stock demandés à inventory-service"""
+    mouvements = []
+    journal = Mock()
+    monkeypatch.setattr(sales_app, 'sales_store', sales_app.SalesStore([{
+        'transaction_id': 't1', 'timestamp': '2025-01-01T10:00:00', 'store_id': 1, 'cashier_id': 'c1',
+        'items': [{'product_id': 1, 'quantity': 2, 'unit_price': 10.0}], 'final_amount': 23.0
+    }]))
+    monkeypatch.setattr(sales_app, 'sales_journal', journal)
+    monkeypatch.setattr(sales_app, 'apply_inventory_batch',
+                        lambda items, store_id, operation, reference: mouvements.append(operation) or (True, ''))
+    return sales_app.app.test_client(), journal, mouvements
+
+
+def _retour(client):
+    return client.post('/api/v1/sales/t1/return', json={
+        'cashier_id': 'c1', 'reason': 'Défectueux',
+        'items': [{'product_id': 1, 'quantity': 1, 'unit_price': 10.0}]
+    })
+
+
+class TestRetours:
+    """Le retour est journalisé avant la remise en stock"""
+
+    def test_retour_journalise_puis_remis_en_stock(self, service):
+        client, journal, mouvements = service
+        response = _retour(client)
+        assert response.status_code == 201
+        journal.record_return.assert_called_once()
+        assert mouvements == ['return']
+        assert len(sales_app.sales_store.get('t1')['returns']) == 1
+
+    def test_journal_en_echec_stock_inchange(self, service):
+        client, journal, mouvements = service
+        journal.record_return.side_effect = OSError('disque plein')
+        response = _retour(client)
+        assert response.status_code == 503
+        assert mouvements == []
+        assert 'returns' not in sales_app.sales_store.get('t1')
+
+
+class TestListeVentes:
+    """GET /sales page par page (offset / next_offset)"""
+
+    def test_pages_sans_perte_ni_doublon(self, service, monkeypatch):
+        client, _, _ = service
+        monkeypatch.setattr(sales_app, 'sales_store', sales_app.SalesStore(
+            {'transaction_id': f"t{numero}", 'timestamp': f"2025-01-0{1 + numero % 3}T{numero % 24:02d}:{numero % 60:02d}:00",
+             'store_id': 1, 'cashier_id': 'c1', 'items': [], 'final_amount': 1.0}
+            for numero in range(250)
+        ))
+        assert client.get('/api/v1/sales').get_json()['total_count'] == 100
+
+        lues, offset = [], 0
+        while offset is not None:
+            page = client.get(f"/api/v1/sales?limit=60&offset={offset}").get_json()
+            lues += [vente['transaction_id'] for vente in page['sales']]
+            offset = page['next_offset']
+        assert len(lues) == 250 and len(set(lues)) == 250
+        assert client.get('/api/v1/sales?limit=0').status_code == 400
+
+
+class _Appels(list):
+    """Paramètres des appels à GET /sales ; pannes : (date_from, offset) répondus en 503"""
+    pannes = ()
+
+
+@pytest.fixture
+def ventes(monkeypatch):
+    """250 ventes par jour sur 3 jours ; les appels HTTP de reporting vont au client de test de sales-service"""
+    monkeypatch.setattr(sales_app, 'sales_store', sales_app.SalesStore(
+        {'transaction_id': f"t{jour}-{numero}", 'timestamp': f"2025-01-0{jour}T{numero % 24:02d}:{numero % 60:02d}:00",
+         'store_id': 1 + numero % 2, 'cashier_id': 'c1', 'payment_method': 'card',
+         'items': [{'product_id': 1, 'quantity': 1, 'unit_price': 2.0}], 'final_amount': 2.0}
+        for jour in (1, 2, 3) for numero in range(250)
+    ))
+    client = sales_app.app.test_client()
+    appels = _Appels()
+
+    def get(url, params=None, timeout=None):
+        appels.append(dict(params or {}))
+        if (params.get('date_from'), params.get('offset')) in appels.pannes:
+            return Mock(status_code=503, json=lambda: {'error': 'indisponible'})
+        response = client.get('/api/v1/sales', query_string=params)
+        return Mock(status_code=response.status_code, json=response.get_json)
+
+    monkeypatch.setattr(reporting_app.http_session, 'get', get)
+    monkeypatch.setattr(reporting_app, 'REPORT_JOB_CHUNK_DAYS', 2)
+    monkeypatch.setattr(reporting_app, 'REPORT_JOB_SALES_PAGE_SIZE', 100)
+    return appels
+
+
+class TestRapportVentesEnJob:
+    """Un job lit toutes les ventes de chaque tranche, au-delà de la page par défaut"""
+
+    def test_tranches_de_plus_de_100_ventes(self, ventes):
+        progression = []
+        rapport = reporting_app.run_sales_report_job(
+            {'date_range': {'start_date': '2025-01-01', 'end_date': '2025-01-03'}},
+            lambda fraction, message: progression.append(message)
+        )
+        assert len(rapport['data']) == 750
+        assert len({vente['transaction_id'] for vente in rapport['data']}) == 750
+        assert rapport['summary']['total_transactions'] == 750
+        assert len(ventes) == 5 + 3  # tranche de 2 jours : 500 ventes en 5 pages, puis 250 en 3 pages
+        assert progression[-1] == 'calcul du résumé'
+
+    def test_pages_par_magasin(self, ventes):
+        rapport = reporting_app.run_sales_report_job(
+            {'store_ids': [1, 2], 'date_range': {'start_date': '2025-01-02', 'end_date': '2025-01-02'}},
+            lambda fraction, message: None
+        )
+        assert len(rapport['data']) == 250
+        assert {appel['store_id'] for appel in ventes} == {1, 2}
+
+    def test_page_en_echec_fait_echouer_le_job(self, ventes):
+        """Pas de rapport incomplet : le job échoue en nommant l'appel manquant"""
+        ventes.pannes = {('2025-01-03', 200)}
+        with pytest.raises(reporting_app.UpstreamError) as echec:
+            reporting_app.run_sales_report_job(
+                {'date_range': {'start_date': '2025-01-01', 'end_date': '2025-01-03'}},
+                lambda fraction, message: None
+            )
+        assert 'tous magasins (code 503)' in str(echec.value)
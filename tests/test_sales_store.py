@@ -0,0 +1,68 @@
+"""
+Tests du stockage des ventes de sales-service (partitions par jour, index, résumés)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'microservices', 'sales-service'
+)))
+
+from sales_store import SalesStore
+
+
+def _vente(numero, jour, magasin, caissier, montant=10.0, nb_articles=1):
+    return {
+        'transaction_id': f"t{numero}",
+        'timestamp': f"2025-01-{jour:02d}T{numero % 24:02d}:00:00",
+        'store_id': magasin,
+        'cashier_id': caissier,
+        'items': [{'product_id': 1, 'quantity': 1}] * nb_articles,
+        'final_amount': montant
+    }
+
+
+def _store():
+    return SalesStore(
+        _vente(numero, jour=1 + numero % 5, magasin=1 + numero % 3, caissier=f"c{numero % 2}")
+        for numero in range(60)
+    )
+
+
+class TestSalesStore:
+    """Requêtes et résumés comparés à un parcours complet"""
+
+    def test_requetes_equivalentes_au_parcours_complet(self):
+        """Filtres magasin/caissier/dates, plus récentes d'abord, limite respectée"""
+        store = _store()
+        toutes = [store.get(f"t{numero}") for numero in range(60)]
+
+        for filtres in ({}, {'store_id': 2}, {'cashier_id': 'c1', 'date_from': '2025-01-02'},
+                        {'store_id': 3, 'cashier_id': 'c0', 'date_from': '2025-01-02', 'date_to': '2025-01-04'}):
+            attendues = sorted(
+                (v for v in toutes
+                 if filtres.get('store_id') in (None, v['store_id'])
+                 and filtres.get('cashier_id') in (None, v['cashier_id'])
+                 and v['timestamp'][:10] >= filtres.get('date_from', '')
+                 and v['timestamp'][:10] <= filtres.get('date_to', '9999')),
+                key=lambda v: v['timestamp'], reverse=True
+            )
+            assert store.query(**filtres) == attendues
+            assert store.query(limit=5, **filtres) == attendues[:5]
+
+    def test_resumes_quotidiens(self):
+        """Résumés par jour et par (jour, magasin) tenus à jour à l'ajout"""
+        store = _store()
+        store.add(_vente(100, jour=1, magasin=1, caissier='c9', montant=5.5, nb_articles=3))
+
+        ventes_jour = [v for v in (store.get(f"t{n}") for n in list(range(60)) + [100])
+                       if v['timestamp'].startswith('2025-01-01')]
+        resume = store.daily_summary('2025-01-01')
+        resume_magasin = store.daily_summary('2025-01-01', store_id=1)
+
+        assert resume['transactions'] == len(ventes_jour)
+        assert resume['total_amount'] == sum(v['final_amount'] for v in ventes_jour)
+        assert resume_magasin['transactions'] == len([v for v in ventes_jour if v['store_id'] == 1])
+        assert resume_magasin['total_sales'] == sum(len(v['items']) for v in ventes_jour if v['store_id'] == 1)
+        assert store.daily_summary('2030-01-01')['transactions'] == 0
+        assert [r['date'] for r in store.daily_summaries()] == [f"2025-01-0{j}" for j in range(5, 0, -1)]
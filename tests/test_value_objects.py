@@ -0,0 +1,58 @@
+"""
+Tests des Value Objects compacts des bounded contexts
+"""
+
+import copy
+import pickle
+import pytest
+from dataclasses import FrozenInstanceError
+from decimal import Decimal
+
+from src.api.bounded_contexts.shared.value_objects.entity_id import CategoryId, INTERN_MAX_ID
+from src.api.bounded_contexts.shared.value_objects.money import Money
+from src.api.bounded_contexts.product_catalog.domain.value_objects.product_id import (
+    ProductId, ProductName, StockQuantity
+)
+
+
+class TestValueObjectsCompacts:
+
+    def test_petits_ids_internes(self):
+        """Les petits IDs sont partagés, par type d'ID"""
+        assert ProductId(42) is ProductId(42)
+        assert ProductId(42) != CategoryId(42)
+        assert ProductId(INTERN_MAX_ID + 1) == ProductId(INTERN_MAX_ID + 1)
+        assert ProductId(INTERN_MAX_ID + 1) is not ProductId(INTERN_MAX_ID + 1)
+
+    def test_validation_conservee(self):
+        """La validation s'applique toujours à la construction"""
+        with pytest.raises(ValueError):
+            ProductId(0)
+        with pytest.raises(ValueError):
+            ProductId("12")
+        ProductId(1)
+        for valeur in (1.0, True):  # égales à 1 : ne doivent pas retrouver l'instance internée
+            with pytest.raises(ValueError):
+                ProductId(valeur)
+        with pytest.raises(ValueError):
+            Money(Decimal("-1"))
+
+    def test_immuables_et_sans_dict(self):
+        """Slots (pas de __dict__) et immutabilité"""
+        for value_object, champ in ((ProductId(1), 'value'), (Money.from_float(1.5), 'amount'),
+                                    (ProductName("Pain"), 'value'), (StockQuantity(3), 'value')):
+            assert not hasattr(value_object, '__dict__')
+            with pytest.raises(FrozenInstanceError):
+                setattr(value_object, champ, 2)
+
+    def test_hash_et_egalite_money(self):
+        """Le hash mis en cache reste cohérent avec l'égalité"""
+        assert Money.from_float(1.5) == Money(Decimal("1.50"))
+        assert hash(Money.from_float(1.5)) == hash(Money(Decimal("1.50")))
+        assert len({Money.from_float(1.5), Money(Decimal("1.5")), Money(Decimal("1.5"), "USD")}) == 2
+
+    def test_copie_et_pickle(self):
+        """Les IDs internés survivent à copy et pickle"""
+        assert copy.deepcopy(ProductId(7)) is ProductId(7)
+        assert pickle.loads(pickle.dumps(ProductId(7))) is ProductId(7)
+        assert pickle.loads(pickle.dumps(Money.from_float(2.5))) == Money.from_float(2.5)
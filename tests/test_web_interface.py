@@ -9,9 +9,22 @@ from unittest.mock import Mock, patch
 from decimal import Decimal
 
 from src.web.app import create_app
+from src.web.diffusion_indicateurs import DiffuseurIndicateurs
 from src.domain.entities import IndicateurPerformance
 
 
+def _indicateur(entite_id, ventes, ca="1000.00"):
+    return IndicateurPerformance(
+        entite_id=entite_id,
+        entite_nom=f"Magasin {entite_id}",
+        chiffre_affaires=Decimal(ca),
+        nombre_ventes=ventes,
+        produits_en_rupture=0,
+        produits_en_surstock=1,
+        tendance_hebdomadaire=Decimal("5.0")
+    )
+
+
 class TestInterfaceWebSupervision:
     """Tests pour l'interface web de supervision uniquement"""
 
@@ -92,5 +105,65 @@ class TestInterfaceWebSupervision:
         assert response.status_code == 200
 
 
+
+class TestDiffusionIndicateurs:
+    """Tests du flux SSE partagé des indicateurs"""
+
+    def test_calcul_partage_entre_superviseurs(self):
+        """Plusieurs chargements du tableau de bord dans l'intervalle : un seul calcul"""
+        app = create_app()
+        app.config['TESTING'] = True
+        client = app.test_client()
+
+        with patch('src.web.app.get_db_session', return_value=Mock()):
+            with patch('src.web.app.ServiceTableauBord') as mock_service_class:
+                mock_service_class.return_value.obtenir_indicateurs_performance.return_value = [_indicateur(1, 10)]
+                for _ in range(5):
+                    assert client.get('/dashboard').status_code == 200
+
+        assert mock_service_class.return_value.obtenir_indicateurs_performance.call_count == 1
+
+    def test_delta_limite_aux_magasins_modifies(self):
+        """Seuls les champs modifiés sont publiés ; un client en retard reçoit l'instantané"""
+        resultats = [
+            [_indicateur(1, 10), _indicateur(2, 20)],
+            [_indicateur(1, 11, ca="1010.50"), _indicateur(2, 20)],
+            [_indicateur(1, 11, ca="1010.50"), _indicateur(2, 20)],
+        ]
+        diffuseur = DiffuseurIndicateurs(lambda: resultats.pop(0), intervalle=0)
+
+        diffuseur.rafraichir()
+        delta = diffuseur.rafraichir()
+        assert delta['version'] == 2
+        assert delta['changements'] == {'1': {'chiffre_affaires': 1010.5, 'nombre_ventes': 11}}
+        assert delta['totaux']['nombre_ventes'] == 31
+
+        assert diffuseur.rafraichir() is None  # Aucun changement : rien à pousser
+        assert diffuseur.prochain_message(1, timeout=0)[0] == 'delta'
+        evenement, message = diffuseur.prochain_message(0, timeout=0)
+        assert evenement == 'instantane'
+        assert set(message['indicateurs']) == {'1', '2'}
+        assert diffuseur.prochain_message(2, timeout=0) == ('battement', None)
+        # Last-Event-ID d'avant un redémarrage du serveur : instantané immédiat
+        evenement, message = diffuseur.prochain_message(57, timeout=0)
+        assert evenement == 'instantane' and message['version'] == 2
+
+    def test_flux_sse(self):
+        """Le flux commence par l'instantané courant"""
+        app = create_app()
+        app.config['TESTING'] = True
+
+        with patch('src.web.app.get_db_session', return_value=Mock()):
+            with patch('src.web.app.ServiceTableauBord') as mock_service_class:
+                mock_service_class.return_value.obtenir_indicateurs_performance.return_value = [_indicateur(1, 10)]
+                response = app.test_client().get('/dashboard/stream', buffered=False)
+                premier = next(response.response)
+                response.close()
+
+        assert response.mimetype == 'text/event-stream'
+        texte = premier.decode() if isinstance(premier, bytes) else premier
+        assert texte.startswith("id: 1\nevent: instantane\n")
+
+
 if __name__ == '__main__':
     pytest.main([__file__]) 
\ No newline at end of file